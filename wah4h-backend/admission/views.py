@@ -12,12 +12,12 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
 from django.db import transaction
 
 from admission.models import Encounter, Procedure
 from accounts.models import Location
 from patients.models import Patient
+from patients.services import patient_acl
 
 # Serializer Imports
 from admission.serializers import (
@@ -219,38 +219,47 @@ class EncounterViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def search_patients(self, request):
         """
-        Search for patients by name or patient ID.
-        Uses direct ORM query with Q objects for flexible search.
+        Search for patients by name, patient ID or PhilHealth ID.
+        Non-empty queries go through the indexed, ranked patient search
+        engine (patient_acl.search_patients) shared with /api/patients/search/.
         """
         query = request.query_params.get('q', '').strip()
 
-        # Direct ORM query - no service layer
         if not query:
             patients = Patient.objects.filter(active=True).order_by('-id')[:10]
-        else:
-            patients = Patient.objects.filter(
-                Q(first_name__icontains=query) | 
-                Q(last_name__icontains=query) | 
-                Q(patient_id__icontains=query),
-                active=True
-            ).order_by('-id')[:10]
-        
-        # Build response with patient summaries
+            results = [
+                {
+                    'id': p.id,
+                    'patientId': p.patient_id,
+                    'name': f"{p.first_name} {p.last_name}",
+                    'firstName': p.first_name,
+                    'lastName': p.last_name,
+                    'dob': p.birthdate.isoformat() if p.birthdate else None,
+                    'age': p.age,
+                    'gender': p.gender,
+                    'contact': p.mobile_number,
+                    'philhealth': p.philhealth_id
+                }
+                for p in patients
+            ]
+            return Response(results, status=status.HTTP_200_OK)
+
+        # Ranked search via the patient ACL (slim DTOs, best match first)
         results = []
-        for p in patients:
+        for p in patient_acl.search_patients(query, limit=10, shape=patient_acl.DTO_SLIM):
             results.append({
-                'id': p.id,
-                'patientId': p.patient_id,
-                'name': f"{p.first_name} {p.last_name}",
-                'firstName': p.first_name,
-                'lastName': p.last_name,
-                'dob': p.birthdate.isoformat() if p.birthdate else None,
-                'age': p.age,
-                'gender': p.gender,
-                'contact': p.mobile_number,
-                'philhealth': p.philhealth_id
+                'id': p['id'],
+                'patientId': p['patient_id'] or None,
+                'name': f"{p['first_name']} {p['last_name']}",
+                'firstName': p['first_name'],
+                'lastName': p['last_name'],
+                'dob': p['birthdate'],
+                'age': p['age'],
+                'gender': p['gender'] or None,
+                'contact': p['mobile_number'] or None,
+                'philhealth': p['philhealth_id'] or None
             })
-            
+
         return Response(results, status=status.HTTP_200_OK)
 
 
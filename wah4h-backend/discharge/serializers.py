@@ -1,6 +1,5 @@
 from rest_framework import serializers
 from .models import Discharge
-from patients.models import Patient
 from admission.models import Encounter
 from accounts.models import Practitioner, Location
 from datetime import date, datetime
@@ -9,7 +8,8 @@ class DischargeSerializer(serializers.ModelSerializer):
     """
     Serializer for Discharge records.
     Standardized on camelCase for frontend dashboard alignment.
-    Uses pre-fetched objects (patient_obj, encounter_obj) for efficiency.
+    Uses pre-fetched objects (patient_obj, encounter_obj) for efficiency;
+    patient_obj is a patient ACL summary DTO.
     """
     # Aliases for Frontend Compatibility
     id = serializers.IntegerField(source='discharge_id', read_only=True)
@@ -53,7 +53,7 @@ class DischargeSerializer(serializers.ModelSerializer):
 
     def get_patientName(self, obj):
         if hasattr(obj, 'patient_obj') and obj.patient_obj:
-            return f"{obj.patient_obj.first_name} {obj.patient_obj.last_name}".strip()
+            return f"{obj.patient_obj['first_name']} {obj.patient_obj['last_name']}".strip()
         return "Unknown Patient"
 
     def get_room(self, obj):
@@ -82,13 +82,13 @@ class DischargeSerializer(serializers.ModelSerializer):
 
     def get_age(self, obj):
         if hasattr(obj, 'patient_obj') and obj.patient_obj:
-            age = obj.patient_obj.age
+            age = obj.patient_obj['age']
             return age if age is not None else "N/A"
         return "N/A"
 
     def get_birthdate(self, obj):
-        if hasattr(obj, 'patient_obj') and obj.patient_obj and obj.patient_obj.birthdate:
-            return obj.patient_obj.birthdate.isoformat()
+        if hasattr(obj, 'patient_obj') and obj.patient_obj and obj.patient_obj['birthdate']:
+            return obj.patient_obj['birthdate']
         return None
 
     def get_condition(self, obj):
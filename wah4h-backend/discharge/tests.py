@@ -4,6 +4,7 @@ from rest_framework import status
 from django.urls import reverse
 from admission.models import Encounter
 from patients.models import Patient
+from patients.services import patient_acl
 from accounts.models import Practitioner
 from .models import Discharge
 from .serializers import DischargeSerializer
@@ -90,7 +91,7 @@ class DischargeWorkflowTests(APITestCase):
         discharge.save()
         
         # Attach pre-fetched objects as expected by the optimized serializer
-        discharge.patient_obj = self.patient
+        discharge.patient_obj = patient_acl.get_patient_summary(self.patient.id)
         discharge.encounter_obj = encounter
         discharge.encounter_obj.practitioner_obj = self.practitioner
         
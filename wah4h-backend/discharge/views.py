@@ -10,7 +10,7 @@ import logging
 from .models import Discharge
 from .serializers import DischargeSerializer
 from admission.models import Encounter
-from patients.models import Patient
+from patients.services import patient_acl
 from accounts.models import Practitioner, Location
 from billing.models import Invoice
 
@@ -34,7 +34,7 @@ class DischargeViewSet(viewsets.ModelViewSet):
             if instance.patient_id: patient_ids.add(instance.patient_id)
             if instance.encounter_id: encounter_ids.add(instance.encounter_id)
         
-        patients = {p.id: p for p in Patient.objects.filter(id__in=patient_ids)}
+        patients = patient_acl.get_patient_summaries(patient_ids)
         encounters = {e.encounter_id: e for e in Encounter.objects.filter(encounter_id__in=encounter_ids)}
         
         practitioner_ids = set()
@@ -65,10 +65,7 @@ class DischargeViewSet(viewsets.ModelViewSet):
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
         # Enrich instance manually for single retrieve
-        try:
-            instance.patient_obj = Patient.objects.get(id=instance.patient_id)
-        except Patient.DoesNotExist:
-            instance.patient_obj = None
+        instance.patient_obj = patient_acl.get_patient_summary(instance.patient_id)
             
         try:
             enc = Encounter.objects.get(encounter_id=instance.encounter_id)
@@ -167,10 +164,7 @@ class DischargeViewSet(viewsets.ModelViewSet):
                     logger.warning(f"Encounter {instance.encounter_id} not found during discharge processing.")
         
         # Re-fetch or manually attach patient for response enrichment
-        try:
-            instance.patient_obj = Patient.objects.get(id=instance.patient_id)
-        except Patient.DoesNotExist:
-            instance.patient_obj = None
+        instance.patient_obj = patient_acl.get_patient_summary(instance.patient_id)
             
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
@@ -231,7 +225,7 @@ class DischargeViewSet(viewsets.ModelViewSet):
             
             invoices = list(eligible_invoices[:50])
             patient_ids = [inv.subject_id for inv in invoices]
-            patients = {p.id: p for p in Patient.objects.filter(id__in=patient_ids)}
+            patients = patient_acl.get_patient_summaries(patient_ids)
             
             results = []
             for inv in invoices:
@@ -239,7 +233,7 @@ class DischargeViewSet(viewsets.ModelViewSet):
                 if not pat: continue
                 
                 # Get latest encounter for metadata
-                enc = Encounter.objects.filter(subject_id=pat.id).order_by('-encounter_id').first()
+                enc = Encounter.objects.filter(subject_id=pat['id']).order_by('-encounter_id').first()
                 
                 # Logic to extract Room from Admission location_status
                 room_display = "N/A"
@@ -260,10 +254,10 @@ class DischargeViewSet(viewsets.ModelViewSet):
 
                 results.append({
                     "billing_id": inv.invoice_id,
-                    "patient_name": f"{pat.first_name} {pat.last_name}",
-                    "hospital_id": pat.patient_id,
+                    "patient_name": f"{pat['first_name']} {pat['last_name']}",
+                    "hospital_id": pat['patient_id'] or None,
                     "room": room_display,
-                    "age": pat.age if pat.age is not None else "N/A",
+                    "age": pat['age'] if pat['age'] is not None else "N/A",
                     "department": enc.service_type if enc else "General",
                     "admission_date": inv.invoice_datetime.strftime("%Y-%m-%d") if inv.invoice_datetime else "N/A",
                 })
@@ -1,6 +1,7 @@
 from django.db import transaction
 from django.utils import timezone
 from rest_framework import serializers
+from patients.services import patient_acl
 from .models import (
     DiagnosticReport,
     DiagnosticReportResult,
@@ -132,14 +133,14 @@ class DiagnosticReportListSerializer(serializers.ModelSerializer):
         patients_map = self.context.get('patients_map', {})
         if obj.subject_id in patients_map:
             patient = patients_map[obj.subject_id]
-            return f"{patient.first_name or ''} {patient.last_name or ''}".strip() or "Unknown Patient"
+            return f"{patient['first_name']} {patient['last_name']}".strip() or "Unknown Patient"
         return "Unknown Patient" # simplified fallback for list view
 
     def get_subject_patient_id(self, obj):
         patients_map = self.context.get('patients_map', {})
         if obj.subject_id in patients_map:
             patient = patients_map[obj.subject_id]
-            return patient.patient_id or f"P-{patient.id}"
+            return patient['patient_id'] or f"P-{patient['id']}"
         return f"P-{obj.subject_id}"
 
     def get_lifecycleStatus(self, obj):
@@ -233,15 +234,12 @@ class DiagnosticReportSerializer(serializers.ModelSerializer):
         patients_map = self.context.get('patients_map', {})
         if obj.subject_id in patients_map:
             patient = patients_map[obj.subject_id]
-            return f"{patient.first_name or ''} {patient.last_name or ''}".strip() or "Unknown Patient"
-
-        # Fallback to DB
-        from patients.models import Patient
-        try:
-            patient = Patient.objects.get(id=obj.subject_id)
-            return f"{patient.first_name or ''} {patient.last_name or ''}".strip() or "Unknown Patient"
-        except Patient.DoesNotExist:
+        else:
+            # Fallback to the patient ACL (served from the request's lookup scope when possible)
+            patient = patient_acl.get_patient_summary(obj.subject_id)
+        if not patient:
             return "Unknown Patient"
+        return f"{patient['first_name']} {patient['last_name']}".strip() or "Unknown Patient"
 
     def get_subject_patient_id(self, obj):
         """Fetch patient identifier from Patient model (Optimized)."""
@@ -249,15 +247,12 @@ class DiagnosticReportSerializer(serializers.ModelSerializer):
         patients_map = self.context.get('patients_map', {})
         if obj.subject_id in patients_map:
             patient = patients_map[obj.subject_id]
-            return patient.patient_id or f"P-{patient.id}"
-
-        # Fallback to DB
-        from patients.models import Patient
-        try:
-            patient = Patient.objects.get(id=obj.subject_id)
-            return patient.patient_id or f"P-{patient.id}"
-        except Patient.DoesNotExist:
+        else:
+            # Fallback to the patient ACL (served from the request's lookup scope when possible)
+            patient = patient_acl.get_patient_summary(obj.subject_id)
+        if not patient:
             return f"P-{obj.subject_id}"
+        return patient['patient_id'] or f"P-{patient['id']}"
 
     def get_lifecycleStatus(self, obj):
         """
@@ -556,19 +551,17 @@ class SpecimenSerializer(serializers.ModelSerializer):
         ]
     
     def get_subject(self, obj):
-        """Resolve patient reference using direct ORM."""
+        """Resolve patient reference via the patient ACL."""
         if not obj.subject_id:
             return None
-        try:
-            from patients.models import Patient
-            patient = Patient.objects.get(id=obj.subject_id)
-            return {
-                "id": patient.id,
-                "patient_id": patient.patient_id,
-                "name": f"{patient.first_name} {patient.last_name}"
-            }
-        except:
+        patient = patient_acl.get_patient_summary(obj.subject_id)
+        if not patient:
             return None
+        return {
+            "id": patient['id'],
+            "patient_id": patient['patient_id'] or None,
+            "name": f"{patient['first_name']} {patient['last_name']}"
+        }
     
     def get_collector(self, obj):
         """Resolve collector practitioner reference using direct ORM."""
@@ -622,19 +615,17 @@ class ImagingStudySerializer(serializers.ModelSerializer):
         ]
     
     def get_subject(self, obj):
-        """Resolve patient reference using direct ORM."""
+        """Resolve patient reference via the patient ACL."""
         if not obj.subject_id:
             return None
-        try:
-            from patients.models import Patient
-            patient = Patient.objects.get(id=obj.subject_id)
-            return {
-                "id": patient.id,
-                "patient_id": patient.patient_id,
-                "name": f"{patient.first_name} {patient.last_name}"
-            }
-        except:
+        patient = patient_acl.get_patient_summary(obj.subject_id)
+        if not patient:
             return None
+        return {
+            "id": patient['id'],
+            "patient_id": patient['patient_id'] or None,
+            "name": f"{patient['first_name']} {patient['last_name']}"
+        }
     
     def get_encounter(self, obj):
         """Resolve encounter reference using direct ORM."""
@@ -11,6 +11,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
+from patients.services import patient_acl
 
 from .models import DiagnosticReport, LabTestDefinition, Specimen, ImagingStudy
 from .serializers import (
@@ -147,11 +148,7 @@ class DiagnosticReportViewSet(viewsets.ModelViewSet):
                 practitioner_ids.add(report.performer_id)
         
         # 2. Bulk Fetch
-        patients_map = {}
-        if subject_ids:
-            from patients.models import Patient
-            patients = Patient.objects.filter(id__in=subject_ids)
-            patients_map = {p.id: p for p in patients}
+        patients_map = patient_acl.get_patient_summaries(subject_ids)
 
         practitioners_map = {}
         users_map = {}
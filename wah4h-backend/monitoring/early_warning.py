@@ -0,0 +1,400 @@
+"""
+Early-Warning Scores (NEWS2 / PEWS)
+===================================
+Turns the latest vitals of an encounter into a NEWS2 score (adults, 16 and
+over) or a vitals-based PEWS (children), stored as a derived Observation.
+
+    latest_vitals snapshot changed for a scored code
+        │
+        └─ rescore(encounter_ids)
+               LatestObservation rows of the inputs   one query, no history scan
+               patient birthdates                     one query (NEWS2 vs PEWS)
+               identifier = hash of the inputs
+                   new          ──► bulk_create score Observation
+                                    + one component per parameter
+                   scored before (e.g. a retraction restored an earlier
+                   input set) ──► reuse that Observation
+               latest_vitals.pin ──► LatestObservation (NEWS2_CODE / PEWS_CODE)
+                   always the computed score, whatever its effective time
+
+    GET /api/monitoring/observations/deteriorating/   deteriorating()
+        score snapshot rows of in-progress encounters, one query
+
+Score Observation:
+    code            NEWS2_CODE or PEWS_CODE, category "survey"
+    value_quantity  total score
+    interpretation  risk band: low / low-medium / medium / high
+    components      code of each scored parameter, value_quantity = its points
+    derived_from_id newest input observation
+
+Parameters missing from the snapshot, or older than STALE_AFTER relative to
+the newest input, score 0 and are reported as missing. Consciousness and
+supplemental oxygen are only scored when recorded (67775-7 / 3151-8 / 3150-0).
+
+NEWS2 uses the RCP 2017 chart with SpO2 scale 1. The PEWS bands below are
+age-banded vital-sign thresholds; review them against the local paediatric
+escalation policy before relying on them.
+"""
+
+import hashlib
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from monitoring import latest_vitals
+from monitoring.models import LatestObservation, Observation, ObservationComponent
+
+
+# Local codes of the derived score observations
+NEWS2_CODE = 'news2-score'
+PEWS_CODE = 'pews-score'
+SCORE_CODES = (NEWS2_CODE, PEWS_CODE)
+
+BLOOD_PRESSURE = '85354-9'
+SYSTOLIC = '8480-6'
+RESPIRATORY_RATE = '9279-1'
+OXYGEN_SATURATION = '2708-6'
+HEART_RATE = '8867-4'
+TEMPERATURE = '8310-5'
+CONSCIOUSNESS = '67775-7'        # level of responsiveness (ACVPU)
+OXYGEN_FLOW = '3151-8'           # inhaled oxygen flow rate, L/min
+OXYGEN_CONCENTRATION = '3150-0'  # inhaled oxygen concentration, %
+
+# Scored parameters, keyed by the code reported in score components
+PARAMETERS = (RESPIRATORY_RATE, OXYGEN_SATURATION, 'oxygen', SYSTOLIC, HEART_RATE, 'consciousness', TEMPERATURE)
+
+# Snapshot codes that feed a score
+INPUT_CODES = frozenset({
+    BLOOD_PRESSURE, SYSTOLIC, RESPIRATORY_RATE, OXYGEN_SATURATION, HEART_RATE, TEMPERATURE,
+    CONSCIOUSNESS, OXYGEN_FLOW, OXYGEN_CONCENTRATION,
+})
+
+# Inputs this much older than the newest input of the encounter are not scored
+STALE_AFTER = timedelta(hours=12)
+
+# NEWS2 is validated from this age; younger patients get PEWS
+ADULT_AGE = 16
+
+RISK_LOW = 'low'
+RISK_LOW_MEDIUM = 'low-medium'
+RISK_MEDIUM = 'medium'
+RISK_HIGH = 'high'
+RISK_ORDER = (RISK_LOW, RISK_LOW_MEDIUM, RISK_MEDIUM, RISK_HIGH)
+
+INF = float('inf')
+
+# (highest value, points) bands, checked in order
+Bands = Tuple[Tuple[float, int], ...]
+
+NEWS2_BANDS: Dict[str, Bands] = {
+    RESPIRATORY_RATE: ((8, 3), (11, 1), (20, 0), (24, 2), (INF, 3)),
+    OXYGEN_SATURATION: ((91, 3), (93, 2), (95, 1), (INF, 0)),
+    SYSTOLIC: ((90, 3), (100, 2), (110, 1), (219, 0), (INF, 3)),
+    HEART_RATE: ((40, 3), (50, 1), (90, 0), (110, 1), (130, 2), (INF, 3)),
+    TEMPERATURE: ((35.0, 3), (36.0, 1), (38.0, 0), (39.0, 1), (INF, 2)),
+}
+
+# (age in months below which the bands apply, bands)
+PEWS_BANDS: Tuple[Tuple[float, Dict[str, Bands]], ...] = (
+    (12, {
+        RESPIRATORY_RATE: ((19, 3), (29, 1), (50, 0), (60, 1), (70, 2), (INF, 3)),
+        HEART_RATE: ((89, 3), (109, 1), (160, 0), (170, 1), (180, 2), (INF, 3)),
+        SYSTOLIC: ((59, 3), (69, 1), (90, 0), (100, 1), (INF, 2)),
+    }),
+    (60, {
+        RESPIRATORY_RATE: ((15, 3), (23, 1), (40, 0), (50, 1), (60, 2), (INF, 3)),
+        HEART_RATE: ((79, 3), (94, 1), (140, 0), (150, 1), (170, 2), (INF, 3)),
+        SYSTOLIC: ((69, 3), (79, 1), (100, 0), (110, 1), (INF, 2)),
+    }),
+    (144, {
+        RESPIRATORY_RATE: ((11, 3), (19, 1), (30, 0), (40, 1), (50, 2), (INF, 3)),
+        HEART_RATE: ((69, 3), (79, 1), (120, 0), (130, 1), (150, 2), (INF, 3)),
+        SYSTOLIC: ((79, 3), (89, 1), (110, 0), (120, 1), (INF, 2)),
+    }),
+    (INF, {
+        RESPIRATORY_RATE: ((9, 3), (11, 1), (20, 0), (25, 1), (30, 2), (INF, 3)),
+        HEART_RATE: ((49, 3), (59, 1), (100, 0), (110, 1), (130, 2), (INF, 3)),
+        SYSTOLIC: ((89, 3), (99, 1), (120, 0), (130, 1), (INF, 2)),
+    }),
+)
+PEWS_COMMON_BANDS: Dict[str, Bands] = {
+    OXYGEN_SATURATION: ((91, 3), (93, 2), (95, 1), (INF, 0)),
+    TEMPERATURE: ((35.0, 3), (35.9, 1), (37.9, 0), (38.9, 1), (INF, 2)),
+}
+
+OXYGEN_POINTS = 2
+CONFUSED_POINTS = 3
+
+# ACVPU: anything but "alert" scores CONFUSED_POINTS
+_ALERT_VALUES = {'a', 'alert'}
+
+
+# ============================================================================
+# SCORING
+# ============================================================================
+
+def band_points(bands: Bands, value: float) -> int:
+    for highest, points in bands:
+        if value <= highest:
+            return points
+    return bands[-1][1]
+
+
+def score(values: Dict[str, Any], age_months: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Score one set of parameter values.
+
+    Args:
+        values: {parameter: value}; numeric parameters as numbers,
+                'oxygen' as bool, 'consciousness' as an ACVPU letter or word
+        age_months: patient age; under ADULT_AGE years selects PEWS
+
+    Returns:
+        {'code', 'total', 'risk', 'points': {parameter: points}, 'missing': [...]}
+    """
+    pediatric = age_months is not None and age_months < ADULT_AGE * 12
+    if pediatric:
+        bands = dict(PEWS_COMMON_BANDS)
+        bands.update(next(table for below, table in PEWS_BANDS if age_months < below))
+    else:
+        bands = NEWS2_BANDS
+
+    points: Dict[str, int] = {}
+    for parameter in PARAMETERS:
+        value = values.get(parameter)
+        if value is None:
+            continue
+        if parameter == 'oxygen':
+            points[parameter] = OXYGEN_POINTS if value else 0
+        elif parameter == 'consciousness':
+            points[parameter] = 0 if str(value).strip().lower() in _ALERT_VALUES else CONFUSED_POINTS
+        else:
+            points[parameter] = band_points(bands[parameter], float(value))
+
+    total = sum(points.values())
+    return {
+        'code': PEWS_CODE if pediatric else NEWS2_CODE,
+        'total': total,
+        'risk': risk(total, max(points.values(), default=0)),
+        'points': points,
+        'missing': [p for p in PARAMETERS if p not in points],
+    }
+
+
+def risk(total: int, highest_single: int) -> str:
+    """NEWS2 clinical risk band of a total (also used for PEWS)."""
+    if total >= 7:
+        return RISK_HIGH
+    if total >= 5:
+        return RISK_MEDIUM
+    if highest_single >= 3:
+        return RISK_LOW_MEDIUM
+    return RISK_LOW
+
+
+def values_from_snapshot(rows: Iterable[LatestObservation]) -> Tuple[Dict[str, Any], List[LatestObservation]]:
+    """
+    Parameter values from an encounter's snapshot rows.
+
+    Returns ({parameter: value}, the rows used). Rows older than STALE_AFTER
+    before the newest row are left out.
+    """
+    rows = [row for row in rows if row.code in INPUT_CODES]
+    if not rows:
+        return {}, []
+    newest = max(row.effective_datetime for row in rows)
+    rows = sorted(
+        (row for row in rows if newest - row.effective_datetime <= STALE_AFTER),
+        key=lambda row: (row.effective_datetime, row.observation_id),
+    )
+
+    values: Dict[str, Any] = {}
+    used: Dict[str, LatestObservation] = {}
+
+    def take(parameter, value, row):
+        if value is not None:
+            values[parameter] = value
+            used[parameter] = row
+
+    # Oldest first, so a later reading of the same parameter wins
+    for row in rows:
+        if row.code == BLOOD_PRESSURE:
+            systolic = next((c['value_quantity'] for c in row.components if c['code'] == SYSTOLIC), None)
+            take(SYSTOLIC, systolic, row)
+        elif row.code == OXYGEN_FLOW and row.value_quantity is not None:
+            take('oxygen', row.value_quantity > 0, row)
+        elif row.code == OXYGEN_CONCENTRATION and row.value_quantity is not None:
+            take('oxygen', row.value_quantity > 21, row)
+        elif row.code == CONSCIOUSNESS:
+            take('consciousness', row.value_codeableconcept or row.value_string, row)
+        else:
+            take(row.code, _number(row.value_quantity), row)
+    return values, list({row.observation_id: row for row in used.values()}.values())
+
+
+# ============================================================================
+# INCREMENTAL RESCORE
+# ============================================================================
+
+def rescore(encounter_ids: Iterable[int]) -> List[int]:
+    """
+    Bring the score snapshot of each encounter in line with its current inputs.
+
+    A new input set stores a new score Observation; an input set scored
+    before (e.g. after a retraction) re-points the snapshot at that score.
+    Either way the snapshot shows the computed score, not the newest one.
+    Returns the new observation ids.
+    """
+    from patients.services import patient_acl
+
+    encounter_ids = set(encounter_ids)
+    if not encounter_ids:
+        return []
+
+    inputs: Dict[int, List[LatestObservation]] = {}
+    held: Dict[int, Set[int]] = {}
+    rows = LatestObservation.objects.filter(encounter_id__in=encounter_ids, code__in=INPUT_CODES | set(SCORE_CODES))
+    for row in rows:
+        if row.code in SCORE_CODES:
+            held.setdefault(row.encounter_id, set()).add(row.observation_id)
+        else:
+            inputs.setdefault(row.encounter_id, []).append(row)
+
+    pending, unscored = [], set()
+    for encounter_id in encounter_ids:
+        values, used = values_from_snapshot(inputs.get(encounter_id, ()))
+        if values:
+            pending.append((encounter_id, values, used))
+        elif encounter_id in held:
+            # Every input was retracted or deleted
+            unscored.add(encounter_id)
+
+    scored = []
+    if pending:
+        patients = patient_acl.get_patient_summaries(
+            {used[0].subject_id for _, _, used in pending}, shape=patient_acl.DTO_SLIM,
+        )
+        for encounter_id, values, used in pending:
+            newest = max(used, key=lambda row: (row.effective_datetime, row.observation_id))
+            patient = patients.get(newest.subject_id)
+            birthdate = parse_date(patient['birthdate']) if patient and patient.get('birthdate') else None
+            result = score(values, _age_months(birthdate, newest.effective_datetime.date()))
+            scored.append((_identifier(encounter_id, result, used), newest, result))
+
+    stored = dict(
+        Observation.objects.filter(identifier__in=[identifier for identifier, _, _ in scored])
+        .values_list('identifier', 'observation_id')
+    ) if scored else {}
+    # Scored before, but the snapshot shows something else
+    repin = {
+        newest.encounter_id: stored[identifier] for identifier, newest, _ in scored
+        if identifier in stored and held.get(newest.encounter_id) != {stored[identifier]}
+    }
+    scored = [entry for entry in scored if entry[0] not in stored]
+    if not (scored or repin or unscored):
+        return []
+
+    with transaction.atomic():
+        headers = Observation.objects.bulk_create([
+            Observation(
+                identifier=identifier,
+                status='final',
+                category='survey',
+                code=result['code'],
+                subject_id=newest.subject_id,
+                encounter_id=newest.encounter_id,
+                effective_datetime=newest.effective_datetime,
+                issued=timezone.now(),
+                value_quantity=result['total'],
+                interpretation=result['risk'],
+                method='NEWS2' if result['code'] == NEWS2_CODE else 'PEWS',
+                derived_from_id=newest.observation_id,
+            )
+            for identifier, newest, result in scored
+        ])
+        ObservationComponent.objects.bulk_create([
+            ObservationComponent(observation=header, code=parameter, value_quantity=points)
+            for header, (_, _, result) in zip(headers, scored)
+            for parameter, points in result['points'].items()
+        ])
+        current = [header.observation_id for header in headers] + list(repin.values())
+        # One score row per encounter: drop the other system's row, and the
+        # rows of encounters left without inputs
+        affected = {header.encounter_id for header in headers} | set(repin) | unscored
+        LatestObservation.objects.filter(
+            encounter_id__in=affected, code__in=SCORE_CODES,
+        ).exclude(observation_id__in=current).delete()
+        latest_vitals.pin(current)
+    return [header.observation_id for header in headers]
+
+
+def _identifier(encounter_id: int, result: Dict[str, Any], used: List[LatestObservation]) -> str:
+    """Same encounter, system and input readings -> same identifier (rescoring is idempotent)."""
+    basis = '|'.join(
+        f'{row.observation_id}:{row.effective_datetime.isoformat()}:{row.value_quantity}:'
+        f'{row.value_codeableconcept or row.value_string}:{row.components}'
+        for row in sorted(used, key=lambda row: row.observation_id)
+    )
+    digest = hashlib.sha256(f'{result["code"]}|{basis}'.encode('utf-8')).hexdigest()[:24]
+    return f'{result["code"]}-{encounter_id}-{digest}'
+
+
+def _age_months(birthdate: Optional[date], on: date) -> Optional[int]:
+    if not birthdate:
+        return None
+    return (on.year - birthdate.year) * 12 + on.month - birthdate.month - (on.day < birthdate.day)
+
+
+def _number(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+# ============================================================================
+# READ
+# ============================================================================
+
+def deteriorating(
+    min_risk: str = RISK_LOW_MEDIUM,
+    min_score: Optional[int] = None,
+    location_ids: Optional[Iterable[int]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Latest score of every in-progress encounter at or above a threshold,
+    highest score first.
+
+    An encounter qualifies when its total is at least min_score or, when
+    min_score is not given, its risk band is at least min_risk.
+    """
+    if min_risk not in RISK_ORDER:
+        raise ValueError(f'min_risk must be one of {", ".join(RISK_ORDER)}')
+    floor = RISK_ORDER.index(min_risk)
+
+    patients = []
+    for entry in latest_vitals.current_vitals(codes=SCORE_CODES, location_ids=location_ids):
+        # rescore() keeps one score row per encounter
+        code, latest = next(iter(entry['vitals'].items()))
+        total = int(latest['value_quantity'])
+        band = latest['interpretation']
+        if min_score is not None:
+            qualifies = total >= min_score
+        else:
+            qualifies = band in RISK_ORDER and RISK_ORDER.index(band) >= floor
+        if not qualifies:
+            continue
+        points = {c['code']: int(c['value_quantity']) for c in latest['components']}
+        patients.append({
+            'encounter_id': entry['encounter_id'],
+            'subject_id': entry['subject_id'],
+            'system': 'PEWS' if code == PEWS_CODE else 'NEWS2',
+            'score': total,
+            'risk': band,
+            'observation_id': latest['observation_id'],
+            'effective_datetime': latest['effective_datetime'],
+            'parameters': points,
+            'missing': [p for p in PARAMETERS if p not in points],
+        })
+    patients.sort(key=lambda p: (-p['score'], p['effective_datetime']))
+    return patients
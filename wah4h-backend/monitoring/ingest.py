@@ -0,0 +1,202 @@
+"""
+Bulk Vital-Signs Ingestion
+==========================
+Batches of readings from ward rounds and bedside monitors
+(POST /api/monitoring/observations/bulk/).
+
+    JSON array  /  {"observations": [...]}  /  NDJSON (one object per line)
+        │
+        ├─ validate every item (ObservationIngestSerializer, no queries)
+        ├─ identifiers: one query for those already stored
+        │     dedupe=true  -> already stored or repeated in the batch:
+        │                     "duplicate", pointing at the existing row
+        │     dedupe=false -> reported as an error
+        └─ one transaction: bulk_create headers, then bulk_create components
+              (latest-vitals snapshot updated on commit, see monitoring.latest_vitals)
+
+Every item gets a result in input order; a bad item never rejects the rest.
+If the bulk insert hits a concurrent writer's identifier, the batch is
+retried item by item so only the colliding items fail.
+
+With dedupe (the default) a device can resend a whole batch after a timeout
+without creating doubles: the identifier is the idempotency key.
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Tuple
+
+from django.db import IntegrityError, transaction
+
+from monitoring import latest_vitals
+from monitoring.models import Observation, ObservationComponent
+
+
+# Items accepted per request
+MAX_BATCH = 5000
+
+RESULT_CREATED = 'created'
+RESULT_DUPLICATE = 'duplicate'
+RESULT_ERROR = 'error'
+
+Item = Tuple[int, Dict[str, Any]]
+
+
+class IngestError(ValueError):
+    """The request body as a whole is unusable (reported as HTTP 400)."""
+
+
+# ============================================================================
+# READERS
+# ============================================================================
+
+def items_from_json(data: Any) -> List[Item]:
+    """(index, item) pairs from a parsed JSON array or {"observations": [...]}."""
+    if isinstance(data, dict) and 'observations' in data:
+        data = data['observations']
+    if not isinstance(data, list):
+        raise IngestError('Expected a JSON array of observations')
+    return _check_size([(index, item) for index, item in enumerate(data)])
+
+
+def items_from_ndjson(body: bytes) -> List[Item]:
+    """(line number, item) pairs from an NDJSON body; bad lines become error items."""
+    items = []
+    for line_no, line in enumerate(body.decode('utf-8-sig').splitlines(), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            items.append((line_no, json.loads(line)))
+        except ValueError as e:
+            items.append((line_no, {'__error__': f'Invalid JSON: {e}'}))
+    return _check_size(items)
+
+
+def _check_size(items: List[Item]) -> List[Item]:
+    if len(items) > MAX_BATCH:
+        raise IngestError(f'At most {MAX_BATCH} observations per request')
+    return items
+
+
+# ============================================================================
+# INGEST
+# ============================================================================
+
+def ingest(items: Iterable[Item], dedupe: bool = True) -> Dict[str, Any]:
+    """
+    Validate and store a batch of observations.
+
+    Returns:
+        {'received', 'created', 'duplicates', 'failed',
+         'results': [{'index', 'status', 'identifier', 'observation_id'?, 'errors'?}]}
+    """
+    from monitoring.serializers import ObservationIngestSerializer
+
+    results: List[Dict[str, Any]] = []
+    valid: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+
+    for index, item in items:
+        result = {'index': index, 'identifier': item.get('identifier') if isinstance(item, dict) else None}
+        results.append(result)
+        if not isinstance(item, dict):
+            _fail(result, {'non_field_errors': ['Expected a JSON object']})
+            continue
+        if '__error__' in item:
+            _fail(result, {'non_field_errors': [item['__error__']]})
+            continue
+        serializer = ObservationIngestSerializer(data=item)
+        if not serializer.is_valid():
+            _fail(result, serializer.errors)
+            continue
+        valid.append((result, dict(serializer.validated_data)))
+
+    valid = _resolve_identifiers(valid, dedupe)
+    if valid:
+        try:
+            with transaction.atomic():
+                _insert(valid)
+        except IntegrityError:
+            # Another writer stored one of these identifiers meanwhile
+            for one in valid:
+                try:
+                    with transaction.atomic():
+                        _insert([one])
+                except IntegrityError:
+                    errors = {'identifier': ['Observation with this identifier already exists.']}
+                    for result in (one[0], *one[0].pop('duplicates', ())):
+                        _fail(result, errors)
+
+    return {
+        'received': len(results),
+        'created': sum(r['status'] == RESULT_CREATED for r in results),
+        'duplicates': sum(r['status'] == RESULT_DUPLICATE for r in results),
+        'failed': sum(r['status'] == RESULT_ERROR for r in results),
+        'results': results,
+    }
+
+
+def _resolve_identifiers(valid, dedupe):
+    """Drop items whose identifier is stored already or repeated in the batch."""
+    stored = dict(
+        Observation.objects
+        .filter(identifier__in={data['identifier'] for _, data in valid})
+        .values_list('identifier', 'observation_id')
+    ) if valid else {}
+
+    kept, first_in_batch = [], {}
+    for result, data in valid:
+        identifier = data['identifier']
+        if identifier in stored or identifier in first_in_batch:
+            if not dedupe:
+                _fail(result, {'identifier': ['Observation with this identifier already exists.']})
+                continue
+            result['status'] = RESULT_DUPLICATE
+            if identifier in stored:
+                result['observation_id'] = stored[identifier]
+            else:
+                # Filled in once the first copy is inserted
+                first_in_batch[identifier].setdefault('duplicates', []).append(result)
+            continue
+        first_in_batch[identifier] = result
+        kept.append((result, data))
+    return kept
+
+
+def _insert(valid) -> None:
+    headers, components = [], []
+    for _, data in valid:
+        data = dict(data)
+        parts = data.pop('components', None) or []
+        header = Observation(**data)
+        headers.append(header)
+        components.append(parts)
+
+    Observation.objects.bulk_create(headers)
+
+    rows = [
+        ObservationComponent(
+            observation=header,
+            code=part['code'],
+            value_quantity=part.get('value_quantity'),
+            value_string=part.get('value_string'),
+            value_codeableconcept=part.get('value_codeableconcept'),
+        )
+        for header, parts in zip(headers, components)
+        for part in parts
+    ]
+    if rows:
+        ObservationComponent.objects.bulk_create(rows)
+
+    # bulk_create sends no post_save
+    latest_vitals.record_on_commit(header.observation_id for header in headers)
+
+    for (result, _), header in zip(valid, headers):
+        result['status'] = RESULT_CREATED
+        result['observation_id'] = header.observation_id
+        for duplicate in result.pop('duplicates', ()):
+            duplicate['observation_id'] = header.observation_id
+
+
+def _fail(result: Dict[str, Any], errors: Any) -> None:
+    result['status'] = RESULT_ERROR
+    result['errors'] = errors
@@ -0,0 +1,339 @@
+"""
+Latest Vitals Snapshot
+======================
+Maintains LatestObservation: the most recent observation per
+(encounter_id, code), so "current BP/HR/Temp/SpO2 of every admitted patient"
+is one indexed read instead of a scan of Observation history.
+
+    Observation save / delete  (monitoring.signals)
+    bulk ingestion             (monitoring.ingest)
+        │
+        └─ on commit, once per transaction (components are stored by then)
+             record(observation_ids)   every id saved in the transaction
+                 newer than the snapshot row, or the same observation
+                 re-saved ──► upsert
+                 no longer chartable (entered-in-error / cancelled)
+                 ──► recompute that (encounter_id, code) from history
+             refresh_keys(keys)   after a delete: recompute from history
+                 │
+                 └─ changed vitals ──► early_warning.rescore(encounters)
+
+    GET /api/monitoring/observations/latest-vitals/   current_vitals()
+        snapshot rows of in-progress encounters, one query
+
+rebuild() (manage.py rebuild_latest_vitals) recomputes the whole table.
+"""
+
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from monitoring.models import LatestObservation, Observation
+
+
+# Frontend vital-sign codes (monitoringService.ts CODES)
+VITAL_CODES = {
+    '85354-9': 'blood_pressure',
+    '8867-4': 'heart_rate',
+    '9279-1': 'respiratory_rate',
+    '8310-5': 'body_temperature',
+    '2708-6': 'oxygen_saturation',
+}
+
+# Observations that never count as the current value
+EXCLUDED_STATUSES = ('entered-in-error', 'cancelled')
+
+_SNAPSHOT_FIELDS = [
+    'subject_id', 'observation', 'status', 'effective_datetime', 'value_quantity',
+    'value_string', 'value_codeableconcept', 'interpretation', 'components', 'updated_at',
+]
+
+# Fields that decide whether a locked row needs rewriting
+_COMPARED_FIELDS = [f if f != 'observation' else 'observation_id' for f in _SNAPSHOT_FIELDS if f != 'updated_at']
+
+Key = Tuple[int, str]
+
+
+# ============================================================================
+# MAINTENANCE
+# ============================================================================
+
+def record_on_commit(observation_ids: Iterable[int]) -> None:
+    """
+    Schedule record() for after the current transaction commits.
+
+    Ids saved in one transaction are merged: the commit runs one record()
+    and one rescore per encounter however many rows and components were
+    written. A failure is logged, not raised: the write it follows has
+    committed already.
+    """
+    _schedule(ids=observation_ids)
+
+
+def refresh_on_commit(keys: Iterable[Key]) -> None:
+    """Schedule refresh_keys() for after the current transaction commits (merged like record_on_commit)."""
+    _schedule(keys=keys)
+
+
+# Per-thread (per-connection) work waiting for the commit
+_pending = threading.local()
+
+
+def _schedule(ids: Iterable[int] = (), keys: Iterable[Key] = ()) -> None:
+    ids, keys = set(ids), set(keys)
+    if not (ids or keys):
+        return
+    if not hasattr(_pending, 'ids'):
+        _pending.ids, _pending.keys = set(), set()
+    _pending.ids |= ids
+    _pending.keys |= keys
+    # Every call registers a flush, so a rolled-back transaction can't leave
+    # the batch without one; the first flush takes it all, the rest are no-ops.
+    # Leftovers of a rollback are harmless: both steps re-read the database.
+    transaction.on_commit(_flush, robust=True)
+
+
+def _flush() -> None:
+    ids, keys = getattr(_pending, 'ids', set()), getattr(_pending, 'keys', set())
+    if not (ids or keys):
+        return
+    _pending.ids, _pending.keys = set(), set()
+    changed = record(ids) if ids else set()
+    if keys:
+        changed |= refresh_keys(keys)
+    _snapshot_changed(changed)
+
+
+def record(observation_ids: Iterable[int]) -> Set[Key]:
+    """Fold saved observations into the snapshot; returns the keys that changed."""
+    observations = {
+        obs.pk: obs
+        for obs in Observation.objects.filter(pk__in=list(observation_ids)).prefetch_related('components')
+    }
+    if not observations:
+        return set()
+
+    # Newest saved observation per key
+    candidates: Dict[Key, Observation] = {}
+    for obs in observations.values():
+        key = (obs.encounter_id, obs.code)
+        if _chartable(obs) and (key not in candidates or _sort_key(obs) > _sort_key(candidates[key])):
+            candidates[key] = obs
+
+    keys = {(obs.encounter_id, obs.code) for obs in observations.values()}
+    with transaction.atomic():
+        recompute: Set[Key] = set()
+        # Rows showing one of these observations under its old encounter/code
+        for row in LatestObservation.objects.select_for_update().filter(observation_id__in=list(observations)):
+            obs = observations[row.observation_id]
+            if (row.encounter_id, row.code) != (obs.encounter_id, obs.code):
+                row.delete()
+                recompute.add((row.encounter_id, row.code))
+
+        current = _snapshot_rows(keys)
+        upserts: List[LatestObservation] = []
+        for key in keys:
+            row, obs = current.get(key), candidates.get(key)
+            if obs is not None and (row is None or _sort_key(obs) >= _sort_key(row)):
+                upserts.append(_snapshot_of(obs))
+            elif row is not None and row.observation_id in observations:
+                # The snapshot's own observation was retracted or moved back in time
+                recompute.add(key)
+        changed = _upsert(upserts)
+        refresh_keys(recompute)
+    return changed | recompute
+
+
+def refresh_keys(keys: Iterable[Key]) -> Set[Key]:
+    """Recompute the snapshot of each (encounter_id, code) from Observation history."""
+    keys = set(keys)
+    for encounter_id, code in keys:
+        with transaction.atomic():
+            # Lock first: history read afterwards includes every reading
+            # whose own record() ran before this one
+            list(LatestObservation.objects.select_for_update().filter(encounter_id=encounter_id, code=code))
+            latest = (
+                _chartable_observations()
+                .filter(encounter_id=encounter_id, code=code)
+                .order_by('-effective_datetime', '-observation_id')
+                .prefetch_related('components')
+                .first()
+            )
+            if latest is None:
+                LatestObservation.objects.filter(encounter_id=encounter_id, code=code).delete()
+            else:
+                _upsert([_snapshot_of(latest)], force=True)
+    return keys
+
+
+def pin(observation_ids: Iterable[int]) -> None:
+    """
+    Point the snapshot at these observations whatever their time order
+    (derived values such as early-warning scores, see monitoring.early_warning).
+    """
+    observations = Observation.objects.filter(pk__in=list(observation_ids)).prefetch_related('components')
+    with transaction.atomic():
+        _upsert([_snapshot_of(obs) for obs in observations], force=True)
+
+
+def rebuild(batch_size: int = 2000) -> int:
+    """Recompute the whole snapshot table and rescore; returns the number of rows copied."""
+    with transaction.atomic():
+        LatestObservation.objects.all().delete()
+        written, batch, last_key = 0, [], None
+        observations = (
+            _chartable_observations()
+            .order_by('encounter_id', 'code', '-effective_datetime', '-observation_id')
+            .prefetch_related('components')
+        )
+        for obs in observations.iterator(chunk_size=batch_size):
+            key = (obs.encounter_id, obs.code)
+            if key == last_key:
+                continue
+            last_key = key
+            batch.append(_snapshot_of(obs))
+            if len(batch) >= batch_size:
+                LatestObservation.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            LatestObservation.objects.bulk_create(batch)
+            written += len(batch)
+
+    # Score rows were copied newest-first like any other; put the computed scores back
+    from monitoring import early_warning
+
+    encounter_ids = sorted(set(
+        LatestObservation.objects.filter(code__in=early_warning.INPUT_CODES).values_list('encounter_id', flat=True)
+    ))
+    for start in range(0, len(encounter_ids), batch_size):
+        early_warning.rescore(encounter_ids[start:start + batch_size])
+    return written
+
+
+def _snapshot_changed(keys: Set[Key]) -> None:
+    """Rescore early-warning scores of encounters whose scored vitals changed."""
+    from monitoring import early_warning
+
+    early_warning.rescore({encounter_id for encounter_id, code in keys if code in early_warning.INPUT_CODES})
+
+
+def _chartable(obs: Observation) -> bool:
+    return obs.effective_datetime is not None and obs.status not in EXCLUDED_STATUSES
+
+
+def _chartable_observations():
+    return Observation.objects.filter(effective_datetime__isnull=False).exclude(status__in=EXCLUDED_STATUSES)
+
+
+def _sort_key(obs):
+    """Effective time, then observation_id for readings at the same instant (Observation or snapshot row)."""
+    return (obs.effective_datetime, obs.observation_id)
+
+
+def _snapshot_rows(keys: Set[Key]) -> Dict[Key, LatestObservation]:
+    encounter_ids = {encounter_id for encounter_id, _ in keys}
+    codes = {code for _, code in keys}
+    rows = LatestObservation.objects.select_for_update().filter(encounter_id__in=encounter_ids, code__in=codes)
+    return {(row.encounter_id, row.code): row for row in rows if (row.encounter_id, row.code) in keys}
+
+
+def _snapshot_of(obs: Observation) -> LatestObservation:
+    return LatestObservation(
+        encounter_id=obs.encounter_id,
+        code=obs.code,
+        subject_id=obs.subject_id,
+        observation=obs,
+        status=obs.status,
+        effective_datetime=obs.effective_datetime,
+        value_quantity=obs.value_quantity,
+        value_string=obs.value_string,
+        value_codeableconcept=obs.value_codeableconcept,
+        interpretation=obs.interpretation,
+        components=[
+            {'code': c.code, 'value_quantity': float(c.value_quantity) if c.value_quantity is not None else None}
+            for c in obs.components.all()
+        ],
+    )
+
+
+def _upsert(rows: List[LatestObservation], force: bool = False) -> Set[Key]:
+    """
+    Write snapshot rows (inside a transaction); returns the keys written.
+
+    Missing rows are inserted first and every row is then locked, so two
+    commits racing on a new (encounter_id, code) are serialized: the later
+    one only replaces the row with a reading that sorts at least as new.
+    force replaces it regardless (recomputed from history).
+    """
+    if not rows:
+        return set()
+    LatestObservation.objects.bulk_create(rows, ignore_conflicts=True)
+    current = _snapshot_rows({(row.encounter_id, row.code) for row in rows})
+
+    now = timezone.now()
+    written, updates = set(), []
+    for row in rows:
+        key = (row.encounter_id, row.code)
+        held = current.get(key)
+        if held is None or (not force and _sort_key(row) < _sort_key(held)):
+            # Deleted again before the lock, or a newer reading got there first
+            continue
+        written.add(key)
+        if any(getattr(row, f) != getattr(held, f) for f in _COMPARED_FIELDS):
+            row.pk = held.pk
+            row.updated_at = now  # bulk_update does not apply auto_now
+            updates.append(row)
+    LatestObservation.objects.bulk_update(updates, _SNAPSHOT_FIELDS)
+    return written
+
+
+# ============================================================================
+# READ
+# ============================================================================
+
+def current_vitals(
+    codes: Optional[Iterable[str]] = None,
+    encounter_ids: Optional[Iterable[int]] = None,
+    location_ids: Optional[Iterable[int]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Latest values of every in-progress encounter, one entry per encounter.
+
+    codes defaults to VITAL_CODES; location_ids limits to encounters at
+    those locations (Encounter.location_id).
+    """
+    from admission.models import Encounter
+
+    encounters = Encounter.objects.filter(status='in-progress')
+    if encounter_ids is not None:
+        encounters = encounters.filter(encounter_id__in=list(encounter_ids))
+    if location_ids is not None:
+        encounters = encounters.filter(location_id__in=list(location_ids))
+
+    rows = (
+        LatestObservation.objects
+        .filter(encounter_id__in=encounters.values('encounter_id'), code__in=list(codes or VITAL_CODES))
+        .order_by('encounter_id', 'code')
+    )
+
+    out: Dict[int, Dict[str, Any]] = {}
+    for row in rows:
+        entry = out.setdefault(row.encounter_id, {
+            'encounter_id': row.encounter_id,
+            'subject_id': row.subject_id,
+            'vitals': {},
+        })
+        entry['vitals'][row.code] = {
+            'name': VITAL_CODES.get(row.code),
+            'observation_id': row.observation_id,
+            'effective_datetime': row.effective_datetime,
+            'value_quantity': float(row.value_quantity) if row.value_quantity is not None else None,
+            'value_string': row.value_string,
+            'value_codeableconcept': row.value_codeableconcept,
+            'interpretation': row.interpretation,
+            'components': row.components,
+        }
+    return list(out.values())
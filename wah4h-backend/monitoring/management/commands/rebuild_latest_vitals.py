@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from monitoring import latest_vitals
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the latest-vitals snapshot (LatestObservation) from observation history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Snapshot rows written per insert (default: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('Rebuilding latest-vitals snapshot...'))
+        written = latest_vitals.rebuild(batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} snapshot row(s).'))
@@ -0,0 +1,69 @@
+# Generated by Django 6.0.2 on 2026-10-16 23:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("monitoring", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LatestObservation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("encounter_id", models.BigIntegerField()),
+                ("code", models.CharField(max_length=100)),
+                ("subject_id", models.BigIntegerField(db_index=True)),
+                ("status", models.CharField(max_length=100)),
+                ("effective_datetime", models.DateTimeField()),
+                (
+                    "value_quantity",
+                    models.DecimalField(
+                        blank=True, decimal_places=4, max_digits=12, null=True
+                    ),
+                ),
+                (
+                    "value_string",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                (
+                    "value_codeableconcept",
+                    models.CharField(blank=True, max_length=100, null=True),
+                ),
+                (
+                    "interpretation",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                ("components", models.JSONField(blank=True, default=list)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "observation",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="monitoring.observation",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "monitoring_latest_observation",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("encounter_id", "code"), name="latest_obs_enc_code_uniq"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -126,6 +126,42 @@ class ObservationComponent(models.Model):
         ]
 
 
+class LatestObservation(models.Model):
+    """
+    Most recent Observation per (encounter_id, code) - a maintained snapshot.
+
+    Kept current by monitoring.latest_vitals on every Observation save,
+    delete and bulk ingestion, so dashboards read one row per encounter and
+    code instead of scanning Observation history.
+    """
+    encounter_id = models.BigIntegerField()
+    code = models.CharField(max_length=100)
+    subject_id = models.BigIntegerField(db_index=True)
+    observation = models.OneToOneField(
+        Observation,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+
+    # Copied from the observation so dashboard reads need no join
+    status = models.CharField(max_length=100)
+    effective_datetime = models.DateTimeField()
+    value_quantity = models.DecimalField(max_digits=12, decimal_places=4, null=True, blank=True)
+    value_string = models.CharField(max_length=255, null=True, blank=True)
+    value_codeableconcept = models.CharField(max_length=100, null=True, blank=True)
+    interpretation = models.CharField(max_length=255, null=True, blank=True)
+    # [{"code", "value_quantity"}, ...] e.g. systolic/diastolic of a BP panel
+    components = models.JSONField(default=list, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'monitoring_latest_observation'
+        constraints = [
+            models.UniqueConstraint(fields=['encounter_id', 'code'], name='latest_obs_enc_code_uniq'),
+        ]
+
+
 class ChargeItem(FHIRResourceModel):
     """
     ChargeItem Model (FHIR standard).
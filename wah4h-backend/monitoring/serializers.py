@@ -8,7 +8,7 @@ Direct ORM queries - NO service layers.
 
 from rest_framework import serializers
 from monitoring.models import Observation, ChargeItem, ChargeItemDefinition
-from patients.models import Patient
+from patients.services import patient_acl
 from admission.models import Encounter
 from accounts.models import Practitioner, Organization
 
@@ -100,51 +100,59 @@ class ObservationSerializer(serializers.ModelSerializer):
             'issued',
         ]
     
+    # List views pass patients_map / encounters_map / practitioners_map in the
+    # context (ObservationViewSet._get_prefetch_context); single-object views
+    # fall back to one lookup per reference.
+
     def get_subject(self, obj):
-        """Resolve patient reference using direct ORM."""
+        """Resolve patient reference via the patient ACL (one lookup per subject per request)."""
         if not obj.subject_id:
             return None
-        try:
-            patient = Patient.objects.get(id=obj.subject_id)
-            return {
-                "id": patient.id,
-                "patient_id": patient.patient_id,
-                "name": f"{patient.first_name} {patient.last_name}"
-            }
-        except Patient.DoesNotExist:
+        if 'patients_map' in self.context:
+            patient = self.context['patients_map'].get(obj.subject_id)
+        else:
+            patient = patient_acl.get_patient_summary(obj.subject_id)
+        if not patient:
             return None
+        return {
+            "id": patient['id'],
+            "patient_id": patient['patient_id'] or None,
+            "name": f"{patient['first_name']} {patient['last_name']}"
+        }
     
     def get_encounter(self, obj):
-        """Resolve encounter reference using direct ORM."""
+        """Resolve encounter reference from the context map or direct ORM."""
         if not obj.encounter_id:
             return None
-        try:
-            encounter = Encounter.objects.get(encounter_id=obj.encounter_id)
-            return {
-                "encounter_id": encounter.encounter_id,
-                "identifier": encounter.identifier,
-                "status": encounter.status
-            }
-        except Encounter.DoesNotExist:
+        if 'encounters_map' in self.context:
+            encounter = self.context['encounters_map'].get(obj.encounter_id)
+        else:
+            encounter = Encounter.objects.filter(encounter_id=obj.encounter_id).first()
+        if encounter is None:
             return None
+        return {
+            "encounter_id": encounter.encounter_id,
+            "identifier": encounter.identifier,
+            "status": encounter.status
+        }
     
     def get_performer(self, obj):
-        """Resolve practitioner reference using direct ORM."""
+        """Resolve practitioner reference from the context map or direct ORM."""
         if not obj.performer_id:
             return None
-        try:
-            practitioner = Practitioner.objects.get(practitioner_id=obj.performer_id)
-            return {
-                "practitioner_id": practitioner.practitioner_id,
-                "name": f"{practitioner.first_name} {practitioner.last_name}"
-            }
-        except Practitioner.DoesNotExist:
+        if 'practitioners_map' in self.context:
+            practitioner = self.context['practitioners_map'].get(obj.performer_id)
+        else:
+            practitioner = Practitioner.objects.filter(practitioner_id=obj.performer_id).first()
+        if practitioner is None:
             return None
+        return {
+            "practitioner_id": practitioner.practitioner_id,
+            "name": f"{practitioner.first_name} {practitioner.last_name}"
+        }
     
     def get_components_data(self, obj):
-        """Return components for this observation."""
-        from monitoring.models import ObservationComponent
-        components = ObservationComponent.objects.filter(observation=obj)
+        """Return components for this observation (served by prefetch_related('components') in lists)."""
         return [
             {
                 "code": comp.code,
@@ -152,7 +160,7 @@ class ObservationSerializer(serializers.ModelSerializer):
                 "value_string": comp.value_string,
                 "value_codeableconcept": comp.value_codeableconcept,
             }
-            for comp in components
+            for comp in obj.components.all()
         ]
     
     def create(self, validated_data):
@@ -208,6 +216,28 @@ class ObservationSerializer(serializers.ModelSerializer):
         return instance
 
 
+class ObservationComponentIngestSerializer(serializers.Serializer):
+    """One component of a bulk-ingested observation (same fields ObservationSerializer.create accepts)."""
+    code = serializers.CharField(max_length=100)
+    value_quantity = serializers.DecimalField(max_digits=12, decimal_places=4, required=False, allow_null=True)
+    value_string = serializers.CharField(max_length=255, required=False, allow_null=True, allow_blank=True)
+    value_codeableconcept = serializers.CharField(max_length=100, required=False, allow_null=True, allow_blank=True)
+
+
+class ObservationIngestSerializer(ObservationSerializer):
+    """
+    Validates one item of a bulk vitals batch (monitoring.ingest).
+
+    Validation must not touch the database: identifier uniqueness is checked
+    for the whole batch in one query instead of one UniqueValidator query
+    per item, and components are validated field by field.
+    """
+    components = ObservationComponentIngestSerializer(many=True, required=False)
+
+    class Meta(ObservationSerializer.Meta):
+        extra_kwargs = {'identifier': {'validators': []}}
+
+
 class ChargeItemSerializer(serializers.ModelSerializer):
     """
     Serializer for ChargeItem model with resolved foreign key references.
@@ -280,18 +310,17 @@ class ChargeItemSerializer(serializers.ModelSerializer):
         ]
     
     def get_subject(self, obj):
-        """Resolve patient reference using direct ORM."""
+        """Resolve patient reference via the patient ACL (one lookup per subject per request)."""
         if not obj.subject_id:
             return None
-        try:
-            patient = Patient.objects.get(id=obj.subject_id)
-            return {
-                "id": patient.id,
-                "patient_id": patient.patient_id,
-                "name": f"{patient.first_name} {patient.last_name}"
-            }
-        except Patient.DoesNotExist:
+        patient = patient_acl.get_patient_summary(obj.subject_id)
+        if not patient:
             return None
+        return {
+            "id": patient['id'],
+            "patient_id": patient['patient_id'] or None,
+            "name": f"{patient['first_name']} {patient['last_name']}"
+        }
     
     def get_account(self, obj):
         """Return account ID - no ACL available yet."""
@@ -0,0 +1,251 @@
+"""
+Observation Time Series
+=======================
+Server-side downsampling for vitals charts
+(GET /api/monitoring/observations/series/).
+
+    subject_id / encounter_id + codes + [start, end) + bucket
+        │
+        ├─ Observation rows          value_quantity of matching codes
+        │                            (subject: obs_subj_eff_idx,
+        │                             encounter: obs_enc_code_idx)
+        └─ ObservationComponent rows component values of matching codes,
+                                     e.g. 8480-6 / 8462-4 inside a BP panel
+        │
+        └─ GROUP BY code, floor((epoch(effective_datetime) - start) / bucket)
+           ──► min / max / avg / count per bucket, in SQL
+
+The response is columnar, one entry per code, so a 30-day chart at hourly
+resolution is at most 720 points per code:
+
+    {"code": "8867-4", "timestamps": [...], "min": [...], "max": [...],
+     "avg": [...], "count": [...]}
+
+bucket=0 returns the raw points instead ("timestamps", "values"), capped at
+MAX_RAW_POINTS per request.
+"""
+
+import math
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Avg, Count, FloatField, Func, Max, Min
+from django.db.models.functions import Floor
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from monitoring.models import Observation, ObservationComponent
+
+
+DEFAULT_WINDOW = timedelta(hours=24)
+MAX_WINDOW = timedelta(days=90)
+
+# Automatic bucket size aims for about this many points per code
+TARGET_POINTS = 500
+MAX_BUCKETS = 5000
+MAX_RAW_POINTS = 5000
+
+# Observations that must never be charted
+EXCLUDED_STATUSES = ('entered-in-error', 'cancelled')
+
+_BUCKET_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+_BUCKET_RE = re.compile(r'(\d+)([smhd]?)')
+
+
+class SeriesError(ValueError):
+    """Invalid series request (reported as HTTP 400)."""
+
+
+class EpochSeconds(Func):
+    """Seconds since 1970-01-01 UTC of a DateTimeField."""
+    output_field = FloatField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template='EXTRACT(EPOCH FROM %(expressions)s)', **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection, template='((julianday(%(expressions)s) - 2440587.5) * 86400.0)', **extra_context
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template='UNIX_TIMESTAMP(%(expressions)s)', **extra_context)
+
+
+# ============================================================================
+# PARAMETERS
+# ============================================================================
+
+def parse_bucket(value):
+    """'300', '5m', '1h', '1d' -> seconds; None for automatic sizing."""
+    if value in (None, '', 'auto'):
+        return None
+    m = _BUCKET_RE.fullmatch(str(value).strip())
+    if not m:
+        raise SeriesError("bucket must be seconds or a number with s/m/h/d, e.g. '15m'")
+    return int(m.group(1)) * _BUCKET_UNITS[m.group(2) or 's']
+
+
+def parse_window(start, end):
+    """(start, end) as aware datetimes; defaults to the last DEFAULT_WINDOW."""
+    def parse(value, name):
+        if not value:
+            return None
+        try:
+            parsed = parse_datetime(value)
+        except ValueError:
+            # Well formed but not a real date, e.g. month 13
+            parsed = None
+        if parsed is None:
+            raise SeriesError(f'{name} must be an ISO 8601 datetime')
+        return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+    end_dt = parse(end, 'end') or timezone.now()
+    start_dt = parse(start, 'start') or end_dt - DEFAULT_WINDOW
+    if start_dt >= end_dt:
+        raise SeriesError('start must be before end')
+    if end_dt - start_dt > MAX_WINDOW:
+        raise SeriesError(f'window is limited to {MAX_WINDOW.days} days')
+    return start_dt, end_dt
+
+
+def auto_bucket(start, end):
+    """Smallest whole-minute bucket giving at most TARGET_POINTS buckets."""
+    seconds = (end - start).total_seconds() / TARGET_POINTS
+    return max(60, math.ceil(seconds / 60) * 60)
+
+
+# ============================================================================
+# SERIES
+# ============================================================================
+
+def observation_series(codes, start, end, bucket=None, subject_id=None, encounter_id=None):
+    """
+    Downsampled (or raw, bucket=0) series for each code; see module docstring.
+
+    Returns:
+        {'start', 'end', 'bucket_seconds', 'series': [per-code columns]}
+    """
+    if subject_id is None and encounter_id is None:
+        raise SeriesError('subject_id or encounter_id is required')
+    if not codes:
+        raise SeriesError('at least one code is required')
+    if bucket is None:
+        bucket = auto_bucket(start, end)
+    elif bucket and (end - start).total_seconds() / bucket > MAX_BUCKETS:
+        raise SeriesError(f'bucket too small for the window (max {MAX_BUCKETS} buckets)')
+
+    scope = {}
+    if subject_id is not None:
+        scope['subject_id'] = subject_id
+    if encounter_id is not None:
+        scope['encounter_id'] = encounter_id
+    observations = Observation.objects.filter(
+        **scope, effective_datetime__gte=start, effective_datetime__lt=end,
+    ).exclude(status__in=EXCLUDED_STATUSES)
+
+    sources = [
+        (
+            observations.filter(code__in=codes, value_quantity__isnull=False),
+            'code', 'value_quantity', 'effective_datetime',
+        ),
+        (
+            ObservationComponent.objects.filter(
+                observation__in=observations, code__in=codes, value_quantity__isnull=False,
+            ),
+            'code', 'value_quantity', 'observation__effective_datetime',
+        ),
+    ]
+
+    series = {code: None for code in codes}
+    for queryset, code_field, value_field, time_field in sources:
+        if bucket:
+            rows = _bucketed(queryset, code_field, value_field, time_field, start, bucket)
+        else:
+            rows = _raw(queryset, code_field, value_field, time_field)
+        for code, columns in rows.items():
+            series[code] = _merge(series[code], columns, bucketed=bool(bucket))
+
+    return {
+        'start': start,
+        'end': end,
+        'bucket_seconds': bucket,
+        'series': [{'code': code, **(columns or _empty(bool(bucket)))} for code, columns in series.items()],
+    }
+
+
+def _bucketed(queryset, code_field, value_field, time_field, start, bucket):
+    start_epoch = start.timestamp()
+    rows = (
+        queryset
+        .annotate(bucket=Floor((EpochSeconds(time_field) - start_epoch) / bucket))
+        .values(code_field, 'bucket')
+        .annotate(low=Min(value_field), high=Max(value_field), mean=Avg(value_field), n=Count('pk'))
+        .order_by(code_field, 'bucket')
+    )
+    columns = {}
+    for row in rows:
+        col = columns.setdefault(row[code_field], _empty(True))
+        col['timestamps'].append(_at(start_epoch + int(row['bucket']) * bucket))
+        col['min'].append(float(row['low']))
+        col['max'].append(float(row['high']))
+        col['avg'].append(round(float(row['mean']), 2))
+        col['count'].append(row['n'])
+    return columns
+
+
+def _raw(queryset, code_field, value_field, time_field):
+    rows = list(
+        queryset
+        .order_by(time_field)
+        .values_list(code_field, time_field, value_field)[:MAX_RAW_POINTS + 1]
+    )
+    if len(rows) > MAX_RAW_POINTS:
+        raise SeriesError(f'more than {MAX_RAW_POINTS} points; use a bucket')
+    columns = {}
+    for code, at, value in rows:
+        col = columns.setdefault(code, _empty(False))
+        col['timestamps'].append(at)
+        col['values'].append(float(value))
+    return columns
+
+
+def _merge(current, columns, bucketed):
+    """Combine a code's columns from observations and components, in time order."""
+    if current is None:
+        return columns
+    keys = list(columns)
+    points = sorted(
+        list(zip(*(current[k] for k in keys))) + list(zip(*(columns[k] for k in keys))),
+        key=lambda p: p[0],
+    )
+    merged = {k: [p[i] for p in points] for i, k in enumerate(keys)}
+    if bucketed:
+        return _merge_buckets(merged)
+    return merged
+
+
+def _merge_buckets(columns):
+    """Fold points that share a bucket timestamp (same code in both sources)."""
+    out = _empty(True)
+    for at, low, high, mean, n in zip(*(columns[k] for k in ('timestamps', 'min', 'max', 'avg', 'count'))):
+        if out['timestamps'] and out['timestamps'][-1] == at:
+            total = out['count'][-1] + n
+            out['avg'][-1] = round((out['avg'][-1] * out['count'][-1] + mean * n) / total, 2)
+            out['min'][-1] = min(out['min'][-1], low)
+            out['max'][-1] = max(out['max'][-1], high)
+            out['count'][-1] = total
+        else:
+            for key, value in zip(('timestamps', 'min', 'max', 'avg', 'count'), (at, low, high, mean, n)):
+                out[key].append(value)
+    return out
+
+
+def _empty(bucketed):
+    if bucketed:
+        return {'timestamps': [], 'min': [], 'max': [], 'avg': [], 'count': []}
+    return {'timestamps': [], 'values': []}
+
+
+def _at(epoch_seconds):
+    return datetime.fromtimestamp(epoch_seconds, tz=dt_timezone.utc)
@@ -0,0 +1,31 @@
+# monitoring/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import latest_vitals
+from .models import Observation, ObservationComponent
+
+
+# The latest-vitals snapshot is updated once the write commits, so a panel
+# saved header-first still lands with all of its components. Bulk ingestion
+# uses bulk_create (no signals) and schedules its own update.
+
+@receiver(post_save, sender=Observation)
+def record_latest_observation(sender, instance, raw=False, **kwargs):
+    if raw:
+        # loaddata — run rebuild_latest_vitals afterwards
+        return
+    latest_vitals.record_on_commit([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=ObservationComponent)
+def record_latest_observation_component(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    latest_vitals.record_on_commit([instance.observation_id])
+
+
+@receiver(post_delete, sender=Observation)
+def refresh_latest_observation(sender, instance, **kwargs):
+    # The snapshot row went with the observation (CASCADE); fall back to the previous reading
+    latest_vitals.refresh_on_commit([(instance.encounter_id, instance.code)])
@@ -0,0 +1,172 @@
+"""
+Early-Warning Score Tests
+=========================
+NEWS2 / PEWS are scored from the latest-vitals snapshot when a scored
+reading arrives, stored as derived observations, and listed per ward.
+"""
+
+from datetime import date, timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from admission.models import Encounter
+from monitoring import early_warning
+from monitoring.early_warning import NEWS2_CODE, PEWS_CODE
+from monitoring.models import Observation, ObservationComponent
+from patients.models import Patient
+
+
+URL = '/api/monitoring/observations/deteriorating/'
+NOW = timezone.now().replace(microsecond=0)
+
+# RR 22, SpO2 94, SBP 105, HR 115, temp 38.5 -> 2 + 1 + 1 + 2 + 1
+UNWELL = {'9279-1': 22, '2708-6': 94, '8480-6': 105, '8867-4': 115, '8310-5': 38.5}
+WELL = {'9279-1': 16, '2708-6': 98, '8480-6': 120, '8867-4': 75, '8310-5': 37.0}
+
+
+class ScoreTests(TestCase):
+
+    def test_news2_chart(self):
+        result = early_warning.score({**UNWELL, 'oxygen': False, 'consciousness': 'A'})
+        self.assertEqual(result['code'], NEWS2_CODE)
+        self.assertEqual(result['total'], 7)
+        self.assertEqual(result['risk'], early_warning.RISK_HIGH)
+        self.assertEqual(result['missing'], [])
+
+    def test_single_red_parameter_is_low_medium(self):
+        result = early_warning.score({**WELL, 'consciousness': 'V'})
+        self.assertEqual((result['total'], result['risk']), (3, early_warning.RISK_LOW_MEDIUM))
+        self.assertEqual(result['missing'], ['oxygen'])
+
+    def test_children_get_age_banded_pews(self):
+        toddler = early_warning.score({'8867-4': 130, '9279-1': 35}, age_months=30)
+        self.assertEqual((toddler['code'], toddler['total']), (PEWS_CODE, 0))
+        adult = early_warning.score({'8867-4': 130, '9279-1': 35})
+        self.assertEqual((adult['code'], adult['total']), (NEWS2_CODE, 5))
+
+
+class EarlyWarningTests(APITestCase):
+
+    def setUp(self):
+        self.seq = 0
+
+    def tearDown(self):
+        # Throttle counters live in the shared cache; don't spend other suites' budget
+        cache.clear()
+
+    def _admit(self, birthdate=date(1970, 1, 1), location_id=501):
+        self.seq += 1
+        patient = Patient.objects.create(
+            patient_id=f'WAH-2026-{self.seq:05d}', first_name='Ana', last_name='Reyes', birthdate=birthdate,
+        )
+        return Encounter.objects.create(
+            identifier=f'ENC-{self.seq}', status='in-progress', subject_id=patient.id, location_id=location_id,
+        )
+
+    def _record(self, encounter, vitals, minutes_ago=0):
+        with self.captureOnCommitCallbacks(execute=True):
+            for code, value in vitals.items():
+                self.seq += 1
+                obs = Observation.objects.create(
+                    identifier=f'OBS-{self.seq}', status='final',
+                    subject_id=encounter.subject_id, encounter_id=encounter.encounter_id,
+                    code='85354-9' if code == '8480-6' else code,
+                    value_quantity=None if code == '8480-6' else value,
+                    effective_datetime=NOW - timedelta(minutes=minutes_ago),
+                )
+                if code == '8480-6':
+                    ObservationComponent.objects.create(observation=obs, code=code, value_quantity=value)
+
+    def _snapshot(self, encounter):
+        results = self.client.get(URL, {'min_score': '0'}).data['results']
+        return next(p for p in results if p['encounter_id'] == encounter.encounter_id)
+
+    def _scores(self, encounter, code=NEWS2_CODE):
+        return Observation.objects.filter(encounter_id=encounter.encounter_id, code=code).order_by('observation_id')
+
+    def test_new_reading_stores_a_derived_score(self):
+        encounter = self._admit()
+        self._record(encounter, UNWELL)
+
+        score = self._scores(encounter).last()
+        self.assertEqual((float(score.value_quantity), score.interpretation), (7, early_warning.RISK_HIGH))
+        self.assertEqual(score.category, 'survey')
+        self.assertEqual(
+            dict(score.components.values_list('code', 'value_quantity')),
+            {'9279-1': 2, '2708-6': 1, '8480-6': 1, '8867-4': 2, '8310-5': 1},
+        )
+
+        self._record(encounter, {'8867-4': 80})  # HR back to normal
+        self.assertEqual(float(self._scores(encounter).last().value_quantity), 5)
+
+    def test_one_commit_scores_once(self):
+        encounter = self._admit()
+        with mock.patch.object(early_warning, 'rescore', wraps=early_warning.rescore) as rescore:
+            # Four readings and a BP panel with its component, one transaction
+            self._record(encounter, UNWELL)
+        self.assertEqual(rescore.call_count, 1)
+        self.assertEqual(self._scores(encounter).count(), 1)
+
+    def test_retracted_reading_restores_the_earlier_score(self):
+        encounter = self._admit()
+        self._record(encounter, {**UNWELL, '8867-4': 80}, minutes_ago=10)
+        self._record(encounter, {'8867-4': 140})
+        self.assertEqual(self._snapshot(encounter)['score'], 8)
+
+        wrong = Observation.objects.get(encounter_id=encounter.encounter_id, code='8867-4', value_quantity=140)
+        wrong.status = 'entered-in-error'
+        with self.captureOnCommitCallbacks(execute=True):
+            wrong.save()
+        self.assertEqual((self._snapshot(encounter)['score'], self._snapshot(encounter)['risk']), (5, 'medium'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Observation.objects.filter(encounter_id=encounter.encounter_id).exclude(code=NEWS2_CODE).delete()
+        self.assertEqual(self.client.get(URL, {'min_score': '0'}).data['count'], 0)
+
+    def test_rescore_reads_only_the_snapshot(self):
+        encounter = self._admit()
+        for minutes_ago in (240, 120, 0):
+            self._record(encounter, WELL, minutes_ago=minutes_ago)
+        count = self._scores(encounter).count()
+
+        # snapshot rows, patient birthdates, already-stored identifiers
+        with self.assertNumQueries(3):
+            self.assertEqual(early_warning.rescore([encounter.encounter_id]), [])
+        self.assertEqual(self._scores(encounter).count(), count)
+
+    def test_children_are_scored_with_pews(self):
+        child = self._admit(birthdate=NOW.date() - timedelta(days=3 * 365))
+        self._record(child, {'8867-4': 130, '9279-1': 35})
+        self.assertEqual(float(self._scores(child, PEWS_CODE).last().value_quantity), 0)
+        self.assertFalse(self._scores(child, NEWS2_CODE).exists())
+
+    def test_deteriorating_patients_by_ward(self):
+        sick = self._admit(location_id=501)
+        well = self._admit(location_id=502)
+        other_ward = self._admit(location_id=900)
+        self._record(sick, UNWELL)
+        self._record(well, WELL)
+        self._record(other_ward, UNWELL)
+        discharged = self._admit(location_id=501)
+        self._record(discharged, UNWELL)
+        discharged.status = 'finished'
+        discharged.save()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(URL, {'location_id': '501,502'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['encounter_id'] for p in response.data['results']], [sick.encounter_id])
+        first = response.data['results'][0]
+        self.assertEqual((first['system'], first['score'], first['risk']), ('NEWS2', 7, 'high'))
+        self.assertEqual(first['missing'], ['oxygen', 'consciousness'])
+
+        response = self.client.get(URL, {'min_score': '0'})
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(response.data['results'][-1]['encounter_id'], well.encounter_id)
+
+        self.assertEqual(self.client.get(URL, {'min_risk': 'severe'}).status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,148 @@
+"""
+Latest Vitals Snapshot Tests
+============================
+LatestObservation follows Observation writes (after commit) and the
+latest-vitals endpoint reads it for in-progress encounters only.
+"""
+
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from admission.models import Encounter
+from monitoring import latest_vitals
+from monitoring.models import LatestObservation, Observation, ObservationComponent
+
+
+URL = '/api/monitoring/observations/latest-vitals/'
+HR = '8867-4'
+BP = '85354-9'
+NOW = timezone.now().replace(microsecond=0)
+
+
+class LatestVitalsTests(APITestCase):
+
+    def setUp(self):
+        self.encounter = Encounter.objects.create(
+            identifier='ENC-1', status='in-progress', subject_id=1, location_id=501,
+        )
+        self.seq = 0
+
+    def tearDown(self):
+        # Throttle counters live in the shared cache; don't spend other suites' budget
+        cache.clear()
+
+    def _obs(self, code=HR, value=80, minutes_ago=0, encounter=None, **extra):
+        self.seq += 1
+        encounter = encounter or self.encounter
+        with self.captureOnCommitCallbacks(execute=True):
+            return Observation.objects.create(
+                identifier=f'OBS-{self.seq}', status=extra.pop('status', 'final'),
+                subject_id=encounter.subject_id, encounter_id=encounter.encounter_id,
+                code=code, value_quantity=value,
+                effective_datetime=NOW - timedelta(minutes=minutes_ago), **extra,
+            )
+
+    def _latest(self, code=HR, encounter=None):
+        encounter = encounter or self.encounter
+        return LatestObservation.objects.filter(encounter_id=encounter.encounter_id, code=code).first()
+
+    def test_newer_reading_replaces_older_one(self):
+        self._obs(value=80, minutes_ago=10)
+        newest = self._obs(value=95, minutes_ago=0)
+        self._obs(value=70, minutes_ago=30)  # late entry of an older reading
+
+        latest = self._latest()
+        self.assertEqual(latest.observation_id, newest.observation_id)
+        self.assertEqual(float(latest.value_quantity), 95)
+        self.assertEqual(LatestObservation.objects.filter(code=HR).count(), 1)
+
+    def test_racing_first_writes_keep_the_newest(self):
+        # Both commits saw no snapshot row; the older one writes last
+        older = self._obs(value=70, minutes_ago=10)
+        newer = self._obs(value=95, minutes_ago=0)
+        LatestObservation.objects.all().delete()
+
+        latest_vitals._upsert([latest_vitals._snapshot_of(newer)])
+        self.assertEqual(latest_vitals._upsert([latest_vitals._snapshot_of(older)]), set())
+        self.assertEqual(self._latest().observation_id, newer.observation_id)
+
+    def test_panel_components_are_captured(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            panel = Observation.objects.create(
+                identifier='BP-1', status='final', subject_id=1, encounter_id=self.encounter.encounter_id,
+                code=BP, effective_datetime=NOW,
+            )
+            ObservationComponent.objects.create(observation=panel, code='8480-6', value_quantity=150)
+            ObservationComponent.objects.create(observation=panel, code='8462-4', value_quantity=95)
+
+        self.assertEqual(
+            sorted((c['code'], c['value_quantity']) for c in self._latest(BP).components),
+            [('8462-4', 95.0), ('8480-6', 150.0)],
+        )
+
+    def test_retracted_reading_falls_back_to_previous(self):
+        previous = self._obs(value=80, minutes_ago=10)
+        wrong = self._obs(value=180, minutes_ago=0)
+
+        wrong.status = 'entered-in-error'
+        with self.captureOnCommitCallbacks(execute=True):
+            wrong.save()
+        self.assertEqual(self._latest().observation_id, previous.observation_id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            previous.delete()
+        self.assertIsNone(self._latest())
+
+    def test_bulk_ingestion_updates_snapshot(self):
+        items = [
+            {
+                'identifier': f'HR-{i}', 'status': 'final', 'subject_id': 1,
+                'encounter_id': self.encounter.encounter_id, 'code': HR, 'value_quantity': 60 + i,
+                'effective_datetime': (NOW - timedelta(minutes=10 - i)).isoformat(),
+            }
+            for i in range(5)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/monitoring/observations/bulk/', items, format='json')
+
+        self.assertEqual(float(self._latest().value_quantity), 64)
+
+    def test_endpoint_lists_in_progress_encounters_in_one_query(self):
+        finished = Encounter.objects.create(identifier='ENC-2', status='finished', subject_id=2)
+        other = Encounter.objects.create(identifier='ENC-3', status='in-progress', subject_id=3, location_id=502)
+        self._obs(value=88)
+        self._obs(code='2708-6', value=97)
+        self._obs(encounter=finished)
+        self._obs(encounter=other, value=120)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        by_encounter = {e['encounter_id']: e for e in response.data['results']}
+        self.assertEqual(set(by_encounter), {self.encounter.encounter_id, other.encounter_id})
+        mine = by_encounter[self.encounter.encounter_id]['vitals']
+        self.assertEqual((mine[HR]['value_quantity'], mine['2708-6']['value_quantity']), (88.0, 97.0))
+
+        response = self.client.get(URL, {'location_id': '502', 'code': HR})
+        self.assertEqual([e['encounter_id'] for e in response.data['results']], [other.encounter_id])
+
+        self.assertEqual(self.client.get(URL, {'location_id': 'bed'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_matches_incremental_snapshot(self):
+        self._obs(value=80, minutes_ago=10)
+        self._obs(value=90, minutes_ago=0)
+        self._obs(code='9279-1', value=18)
+        before = sorted(LatestObservation.objects.values_list('encounter_id', 'code', 'observation_id'))
+
+        LatestObservation.objects.all().delete()
+        call_command('rebuild_latest_vitals', stdout=StringIO())
+        self.assertEqual(
+            sorted(LatestObservation.objects.values_list('encounter_id', 'code', 'observation_id')),
+            before,
+        )
@@ -0,0 +1,93 @@
+"""
+Bulk Observation Ingestion Tests
+================================
+A batch is validated item by item, stored with a fixed number of queries,
+and can be resent without creating doubles.
+"""
+
+import json
+
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from monitoring.models import Observation, ObservationComponent
+
+
+URL = '/api/monitoring/observations/bulk/'
+
+
+def _bp(identifier, systolic=120, diastolic=80):
+    return {
+        'identifier': identifier, 'status': 'final', 'subject_id': 1, 'encounter_id': 10,
+        'code': '85354-9', 'category': 'vital-signs', 'effective_datetime': '2026-03-01T08:00:00Z',
+        'components': [
+            {'code': '8480-6', 'value_quantity': systolic},
+            {'code': '8462-4', 'value_quantity': diastolic},
+        ],
+    }
+
+
+class ObservationIngestTests(APITestCase):
+
+    def tearDown(self):
+        # Throttle counters live in the shared cache; don't spend other suites' budget
+        cache.clear()
+
+    def test_batch_with_components(self):
+        response = self.client.post(URL, [_bp(f'BP-{i}') for i in range(3)], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['created'], response.data['failed']), (3, 0))
+
+        first = Observation.objects.get(identifier='BP-0')
+        self.assertEqual(response.data['results'][0]['observation_id'], first.observation_id)
+        self.assertEqual(
+            sorted(first.components.values_list('code', 'value_quantity')),
+            [('8462-4', 80), ('8480-6', 120)],
+        )
+
+    def test_query_count_does_not_grow(self):
+        # lookup, savepoint, headers, components, release (SQLite splits much
+        # larger batches by its bound-parameter limit)
+        with self.assertNumQueries(5):
+            self.client.post(URL, [_bp('A-1')], format='json')
+        with self.assertNumQueries(5):
+            self.client.post(URL, [_bp(f'B-{i}') for i in range(10)], format='json')
+
+    def test_bad_items_do_not_reject_the_batch(self):
+        bad_component = _bp('BP-2')
+        bad_component['components'][0]['value_quantity'] = 'high'
+        response = self.client.post(
+            URL, {'observations': [_bp('BP-1'), {'code': 'x'}, bad_component, 'nope']}, format='json',
+        )
+
+        statuses = [r['status'] for r in response.data['results']]
+        self.assertEqual(statuses, ['created', 'error', 'error', 'error'])
+        self.assertIn('subject_id', response.data['results'][1]['errors'])
+        self.assertIn('components', response.data['results'][2]['errors'])
+        self.assertEqual(Observation.objects.count(), 1)
+
+    def test_resent_batch_is_idempotent(self):
+        first = self.client.post(URL, [_bp('BP-1'), _bp('BP-2')], format='json').data
+        again = self.client.post(URL, [_bp('BP-1'), _bp('BP-3'), _bp('BP-3')], format='json').data
+
+        self.assertEqual([r['status'] for r in again['results']], ['duplicate', 'created', 'duplicate'])
+        self.assertEqual(again['results'][0]['observation_id'], first['results'][0]['observation_id'])
+        self.assertEqual(again['results'][2]['observation_id'], again['results'][1]['observation_id'])
+        self.assertEqual(Observation.objects.count(), 3)
+        self.assertEqual(ObservationComponent.objects.count(), 6)
+
+        strict = self.client.post(URL + '?dedupe=false', [_bp('BP-1')], format='json').data
+        self.assertEqual(strict['results'][0]['status'], 'error')
+
+    def test_ndjson(self):
+        body = '\n'.join([json.dumps(_bp('N-1')), '{not json', '', json.dumps(_bp('N-2'))])
+        response = self.client.post(URL, body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(r['index'], r['status']) for r in response.data['results']],
+                         [(1, 'created'), (2, 'error'), (4, 'created')])
+
+    def test_body_must_be_a_list(self):
+        response = self.client.post(URL, {'identifier': 'X'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
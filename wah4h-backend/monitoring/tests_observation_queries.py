@@ -0,0 +1,77 @@
+"""
+Observation List Query Tests
+============================
+A page of vitals resolves its patients, encounters, practitioners and
+components in bulk, so its query count does not grow with the page size.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import Practitioner
+from admission.models import Encounter
+from monitoring.models import Observation, ObservationComponent
+from patients.models import Patient
+
+
+class ObservationListQueryTests(APITestCase):
+
+    def setUp(self):
+        self.doctor = Practitioner.objects.create(identifier='DOC-V-001', first_name='Ana', last_name='Reyes')
+        self.subjects = []
+        for i in range(3):
+            patient = Patient.objects.create(patient_id=f'WAH-2026-0090{i}', first_name='Pt', last_name=str(i))
+            encounter = Encounter.objects.create(
+                identifier=f'ENC-V-{i}', subject_id=patient.id, class_field='IMP', type='inpatient',
+                status='in-progress',
+            )
+            self.subjects.append((patient, encounter))
+
+    def tearDown(self):
+        # Throttle counters live in the shared cache; don't spend other suites' budget
+        cache.clear()
+
+    def _add_vitals(self, count):
+        now = timezone.now()
+        start = Observation.objects.count()
+        for n in range(count):
+            patient, encounter = self.subjects[n % len(self.subjects)]
+            observation = Observation.objects.create(
+                identifier=f'OBS-{start + n}', subject_id=patient.id, encounter_id=encounter.encounter_id, performer_id=self.doctor.practitioner_id,
+                code='85354-9', category='vital-signs', status='final',
+                effective_datetime=now - timedelta(minutes=n),
+            )
+            ObservationComponent.objects.bulk_create([
+                ObservationComponent(observation=observation, code='8480-6', value_quantity=Decimal('120')),
+                ObservationComponent(observation=observation, code='8462-4', value_quantity=Decimal('80')),
+            ])
+
+    def test_page_cost_is_constant(self):
+        self._add_vitals(3)
+        # count, page, components, patients, encounters, practitioners
+        with self.assertNumQueries(6):
+            small = self.client.get('/api/monitoring/observations/')
+        self.assertEqual(small.status_code, status.HTTP_200_OK)
+
+        self._add_vitals(40)
+        with self.assertNumQueries(6):
+            large = self.client.get('/api/monitoring/observations/')
+        self.assertEqual(len(large.data['results']), 43)
+
+    def test_rows_resolve_references(self):
+        self._add_vitals(1)
+        row = self.client.get('/api/monitoring/observations/').data['results'][0]
+        patient, encounter = self.subjects[0]
+
+        self.assertEqual(row['subject']['patient_id'], patient.patient_id)
+        self.assertEqual(row['encounter']['identifier'], encounter.identifier)
+        self.assertEqual(row['performer']['name'], 'Ana Reyes')
+        self.assertEqual([c['code'] for c in row['components_data']], ['8480-6', '8462-4'])
+
+        detail = self.client.get(f"/api/monitoring/observations/{row['observation_id']}/").data
+        self.assertEqual(detail['encounter'], row['encounter'])
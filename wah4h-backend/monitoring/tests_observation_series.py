@@ -0,0 +1,95 @@
+"""
+Observation Series Tests
+========================
+The series endpoint buckets vitals in SQL and returns one columnar entry per
+code, including component codes inside panels such as blood pressure.
+"""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from monitoring.models import Observation, ObservationComponent
+
+
+URL = '/api/monitoring/observations/series/'
+T0 = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+class ObservationSeriesTests(APITestCase):
+
+    def setUp(self):
+        # Heart rate every 10 minutes for two hours: 60, 61, ... 71
+        for n in range(12):
+            self._observe('8867-4', T0 + timedelta(minutes=10 * n, seconds=30), value=60 + n)
+        # One BP panel with systolic/diastolic components
+        panel = self._observe('85354-9', T0 + timedelta(minutes=5))
+        ObservationComponent.objects.create(observation=panel, code='8480-6', value_quantity=Decimal('128'))
+        ObservationComponent.objects.create(observation=panel, code='8462-4', value_quantity=Decimal('82'))
+        # Other patient and a retracted reading are never charted
+        self._observe('8867-4', T0 + timedelta(minutes=1), value=200, subject_id=2)
+        self._observe('8867-4', T0 + timedelta(minutes=2), value=200, status='entered-in-error')
+
+    def tearDown(self):
+        # Throttle counters live in the shared cache; don't spend other suites' budget
+        cache.clear()
+
+    def _observe(self, code, at, value=None, subject_id=1, status='final'):
+        return Observation.objects.create(
+            identifier=f'OBS-{Observation.objects.count()}', subject_id=subject_id, encounter_id=10,
+            code=code, status=status, effective_datetime=at,
+            value_quantity=Decimal(value) if value is not None else None,
+        )
+
+    def _get(self, **params):
+        params.setdefault('subject_id', 1)
+        params.setdefault('start', T0.isoformat())
+        params.setdefault('end', (T0 + timedelta(hours=2)).isoformat())
+        return self.client.get(URL, params)
+
+    def test_hourly_buckets(self):
+        response = self._get(code='8867-4', bucket='1h')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['bucket_seconds'], 3600)
+
+        hr = response.data['series'][0]
+        self.assertEqual(hr['code'], '8867-4')
+        self.assertEqual(hr['timestamps'], [T0, T0 + timedelta(hours=1)])
+        self.assertEqual((hr['min'], hr['max'], hr['count']), ([60.0, 66.0], [65.0, 71.0], [6, 6]))
+        self.assertEqual(hr['avg'], [62.5, 68.5])
+
+    def test_component_codes_and_encounter_scope(self):
+        response = self._get(subject_id='', encounter_id=10, code='8480-6,8462-4,9279-1', bucket='2h')
+        by_code = {s['code']: s for s in response.data['series']}
+        self.assertEqual(by_code['8480-6']['max'], [128.0])
+        self.assertEqual(by_code['8462-4']['min'], [82.0])
+        self.assertEqual(by_code['9279-1']['timestamps'], [])
+
+    def test_raw_points(self):
+        hr = self._get(code='8867-4', bucket='0').data['series'][0]
+        self.assertEqual(len(hr['values']), 12)
+        self.assertEqual(hr['values'][:2], [60.0, 61.0])
+
+    def test_query_count(self):
+        with self.assertNumQueries(2):
+            self._get(code=['8867-4', '8480-6'], bucket='15m')
+
+    def test_bad_requests(self):
+        self.assertEqual(self._get(subject_id='', code='8867-4').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._get(code='8867-4', bucket='fast').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._get(code='8867-4', bucket='1s').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self._get(code='8867-4', start=(T0 + timedelta(hours=3)).isoformat()).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_invalid_dates_are_reported_as_dates(self):
+        response = self._get(code='8867-4', start='2026-13-01T00:00')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'start must be an ISO 8601 datetime')
+
+        response = self._get(code='8867-4', subject_id='abc')
+        self.assertEqual(response.data['error'], 'subject_id and encounter_id must be integers')
@@ -6,6 +6,10 @@ Registers ViewSets for clinical observations (vital signs, labs) and charge item
 
 Routes:
 - /api/monitoring/observations/
+- /api/monitoring/observations/series/  (downsampled vitals for charts)
+- /api/monitoring/observations/bulk/    (batch ingestion, JSON array or NDJSON)
+- /api/monitoring/observations/latest-vitals/  (current vitals of in-progress encounters)
+- /api/monitoring/observations/deteriorating/  (NEWS2 / PEWS above a threshold)
 - /api/monitoring/charge-items/
 """
 
@@ -1,7 +1,13 @@
-from rest_framework import viewsets, filters
+from rest_framework import viewsets, filters, status
+from rest_framework.decorators import action
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
+from patients.services import patient_acl
+
+from . import early_warning, ingest, latest_vitals, series as timeseries
 from .models import Observation, ChargeItem, ChargeItemDefinition
 from .serializers import (
     ObservationSerializer,
@@ -10,6 +16,21 @@ from .serializers import (
 )
 
 
+class NDJSONBody:
+    """Unparsed NDJSON request body; split into items by monitoring.ingest."""
+
+    def __init__(self, raw):
+        self.raw = raw
+
+
+class NDJSONParser(BaseParser):
+    """Accepts newline-delimited JSON for bulk observation ingestion."""
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return NDJSONBody(stream.read() if stream is not None else b'')
+
+
 class StandardResultsSetPagination(PageNumberPagination):
     """
     Standard pagination configuration for monitoring resources.
@@ -75,6 +96,181 @@ class ObservationViewSet(viewsets.ModelViewSet):
         'note'
     ]
 
+    def list(self, request, *args, **kwargs):
+        """
+        List with bulk-resolved references: a page costs a fixed number of
+        queries (page, components, patients, encounters, practitioners)
+        however many rows it holds.
+        """
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related('components')
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True, context=self._get_prefetch_context(page))
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(queryset, many=True, context=self._get_prefetch_context(queryset))
+        return Response(serializer.data)
+
+    def _get_prefetch_context(self, observations):
+        """
+        Fetch the patients, encounters and practitioners referenced by the
+        page in bulk and return them as serializer context maps.
+        """
+        from accounts.models import Practitioner
+        from admission.models import Encounter
+
+        subject_ids, encounter_ids, performer_ids = set(), set(), set()
+        for observation in observations:
+            if observation.subject_id:
+                subject_ids.add(observation.subject_id)
+            if observation.encounter_id:
+                encounter_ids.add(observation.encounter_id)
+            if observation.performer_id:
+                performer_ids.add(observation.performer_id)
+
+        encounters_map = {}
+        if encounter_ids:
+            encounters = Encounter.objects.filter(encounter_id__in=encounter_ids).only(
+                'encounter_id', 'identifier', 'status'
+            )
+            encounters_map = {e.encounter_id: e for e in encounters}
+
+        practitioners_map = {}
+        if performer_ids:
+            practitioners = Practitioner.objects.filter(practitioner_id__in=performer_ids).only(
+                'practitioner_id', 'first_name', 'last_name'
+            )
+            practitioners_map = {p.practitioner_id: p for p in practitioners}
+
+        return {
+            **self.get_serializer_context(),
+            'patients_map': patient_acl.get_patient_summaries(subject_ids),
+            'encounters_map': encounters_map,
+            'practitioners_map': practitioners_map,
+        }
+
+    @action(detail=False, methods=['get'])
+    def series(self, request):
+        """
+        Downsampled vitals for charting (see monitoring.series).
+
+        Query params:
+            subject_id / encounter_id: scope (at least one)
+            code: observation or component code; repeat or comma-separate
+            start, end: ISO 8601 window (default: the last 24 hours)
+            bucket: seconds or 15m / 1h / 1d; "auto" (default) aims for
+                    about 500 points; 0 returns raw points
+        """
+        params = request.query_params
+        codes = [c for value in params.getlist('code') for c in value.split(',') if c]
+        try:
+            subject_id = int(params['subject_id']) if params.get('subject_id') else None
+            encounter_id = int(params['encounter_id']) if params.get('encounter_id') else None
+        except ValueError:
+            return Response(
+                {'error': 'subject_id and encounter_id must be integers'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            start, end = timeseries.parse_window(params.get('start'), params.get('end'))
+            data = timeseries.observation_series(
+                codes, start, end,
+                bucket=timeseries.parse_bucket(params.get('bucket')),
+                subject_id=subject_id,
+                encounter_id=encounter_id,
+            )
+        except timeseries.SeriesError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'subject_id': subject_id, 'encounter_id': encounter_id, **data})
+
+    @action(detail=False, methods=['get'], url_path='latest-vitals')
+    def latest_vitals(self, request):
+        """
+        Current vitals of every in-progress encounter, read from the
+        LatestObservation snapshot (see monitoring.latest_vitals).
+
+        Query params:
+            code: observation codes; repeat or comma-separate
+                  (default: BP, HR, RR, temperature, SpO2)
+            encounter_id: limit to these encounters; repeat or comma-separate
+            location_id: limit to encounters at these locations (beds)
+        """
+        params = request.query_params
+
+        def values(name):
+            return [v for value in params.getlist(name) for v in value.split(',') if v] or None
+
+        try:
+            encounter_ids = [int(v) for v in values('encounter_id') or ()] or None
+            location_ids = [int(v) for v in values('location_id') or ()] or None
+        except ValueError:
+            return Response(
+                {'error': 'encounter_id and location_id must be integers'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        encounters = latest_vitals.current_vitals(
+            codes=values('code'), encounter_ids=encounter_ids, location_ids=location_ids,
+        )
+        return Response({'count': len(encounters), 'results': encounters})
+
+    @action(detail=False, methods=['get'])
+    def deteriorating(self, request):
+        """
+        In-progress encounters whose latest NEWS2 / PEWS score is at or above
+        a threshold, highest first (see monitoring.early_warning). One query.
+
+        Query params:
+            location_id: limit to encounters at these locations (a ward's
+                         beds); repeat or comma-separate
+            min_risk: low / low-medium (default) / medium / high
+            min_score: total score threshold; replaces min_risk when given
+        """
+        params = request.query_params
+        try:
+            location_ids = [
+                int(v) for value in params.getlist('location_id') for v in value.split(',') if v
+            ] or None
+            min_score = int(params['min_score']) if params.get('min_score') else None
+        except ValueError:
+            return Response(
+                {'error': 'location_id and min_score must be integers'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            patients = early_warning.deteriorating(
+                min_risk=params.get('min_risk') or early_warning.RISK_LOW_MEDIUM,
+                min_score=min_score,
+                location_ids=location_ids,
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'count': len(patients), 'results': patients})
+
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request):
+        """
+        Ingest a batch of observations with components (see monitoring.ingest).
+
+        Body: JSON array, {"observations": [...]}, or NDJSON
+              (Content-Type: application/x-ndjson).
+        Query params:
+            dedupe: "false" to report already-stored identifiers as errors
+                    instead of returning them as duplicates (default: true)
+
+        Returns 200 with per-item results in input order.
+        """
+        dedupe = request.query_params.get('dedupe', 'true').lower() not in ('0', 'false', 'no')
+        try:
+            if isinstance(request.data, NDJSONBody):
+                items = ingest.items_from_ndjson(request.data.raw)
+            else:
+                items = ingest.items_from_json(request.data)
+        except (ingest.IngestError, UnicodeDecodeError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(ingest.ingest(items, dedupe=dedupe), status=status.HTTP_200_OK)
+
 
 class ChargeItemViewSet(viewsets.ModelViewSet):
     """
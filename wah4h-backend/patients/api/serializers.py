@@ -77,6 +77,22 @@ class PatientInputSerializer(serializers.ModelSerializer):
         return value
 
 
+class PatientImportSerializer(PatientInputSerializer):
+    """
+    Patient Import Serializer (Bulk Import Rows)
+
+    Used for: patient_import pipeline (POST /patients/import/, import_patients)
+    Same field rules as PatientInputSerializer, minus the per-row uniqueness
+    query on patient_id - the importer checks that once per chunk.
+    """
+
+    class Meta(PatientInputSerializer.Meta):
+        extra_kwargs = {
+            **PatientInputSerializer.Meta.extra_kwargs,
+            'patient_id': {'required': False, 'validators': []},
+        }
+
+
 class PatientOutputSerializer(serializers.Serializer):
     """
     Patient Output Serializer (Read Operations)
@@ -154,6 +170,30 @@ class PatientOutputSerializer(serializers.Serializer):
     updated_at = serializers.DateTimeField(required=False)
 
 
+class PatientSlimOutputSerializer(serializers.Serializer):
+    """
+    Patient Slim Output Serializer (Large Lists)
+
+    Used for: GET list/search with ?shape=slim
+    Source: PatientACL DTO_SLIM projection (identity, name, demographics, status)
+    """
+
+    id = serializers.IntegerField()
+    patient_id = serializers.CharField()
+    first_name = serializers.CharField()
+    last_name = serializers.CharField()
+    middle_name = serializers.CharField(required=False, allow_null=True)
+    suffix_name = serializers.CharField(required=False, allow_null=True)
+    full_name = serializers.CharField(required=False)
+    gender = serializers.CharField()
+    birthdate = serializers.DateField()
+    age = serializers.IntegerField(required=False)
+    philhealth_id = serializers.CharField(required=False, allow_null=True)
+    mobile_number = serializers.CharField(required=False, allow_null=True)
+    active = serializers.BooleanField(required=False)
+    status = serializers.CharField(required=False, allow_null=True)
+
+
 # ============================================================================
 # CONDITION SERIALIZERS
 # ============================================================================
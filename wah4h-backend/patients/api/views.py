@@ -7,33 +7,36 @@ Writes (POST/PUT): Validate -> Delegate to PatientRegistrationService
 Reads (GET): Delegate to PatientACL -> Format with OutputSerializer
 """
 
+import json
 import logging
+import math
 import os
-import threading
-import uuid
+import time
 
 from django.core.exceptions import ValidationError as DjangoValidationError
-from django.db import connection
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import StreamingHttpResponse
 
 from rest_framework import viewsets, status
 from rest_framework.response import Response
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes, renderer_classes
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter
 
-import requests as http_requests
-
 from patients.wah4pc import (
-    request_patient, fhir_to_dict, push_patient, patient_to_fhir, get_providers,
+    fhir_to_dict,
     immunization_to_fhir, immunizations_to_bundle,
-    procedures_to_bundle, encounters_to_bundle,
+    procedures_to_bundle, encounters_to_bundle, get_gateway_client,
 )
 from patients.models import Patient, WAH4PCTransaction
 
 from patients.api.serializers import (
     PatientInputSerializer,
     PatientOutputSerializer,
+    PatientSlimOutputSerializer,
     ConditionSerializer,
     ConditionCreateSerializer,
     AllergySerializer,
@@ -42,7 +45,10 @@ from patients.api.serializers import (
     ImmunizationCreateSerializer,
 )
 from patients.models import Condition, AllergyIntolerance, Immunization
-from patients.services import patient_acl
+from patients.services import (
+    fhir_cache, gateway_outbox, patient_acl, patient_import, provider_directory, query_worker,
+    payload_archive, transaction_events, transaction_log,
+)
 from patients.services.patients_services import (
     PatientRegistrationService,
     PatientUpdateService,
@@ -51,6 +57,26 @@ from patients.services.patients_services import (
 
 logger = logging.getLogger(__name__)
 
+# Patient list page size: default and hard upper bound (also caps search)
+PATIENT_LIST_DEFAULT_LIMIT = 100
+PATIENT_LIST_MAX_LIMIT = 200
+PATIENT_SEARCH_DEFAULT_LIMIT = 50
+
+# DTO shapes a client may request with ?shape= on list/search
+PATIENT_LIST_SHAPES = {
+    patient_acl.DTO_SUMMARY: PatientOutputSerializer,
+    patient_acl.DTO_SLIM: PatientSlimOutputSerializer,
+}
+
+
+def _patient_limit(request, default):
+    """?limit= clamped to 1..PATIENT_LIST_MAX_LIMIT; default when missing or not a number."""
+    try:
+        limit = int(request.query_params.get('limit', default))
+    except (ValueError, TypeError):
+        limit = default
+    return min(PATIENT_LIST_MAX_LIMIT, max(1, limit))
+
 
 # ============================================================================
 # PATIENT VIEWSET (CQRS-Lite)
@@ -78,19 +104,47 @@ class PatientViewSet(viewsets.ViewSet):
 
     def list(self, request):
         """
-        List all patients.
+        List active patients, one keyset page at a time.
+
+        Query params:
+            limit: Page size (default 100, capped at PATIENT_LIST_MAX_LIMIT)
+            cursor: Opaque cursor from the previous page's X-Next-Cursor header
+            shape: "summary" (default) or "slim" for a lighter row
 
-        Delegates to: PatientACL.search_patients('', limit)
-        Returns: List of patient summaries
+        The body stays a flat array of patient summaries; pagination metadata
+        travels in headers so existing clients keep working:
+            X-Next-Cursor: cursor for the next page (absent on the last page)
+            Link: <...?cursor=...>; rel="next"
+
+        Delegates to: PatientACL.list_patients(cursor, limit, shape)
         """
-        limit = int(request.query_params.get('limit', 100))
+        shape = request.query_params.get('shape', patient_acl.DTO_SUMMARY)
+        if shape not in PATIENT_LIST_SHAPES:
+            return Response({'error': f'Unknown shape "{shape}"'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Delegate to ACL (empty query returns all)
-        patients = patient_acl.search_patients('', limit)
+        limit = _patient_limit(request, PATIENT_LIST_DEFAULT_LIMIT)
 
-        # Serialize using Output serializer
-        serializer = PatientOutputSerializer(patients, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        try:
+            patients, next_cursor = patient_acl.list_patients(
+                cursor=request.query_params.get('cursor') or None,
+                limit=limit,
+                shape=shape,
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Serialize using the Output serializer for the requested shape
+        serializer = PATIENT_LIST_SHAPES[shape](patients, many=True)
+        response = Response(serializer.data, status=status.HTTP_200_OK)
+
+        if next_cursor:
+            params = request.query_params.copy()
+            params['cursor'] = next_cursor
+            params['limit'] = limit
+            next_url = request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+            response['X-Next-Cursor'] = next_cursor
+            response['Link'] = f'<{next_url}>; rel="next"'
+        return response
 
     def retrieve(self, request, pk=None):
         """
@@ -273,6 +327,46 @@ class PatientViewSet(viewsets.ViewSet):
             status=status.HTTP_200_OK
         )
 
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_patients(self, request):
+        """
+        Bulk-import patients from an uploaded file.
+
+        Multipart form fields:
+            file: CSV (model field names as headers), NDJSON, or FHIR Bundle JSON
+            file_format: "csv", "ndjson" or "bundle" (default: from file extension)
+            chunk_size: Rows validated and inserted per batch (default 500)
+            dry_run: "true" to validate and dedup without writing
+
+        Returns 200 with the import report (counts + per-row errors); rows
+        that fail validation or dedup do not abort the rest of the file.
+
+        Delegates to: patient_import.PatientImporter
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'Upload the registry as multipart field "file"'}, status=status.HTTP_400_BAD_REQUEST)
+
+        fmt = request.data.get('file_format') or patient_import.detect_format(upload.name)
+        if fmt not in patient_import.FORMATS:
+            return Response(
+                {'error': f'file_format must be one of {", ".join(patient_import.FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            chunk_size = min(5000, max(1, int(request.data.get('chunk_size', 500))))
+        except (TypeError, ValueError):
+            chunk_size = 500
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+
+        importer = patient_import.PatientImporter(chunk_size=chunk_size, dry_run=dry_run)
+        try:
+            report = importer.run(patient_import.read_rows(upload.file, fmt))
+        except (ValueError, UnicodeDecodeError) as e:
+            return Response({'error': f'Unreadable import file: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(report, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['get'])
     def search(self, request):
         """
@@ -280,26 +374,30 @@ class PatientViewSet(viewsets.ViewSet):
 
         Query params:
             q: Search term (required)
-            limit: Max results (optional, default: 50)
+            limit: Max results (default 50, capped at PATIENT_LIST_MAX_LIMIT)
+            shape: "summary" (default) or "slim" for a lighter row
 
         Example: GET /patients/search/?q=Juan&limit=10
 
-        Delegates to: PatientACL.search_patients(query, limit)
+        Delegates to: PatientACL.search_patients(query, limit, shape)
         """
         query = request.query_params.get('q', '').strip()
-        limit = int(request.query_params.get('limit', 50))
+        limit = _patient_limit(request, PATIENT_SEARCH_DEFAULT_LIMIT)
+        shape = request.query_params.get('shape', patient_acl.DTO_SUMMARY)
 
         if not query:
             return Response(
                 {'error': 'Search query parameter "q" is required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if shape not in PATIENT_LIST_SHAPES:
+            return Response({'error': f'Unknown shape "{shape}"'}, status=status.HTTP_400_BAD_REQUEST)
 
         # Delegate to ACL
-        results = patient_acl.search_patients(query, limit)
+        results = patient_acl.search_patients(query, limit, shape=shape)
 
         # Serialize output
-        serializer = PatientOutputSerializer(results, many=True)
+        serializer = PATIENT_LIST_SHAPES[shape](results, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['get'])
@@ -368,7 +466,7 @@ class PatientViewSet(viewsets.ViewSet):
 
         qs = Immunization.objects.filter(
             patient_id=patient_id
-        ).select_related('patient').order_by('-occurrence_datetime', '-created_at')
+        ).order_by('-occurrence_datetime', '-created_at')
         return Response(immunizations_to_bundle(qs), status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['get'], url_path='procedures')
@@ -735,10 +833,33 @@ class ImmunizationViewSet(viewsets.ModelViewSet):
 # WAH4PC INTEGRATION
 # ============================================================================
 
+def _outbox_accepted(txn):
+    """202 body for a queued outbound request; the client polls transactionId."""
+    return Response(
+        {
+            'transactionId': txn.transaction_id,
+            'status': txn.status,
+            'idempotency_key': txn.idempotency_key,
+        },
+        status=status.HTTP_202_ACCEPTED,
+    )
+
+
+def _transaction_q(transaction_id):
+    """Match a transaction by our own ID or by the gateway's ID for it."""
+    return Q(transaction_id=transaction_id) | Q(gateway_transaction_id=transaction_id)
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def fetch_wah4pc(request):
-    """Fetch patient data from WAH4PC gateway."""
+    """
+    Fetch patient data from WAH4PC gateway.
+
+    The request is queued (gateway_outbox) and delivered by the outbox
+    worker, which retries 409/429 with backoff. Returns 202 with the local
+    transactionId at once; poll GET /wah4pc/transactions/<id>/ for the result.
+    """
     target_id = request.data.get('targetProviderId')
     philhealth_id = request.data.get('philHealthId')
     if not target_id or not philhealth_id:
@@ -747,44 +868,8 @@ def fetch_wah4pc(request):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    result = request_patient(target_id, philhealth_id)
-
-    # Handle error responses
-    if 'error' in result:
-        return Response(
-            {'error': result['error']},
-            status=result.get('status_code', 500)
-        )
-
-    # Gateway may return the transaction ID as 'transactionId' or 'id' (flat or nested under 'data')
-    _data = result.get('data') or {}
-    txn_id = (
-        result.get('transactionId') or
-        result.get('id') or
-        _data.get('transactionId') or
-        _data.get('id')
-    )
-    idempotency_key = result.get('idempotency_key')
-
-    if txn_id:
-        WAH4PCTransaction.objects.get_or_create(
-            transaction_id=txn_id,
-            defaults={
-                'type': 'fetch',
-                'status': 'PENDING',
-                'target_provider_id': target_id,
-                'idempotency_key': idempotency_key,
-            },
-        )
-    else:
-        return Response(
-            {'error': 'Gateway did not return a transaction ID. Check gateway credentials or try again.'},
-            status=status.HTTP_502_BAD_GATEWAY,
-        )
-
-    # Guarantee transactionId is always top-level so the frontend can find it
-    # regardless of whether the gateway wraps it under a 'data' key.
-    return Response({**result, 'transactionId': txn_id}, status=status.HTTP_202_ACCEPTED)
+    txn = gateway_outbox.enqueue_patient_fetch(target_id, philhealth_id)
+    return _outbox_accepted(txn)
 
 
 @api_view(['POST'])
@@ -795,7 +880,9 @@ def webhook_receive(request):
     Protocol:
         1. Validate X-Gateway-Auth — reject immediately if invalid.
         2. Require a transactionId in the payload.
-        3. Look up a PENDING WAH4PCTransaction by that transactionId.
+        3. Look up a PENDING WAH4PCTransaction by that transactionId
+           (the gateway's ID, stored as gateway_transaction_id for requests
+           sent through the outbox).
              - If found and PENDING   → process and return 200.
              - If found but not PENDING → already processed; return 200 (idempotent).
              - If not found at all      → return 404 so the gateway flags the anomaly.
@@ -817,11 +904,11 @@ def webhook_receive(request):
     raw_payload = dict(request.data)
 
     # Only process if the transaction is still PENDING
-    txn = WAH4PCTransaction.objects.filter(transaction_id=txn_id, status='PENDING').first()
+    txn = WAH4PCTransaction.objects.filter(_transaction_q(txn_id), status='PENDING').first()
 
     if txn is None:
         # Distinguish "already finished" (idempotent 200) from "never existed" (404)
-        if WAH4PCTransaction.objects.filter(transaction_id=txn_id).exists():
+        if WAH4PCTransaction.objects.filter(_transaction_q(txn_id)).exists():
             return Response({'status': 'already_processed'}, status=status.HTTP_200_OK)
         return Response(
             {'error': 'Transaction not found'},
@@ -857,11 +944,12 @@ def webhook_receive(request):
                     if philhealth_id:
                         patient = Patient.objects.filter(philhealth_id=philhealth_id).first()
                     if not patient:
-                        patient = Patient.objects.filter(
-                            first_name__iexact=patient_dict.get('first_name', ''),
-                            last_name__iexact=patient_dict.get('last_name', ''),
-                            birthdate=patient_dict.get('birthdate'),
-                        ).first()
+                        patient = PatientRegistrationService.find_duplicate(
+                            patient_dict.get('first_name'),
+                            patient_dict.get('last_name'),
+                            patient_dict.get('birthdate'),
+                            match_missing_birthdate=True,
+                        )
                 if patient:
                     txn.related_patient = patient
                     txn.patient_id = patient.id
@@ -871,6 +959,7 @@ def webhook_receive(request):
                     txn_id, exc,
                 )
 
+        gateway_outbox.record_entry_outcomes(txn, raw_payload, txn.status)
         txn.save()
     else:
         txn.raw_payload = raw_payload
@@ -881,6 +970,7 @@ def webhook_receive(request):
             if isinstance(error_data, dict)
             else 'Unknown'
         )
+        gateway_outbox.record_entry_outcomes(txn, raw_payload, txn.status)
         txn.save()
 
     return Response({'status': 'received'}, status=status.HTTP_200_OK)
@@ -889,7 +979,12 @@ def webhook_receive(request):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def send_to_wah4pc(request):
-    """Send local patient data to another provider via WAH4PC gateway."""
+    """
+    Send local patient data to another provider via WAH4PC gateway.
+
+    Queued like fetch_wah4pc: returns 202 with the local transactionId and
+    the outbox worker delivers the push.
+    """
     patient_id = request.data.get('patientId')
     target_id = request.data.get('targetProviderId')
     if not patient_id or not target_id:
@@ -902,38 +997,37 @@ def send_to_wah4pc(request):
     except Patient.DoesNotExist:
         return Response({'error': 'Patient not found'}, status=status.HTTP_404_NOT_FOUND)
 
-    result = push_patient(target_id, patient)
+    txn = gateway_outbox.enqueue_patient_push(target_id, patient)
+    return _outbox_accepted(txn)
 
-    # Handle error responses
-    if 'error' in result:
-        return Response(
-            {'error': result['error']},
-            status=result.get('status_code', 500)
-        )
 
-    _data_send = result.get('data') or {}
-    txn_id = (
-        result.get('transactionId') or
-        result.get('id') or
-        _data_send.get('transactionId') or
-        _data_send.get('id')
-    )
-    idempotency_key = result.get('idempotency_key')
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def transfer_to_wah4pc(request):
+    """
+    Transfer a patient's full record to another provider in one gateway call.
 
-    if txn_id:
-        WAH4PCTransaction.objects.get_or_create(
-            transaction_id=txn_id,
-            defaults={
-                'type': 'send',
-                'status': result.get('status', 'PENDING'),
-                'patient_id': patient.id,
-                'related_patient': patient,
-                'target_provider_id': target_id,
-                'idempotency_key': idempotency_key,
-            },
+    Patient, Encounters, Procedures, Immunizations, Conditions and Allergies
+    are snapshotted into one FHIR transaction Bundle and queued like
+    send_to_wah4pc. Returns 202 with the transactionId and the entry count;
+    GET /wah4pc/transactions/<id>/ reports the status of each entry.
+    """
+    patient_id = request.data.get('patientId')
+    target_id = request.data.get('targetProviderId')
+    if not patient_id or not target_id:
+        return Response(
+            {'error': 'patientId and targetProviderId are required'},
+            status=status.HTTP_400_BAD_REQUEST,
         )
+    try:
+        patient = Patient.objects.get(id=patient_id)
+    except (Patient.DoesNotExist, ValueError, TypeError):
+        return Response({'error': 'Patient not found'}, status=status.HTTP_404_NOT_FOUND)
 
-    return Response(result, status=status.HTTP_202_ACCEPTED)
+    txn = gateway_outbox.enqueue_patient_transfer(target_id, patient)
+    response = _outbox_accepted(txn)
+    response.data['entries'] = len(txn.entries)
+    return response
 
 
 @api_view(['POST'])
@@ -1051,14 +1145,13 @@ def webhook_process_query(request):
     Protocol (non-blocking):
         1. Validate X-Gateway-Auth — reject immediately if invalid.
         2. Validate that transactionId and gatewayReturnUrl are present.
-        3. Acknowledge the gateway with HTTP 200 immediately — this prevents
-           gateway timeouts regardless of how long the DB lookup takes.
-        4. Spawn a daemon thread that:
-             a. Searches for the patient using the supplied identifiers.
-             b. Creates a WAH4PCTransaction audit record.
-             c. POSTs the result back to gatewayReturnUrl (10 s timeout).
-             d. Updates the transaction status to COMPLETED or FAILED.
-             e. Closes the thread-local DB connection to avoid leaks.
+        3. Record the query as a PROCESSING WAH4PCTransaction (a redelivered
+           transactionId is acknowledged and skipped).
+        4. Hand it to the bounded worker pool (query_worker), which matches
+           the patient, POSTs the result to gatewayReturnUrl and marks the
+           transaction COMPLETED or FAILED.
+        5. Acknowledge with HTTP 200 — or 503 + Retry-After when the pool's
+           queue is full, so the gateway redelivers later.
     """
     gateway_key = os.getenv('GATEWAY_AUTH_KEY')
     auth_header = request.headers.get('X-Gateway-Auth')
@@ -1066,146 +1159,62 @@ def webhook_process_query(request):
         return Response({'error': 'Unauthorized'}, status=status.HTTP_401_UNAUTHORIZED)
 
     txn_id = request.data.get('transactionId')
-    identifiers = request.data.get('identifiers', [])
     return_url = request.data.get('gatewayReturnUrl')
-    requester_id = request.data.get('requesterId')
-    # Detect which resource type was requested: explicit param wins, then infer from return URL.
-    requested_resource = request.data.get('resourceType', '')
-    if not requested_resource:
-        if return_url and 'Encounter' in return_url:
-            requested_resource = 'Encounter'
-        elif return_url and 'Procedure' in return_url:
-            requested_resource = 'Procedure'
-        elif return_url and 'Immunization' in return_url:
-            requested_resource = 'Immunization'
-        else:
-            requested_resource = 'Patient'
-
     if not txn_id or not return_url:
         return Response(
             {'error': 'transactionId and gatewayReturnUrl are required'},
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    # Capture everything needed by the thread before the response is sent.
-    # request.data may not be safe to access after the view returns.
-    raw_payload = dict(request.data)
-    idempotency_key = str(uuid.uuid4())
-
-    def _process_query():
-        txn = None
-        try:
-            # ----------------------------------------------------------------
-            # 1. Match patient using the supplied identifier list
-            # ----------------------------------------------------------------
-            patient = None
-            for ident in identifiers:
-                system = ident.get('system', '').lower()
-                value = ident.get('value')
-
-                if not value:
-                    continue
-
-                if 'philhealth' in system:
-                    patient = Patient.objects.filter(philhealth_id=value).first()
-                elif 'mrn' in system or 'medical-record' in system:
-                    patient = Patient.objects.filter(patient_id=value).first()
-                elif 'phone' in system or 'mobile' in system:
-                    patient = Patient.objects.filter(mobile_number=value).first()
-
-                if patient:
-                    break
-
-            # ----------------------------------------------------------------
-            # 2. Create audit record (idempotent — skip if already exists)
-            # ----------------------------------------------------------------
-            txn, created = WAH4PCTransaction.objects.get_or_create(
-                transaction_id=txn_id,
-                defaults={
-                    'type': 'receive_query',
-                    'status': 'PROCESSING',
-                    'requester_id': requester_id,
-                    'raw_payload': raw_payload,
-                    'related_patient': patient,
-                },
-            )
-            if not created:
-                # Already handled by a previous delivery attempt
-                logger.warning('[WAH4PC] Duplicate process_query for txn %s — skipping', txn_id)
-                return
+    txn = query_worker.create_query_job(dict(request.data))
+    if txn is None:
+        logger.warning('[WAH4PC] Duplicate process_query for txn %s — skipping', txn_id)
+        return Response({'status': 'acknowledged'}, status=status.HTTP_200_OK)
+
+    if not query_worker.get_query_pool().submit(txn):
+        # No worker has seen the row yet, so dropping it is safe; the
+        # gateway's redelivery starts over.
+        txn.delete()
+        logger.warning('[WAH4PC] process_query queue full — asked gateway to retry txn %s', txn_id)
+        return Response(
+            {'error': 'Query queue is full, retry later'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={'Retry-After': str(query_worker.BUSY_RETRY_AFTER)},
+        )
 
-            # ----------------------------------------------------------------
-            # 3. Build the response payload for the requested resource type
-            # ----------------------------------------------------------------
-            if not patient:
-                response_data = {'error': 'Patient not found'}
-                response_status = 'REJECTED'
-            elif requested_resource == 'Encounter':
-                from admission.models import Encounter as EncounterModel
-                enc_qs = EncounterModel.objects.filter(
-                    subject_id=patient.id
-                ).order_by('-period_start', '-created_at')
-                response_data = encounters_to_bundle(enc_qs)
-                response_status = 'SUCCESS'
-            elif requested_resource == 'Procedure':
-                from admission.models import Procedure as ProcedureModel
-                proc_qs = ProcedureModel.objects.filter(
-                    subject_id=patient.id
-                ).order_by('-performed_datetime', '-created_at')
-                response_data = procedures_to_bundle(proc_qs)
-                response_status = 'SUCCESS'
-            elif requested_resource == 'Immunization':
-                imm_qs = Immunization.objects.filter(
-                    patient=patient
-                ).select_related('patient').order_by('-occurrence_datetime', '-created_at')
-                response_data = immunizations_to_bundle(imm_qs)
-                response_status = 'SUCCESS'
-            else:
-                response_data = patient_to_fhir(patient)
-                response_status = 'SUCCESS'
-
-            # ----------------------------------------------------------------
-            # 4. Send the result back to the gateway (10 s hard timeout)
-            # ----------------------------------------------------------------
-            http_requests.post(
-                return_url,
-                headers={
-                    'X-API-Key': os.getenv('WAH4PC_API_KEY'),
-                    'X-Provider-ID': os.getenv('WAH4PC_PROVIDER_ID'),
-                    'Idempotency-Key': idempotency_key,
-                },
-                json={
-                    'transactionId': txn_id,
-                    'status': response_status,
-                    'data': response_data,
-                },
-                timeout=10,
-            )
+    # Acknowledge immediately — the gateway must not wait for the worker
+    return Response({'status': 'acknowledged'}, status=status.HTTP_200_OK)
 
-            txn.status = 'COMPLETED'
-            txn.save()
 
-        except Exception as e:
-            logger.exception('[WAH4PC] process_query thread error for txn %s', txn_id)
-            if txn is not None:
-                txn.status = 'FAILED'
-                txn.error_message = str(e)
-                txn.save()
-            else:
-                # Thread failed before the transaction record was created
-                WAH4PCTransaction.objects.filter(transaction_id=txn_id).update(
-                    status='FAILED',
-                    error_message=str(e),
-                )
-        finally:
-            # Return the thread-local database connection to the pool
-            connection.close()
-
-    thread = threading.Thread(target=_process_query, daemon=True)
-    thread.start()
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def gateway_metrics(request):
+    """
+    Operational metrics for the WAH4PC integration in this process.
 
-    # Acknowledge immediately — the gateway must not wait for the thread
-    return Response({'status': 'acknowledged'}, status=status.HTTP_200_OK)
+    Returns:
+        gateway:     per-endpoint call/error/latency stats and connection reuse
+        query_pool:  process-query worker pool depth, throughput and latency
+        backlog:     durable counts of queued outbound requests and
+                     unanswered inbound queries (all processes)
+        fhir_cache:  rendered FHIR resource cache hits/misses per resource type
+        watchers:    requests waiting on a transaction status change (this process)
+        watchers_turned_away: watch requests answered at once because
+                     MAX_WATCHERS were already waiting (this process)
+    """
+    return Response({
+        'gateway': get_gateway_client().metrics(),
+        'query_pool': query_worker.get_query_pool().metrics(),
+        'backlog': {
+            'outbox_queued': WAH4PCTransaction.objects.filter(status=gateway_outbox.QUEUED).count(),
+            'queries_processing': WAH4PCTransaction.objects.filter(
+                type=query_worker.TYPE_RECEIVE_QUERY, status=query_worker.PROCESSING,
+            ).count(),
+        },
+        'fhir_cache': fhir_cache.metrics(),
+        'watchers': transaction_events.waiting(),
+        'watchers_turned_away': transaction_events.turned_away(),
+    })
 
 
 @api_view(['GET'])
@@ -1215,13 +1224,25 @@ def list_providers(request):
     This endpoint fetches the list of registered providers from the WAH4PC gateway.
     No authentication required as the gateway endpoint is public.
 
+    Served from the provider directory cache (provider_directory): a stale
+    copy is answered at once while it is refreshed in the background.
+
     Returns:
         Response: List of active providers with id, name, type, and isActive fields
     """
-    providers = get_providers()
+    providers = provider_directory.get_provider_directory().providers()
     return Response(providers, status=status.HTTP_200_OK)
 
 
+@api_view(['GET'])
+def get_provider(request, provider_id):
+    """Look up one WAH4PC provider (active or not) in the cached directory."""
+    provider = provider_directory.get_provider_directory().provider(provider_id)
+    if provider is None:
+        return Response({'error': 'Provider not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(provider, status=status.HTTP_200_OK)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_transactions(request):
@@ -1233,23 +1254,16 @@ def list_transactions(request):
         type: Filter by transaction type (fetch, send, receive_push, process_query)
         page: Page number (1-based, default 1)
         page_size: Records per page (default 50, max 200)
-    """
-    txns = WAH4PCTransaction.objects.all().order_by('-created_at')
+        view: "slim" for the lightweight list below
 
-    # Apply filters
-    patient_id = request.query_params.get('patient_id')
-    if patient_id:
-        txns = txns.filter(patient_id=patient_id)
-
-    status_filter = request.query_params.get('status')
-    if status_filter:
-        txns = txns.filter(status=status_filter)
-
-    type_filter = request.query_params.get('type')
-    if type_filter:
-        txns = txns.filter(type=type_filter)
+    view=slim (transaction_log.list_slim):
+        Rows omit rawPayload/outboundPayload and carry hasPayload (either
+        body present); fetch them from /wah4pc/transactions/<id>/payload. Pages by keyset: pass the
+        previous response's nextCursor as `cursor` (page is ignored).
+        `count` is cached for a minute and flagged countIsApproximate.
+    """
+    filters = {key: request.query_params.get(key) for key in transaction_log.FILTER_FIELDS}
 
-    # Pagination
     try:
         page = max(1, int(request.query_params.get('page', 1)))
         page_size = min(200, max(1, int(request.query_params.get('page_size', 50))))
@@ -1257,7 +1271,27 @@ def list_transactions(request):
         page = 1
         page_size = 50
 
-    total = txns.count()
+    total = transaction_log.approximate_count(filters)
+
+    if request.query_params.get('view') == 'slim':
+        try:
+            rows, next_cursor = transaction_log.list_slim(
+                filters, cursor=request.query_params.get('cursor') or None, limit=page_size,
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'count': total,
+            'countIsApproximate': True,
+            'pageSize': page_size,
+            'nextCursor': next_cursor,
+            'results': [
+                {**_transaction_row(t), 'hasPayload': t.has_payload}
+                for t in rows
+            ],
+        })
+
+    txns = transaction_log.filtered_transactions(filters).select_related('payload_archive').order_by('-created_at')
     offset = (page - 1) * page_size
     page_txns = txns[offset: offset + page_size]
 
@@ -1267,25 +1301,50 @@ def list_transactions(request):
         'pageSize': page_size,
         'totalPages': max(1, (total + page_size - 1) // page_size),
         'results': [
-            {
-                'id': t.transaction_id,
-                'type': t.type,
-                'status': t.status,
-                'patientId': t.patient_id,
-                'relatedPatientId': t.related_patient_id,
-                'targetProviderId': t.target_provider_id,
-                'requesterId': t.requester_id,
-                'senderId': t.sender_id,
-                'rawPayload': t.raw_payload,
-                'error': t.error_message,
-                'createdAt': t.created_at,
-                'updatedAt': t.updated_at,
-            }
+            {**_transaction_row(t), 'rawPayload': payload_archive.load_payload(t)}
             for t in page_txns
         ],
     })
 
 
+def _transaction_row(t):
+    return {
+        'id': t.transaction_id,
+        'type': t.type,
+        'status': t.status,
+        'patientId': t.patient_id,
+        'relatedPatientId': t.related_patient_id,
+        'targetProviderId': t.target_provider_id,
+        'requesterId': t.requester_id,
+        'senderId': t.sender_id,
+        'error': t.error_message,
+        'createdAt': t.created_at,
+        'updatedAt': t.updated_at,
+    }
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_transaction_payload(request, transaction_id):
+    """Raw inbound and outbound payloads of one transaction (omitted from the slim list)."""
+    txn = (
+        WAH4PCTransaction.objects.filter(_transaction_q(transaction_id))
+        .select_related('payload_archive')
+        .only(
+            'transaction_id', 'raw_payload', 'payload_sha256',
+            'outbound_payload', 'outbound_sha256', 'payload_archive',
+        )
+        .first()
+    )
+    if txn is None:
+        return Response({'error': 'Transaction not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({
+        'id': txn.transaction_id,
+        'rawPayload': payload_archive.load_payload(txn),
+        'outboundPayload': payload_archive.load_payload(txn, outbound=True),
+    })
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_transaction(request, transaction_id):
@@ -1297,15 +1356,18 @@ def get_transaction(request, transaction_id):
     Returns:
         Transaction details including idempotency key
     """
-    try:
-        txn = WAH4PCTransaction.objects.get(transaction_id=transaction_id)
-    except WAH4PCTransaction.DoesNotExist:
+    txn = WAH4PCTransaction.objects.filter(_transaction_q(transaction_id)).first()
+    if txn is None:
         return Response(
             {'error': 'Transaction not found'},
             status=status.HTTP_404_NOT_FOUND
         )
 
-    return Response({
+    return Response(_transaction_detail(txn))
+
+
+def _transaction_detail(txn):
+    return {
         'id': txn.transaction_id,
         'type': txn.type,
         'status': txn.status,
@@ -1314,9 +1376,118 @@ def get_transaction(request, transaction_id):
         'targetProviderId': txn.target_provider_id,
         'requesterId': txn.requester_id,
         'senderId': txn.sender_id,
-        'rawPayload': txn.raw_payload,
+        'rawPayload': payload_archive.load_payload(txn),
+        'payloadArchived': txn.payload_archive_id is not None,
         'error': txn.error_message,
         'idempotencyKey': txn.idempotency_key,
+        'gatewayTransactionId': txn.gateway_transaction_id,
+        'attempts': txn.attempts,
+        'nextAttemptAt': txn.next_attempt_at,
+        'entries': txn.entries,
         'createdAt': txn.created_at,
         'updatedAt': txn.updated_at,
-    })
+    }
+
+
+# Long-poll: default and longest wait per request (stay under proxy timeouts)
+WATCH_DEFAULT_TIMEOUT = 25.0
+WATCH_MAX_TIMEOUT = 55.0
+# SSE: comment line every SSE_HEARTBEAT seconds, stream closed after SSE_MAX_DURATION
+SSE_HEARTBEAT = 15.0
+SSE_MAX_DURATION = 300.0
+# Seconds a watcher turned away (transaction_events.MAX_WATCHERS) is told to wait
+WATCH_BUSY_RETRY = 5
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets DRF content negotiation accept text/event-stream for watch_transaction."""
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder).encode('utf-8')
+
+
+def _sse_event(txn):
+    data = json.dumps(_transaction_detail(txn), cls=DjangoJSONEncoder)
+    return f'event: status\ndata: {data}\n\n'.encode('utf-8')
+
+
+def _transaction_event_stream(txn):
+    deadline = time.monotonic() + SSE_MAX_DURATION
+    with transaction_events.watcher_slot() as admitted:
+        yield _sse_event(txn)
+        if not admitted:
+            # Every slot is taken: the client's EventSource reconnects later
+            yield f'retry: {int(WATCH_BUSY_RETRY * 1000)}\n\n'.encode('utf-8')
+            return
+        while txn.status not in transaction_events.TERMINAL_STATUSES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            # The stream lives for minutes; don't hold a database connection for it
+            txn, changed = transaction_events.wait_for_status_change(
+                txn, txn.status, timeout=min(remaining, SSE_HEARTBEAT), release_connection=True,
+            )
+            if txn is None:
+                return
+            yield _sse_event(txn) if changed else b': keep-alive\n\n'
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([JSONRenderer, EventStreamRenderer])
+def watch_transaction(request, transaction_id):
+    """Wait for a WAH4PC transaction to change status instead of polling.
+
+    Long-poll (default):
+        GET /wah4pc/transactions/<id>/watch?status=PENDING&timeout=25
+        Answers as soon as the status differs from `status` (default: the
+        current status), or after `timeout` seconds (max 55) with
+        changed=false. The body is get_transaction's plus "changed".
+
+    Server-sent events (Accept: text/event-stream):
+        A "status" event with the same body now and on every change, until
+        the transaction completes or fails; ": keep-alive" comments in
+        between.
+
+    At most transaction_events.MAX_WATCHERS requests wait per process.
+    Beyond that a long-poll is answered at once (changed=false unless the
+    status already differs, with Retry-After) and a stream sends its first
+    event and a "retry:" delay, then closes.
+
+    Woken by transaction_events.notify() when the webhook (or outbox
+    worker) saves the transaction.
+    """
+    txn = WAH4PCTransaction.objects.filter(_transaction_q(transaction_id)).first()
+    if txn is None:
+        return Response({'error': 'Transaction not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    if request.accepted_renderer.format == 'sse':
+        response = StreamingHttpResponse(_transaction_event_stream(txn), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Don't let nginx buffer the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    try:
+        timeout = float(request.query_params.get('timeout', WATCH_DEFAULT_TIMEOUT))
+        if not math.isfinite(timeout):
+            # nan survives the clamp below and never reaches the deadline
+            raise ValueError(timeout)
+    except ValueError:
+        return Response({'error': 'timeout must be a number of seconds'}, status=status.HTTP_400_BAD_REQUEST)
+    timeout = min(max(timeout, 0.0), WATCH_MAX_TIMEOUT)
+    known_status = request.query_params.get('status') or txn.status
+
+    with transaction_events.watcher_slot() as admitted:
+        txn, changed = transaction_events.wait_for_status_change(
+            txn, known_status, timeout if admitted else 0.0,
+        )
+    if txn is None:
+        return Response({'error': 'Transaction not found'}, status=status.HTTP_404_NOT_FOUND)
+    response = Response({**_transaction_detail(txn), 'changed': changed})
+    if not admitted:
+        response['Retry-After'] = str(WATCH_BUSY_RETRY)
+    return response
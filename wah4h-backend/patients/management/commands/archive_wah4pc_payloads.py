@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from patients.services import payload_archive
+
+
+class Command(BaseCommand):
+    help = (
+        'Moves raw payloads of finished WAH4PC transactions older than the retention window '
+        'into the compressed archive table, in bounded batches'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=payload_archive.RETENTION_DAYS,
+            help=f'Archive payloads older than this many days (default: {payload_archive.RETENTION_DAYS})',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=payload_archive.BATCH_SIZE,
+            help=f'Transactions archived per database transaction (default: {payload_archive.BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=None,
+            help='Stop after this many batches (default: until nothing is due)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many payloads are due',
+        )
+
+    def handle(self, *args, **options):
+        days = max(0, options['days'])
+        if options['dry_run']:
+            due = payload_archive.archivable(days).count()
+            self.stdout.write(self.style.NOTICE(f'{due} payload(s) older than {days} day(s) are due.'))
+            return
+
+        self.stdout.write(self.style.WARNING(f'Archiving payloads older than {days} day(s)...'))
+        archived = payload_archive.archive_expired(
+            days=days,
+            batch_size=max(1, options['batch_size']),
+            max_batches=options['max_batches'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} transaction payload(s).'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from patients.models import Immunization, Patient, fhir_logical_id
+
+
+class Command(BaseCommand):
+    help = (
+        'Fills in the persisted FHIR logical id (fhir_id) for patients and immunizations '
+        'written without save(), e.g. by bulk_create or raw SQL loads'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Rows updated per query (default: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+
+        self.stdout.write(self.style.WARNING('Backfilling FHIR logical ids...'))
+        for model, kind in ((Patient, 'patient'), (Immunization, 'immunization')):
+            count = 0
+            batch = []
+            for row in model.objects.filter(fhir_id__isnull=True).only('pk').iterator(chunk_size=batch_size):
+                row.fhir_id = fhir_logical_id(kind, row.pk)
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    count += model.objects.bulk_update(batch, ['fhir_id'])
+                    batch = []
+            if batch:
+                count += model.objects.bulk_update(batch, ['fhir_id'])
+            self.stdout.write(self.style.SUCCESS(f'{model.__name__}: assigned {count} fhir_id(s).'))
@@ -0,0 +1,61 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from patients.services import patient_import
+
+
+class Command(BaseCommand):
+    help = 'Bulk-imports patients from a CSV, NDJSON or FHIR Bundle file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import')
+        parser.add_argument(
+            '--format',
+            dest='file_format',
+            choices=patient_import.FORMATS,
+            help='Input format (default: from the file extension)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Rows validated and inserted per batch (default: 500)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate and dedup without writing anything',
+        )
+        parser.add_argument(
+            '--errors',
+            help='Write the per-row error report to this JSON file',
+        )
+
+    def handle(self, *args, **options):
+        fmt = options['file_format'] or patient_import.detect_format(options['path'])
+        if not fmt:
+            raise CommandError('Cannot tell the file format from its name; pass --format')
+
+        importer = patient_import.PatientImporter(
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+            max_errors=10 ** 9 if options['errors'] else 1000,
+        )
+        self.stdout.write(self.style.WARNING(f"Importing patients from {options['path']} ({fmt})..."))
+        try:
+            with open(options['path'], 'rb') as stream:
+                report = importer.run(patient_import.read_rows(stream, fmt))
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            raise CommandError(f'Import failed: {e}')
+
+        for error in report['errors'][:20]:
+            self.stdout.write(self.style.NOTICE(f"Row {error['row']}: {error['errors']}"))
+        if options['errors']:
+            with open(options['errors'], 'w') as out:
+                json.dump(report['errors'], out, indent=2)
+
+        verb = 'Validated' if report['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {report['created']} of {report['total']} rows "
+            f"({report['duplicates']} duplicates, {report['failed']} failed)."
+        ))
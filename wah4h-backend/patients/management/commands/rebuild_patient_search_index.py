@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from patients.models import Patient, PatientSearchTerm
+from patients.services import patient_search
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the patient search index (PatientSearchTerm) from the patient table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of patients indexed per transaction (default: 1000)',
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Truncate the index before rebuilding (drops rows of deleted patients)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        if options['clear']:
+            deleted, _ = PatientSearchTerm.objects.all().delete()
+            self.stdout.write(self.style.NOTICE(f'Cleared {deleted} index rows'))
+
+        self.stdout.write(self.style.WARNING('Rebuilding patient search index...'))
+        patients = Patient.objects.order_by('id').iterator(chunk_size=batch_size)
+        count = patient_search.index_patients(patients, batch_size=batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {count} patients ({PatientSearchTerm.objects.count()} terms).'
+        ))
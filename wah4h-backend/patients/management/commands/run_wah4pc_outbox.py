@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from patients.services import gateway_outbox, payload_archive, provider_directory, query_worker
+
+
+class Command(BaseCommand):
+    help = (
+        'Delivers queued WAH4PC fetch/send requests to the gateway, retrying with backoff, '
+        'answers process-query jobs interrupted by a web process restart, '
+        'keeps the provider directory fresh and archives expired transaction payloads'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain what is due now and exit (for cron) instead of looping',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds to sleep when nothing is due (default: 1)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Requests claimed per pass (default: 50)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        queries = query_worker.get_query_pool()
+        if options['once']:
+            recovered = queries.recover()
+            if recovered:
+                queries.start()
+                queries.join()
+                self.stdout.write(self.style.NOTICE(f'Answered {recovered} interrupted query job(s).'))
+        else:
+            # The pool's recovery thread sweeps for stalled queries every minute
+            queries.start()
+            self.stdout.write(self.style.WARNING('WAH4PC outbox worker started (Ctrl+C to stop)...'))
+
+        total = 0
+        try:
+            while True:
+                close_old_connections()
+                requeued = gateway_outbox.requeue_stalled()
+                if requeued:
+                    self.stdout.write(self.style.NOTICE(f'Re-queued {requeued} stalled request(s).'))
+
+                if not options['once']:
+                    provider_directory.refresh_if_stale()
+                    archived = payload_archive.archive_if_due()
+                    if archived:
+                        self.stdout.write(self.style.NOTICE(f'Archived {archived} transaction payload(s).'))
+
+                attempted = gateway_outbox.process_due(limit=batch_size)
+                total += attempted
+                if attempted < batch_size:
+                    if options['once']:
+                        self.stdout.write(self.style.SUCCESS(f'Attempted {total} request(s).'))
+                        return
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('WAH4PC outbox worker stopped.'))
@@ -0,0 +1,17 @@
+# patients/middleware.py
+from .services.patient_acl import patient_lookup_scope
+
+
+class PatientLookupScopeMiddleware:
+    """
+    Open a patient lookup scope for the duration of each request, so
+    patient_acl.get_patient_summaries() resolves each patient at most once
+    per request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with patient_lookup_scope():
+            return self.get_response(request)
@@ -0,0 +1,44 @@
+# Generated by Django 6.0.2 on 2026-10-16 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patients", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PatientSearchTerm",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("kind", models.CharField(max_length=10)),
+                ("term", models.CharField(max_length=64)),
+                (
+                    "patient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_terms",
+                        to="patients.patient",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "patient_search_term",
+                "indexes": [
+                    models.Index(fields=["kind", "term"], name="pst_kind_term_idx")
+                ],
+            },
+        ),
+    ]
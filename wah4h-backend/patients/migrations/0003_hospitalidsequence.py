@@ -0,0 +1,26 @@
+# Generated by Django 6.0.2 on 2026-10-16 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patients", "0002_patientsearchterm"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HospitalIdSequence",
+            fields=[
+                (
+                    "year",
+                    models.PositiveIntegerField(primary_key=True, serialize=False),
+                ),
+                ("last_value", models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                "db_table": "patient_hospital_id_sequence",
+            },
+        ),
+    ]
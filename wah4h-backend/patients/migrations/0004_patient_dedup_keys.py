@@ -0,0 +1,60 @@
+# Generated by Django 6.0.2 on 2026-10-16 11:20
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def _name_key(value):
+    # Frozen copy of patients.models.name_key
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value.casefold())
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.split())
+
+
+def backfill_dedup_keys(apps, schema_editor):
+    Patient = apps.get_model("patients", "Patient")
+    batch = []
+    for patient in Patient.objects.only("id", "first_name", "last_name").iterator(chunk_size=2000):
+        patient.first_name_key = _name_key(patient.first_name)
+        patient.last_name_key = _name_key(patient.last_name)
+        batch.append(patient)
+        if len(batch) >= 2000:
+            Patient.objects.bulk_update(batch, ["first_name_key", "last_name_key"])
+            batch = []
+    if batch:
+        Patient.objects.bulk_update(batch, ["first_name_key", "last_name_key"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patients", "0003_hospitalidsequence"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="patient",
+            name="first_name_key",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=255
+            ),
+        ),
+        migrations.AddField(
+            model_name="patient",
+            name="last_name_key",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=255
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patient",
+            index=models.Index(
+                fields=["last_name_key", "first_name_key", "birthdate"],
+                name="patient_dedup_key_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_dedup_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 6.0.2 on 2026-10-16 19:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patients", "0004_patient_dedup_keys"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="wah4pctransaction",
+            name="attempts",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="wah4pctransaction",
+            name="gateway_transaction_id",
+            field=models.CharField(
+                blank=True, db_index=True, max_length=255, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="wah4pctransaction",
+            name="next_attempt_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="wah4pctransaction",
+            name="outbound_path",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name="wah4pctransaction",
+            name="outbound_payload",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="wah4pctransaction",
+            index=models.Index(
+                fields=["status", "next_attempt_at"], name="wah4pc_txn_due_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 6.0.2 on 2026-10-16 20:04
+
+import uuid
+
+from django.db import migrations, models
+
+
+def _fhir_logical_id(kind, pk):
+    # Frozen copy of patients.models.fhir_logical_id
+    return str(uuid.uuid5(uuid.NAMESPACE_OID, f"{kind}:{pk}"))
+
+
+def backfill_fhir_ids(apps, schema_editor):
+    for model_name, kind in (("Patient", "patient"), ("Immunization", "immunization")):
+        Model = apps.get_model("patients", model_name)
+        batch = []
+        for row in Model.objects.filter(fhir_id__isnull=True).only("pk").iterator(chunk_size=2000):
+            row.fhir_id = _fhir_logical_id(kind, row.pk)
+            batch.append(row)
+            if len(batch) >= 2000:
+                Model.objects.bulk_update(batch, ["fhir_id"])
+                batch = []
+        if batch:
+            Model.objects.bulk_update(batch, ["fhir_id"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patients", "0005_wah4pctransaction_outbox"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="immunization",
+            name="fhir_id",
+            field=models.CharField(
+                blank=True, editable=False, max_length=36, null=True, unique=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="patient",
+            name="fhir_id",
+            field=models.CharField(
+                blank=True, editable=False, max_length=36, null=True, unique=True
+            ),
+        ),
+        migrations.RunPython(backfill_fhir_ids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-16 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patients", "0006_fhir_logical_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="wah4pctransaction",
+            name="entries",
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-16 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patients", "0007_wah4pctransaction_entries"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WAH4PCProvider",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("provider_id", models.CharField(max_length=255, unique=True)),
+                ("name", models.CharField(blank=True, default="", max_length=255)),
+                ("is_active", models.BooleanField(default=True)),
+                ("data", models.JSONField(default=dict)),
+                ("fetched_at", models.DateTimeField()),
+            ],
+            options={
+                "db_table": "wah4pc_provider",
+            },
+        ),
+    ]
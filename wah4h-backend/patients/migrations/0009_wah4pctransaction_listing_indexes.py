@@ -0,0 +1,29 @@
+# Generated by Django 6.0.2 on 2026-10-16 21:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patients", "0008_wah4pcprovider"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="wah4pctransaction",
+            index=models.Index(fields=["created_at"], name="wah4pc_txn_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="wah4pctransaction",
+            index=models.Index(
+                fields=["status", "created_at"], name="wah4pc_txn_status_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="wah4pctransaction",
+            index=models.Index(
+                fields=["type", "created_at"], name="wah4pc_txn_type_created_idx"
+            ),
+        ),
+    ]
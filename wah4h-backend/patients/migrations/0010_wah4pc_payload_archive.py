@@ -0,0 +1,51 @@
+# Generated by Django 6.0.2 on 2026-10-16 22:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patients", "0009_wah4pctransaction_listing_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WAH4PCPayloadArchive",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("codec", models.CharField(default="gzip", max_length=10)),
+                ("data", models.BinaryField()),
+                ("size", models.PositiveIntegerField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "db_table": "wah4pc_payload_archive",
+            },
+        ),
+        migrations.AddField(
+            model_name="wah4pctransaction",
+            name="payload_sha256",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="wah4pctransaction",
+            name="payload_archive",
+            field=models.OneToOneField(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="transaction",
+                to="patients.wah4pcpayloadarchive",
+            ),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-16 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patients", "0010_wah4pc_payload_archive"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="wah4pcpayloadarchive",
+            name="outbound_data",
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name="wah4pcpayloadarchive",
+            name="outbound_size",
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="wah4pctransaction",
+            name="outbound_sha256",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AlterField(
+            model_name="wah4pcpayloadarchive",
+            name="data",
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AlterField(
+            model_name="wah4pcpayloadarchive",
+            name="size",
+            field=models.PositiveIntegerField(null=True),
+        ),
+    ]
@@ -1,8 +1,44 @@
+import unicodedata
+import uuid
+
 from django.core.validators import RegexValidator
 from django.db import models
 from core.models import TimeStampedModel, FHIRResourceModel
 
 
+def name_key(value):
+    """
+    Normalised name used for registration dedup and patient search tokens
+    (services.patient_search), so both treat the same names as equal.
+
+    Casefolded, accent-stripped and whitespace-collapsed:
+    "  PEÑAFLOR " -> "penaflor", "Dela  Cruz" -> "dela cruz".
+    """
+    if not value:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', value.casefold())
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(stripped.split())
+
+
+def fhir_logical_id(kind, pk):
+    """
+    Deterministic FHIR logical id for a local row: uuid5 over "<kind>:<pk>".
+
+    This is the id wah4pc exports for Patient and Immunization resources;
+    it is persisted in fhir_id so inbound references resolve with one
+    indexed lookup instead of recomputing it for every row.
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_OID, f"{kind}:{pk}"))
+
+
+def _persist_fhir_id(instance, kind):
+    # The id derives from the pk, which only exists after the INSERT
+    if instance.fhir_id is None and instance.pk is not None:
+        instance.fhir_id = fhir_logical_id(kind, instance.pk)
+        type(instance).objects.filter(pk=instance.pk).update(fhir_id=instance.fhir_id)
+
+
 class Patient(TimeStampedModel):
     """
     PHCORE Standard Patient Model
@@ -72,6 +108,13 @@ class Patient(TimeStampedModel):
     active = models.BooleanField(default=True)
     status = models.CharField(max_length=20, default='active')  # active/inactive
 
+    # Dedup keys: name_key() of first/last name, maintained by save()
+    first_name_key = models.CharField(max_length=255, blank=True, default='', editable=False)
+    last_name_key = models.CharField(max_length=255, blank=True, default='', editable=False)
+
+    # FHIR logical id (fhir_logical_id('patient', id)), set on first save
+    fhir_id = models.CharField(max_length=36, unique=True, null=True, blank=True, editable=False)
+
     @property
     def age(self):
         """Calculate age from birthdate."""
@@ -91,9 +134,27 @@ class Patient(TimeStampedModel):
 
         This prevents the two fields from ever diverging, regardless of
         which field a caller sets.
+
+        Also refreshes the normalised dedup keys (first_name_key,
+        last_name_key) from the name fields, and persists fhir_id once the
+        row has a primary key.
         """
         self.status = 'active' if self.active else 'inactive'
+        self.refresh_dedup_keys()
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if update_fields & {'first_name', 'last_name'}:
+                update_fields |= {'first_name_key', 'last_name_key'}
+            kwargs['update_fields'] = update_fields
         super().save(*args, **kwargs)
+        _persist_fhir_id(self, 'patient')
+
+    def refresh_dedup_keys(self):
+        """Recompute the dedup keys (bulk_create callers must call this themselves)."""
+        self.first_name_key = name_key(self.first_name)
+        self.last_name_key = name_key(self.last_name)
 
     class Meta:
         db_table = 'patient'
@@ -101,12 +162,76 @@ class Patient(TimeStampedModel):
             models.Index(fields=['patient_id']),
             models.Index(fields=['last_name', 'first_name']),
             models.Index(fields=['philhealth_id']),
+            models.Index(
+                fields=['last_name_key', 'first_name_key', 'birthdate'],
+                name='patient_dedup_key_idx',
+            ),
         ]
 
     def __str__(self):
         return f"{self.patient_id or self.id}: {self.first_name} {self.last_name}"
 
 
+class PatientSearchTerm(models.Model):
+    """
+    Inverted search index for the patient registry.
+
+    One row per (patient, kind, term). Maintained by the post_save signal in
+    patients/signals.py and rebuilt by `manage.py rebuild_patient_search_index`.
+    Every lookup is an equality seek on (kind, term), so search cost depends
+    on the number of matching terms, not the size of the registry.
+
+    Kinds:
+        word       — full normalised name token ("dela", "cruz")
+        prefix     — leading 2..N characters of a name token ("cr", "cru")
+        trigram    — padded character trigram of a name token (fuzzy matching)
+        identifier — alphanumeric-only patient_id / PhilHealth ID
+        id_prefix  — leading characters of an identifier ("wah2026")
+    """
+    KIND_WORD = 'word'
+    KIND_PREFIX = 'prefix'
+    KIND_TRIGRAM = 'trigram'
+    KIND_IDENTIFIER = 'identifier'
+    KIND_ID_PREFIX = 'id_prefix'
+
+    patient = models.ForeignKey(
+        'Patient',
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+    )
+    kind = models.CharField(max_length=10)
+    term = models.CharField(max_length=64)
+
+    class Meta:
+        db_table = 'patient_search_term'
+        indexes = [
+            models.Index(fields=['kind', 'term'], name='pst_kind_term_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.term} -> {self.patient_id}"
+
+
+class HospitalIdSequence(models.Model):
+    """
+    Per-year counter behind hospital IDs (WAH-{YEAR}-{SEQUENCE}).
+
+    One row per calendar year; last_value is the highest sequence handed out.
+    Allocation is a single atomic `last_value = last_value + n` on this row
+    (see patients/services/hospital_ids.py), so registrations no longer lock
+    the year's patient rows. On PostgreSQL a native sequence is used instead
+    and this table stays empty.
+    """
+    year = models.PositiveIntegerField(primary_key=True)
+    last_value = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'patient_hospital_id_sequence'
+
+    def __str__(self):
+        return f"{self.year}: {self.last_value}"
+
+
 class Condition(FHIRResourceModel):
     """
     FHIR Standard Condition Model
@@ -364,6 +489,13 @@ class Immunization(FHIRResourceModel):
     series_doses_value = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     series_doses_unit = models.CharField(max_length=255, null=True, blank=True)
 
+    # FHIR logical id (fhir_logical_id('immunization', immunization_id)), set on first save
+    fhir_id = models.CharField(max_length=36, unique=True, null=True, blank=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        _persist_fhir_id(self, 'immunization')
+
     class Meta:
         db_table = 'immunization'
         indexes = [
@@ -376,6 +508,28 @@ class Immunization(FHIRResourceModel):
         return f"Immunization {self.identifier}: {self.vaccine_display or self.vaccine_code}"
 
 
+class WAH4PCProvider(models.Model):
+    """
+    Local copy of the WAH4PC gateway's provider directory.
+
+    Written by patients.services.provider_directory on each refresh, so a
+    freshly started process can answer from the database instead of waiting
+    on the gateway.
+    """
+    provider_id = models.CharField(max_length=255, unique=True)
+    name = models.CharField(max_length=255, blank=True, default='')
+    is_active = models.BooleanField(default=True)
+    # The provider entry exactly as the gateway returned it
+    data = models.JSONField(default=dict)
+    fetched_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'wah4pc_provider'
+
+    def __str__(self):
+        return f"{self.provider_id}: {self.name}"
+
+
 class WAH4PCTransaction(TimeStampedModel):
     """
     Audit log for every inbound and outbound WAH4PC gateway interaction.
@@ -388,6 +542,19 @@ class WAH4PCTransaction(TimeStampedModel):
     Outbound fields (populated by fetch/send views):
         target_provider_id — provider we sent a request or push to
         idempotency_key    — UUID used for safe retries
+        outbound_*, attempts, next_attempt_at — outbox state while the
+                             request waits for the gateway worker
+                             (see patients.services.gateway_outbox)
+        entries            — per-entry status of a transaction Bundle push
+                             (patient record transfer), in Bundle order
+
+    Retention (see patients.services.payload_archive):
+        payload_archive    — compressed copy of raw_payload and
+                             outbound_payload once the row is past the
+                             retention window; both are then cleared from
+                             this table
+        payload_sha256     — hash of the archived raw_payload, checked on read
+        outbound_sha256    — hash of the archived outbound_payload
 
     Both directions:
         related_patient    — FK to the local Patient record involved, if any
@@ -421,8 +588,62 @@ class WAH4PCTransaction(TimeStampedModel):
     error_message = models.TextField(null=True, blank=True)
     idempotency_key = models.CharField(max_length=255, null=True, blank=True, db_index=True)
 
+    # Outbox fields (outbound fetch/send queued for the gateway worker).
+    # transaction_id is our own UUID until the gateway accepts the request;
+    # the gateway's ID is then stored in gateway_transaction_id.
+    gateway_transaction_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)
+    outbound_path = models.CharField(max_length=255, null=True, blank=True)
+    outbound_payload = models.JSONField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    # [{"resourceType", "id", "status", "outcome"?}, ...] for Bundle pushes
+    entries = models.JSONField(null=True, blank=True)
+
+    # Set when raw_payload / outbound_payload have been moved to the archive table
+    payload_archive = models.OneToOneField(
+        'WAH4PCPayloadArchive',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='transaction',
+    )
+    payload_sha256 = models.CharField(max_length=64, null=True, blank=True)
+    outbound_sha256 = models.CharField(max_length=64, null=True, blank=True)
+
     class Meta:
         db_table = 'wah4pc_transaction'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='wah4pc_txn_due_idx'),
+            # Interop log listing, newest first (patients.services.transaction_log)
+            models.Index(fields=['created_at'], name='wah4pc_txn_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='wah4pc_txn_status_created_idx'),
+            models.Index(fields=['type', 'created_at'], name='wah4pc_txn_type_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.type} {self.transaction_id}: {self.status}"
+
+
+class WAH4PCPayloadArchive(models.Model):
+    """
+    Compressed raw_payload and outbound_payload of a WAH4PCTransaction past
+    the retention window.
+
+    Kept out of the hot wah4pc_transaction table so its rows and indexes
+    stay small; read back through patients.services.payload_archive.
+    """
+    codec = models.CharField(max_length=10, default='gzip')
+    # raw_payload; NULL when the transaction had none
+    data = models.BinaryField(null=True)
+    # Canonical JSON size before compression
+    size = models.PositiveIntegerField(null=True)
+    outbound_data = models.BinaryField(null=True)
+    outbound_size = models.PositiveIntegerField(null=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'wah4pc_payload_archive'
+
+    def __str__(self):
+        return f"Archived payload {self.pk} ({self.codec}, {self.size} bytes)"
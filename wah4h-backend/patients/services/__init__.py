@@ -7,6 +7,7 @@ Export public services and ACLs for the Patients module.
 from .patient_acl import (
     validate_patient_exists,
     get_patient_summary,
+    get_patient_summaries,
     get_patient_details
 )
 
@@ -19,6 +20,7 @@ from .patients_services import (
 __all__ = [
     'validate_patient_exists',
     'get_patient_summary',
+    'get_patient_summaries',
     'get_patient_details',
     'PatientRegistrationService',
     'PatientUpdateService',
@@ -0,0 +1,127 @@
+"""
+Rendered FHIR Resource Cache
+============================
+Patient, Immunization, Encounter and Procedure resources are rebuilt from the
+database on every gateway query, outbound push and FHIR API read, although
+the underlying rows change rarely. This module keeps the rendered dict in the
+Django cache under a per-record key, tagged with a version:
+
+    fhir:<ResourceType>:<pk>  ->  (version, resource)
+
+    converter(model)
+        │
+        ├─ version = updated_at of the record and of every record its
+        │            references render (patient name, practitioner, location)
+        │
+        ├─ stored version == version  ──► hit: return the cached resource
+        └─ otherwise                  ──► miss: render, store, return
+
+A stale entry can never be served: saving the record (or a referenced
+practitioner/location) moves its updated_at and therefore the version. The
+post_save/post_delete receivers in patients.signals also drop the key so a
+changed record does not keep a dead entry in the cache until it expires.
+Writes through QuerySet.update() bypass auto_now and signals; callers that
+use them on converted models must bump updated_at themselves.
+
+Hit/miss counters are per process and per resource type; they are exposed
+through the gateway metrics endpoint.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from django.core.cache import cache
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+KEY_PREFIX = 'fhir'
+
+# Versioned entries never go stale, so the timeout only bounds memory held by
+# records nobody asks for any more.
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+# ============================================================================
+# LOOKUP
+# ============================================================================
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def cache_key(resource_type: str, pk: Any) -> str:
+    return f'{KEY_PREFIX}:{resource_type}:{pk}'
+
+
+def version_of(*timestamps) -> tuple:
+    """Cache version from the updated_at of a record and its references."""
+    return tuple(ts.isoformat() if ts else None for ts in timestamps)
+
+
+def _count(resource_type: str, outcome: str) -> None:
+    with _stats_lock:
+        counters = _stats.setdefault(resource_type, {'hits': 0, 'misses': 0})
+        counters[outcome] += 1
+
+
+def get_or_render(
+    resource_type: str,
+    pk: Optional[Any],
+    version: Hashable,
+    render: Callable[[], dict],
+) -> dict:
+    """Return the cached resource for (resource_type, pk) at `version`, rendering on a miss.
+
+    Unsaved models (pk None) are rendered every time. A failing cache backend
+    degrades to rendering rather than failing the request.
+    """
+    if pk is None:
+        return render()
+
+    key = cache_key(resource_type, pk)
+    try:
+        entry = cache.get(key)
+    except Exception:
+        entry = None
+
+    if entry is not None and entry[0] == version:
+        _count(resource_type, 'hits')
+        return entry[1]
+
+    _count(resource_type, 'misses')
+    resource = render()
+    try:
+        cache.set(key, (version, resource), CACHE_TIMEOUT)
+    except Exception:
+        pass
+    return resource
+
+
+def invalidate(resource_type: str, pk: Any) -> None:
+    """Drop the cached resource for one record."""
+    try:
+        cache.delete(cache_key(resource_type, pk))
+    except Exception:
+        pass
+
+
+# ============================================================================
+# METRICS
+# ============================================================================
+
+def metrics() -> Dict[str, Dict[str, Any]]:
+    """Hit/miss counters per resource type since process start (or reset)."""
+    with _stats_lock:
+        snapshot = {rt: dict(counters) for rt, counters in _stats.items()}
+    for counters in snapshot.values():
+        total = counters['hits'] + counters['misses']
+        counters['hit_rate'] = round(counters['hits'] / total, 3) if total else None
+    return snapshot
+
+
+def reset_metrics() -> None:
+    with _stats_lock:
+        _stats.clear()
@@ -0,0 +1,294 @@
+"""
+WAH4PC Outbound Queue
+=====================
+Outbound fetch/send requests are no longer sent to the gateway inside the
+API request. The view writes a QUEUED WAH4PCTransaction and answers 202 with
+its transactionId straight away; a worker process delivers the queue:
+
+    enqueue_*()      ->  QUEUED   (next_attempt_at = now)
+    worker           ->  SENDING  (claimed with a conditional UPDATE)
+                     ->  POST once, with the row's Idempotency-Key
+                           2xx                   -> PENDING, gateway ID stored
+                           409/429/502-504/network -> QUEUED, next_attempt_at pushed back
+                           any other error       -> FAILED
+    webhook_receive  ->  COMPLETED / FAILED
+
+A patient record transfer is one row too: the whole record travels as one
+transaction Bundle, and the row's `entries` list tracks each resource in
+it (QUEUED, then the gateway's per-entry response status when it sends a
+transaction-response Bundle, else the transaction's own status).
+
+Retry delay is "full jitter" exponential backoff, uniform(0, min(cap,
+base * 2**(attempt - 1))), but never sooner than the gateway's Retry-After.
+A row still failing after MAX_ATTEMPTS is marked FAILED.
+
+Every attempt reuses the same idempotency key, so re-sending after a lost
+response cannot open a second gateway transaction. Rows left in SENDING by a
+worker that died mid-request are put back on the queue by requeue_stalled().
+
+Worker:
+    manage.py run_wah4pc_outbox            (loops; --once for cron)
+"""
+
+import email.utils
+import logging
+import random
+import uuid
+from datetime import timedelta, timezone as dt_timezone
+from typing import Any, Dict, List, Optional
+
+import requests
+from django.db.models import F
+from django.utils import timezone
+
+from patients.models import Patient, WAH4PCTransaction
+from patients import wah4pc
+
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'QUEUED'
+SENDING = 'SENDING'
+PENDING = 'PENDING'
+FAILED = 'FAILED'
+
+TYPE_FETCH = 'fetch'
+TYPE_SEND = 'send'
+TYPE_TRANSFER = 'transfer'
+
+# Transient gateway answers worth another attempt
+RETRY_STATUSES = {409, 429, 502, 503, 504}
+
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_CAP_SECONDS = 300.0
+
+# A SENDING row older than this belongs to a worker that died mid-request
+STALL_TIMEOUT = timedelta(minutes=5)
+
+_ENDPOINTS = {
+    TYPE_FETCH: 'fhir_request',
+    TYPE_SEND: 'fhir_push',
+    TYPE_TRANSFER: 'fhir_push',
+}
+
+
+# ============================================================================
+# ENQUEUE
+# ============================================================================
+
+def enqueue(txn_type: str, path: str, payload: dict, target_id: str,
+            patient: Optional[Patient] = None,
+            entries: Optional[List[Dict[str, Any]]] = None) -> WAH4PCTransaction:
+    """
+    Queue one outbound gateway request.
+
+    The local transaction_id is a fresh UUID that doubles as the
+    Idempotency-Key for every delivery attempt.
+    """
+    key = str(uuid.uuid4())
+    return WAH4PCTransaction.objects.create(
+        transaction_id=key,
+        idempotency_key=key,
+        type=txn_type,
+        status=QUEUED,
+        target_provider_id=target_id,
+        patient_id=patient.id if patient else None,
+        related_patient=patient,
+        outbound_path=path,
+        outbound_payload=payload,
+        next_attempt_at=timezone.now(),
+        entries=entries,
+    )
+
+
+def enqueue_patient_fetch(target_id: str, philhealth_id: str) -> WAH4PCTransaction:
+    """Queue a Patient fetch by PhilHealth ID."""
+    return enqueue(
+        TYPE_FETCH,
+        wah4pc.PATIENT_REQUEST_PATH,
+        wah4pc.patient_request_payload(target_id, philhealth_id),
+        target_id,
+    )
+
+
+def enqueue_patient_push(target_id: str, patient: Patient) -> WAH4PCTransaction:
+    """Queue a Patient push; the FHIR resource is snapshotted at enqueue time."""
+    return enqueue(
+        TYPE_SEND,
+        wah4pc.PATIENT_PUSH_PATH,
+        wah4pc.patient_push_payload(target_id, patient),
+        target_id,
+        patient=patient,
+    )
+
+
+def enqueue_patient_transfer(target_id: str, patient: Patient) -> WAH4PCTransaction:
+    """Queue a full patient record as one transaction Bundle, snapshotted now."""
+    bundle = wah4pc.patient_record_bundle(patient)
+    entries = [
+        {'resourceType': e['resource']['resourceType'], 'id': e['resource']['id'], 'status': QUEUED}
+        for e in bundle['entry']
+    ]
+    return enqueue(
+        TYPE_TRANSFER,
+        wah4pc.BUNDLE_PUSH_PATH,
+        wah4pc.patient_record_push_payload(target_id, bundle),
+        target_id,
+        patient=patient,
+        entries=entries,
+    )
+
+
+def record_entry_outcomes(txn: WAH4PCTransaction, result: Any, status: str) -> None:
+    """
+    Update a Bundle push's per-entry status in place (the caller saves).
+
+    Entries answered in a transaction-response Bundle inside `result` take
+    its response.status (and outcome); the rest take `status`.
+    """
+    if not txn.entries:
+        return
+    outcomes = wah4pc.bundle_entry_outcomes(result)
+    for i, entry in enumerate(txn.entries):
+        response = outcomes[i] if i < len(outcomes) else {}
+        entry['status'] = response.get('status') or status
+        if response.get('outcome'):
+            entry['outcome'] = response['outcome']
+
+
+# ============================================================================
+# BACKOFF
+# ============================================================================
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=dt_timezone.utc)
+    return max(0.0, (when - timezone.now()).total_seconds())
+
+
+def retry_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Full-jitter backoff before the next attempt, floored at Retry-After."""
+    ceiling = min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * 2 ** max(0, attempt - 1))
+    delay = random.uniform(0, ceiling)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+# ============================================================================
+# DELIVERY
+# ============================================================================
+
+def process_due(limit: int = 50, client=None) -> int:
+    """
+    Deliver up to `limit` queued requests whose next attempt is due.
+
+    Safe to run from several workers at once: a row is only sent by the
+    worker whose claim UPDATE flipped it from QUEUED to SENDING.
+
+    Returns:
+        int: Number of requests attempted
+    """
+    client = client or wah4pc.get_gateway_client()
+    due = list(
+        WAH4PCTransaction.objects
+        .filter(status=QUEUED, next_attempt_at__lte=timezone.now())
+        .order_by('next_attempt_at')
+        .values_list('pk', flat=True)[:limit]
+    )
+    attempted = 0
+    for pk in due:
+        if not _claim(pk):
+            continue
+        deliver(WAH4PCTransaction.objects.get(pk=pk), client)
+        attempted += 1
+    return attempted
+
+
+def requeue_stalled(older_than: timedelta = STALL_TIMEOUT) -> int:
+    """Put SENDING rows abandoned by a dead worker back on the queue."""
+    now = timezone.now()
+    return WAH4PCTransaction.objects.filter(
+        status=SENDING, updated_at__lt=now - older_than,
+    ).update(status=QUEUED, next_attempt_at=now, updated_at=now)
+
+
+def _claim(pk: int) -> bool:
+    # update() skips auto_now, so updated_at is set explicitly; it dates the
+    # claim for requeue_stalled().
+    return WAH4PCTransaction.objects.filter(pk=pk, status=QUEUED).update(
+        status=SENDING, attempts=F('attempts') + 1, updated_at=timezone.now(),
+    ) == 1
+
+
+def deliver(txn: WAH4PCTransaction, client) -> None:
+    """Make one delivery attempt for a claimed (SENDING) transaction."""
+    endpoint = _ENDPOINTS.get(txn.type, 'fhir_push')
+    try:
+        response = client.send(
+            'POST', txn.outbound_path, endpoint,
+            headers=client.auth_headers(txn.idempotency_key),
+            json=txn.outbound_payload,
+        )
+    except requests.RequestException as e:
+        _retry_later(txn, f'Network error: {e}')
+        return
+
+    if response.status_code in RETRY_STATUSES:
+        _retry_later(
+            txn,
+            f'Gateway answered {response.status_code}',
+            parse_retry_after(response.headers.get('Retry-After')),
+        )
+        return
+    if response.status_code >= 400:
+        _finish(txn, FAILED, error=wah4pc.gateway_error_message(response))
+        return
+
+    try:
+        result = response.json()
+    except ValueError:
+        result = {}
+    gateway_id = wah4pc.response_transaction_id(result) if isinstance(result, dict) else None
+    if not gateway_id:
+        _finish(txn, FAILED, error='Gateway did not return a transaction ID')
+        return
+
+    txn.gateway_transaction_id = gateway_id
+    status = result.get('status') if txn.type in (TYPE_SEND, TYPE_TRANSFER) else None
+    record_entry_outcomes(txn, result, status or PENDING)
+    _finish(txn, status or PENDING)
+
+
+def _retry_later(txn: WAH4PCTransaction, message: str, retry_after: Optional[float] = None) -> None:
+    if txn.attempts >= MAX_ATTEMPTS:
+        logger.warning('[WAH4PC] Giving up on txn %s after %d attempts: %s',
+                       txn.transaction_id, txn.attempts, message)
+        _finish(txn, FAILED, error=f'{message} (gave up after {txn.attempts} attempts)')
+        return
+    txn.status = QUEUED
+    txn.error_message = message
+    txn.next_attempt_at = timezone.now() + timedelta(seconds=retry_delay(txn.attempts, retry_after))
+    txn.save(update_fields=['status', 'error_message', 'next_attempt_at', 'updated_at'])
+
+
+def _finish(txn: WAH4PCTransaction, status: str, error: Optional[str] = None) -> None:
+    if status == FAILED:
+        record_entry_outcomes(txn, None, FAILED)
+    txn.status = status
+    txn.error_message = error
+    txn.next_attempt_at = None
+    txn.save(update_fields=[
+        'status', 'error_message', 'next_attempt_at', 'gateway_transaction_id', 'entries', 'updated_at',
+    ])
@@ -0,0 +1,158 @@
+"""
+Hospital ID Allocator
+=====================
+Hands out sequential hospital IDs (WAH-{YYYY}-{XXXXX}) without scanning or
+locking the patient table.
+
+    PostgreSQL:  one native sequence per year (patient_hospital_id_<year>_seq).
+                 nextval() never blocks and never rolls back, so concurrent
+                 registrations do not wait on each other. IDs burned by a
+                 rolled-back registration leave gaps.
+    Other DBs:   one HospitalIdSequence row per year, advanced with a single
+                 `UPDATE ... SET last_value = last_value + n`. Writers only
+                 queue on that one row, for the rest of their transaction.
+
+The first allocation of a year seeds the counter from the highest existing
+ID with that year's prefix, so the switch from the old max(patient_id) scheme
+continues the existing numbering.
+
+Block allocation: allocate_hospital_ids(n) reserves n IDs in one round trip.
+Bulk imports use HospitalIdPool to draw IDs from blocks as they go.
+"""
+
+from datetime import datetime
+from typing import List, Optional
+
+from django.db import IntegrityError, ProgrammingError, connection, transaction
+from django.db.models import F
+
+from patients.models import HospitalIdSequence, Patient
+
+
+HOSPITAL_ID_PREFIX = 'WAH'
+
+
+def format_hospital_id(year: int, sequence: int) -> str:
+    """Format a hospital ID ("WAH-2026-00001"); sequences past 99999 simply widen."""
+    return f"{HOSPITAL_ID_PREFIX}-{year}-{sequence:05d}"
+
+
+def allocate_hospital_ids(count: int = 1, year: Optional[int] = None) -> List[str]:
+    """
+    Reserve `count` hospital IDs for `year` (default: current year).
+
+    Returns:
+        List of hospital IDs in ascending order. On PostgreSQL a block may
+        interleave with concurrent allocations; it is never shared.
+    """
+    if count < 1:
+        return []
+    year = year or datetime.now().year
+
+    if connection.vendor == 'postgresql':
+        sequences = _allocate_native(year, count)
+    else:
+        sequences = _allocate_from_table(year, count)
+    return [format_hospital_id(year, seq) for seq in sequences]
+
+
+def next_hospital_id(year: Optional[int] = None) -> str:
+    """Reserve a single hospital ID."""
+    return allocate_hospital_ids(1, year)[0]
+
+
+class HospitalIdPool:
+    """
+    Draws hospital IDs from blocks reserved `block_size` at a time.
+
+    One pool per worker: each block costs one allocation round trip, and IDs
+    left unused when the pool is discarded are simply skipped.
+    """
+
+    def __init__(self, block_size: int = 100, year: Optional[int] = None):
+        self.block_size = block_size
+        self.year = year
+        self._ids: List[str] = []
+
+    def next(self) -> str:
+        if not self._ids:
+            self._ids = allocate_hospital_ids(self.block_size, self.year)
+            self._ids.reverse()
+        return self._ids.pop()
+
+    def take(self, count: int) -> List[str]:
+        """Take `count` IDs, reserving one extra block at most."""
+        ids = []
+        while len(ids) < count:
+            if not self._ids:
+                self._ids = allocate_hospital_ids(max(self.block_size, count - len(ids)), self.year)
+                self._ids.reverse()
+            ids.append(self._ids.pop())
+        return ids
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+def _allocate_from_table(year: int, count: int) -> List[int]:
+    with transaction.atomic():
+        updated = (
+            HospitalIdSequence.objects
+            .filter(year=year)
+            .update(last_value=F('last_value') + count)
+        )
+        if not updated:
+            _create_counter(year)
+            HospitalIdSequence.objects.filter(year=year).update(last_value=F('last_value') + count)
+        last_value = HospitalIdSequence.objects.values_list('last_value', flat=True).get(year=year)
+    return list(range(last_value - count + 1, last_value + 1))
+
+
+def _create_counter(year: int) -> None:
+    """Create the year's counter row; a concurrent creator winning the race is fine."""
+    try:
+        with transaction.atomic():
+            HospitalIdSequence.objects.create(year=year, last_value=_highest_existing_sequence(year))
+    except IntegrityError:
+        pass
+
+
+def _allocate_native(year: int, count: int) -> List[int]:
+    name = f"patient_hospital_id_{int(year)}_seq"
+    for attempt in range(2):
+        try:
+            # Savepoint: a missing sequence must not abort the caller's transaction
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT nextval(%s) FROM generate_series(1, %s)", [name, count]
+                )
+                return sorted(row[0] for row in cursor.fetchall())
+        except ProgrammingError:
+            if attempt:
+                raise
+            _create_native_sequence(name, year)
+
+
+def _create_native_sequence(name: str, year: int) -> None:
+    """Create the year's sequence; a concurrent creator winning the race is fine."""
+    start = _highest_existing_sequence(year) + 1
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {name} START WITH {start}")
+    except (IntegrityError, ProgrammingError):
+        # Both passed IF NOT EXISTS; the loser hits the pg_class / pg_type
+        # unique index once the winner commits. Its sequence is usable now.
+        pass
+
+
+def _highest_existing_sequence(year: int) -> int:
+    """Highest sequence already used by a patient for `year` (0 if none)."""
+    prefix = f"{HOSPITAL_ID_PREFIX}-{year}-"
+    highest = 0
+    for patient_id in Patient.objects.filter(patient_id__startswith=prefix).values_list('patient_id', flat=True).iterator():
+        try:
+            highest = max(highest, int(patient_id[len(prefix):]))
+        except ValueError:
+            continue
+    return highest
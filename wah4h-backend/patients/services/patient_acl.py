@@ -16,12 +16,146 @@ Refactored: 2026-02-04 to support Admission/Encounter integration
 - Added encounter_id filtering to conditions and allergies
 """
 
-from typing import Optional, List, Dict, Any
+import base64
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Sequence, Tuple
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection
 from django.db.models import Q
 
 # FORTRESS BOUNDARY: Only this file imports patient models
 from patients.models import Patient, Condition, AllergyIntolerance, Immunization
+from patients.services import patient_search
+
+
+# ============================================================================
+# DTO SHAPES (PROJECTIONS)
+# ============================================================================
+# Each DTO shape declares exactly which Patient columns it reads. Builders
+# fetch those columns with values_list() and turn the row tuples straight
+# into dictionaries - no model instances are created.
+#
+#   slim    - identity, name, demographics and status; for large lists
+#   summary - every column, plus age/active (list, search and lookup)
+#   full    - every column, no age/active (detail view)
+
+DTO_SLIM = 'slim'
+DTO_SUMMARY = 'summary'
+DTO_FULL = 'full'
+
+_NAME_FIELDS = ('first_name', 'middle_name', 'last_name', 'suffix_name')
+
+_SLIM_TEXT_FIELDS = _NAME_FIELDS + (
+    'patient_id', 'gender', 'philhealth_id', 'mobile_number',
+)
+
+_DETAIL_TEXT_FIELDS = _NAME_FIELDS + (
+    'patient_id', 'gender', 'civil_status', 'nationality', 'religion',
+    'philhealth_id', 'blood_type', 'pwd_type', 'occupation', 'education',
+    'mobile_number', 'address_line', 'address_city', 'address_district',
+    'address_state', 'address_postal_code', 'address_country',
+    'contact_first_name', 'contact_last_name', 'contact_mobile_number',
+    'contact_relationship', 'indigenous_group', 'image_url',
+)
+
+# text: NULL -> "" columns; raw: copied as-is; age/timestamps: derived keys
+_DTO_SHAPES: Dict[str, Dict[str, Any]] = {
+    DTO_SLIM: {
+        'text': _SLIM_TEXT_FIELDS,
+        'raw': ('active',),
+        'age': True,
+        'timestamps': False,
+    },
+    DTO_SUMMARY: {
+        'text': _DETAIL_TEXT_FIELDS,
+        'raw': ('indigenous_flag', 'consent_flag', 'active'),
+        'age': True,
+        'timestamps': True,
+    },
+    DTO_FULL: {
+        'text': _DETAIL_TEXT_FIELDS,
+        'raw': ('indigenous_flag', 'consent_flag'),
+        'age': False,
+        'timestamps': True,
+    },
+}
+
+
+def patient_dto_columns(shape: str = DTO_SUMMARY) -> Tuple[str, ...]:
+    """
+    Patient columns read by a DTO shape, in row-tuple order.
+
+    Raises:
+        ValueError: If the shape is unknown
+    """
+    try:
+        spec = _DTO_SHAPES[shape]
+    except KeyError:
+        raise ValueError(f"Unknown patient DTO shape: {shape}")
+    columns = ('id', 'birthdate', 'status') + spec['text'] + spec['raw']
+    if spec['timestamps']:
+        columns += ('created_at', 'updated_at')
+    return columns
+
+
+def build_patient_dtos(
+    rows: Iterable[Sequence[Any]],
+    shape: str = DTO_SUMMARY,
+    today: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Turn a stream of row tuples into patient DTOs.
+
+    Args:
+        rows: Tuples in patient_dto_columns(shape) order, e.g. from
+              Patient.objects.values_list(*patient_dto_columns(shape))
+        shape: DTO_SLIM, DTO_SUMMARY or DTO_FULL
+        today: Reference date for age (default: date.today(), taken once
+               for the whole batch)
+
+    Returns:
+        List of patient dictionaries
+    """
+    columns = patient_dto_columns(shape)
+    spec = _DTO_SHAPES[shape]
+    text_fields = spec['text']
+    raw_fields = spec['raw']
+    with_age = spec['age']
+    with_timestamps = spec['timestamps']
+    if with_age and today is None:
+        today = date.today()
+
+    dtos = []
+    for row in rows:
+        values = dict(zip(columns, row))
+        birthdate = values['birthdate']
+
+        dto = {'id': values['id']}
+        for field in text_fields:
+            dto[field] = values[field] or ""
+        dto['full_name'] = " ".join(
+            dto[field] for field in _NAME_FIELDS if dto[field]
+        ) or "Unknown"
+        dto['birthdate'] = birthdate.isoformat() if birthdate else None
+        if with_age:
+            dto['age'] = _age_on(birthdate, today)
+        for field in raw_fields:
+            dto[field] = values[field]
+        dto['status'] = values['status'] or 'active'
+        if with_timestamps:
+            created_at, updated_at = values['created_at'], values['updated_at']
+            dto['created_at'] = created_at.isoformat() if created_at else None
+            dto['updated_at'] = updated_at.isoformat() if updated_at else None
+        dtos.append(dto)
+    return dtos
+
+
+def _fetch_patient_dtos(queryset, shape: str = DTO_SUMMARY) -> List[Dict[str, Any]]:
+    """Project a Patient queryset onto a DTO shape."""
+    return build_patient_dtos(queryset.values_list(*patient_dto_columns(shape)), shape)
 
 
 # ============================================================================
@@ -61,10 +195,7 @@ def get_patient_summary(patient_id: int) -> Optional[Dict[str, Any]]:
               philhealth_id, address_line, address_city
     """
     try:
-        patient = Patient.objects.get(id=patient_id)
-        return _patient_to_summary_dict(patient)
-    except ObjectDoesNotExist:
-        return None
+        return get_patient_summaries([patient_id]).get(patient_id)
     except Exception:
         return None
 
@@ -80,52 +211,160 @@ def get_patient_details(patient_id: int) -> Optional[Dict[str, Any]]:
         Dictionary with full patient details or None if not found
     """
     try:
-        patient = Patient.objects.get(id=patient_id)
-        return _patient_to_full_dict(patient)
-    except ObjectDoesNotExist:
-        return None
+        dtos = _fetch_patient_dtos(Patient.objects.filter(id=patient_id), DTO_FULL)
+        return dtos[0] if dtos else None
     except Exception:
         return None
 
 
+# ============================================================================
+# BATCH LOOKUP (REQUEST-SCOPED IDENTITY MAP)
+# ============================================================================
+# Other apps reference patients by integer ID and resolve them while
+# serializing lists. get_patient_summaries() answers a whole page of IDs with
+# one projected query. Inside a lookup scope (opened per request by
+# PatientLookupScopeMiddleware) every DTO fetched is remembered, so the same
+# subject looked up again - by a prefetch helper, a serializer fallback or
+# get_patient_summary() - is served from memory. Outside a scope (management
+# commands, background threads) every call goes to the database.
+
+# {shape: {patient pk: DTO, or None if the patient does not exist}}
+_identity_map: ContextVar[Optional[Dict[str, Dict[int, Optional[Dict[str, Any]]]]]] = ContextVar(
+    'patient_identity_map', default=None
+)
+
+
+@contextmanager
+def patient_lookup_scope() -> Iterator[None]:
+    """Open a lookup scope; DTOs fetched inside it are reused until it closes."""
+    token = _identity_map.set({})
+    try:
+        yield
+    finally:
+        _identity_map.reset(token)
+
+
+def forget_patient(patient_id: int) -> None:
+    """Drop a patient from the active lookup scope (called after it is saved or deleted)."""
+    scope = _identity_map.get()
+    if scope:
+        for entries in scope.values():
+            entries.pop(patient_id, None)
+
+
+def get_patient_summaries(patient_ids: Iterable[Optional[int]], shape: str = DTO_SUMMARY) -> Dict[int, Dict[str, Any]]:
+    """
+    Resolve many patients at once.
+
+    Args:
+        patient_ids: Database primary keys; None and duplicates are ignored
+        shape: DTO shape (default DTO_SUMMARY)
+
+    Returns:
+        {patient pk: DTO} for the patients that exist. DTOs may be shared
+        with other callers in the same request - treat them as read-only.
+    """
+    wanted = {int(pk) for pk in patient_ids if pk is not None}
+    if not wanted:
+        return {}
+
+    scope = _identity_map.get()
+    known = scope.setdefault(shape, {}) if scope is not None else {}
+    missing = wanted - known.keys()
+    if missing:
+        fetched = {dto['id']: dto for dto in _fetch_patient_dtos(Patient.objects.filter(id__in=missing), shape)}
+        for pk in missing:
+            # Remember misses too, so a dangling reference costs one query
+            known[pk] = fetched.get(pk)
+
+    return {pk: known[pk] for pk in wanted if known[pk] is not None}
+
+
 # ============================================================================
 # PATIENT SEARCH
 # ============================================================================
 
-def search_patients(query: str, limit: int = 50) -> List[Dict[str, Any]]:
+def search_patients(query: str, limit: int = 50, shape: str = DTO_SUMMARY) -> List[Dict[str, Any]]:
     """
-    Search patients by name or patient ID string.
+    Search patients by name, hospital ID or PhilHealth ID.
+
+    Non-empty queries go through the indexed search engine
+    (patients.services.patient_search), which supports prefix, fuzzy and
+    identifier matching and returns results by relevance.
 
     Args:
-        query: Search term (name or patient_id string)
+        query: Search term (name, patient_id or philhealth_id string)
         limit: Maximum number of results (default: 50)
+        shape: DTO shape (DTO_SUMMARY or DTO_SLIM)
 
     Returns:
-        List of patient summary dictionaries (active patients only)
+        List of patient dictionaries (active patients only),
+        best match first
     """
     if not query:
         # Default list behavior: Return recent/all active patients if query is empty
         patients = Patient.objects.filter(status='active').order_by('last_name', 'first_name')[:limit]
-        return [_patient_to_summary_dict(patient) for patient in patients]
+        return _fetch_patient_dtos(patients, shape)
 
     if len(query.strip()) < 2:
         return []
 
     try:
-        query = query.strip()
-        patients = Patient.objects.filter(
-            Q(status='active') &
-            (Q(patient_id__icontains=query) |
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query) |
-            Q(middle_name__icontains=query))
-        ).order_by('last_name', 'first_name')[:limit]
-
-        return [_patient_to_summary_dict(patient) for patient in patients]
+        ranked_ids = patient_search.search(query.strip(), limit=limit)
+        dtos = {dto['id']: dto for dto in _fetch_patient_dtos(Patient.objects.filter(id__in=ranked_ids), shape)}
+        return [dtos[pk] for pk in ranked_ids if pk in dtos]
     except Exception:
         return []
 
 
+# ============================================================================
+# PATIENT LISTING (KEYSET PAGINATION)
+# ============================================================================
+
+def list_patients(
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    shape: str = DTO_SUMMARY,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    List active patients one page at a time, ordered by (last_name, first_name, id).
+
+    Keyset pagination: the cursor encodes the sort key of the last row of the
+    previous page, so every page is a seek on the (last_name, first_name)
+    index followed by a LIMIT - page 1000 costs the same as page 1.
+
+    Args:
+        cursor: Opaque cursor returned by the previous call (None for page 1)
+        limit: Page size
+        shape: DTO shape (DTO_SUMMARY or DTO_SLIM)
+
+    Returns:
+        (patient dictionaries, next cursor or None on the last page)
+
+    Raises:
+        ValueError: If the cursor or shape is invalid
+    """
+    columns = patient_dto_columns(shape)
+    patients = Patient.objects.filter(status='active')
+    if cursor:
+        last_name, first_name, last_id = _decode_patient_cursor(cursor)
+        patients = patients.filter(_after_sort_key(last_name, first_name, last_id))
+
+    # Fetch one extra row to learn whether another page exists
+    rows = list(
+        patients.order_by('last_name', 'first_name', 'id').values_list(*columns)[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more and rows:
+        tail = dict(zip(columns, rows[-1]))
+        next_cursor = _encode_patient_cursor(tail['last_name'], tail['first_name'], tail['id'])
+
+    return build_patient_dtos(rows, shape), next_cursor
+
+
 # ============================================================================
 # PATIENT CONDITIONS
 # ============================================================================
@@ -252,110 +491,59 @@ def get_active_patient_allergies(patient_id: int, encounter_id: Optional[int] =
 # INTERNAL HELPER FUNCTIONS (Private - Do not export)
 # ============================================================================
 
-def _compute_full_name(patient: Patient) -> str:
-    """Compute full name from patient name components."""
-    parts = []
-    
-    if patient.first_name:
-        parts.append(patient.first_name)
-    if patient.middle_name:
-        parts.append(patient.middle_name)
-    if patient.last_name:
-        parts.append(patient.last_name)
-    if patient.suffix_name:
-        parts.append(patient.suffix_name)
-    
-    return " ".join(parts) if parts else "Unknown"
+def _age_on(birthdate: Optional[date], today: date) -> Optional[int]:
+    """Age in whole years on a reference date (same rule as Patient.age)."""
+    if not birthdate:
+        return None
+    return today.year - birthdate.year - ((today.month, today.day) < (birthdate.month, birthdate.day))
 
 
-def _patient_to_summary_dict(patient: Patient) -> Dict[str, Any]:
-    """
-    Convert Patient model to summary dictionary (DTO).
-    
-    Includes both computed full_name and granular name components
-    for flexible display logic in consuming apps.
-    NOTE: Now returns all patient fields to ensure complete data in list views.
-    """
-    return {
-        'id': patient.id,
-        'patient_id': patient.patient_id or "",
-        'full_name': _compute_full_name(patient),
-        'first_name': patient.first_name or "",
-        'last_name': patient.last_name or "",
-        'middle_name': patient.middle_name or "",
-        'suffix_name': patient.suffix_name or "",
-        'gender': patient.gender or "",
-        'birthdate': patient.birthdate.isoformat() if patient.birthdate else None,
-        'age': patient.age,
-        'civil_status': patient.civil_status or "",
-        'nationality': patient.nationality or "",
-        'religion': patient.religion or "",
-        'philhealth_id': patient.philhealth_id or "",
-        'blood_type': patient.blood_type or "",
-        'pwd_type': patient.pwd_type or "",
-        'occupation': patient.occupation or "",
-        'education': patient.education or "",
-        'mobile_number': patient.mobile_number or "",
-        'address_line': patient.address_line or "",
-        'address_city': patient.address_city or "",
-        'address_district': patient.address_district or "",
-        'address_state': patient.address_state or "",
-        'address_postal_code': patient.address_postal_code or "",
-        'address_country': patient.address_country or "",
-        'contact_first_name': patient.contact_first_name or "",
-        'contact_last_name': patient.contact_last_name or "",
-        'contact_mobile_number': patient.contact_mobile_number or "",
-        'contact_relationship': patient.contact_relationship or "",
-        'indigenous_flag': patient.indigenous_flag,
-        'indigenous_group': patient.indigenous_group or "",
-        'consent_flag': patient.consent_flag,
-        'image_url': patient.image_url or "",
-        'active': patient.active,
-        'status': patient.status or 'active',
-        'created_at': patient.created_at.isoformat() if hasattr(patient, 'created_at') else None,
-        'updated_at': patient.updated_at.isoformat() if hasattr(patient, 'updated_at') else None,
-    }
+def _encode_patient_cursor(last_name: Optional[str], first_name: Optional[str], pk: int) -> str:
+    """Encode a (last_name, first_name, id) sort key as an opaque URL-safe cursor."""
+    raw = json.dumps([last_name, first_name, pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
 
 
-def _patient_to_full_dict(patient: Patient) -> Dict[str, Any]:
-    """Convert Patient model to full detail dictionary (DTO)."""
-    return {
-        'id': patient.id,
-        'patient_id': patient.patient_id or "",
-        'first_name': patient.first_name or "",
-        'last_name': patient.last_name or "",
-        'middle_name': patient.middle_name or "",
-        'suffix_name': patient.suffix_name or "",
-        'full_name': _compute_full_name(patient),
-        'gender': patient.gender or "",
-        'birthdate': patient.birthdate.isoformat() if patient.birthdate else None,
-        'civil_status': patient.civil_status or "",
-        'nationality': patient.nationality or "",
-        'religion': patient.religion or "",
-        'philhealth_id': patient.philhealth_id or "",
-        'blood_type': patient.blood_type or "",
-        'pwd_type': patient.pwd_type or "",
-        'occupation': patient.occupation or "",
-        'education': patient.education or "",
-        'mobile_number': patient.mobile_number or "",
-        'address_line': patient.address_line or "",
-        'address_city': patient.address_city or "",
-        'address_district': patient.address_district or "",
-        'address_state': patient.address_state or "",
-        'address_postal_code': patient.address_postal_code or "",
-        'address_country': patient.address_country or "",
-        'contact_first_name': patient.contact_first_name or "",
-        'contact_last_name': patient.contact_last_name or "",
-        'contact_mobile_number': patient.contact_mobile_number or "",
-        'contact_relationship': patient.contact_relationship or "",
-        'indigenous_flag': patient.indigenous_flag,
-        'indigenous_group': patient.indigenous_group or "",
-        'consent_flag': patient.consent_flag,
-        'image_url': patient.image_url or "",
-        'status': patient.status or 'active',
-        'created_at': patient.created_at.isoformat() if hasattr(patient, 'created_at') else None,
-        'updated_at': patient.updated_at.isoformat() if hasattr(patient, 'updated_at') else None,
-    }
+def _decode_patient_cursor(cursor: str) -> Tuple[Optional[str], Optional[str], int]:
+    """Decode a cursor produced by _encode_patient_cursor; raises ValueError if malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        last_name, first_name, pk = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(pk, int) or not all(v is None or isinstance(v, str) for v in (last_name, first_name)):
+        raise ValueError('Invalid cursor')
+    return last_name, first_name, pk
+
+
+def _after_sort_key(last_name: Optional[str], first_name: Optional[str], pk: int) -> Q:
+    """
+    Build the keyset predicate "(last_name, first_name, id) > cursor".
+
+    Name columns are nullable and backends disagree on where NULL sorts
+    (largest on Postgres, smallest on SQLite), so the predicate follows the
+    backend's native order - the same order the index is stored in.
+    """
+    nulls_largest = connection.features.nulls_order_largest
+
+    def sorts_after(field: str, value: Optional[str]) -> Q:
+        if value is None:
+            return Q(pk__in=[]) if nulls_largest else Q(**{f'{field}__isnull': False})
+        after = Q(**{f'{field}__gt': value})
+        return (after | Q(**{f'{field}__isnull': True})) if nulls_largest else after
+
+    def equals(field: str, value: Optional[str]) -> Q:
+        if value is None:
+            return Q(**{f'{field}__isnull': True})
+        return Q(**{field: value})
+
+    return (
+        sorts_after('last_name', last_name)
+        | (equals('last_name', last_name) & (
+            sorts_after('first_name', first_name)
+            | (equals('first_name', first_name) & Q(id__gt=pk))
+        ))
+    )
 
 
 def _condition_to_dict(condition: Condition) -> Dict[str, Any]:
@@ -0,0 +1,317 @@
+"""
+Patient Bulk Import Pipeline
+============================
+Loads a legacy patient registry (CSV, NDJSON or a FHIR Bundle) in chunks.
+
+    read (streaming)  ->  validate chunk (PatientImportSerializer)
+                      ->  dedup against an in-memory key index
+                      ->  allocate hospital IDs in blocks
+                      ->  bulk_create + search indexing per chunk
+
+Every problem is reported per row; a bad row never aborts the load. If a
+chunk's bulk insert fails (e.g. a concurrent registration took a key), that
+chunk is retried row by row so only the offending rows are rejected.
+
+Entry points:
+    - POST /api/patients/import/          (PatientViewSet.import_patients)
+    - manage.py import_patients <file>
+"""
+
+import codecs
+import csv
+import io
+import json
+from itertools import islice
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+
+from patients.models import Patient, fhir_logical_id, name_key
+from patients.services import patient_search
+from patients.services.hospital_ids import HospitalIdPool
+
+
+FORMAT_CSV = 'csv'
+FORMAT_NDJSON = 'ndjson'
+FORMAT_BUNDLE = 'bundle'
+FORMATS = (FORMAT_CSV, FORMAT_NDJSON, FORMAT_BUNDLE)
+
+_EXTENSION_FORMATS = {
+    '.csv': FORMAT_CSV,
+    '.ndjson': FORMAT_NDJSON,
+    '.jsonl': FORMAT_NDJSON,
+    '.json': FORMAT_BUNDLE,
+}
+
+Row = Tuple[int, Dict[str, Any]]
+
+
+# ============================================================================
+# READERS
+# ============================================================================
+
+def detect_format(filename: Optional[str]) -> Optional[str]:
+    """Guess the input format from a file name's extension."""
+    name = (filename or '').lower()
+    for extension, fmt in _EXTENSION_FORMATS.items():
+        if name.endswith(extension):
+            return fmt
+    return None
+
+
+def read_rows(stream: IO, fmt: str) -> Iterator[Row]:
+    """
+    Yield (row number, raw field dict) from a binary or text stream.
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    if fmt == FORMAT_CSV:
+        return _read_csv(_text(stream))
+    if fmt == FORMAT_NDJSON:
+        return _read_ndjson(_text(stream))
+    if fmt == FORMAT_BUNDLE:
+        return _read_bundle(_text(stream))
+    raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def _text(stream: IO) -> IO:
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    if isinstance(stream, io.IOBase):
+        return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    # File-like wrappers (e.g. Django's temporary upload files)
+    return codecs.getreader('utf-8-sig')(stream)
+
+
+def _read_csv(stream: IO) -> Iterator[Row]:
+    # Row numbers are the file line a record starts on; the header is line 1.
+    # A quoted field may span lines, so they come from the reader's line_num
+    # rather than from counting records.
+    reader = csv.DictReader(stream)
+    if reader.fieldnames is None:  # reads the header line
+        return
+    line_no = reader.line_num + 1
+    for record in reader:
+        yield line_no, record
+        line_no = reader.line_num + 1
+
+
+def _read_ndjson(stream: IO) -> Iterator[Row]:
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, {'__error__': f'Invalid JSON: {e}'}
+            continue
+        if not isinstance(record, dict):
+            yield line_no, {'__error__': 'Expected a JSON object'}
+            continue
+        yield line_no, record
+
+
+def _read_bundle(stream: IO) -> Iterator[Row]:
+    # A Bundle is one JSON document, so it is parsed whole; rows are then
+    # converted one entry at a time.
+    from patients.wah4pc import fhir_to_dict
+
+    bundle = json.load(stream)
+    if not isinstance(bundle, dict) or bundle.get('resourceType') != 'Bundle':
+        raise ValueError('Expected a FHIR Bundle')
+    for entry_no, entry in enumerate(bundle.get('entry') or [], start=1):
+        resource = (entry or {}).get('resource') or {}
+        if resource.get('resourceType') != 'Patient':
+            continue
+        try:
+            yield entry_no, fhir_to_dict(resource)
+        except Exception as e:
+            yield entry_no, {'__error__': f'Unreadable Patient resource: {e}'}
+
+
+# ============================================================================
+# IMPORTER
+# ============================================================================
+
+def _dedup_key(first_name, last_name, birthdate) -> Tuple[str, str, Any]:
+    """Same match rule as register_patient: normalised names + birthdate."""
+    return (name_key(first_name), name_key(last_name), birthdate)
+
+
+def _clean(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Strip strings and drop blank values so optional columns may be left empty."""
+    cleaned = {}
+    for key, value in record.items():
+        if key is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == '':
+            continue
+        cleaned[key.strip()] = value
+    return cleaned
+
+
+class PatientImporter:
+    """
+    Chunked patient importer.
+
+    Usage:
+        report = PatientImporter(chunk_size=500).run(read_rows(stream, 'csv'))
+
+    Report keys:
+        total, created, duplicates, failed, dry_run,
+        errors: [{'row': n, 'errors': {field: [messages]}}]  (first max_errors)
+    """
+
+    def __init__(self, chunk_size: int = 500, dry_run: bool = False, max_errors: int = 1000):
+        self.chunk_size = max(1, chunk_size)
+        self.dry_run = dry_run
+        self.max_errors = max_errors
+        self.report: Dict[str, Any] = {
+            'total': 0,
+            'created': 0,
+            'duplicates': 0,
+            'failed': 0,
+            'dry_run': dry_run,
+            'errors': [],
+        }
+        self._keys: Dict[Tuple[str, str, Any], str] = {}
+        self._ids = HospitalIdPool(block_size=self.chunk_size)
+
+    def run(self, rows: Iterable[Row]) -> Dict[str, Any]:
+        self._load_existing_keys()
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self._process_chunk(chunk)
+        return self.report
+
+    # ------------------------------------------------------------------
+    # Chunk processing
+    # ------------------------------------------------------------------
+
+    def _load_existing_keys(self) -> None:
+        existing = Patient.objects.values_list('id', 'patient_id', 'first_name_key', 'last_name_key', 'birthdate')
+        for pk, patient_id, first_key, last_key, birthdate in existing.iterator(chunk_size=5000):
+            self._keys[(first_key, last_key, birthdate)] = patient_id or str(pk)
+
+    def _process_chunk(self, chunk: List[Row]) -> None:
+        from patients.api.serializers import PatientImportSerializer
+
+        self.report['total'] += len(chunk)
+        valid: List[Tuple[int, Dict[str, Any]]] = []
+
+        for row_no, record in chunk:
+            if '__error__' in record:
+                self._fail(row_no, {'non_field_errors': [record['__error__']]})
+                continue
+            serializer = PatientImportSerializer(data=_clean(record))
+            if not serializer.is_valid():
+                self._fail(row_no, serializer.errors)
+                continue
+
+            data = dict(serializer.validated_data)
+            key = _dedup_key(data.get('first_name'), data.get('last_name'), data.get('birthdate'))
+            if key in self._keys:
+                self.report['duplicates'] += 1
+                self._error(row_no, {'non_field_errors': [
+                    f"Patient with name '{data['first_name']} {data['last_name']}' and birthdate "
+                    f"'{data['birthdate']}' already exists (ID: {self._keys[key]})"
+                ]})
+                continue
+            self._keys[key] = data.get('patient_id') or f'row {row_no}'
+            valid.append((row_no, data))
+
+        valid = self._reject_taken_ids(valid)
+        if not valid or self.dry_run:
+            self.report['created'] += len(valid)
+            return
+
+        missing = [data for _, data in valid if not data.get('patient_id')]
+        for data, hospital_id in zip(missing, self._ids.take(len(missing))):
+            data['patient_id'] = hospital_id
+
+        patients = []
+        for _, data in valid:
+            patient = Patient(**data)
+            # bulk_create skips Patient.save(), which keeps status and the
+            # dedup keys in sync
+            patient.status = 'active' if patient.active else 'inactive'
+            patient.refresh_dedup_keys()
+            patients.append(patient)
+
+        try:
+            with transaction.atomic():
+                Patient.objects.bulk_create(patients)
+        except IntegrityError:
+            # Row by row through Patient.save(), which assigns fhir_id; the
+            # post_save signal indexes each row
+            self.report['created'] += len(self._create_one_by_one(valid, patients))
+            return
+
+        created = patients
+        if any(p.pk is None for p in created):
+            by_id = Patient.objects.in_bulk([p.patient_id for p in created], field_name='patient_id')
+            created = [by_id[p.patient_id] for p in created if p.patient_id in by_id]
+        # bulk_create also skips the fhir_id that Patient.save() assigns once the pk exists
+        unassigned = [p for p in created if p.fhir_id is None]
+        for patient in unassigned:
+            patient.fhir_id = fhir_logical_id('patient', patient.pk)
+        Patient.objects.bulk_update(unassigned, ['fhir_id'], batch_size=1000)
+        patient_search.index_patients(created)
+        self.report['created'] += len(created)
+
+    def _reject_taken_ids(self, valid: List[Tuple[int, Dict[str, Any]]]) -> List[Tuple[int, Dict[str, Any]]]:
+        """Reject rows whose explicit patient_id exists in the DB or earlier in the file."""
+        explicit = [data['patient_id'] for _, data in valid if data.get('patient_id')]
+        if not explicit:
+            return valid
+        taken = set(Patient.objects.filter(patient_id__in=explicit).values_list('patient_id', flat=True))
+        kept = []
+        for row_no, data in valid:
+            patient_id = data.get('patient_id')
+            if patient_id and patient_id in taken:
+                self._fail(row_no, {'patient_id': [f"Patient with patient_id '{patient_id}' already exists"]})
+                continue
+            if patient_id:
+                taken.add(patient_id)
+            kept.append((row_no, data))
+        return kept
+
+    def _create_one_by_one(self, valid, patients) -> List[Patient]:
+        created = []
+        for (row_no, _), patient in zip(valid, patients):
+            patient.pk = None
+            try:
+                with transaction.atomic():
+                    patient.save()
+                created.append(patient)
+            except IntegrityError as e:
+                self._fail(row_no, {'non_field_errors': [f'Database rejected row: {e}']})
+        return created
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def _fail(self, row_no: int, errors) -> None:
+        self.report['failed'] += 1
+        self._error(row_no, errors)
+
+    def _error(self, row_no: int, errors) -> None:
+        if len(self.report['errors']) < self.max_errors:
+            self.report['errors'].append({'row': row_no, 'errors': _plain(errors)})
+
+
+def _plain(errors) -> Any:
+    """Turn DRF ErrorDetail structures into plain JSON-friendly values."""
+    if isinstance(errors, dict):
+        return {str(k): _plain(v) for k, v in errors.items()}
+    if isinstance(errors, (list, tuple)):
+        return [_plain(v) for v in errors]
+    return str(errors)
@@ -0,0 +1,222 @@
+"""
+Patient Search Engine
+=====================
+Indexed, ranked patient search backed by the PatientSearchTerm table.
+
+The old search ran four `icontains` OR-clauses over the patient table, which
+no B-tree index can serve, so every search was a full table scan. This module
+keeps an inverted index of normalised terms per patient instead:
+
+    Indexing:  Patient -> {(kind, term), ...}   (post_save + rebuild command)
+    Querying:  query   -> {(kind, term), ...}   -> equality seeks on (kind, term)
+                       -> SUM(weight) per patient -> ranked patient IDs
+
+Supported matching:
+    - Exact name tokens       "cruz"          -> Juan Dela Cruz
+    - Name prefixes           "cru"           -> Cruz, Cruzada
+    - Fuzzy (trigram overlap) "santso"        -> Santos
+    - PhilHealth ID / MRN     "12-345678901-2", "WAH-2026-00012", "wah2026"
+
+The index is portable (plain table + composite index) so it behaves the same
+on SQLite in development and Postgres in production.
+
+NOTE: QuerySet.update() and bulk_create() bypass post_save. Callers that
+write patients in bulk must call index_patients() or run the rebuild command.
+"""
+
+import math
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Sum, Value, When
+
+from patients.models import Patient, PatientSearchTerm, name_key
+
+
+# Relevance weights per matched term kind
+_WEIGHTS = {
+    PatientSearchTerm.KIND_IDENTIFIER: 100,
+    PatientSearchTerm.KIND_ID_PREFIX: 30,
+    PatientSearchTerm.KIND_WORD: 10,
+    PatientSearchTerm.KIND_PREFIX: 4,
+    PatientSearchTerm.KIND_TRIGRAM: 1,
+}
+
+# Prefix terms start at 2 characters (same minimum as the search box)
+_MIN_PREFIX = 2
+_MAX_TERM = 64
+
+# A trigram-only match must share at least this fraction of the query's trigrams
+_FUZZY_THRESHOLD = 0.6
+
+_TOKEN_SPLIT = re.compile(r"[^0-9a-z]+")
+_NON_ALNUM = re.compile(r"[^0-9a-z]")
+
+_NAME_FIELDS = ('first_name', 'middle_name', 'last_name', 'suffix_name')
+_IDENTIFIER_FIELDS = ('patient_id', 'philhealth_id')
+
+
+# ============================================================================
+# NORMALISATION
+# ============================================================================
+
+# Text is normalised by models.name_key, the registration dedup key, so
+# search and dedup agree on which names are the same.
+
+def name_tokens(text: Optional[str]) -> List[str]:
+    """Split a name into normalised alphanumeric tokens ("Peñaflor" -> ["penaflor"])."""
+    return [t for t in _TOKEN_SPLIT.split(name_key(text)) if t]
+
+
+def identifier_key(text: Optional[str]) -> str:
+    """Reduce an identifier to lowercase alphanumerics ("12-345678901-2" -> "123456789012")."""
+    return _NON_ALNUM.sub("", name_key(text))[:_MAX_TERM]
+
+
+def trigrams(token: str) -> Set[str]:
+    """Padded character trigrams, pg_trgm style ("ana" -> {"  a", " an", "ana", "na "})."""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# ============================================================================
+# INDEXING
+# ============================================================================
+
+def terms_for_patient(patient: Patient) -> Set[Tuple[str, str]]:
+    """Build the full (kind, term) set for one patient."""
+    terms: Set[Tuple[str, str]] = set()
+
+    for field in _NAME_FIELDS:
+        for token in name_tokens(getattr(patient, field, None)):
+            token = token[:_MAX_TERM]
+            terms.add((PatientSearchTerm.KIND_WORD, token))
+            for end in range(_MIN_PREFIX, len(token) + 1):
+                terms.add((PatientSearchTerm.KIND_PREFIX, token[:end]))
+            for gram in trigrams(token):
+                terms.add((PatientSearchTerm.KIND_TRIGRAM, gram))
+
+    for field in _IDENTIFIER_FIELDS:
+        key = identifier_key(getattr(patient, field, None))
+        if not key:
+            continue
+        terms.add((PatientSearchTerm.KIND_IDENTIFIER, key))
+        for end in range(_MIN_PREFIX, len(key)):
+            terms.add((PatientSearchTerm.KIND_ID_PREFIX, key[:end]))
+
+    return terms
+
+
+def _build_rows(patient: Patient) -> List[PatientSearchTerm]:
+    return [
+        PatientSearchTerm(patient_id=patient.id, kind=kind, term=term)
+        for kind, term in terms_for_patient(patient)
+    ]
+
+
+@transaction.atomic
+def index_patient(patient: Patient) -> None:
+    """Replace the index rows of a single patient."""
+    PatientSearchTerm.objects.filter(patient_id=patient.id).delete()
+    PatientSearchTerm.objects.bulk_create(_build_rows(patient))
+
+
+def index_patients(patients: Iterable[Patient], batch_size: int = 1000) -> int:
+    """
+    Replace the index rows of many patients in batches.
+
+    Returns:
+        int: Number of patients indexed
+    """
+    count = 0
+    batch: List[Patient] = []
+    for patient in patients:
+        batch.append(patient)
+        if len(batch) >= batch_size:
+            count += _index_batch(batch)
+            batch = []
+    if batch:
+        count += _index_batch(batch)
+    return count
+
+
+@transaction.atomic
+def _index_batch(patients: List[Patient]) -> int:
+    PatientSearchTerm.objects.filter(patient_id__in=[p.id for p in patients]).delete()
+    rows: List[PatientSearchTerm] = []
+    for patient in patients:
+        rows.extend(_build_rows(patient))
+    PatientSearchTerm.objects.bulk_create(rows, batch_size=5000)
+    return len(patients)
+
+
+# ============================================================================
+# QUERYING
+# ============================================================================
+
+def _query_terms(query: str) -> Tuple[Dict[str, Set[str]], int]:
+    """Translate a raw query into per-kind term sets plus the trigram count."""
+    tokens = name_tokens(query)
+    words = {t[:_MAX_TERM] for t in tokens}
+    grams: Set[str] = set()
+    for token in words:
+        grams |= trigrams(token)
+
+    ids = {identifier_key(query)} | {identifier_key(t) for t in query.split()}
+    ids.discard("")
+
+    return {
+        PatientSearchTerm.KIND_WORD: words,
+        PatientSearchTerm.KIND_PREFIX: words,
+        PatientSearchTerm.KIND_TRIGRAM: grams,
+        PatientSearchTerm.KIND_IDENTIFIER: ids,
+        PatientSearchTerm.KIND_ID_PREFIX: ids,
+    }, len(grams)
+
+
+def search(query: str, limit: int = 50, active_only: bool = True) -> List[int]:
+    """
+    Rank patients against a free-text query.
+
+    Args:
+        query: Name fragment, PhilHealth ID or hospital ID
+        limit: Maximum number of patient IDs to return
+        active_only: Restrict results to status='active'
+
+    Returns:
+        List of Patient primary keys, best match first
+    """
+    terms, gram_count = _query_terms(query or "")
+
+    match = Q()
+    for kind, values in terms.items():
+        if values:
+            match |= Q(kind=kind, term__in=values)
+    if not match:
+        return []
+
+    rows = PatientSearchTerm.objects.filter(match)
+    if active_only:
+        rows = rows.filter(patient__status='active')
+
+    fuzzy_min = max(1, math.ceil(gram_count * _FUZZY_THRESHOLD))
+    ranked = (
+        rows.values('patient_id')
+        .annotate(
+            score=Sum(
+                Case(
+                    *[When(kind=kind, then=Value(weight)) for kind, weight in _WEIGHTS.items()],
+                    default=Value(0),
+                    output_field=IntegerField(),
+                )
+            ),
+            grams=Count('id', filter=Q(kind=PatientSearchTerm.KIND_TRIGRAM)),
+        )
+        # Anything beyond trigram hits is a real match; trigram-only matches
+        # must clear the similarity threshold.
+        .filter(Q(score__gt=F('grams')) | Q(grams__gte=fuzzy_min))
+        .order_by('-score', 'patient__last_name', 'patient__first_name', 'patient_id')
+    )
+    return [row['patient_id'] for row in ranked[:limit]]
+
@@ -13,6 +13,7 @@ Architecture Pattern: Fortress Pattern (Write-Only Service)
     - TRANSACTIONS: All write operations use @transaction.atomic
     - VALIDATION: Strict deduplication and referential integrity checks
     - ID GENERATION: Sequential hospital IDs with year-based partitioning
+                     (per-year atomic counter, see hospital_ids.py)
 
 Service Classes:
     - PatientRegistrationService: Patient creation with deduplication and ID generation
@@ -24,10 +25,8 @@ Date: 2026-02-04
 """
 
 from typing import Dict, Any, Optional
-from datetime import datetime
 from django.db import transaction
 from django.core.exceptions import ValidationError, ObjectDoesNotExist
-from django.db.models import Q
 
 # FORTRESS PATTERN: Import ONLY from patients.models
 from patients.models import (
@@ -35,7 +34,9 @@ from patients.models import (
     Condition,
     AllergyIntolerance,
     Immunization,
+    name_key,
 )
+from patients.services import hospital_ids
 
 
 class PatientRegistrationService:
@@ -62,7 +63,7 @@ class PatientRegistrationService:
         Register a new patient with deduplication and automatic ID generation.
         
         Workflow:
-            1. Deduplication check (first_name + last_name + birthdate)
+            1. Deduplication check (normalised first_name + last_name + birthdate)
             2. Generate hospital ID if not provided (WAH-YYYY-XXXXX format)
             3. Create patient record
             4. Return created patient
@@ -103,12 +104,10 @@ class PatientRegistrationService:
                 "first_name, last_name, and birthdate are required for patient registration"
             )
         
-        # Check for existing patient (case-insensitive name match)
-        existing_patient = Patient.objects.filter(
-            Q(first_name__iexact=first_name) &
-            Q(last_name__iexact=last_name) &
-            Q(birthdate=birthdate)
-        ).first()
+        # Check for existing patient (normalised name + birthdate, index seek)
+        existing_patient = PatientRegistrationService.find_duplicate(
+            first_name, last_name, birthdate
+        )
         
         if existing_patient:
             raise ValidationError(
@@ -132,68 +131,50 @@ class PatientRegistrationService:
         return patient
     
     @staticmethod
-    def _generate_hospital_id() -> str:
+    def find_duplicate(
+        first_name: Optional[str], last_name: Optional[str], birthdate, match_missing_birthdate: bool = False,
+    ) -> Optional[Patient]:
         """
-        Generate sequential hospital ID with year-based partitioning.
+        Find an existing patient with the same dedup key.
 
-        Format: WAH-{YYYY}-{XXXXX}
+        Names are compared by their normalised form (casefolded,
+        accent-stripped, whitespace-collapsed - see models.name_key), so
+        "JOSE PEÑA" matches "Jose Pena". The lookup is a seek on
+        patient_dedup_key_idx (last_name_key, first_name_key, birthdate).
 
-        Algorithm:
-            1. Get current year
-            2. Lock all existing rows that share the current year prefix
-               using SELECT FOR UPDATE so no other concurrent transaction
-               can read or insert until this transaction commits.
-            3. Parse the highest sequence number and increment it.
-            4. Default to 00001 if no patients exist for the year yet.
+        Args:
+            match_missing_birthdate: With no birthdate, match a same-named
+                record that has none either (birthdate IS NULL) instead of
+                returning None. Used by the webhook auto-register fallback.
 
         Returns:
-            str: Generated hospital ID (e.g., "WAH-2026-00001")
-
-        Concurrency:
-            Must be called inside @transaction.atomic (enforced by the
-            calling method).  select_for_update() acquires a row-level
-            lock on every existing patient with this year's prefix.
-            A second concurrent transaction attempting the same query
-            will block until the first one commits, guaranteeing that
-            each transaction sees the latest committed sequence number
-            before generating the next one.
+            Patient or None
+        """
+        if not first_name or not last_name or not (birthdate or match_missing_birthdate):
+            return None
+        return Patient.objects.filter(
+            last_name_key=name_key(last_name),
+            first_name_key=name_key(first_name),
+            birthdate=birthdate or None,
+        ).order_by('id').first()
 
-            Edge case – first patient of the year:
-            When no rows exist yet there is nothing to lock, so two
-            perfectly simultaneous first-registrations of the year could
-            still race and both compute sequence 1.  The UNIQUE constraint
-            on patient_id will reject one of them with an IntegrityError,
-            which propagates out of register_patient() and is caught by
-            the view as a 500.  This is an extremely rare scenario (one
-            registration per calendar-year-boundary) and is handled
-            safely by the database constraint.
+    @staticmethod
+    def _generate_hospital_id() -> str:
         """
-        current_year = datetime.now().year
-        prefix = f"WAH-{current_year}-"
+        Generate sequential hospital ID with year-based partitioning.
 
-        # Lock all rows with this year's prefix for the duration of the
-        # transaction.  Any concurrent writer will block here until we
-        # commit, guaranteeing a consistent read of the latest sequence.
-        latest_patient = (
-            Patient.objects
-            .filter(patient_id__startswith=prefix)
-            .select_for_update()          # row-level write lock
-            .order_by('-patient_id')
-            .first()
-        )
+        Format: WAH-{YYYY}-{XXXXX}
 
-        if latest_patient and latest_patient.patient_id:
-            # Extract sequence: "WAH-2026-00123" → 123
-            try:
-                last_sequence = int(latest_patient.patient_id.split('-')[-1])
-                new_sequence = last_sequence + 1
-            except (ValueError, IndexError):
-                new_sequence = 1
-        else:
-            # First patient registered this calendar year
-            new_sequence = 1
+        Delegates to hospital_ids.next_hospital_id(), which advances a
+        per-year counter atomically (a native sequence on PostgreSQL, the
+        HospitalIdSequence table elsewhere). No patient rows are locked or
+        scanned, and the first registration of a year cannot race: the
+        counter row is created once and every allocator increments it.
 
-        return f"{prefix}{new_sequence:05d}"
+        Returns:
+            str: Generated hospital ID (e.g., "WAH-2026-00001")
+        """
+        return hospital_ids.next_hospital_id()
 
 
 class ClinicalDataService:
@@ -0,0 +1,180 @@
+"""
+WAH4PC Payload Archive
+======================
+raw_payload holds the full inbound FHIR document of every gateway
+interaction, outbound_payload the Bundle we sent or pushed. Past the
+retention window both are moved out of the hot wah4pc_transaction table:
+
+    archive_expired()   (archive_wah4pc_payloads, or the outbox worker loop)
+        │
+        └─ per batch of ≤ batch_size finished transactions older than the
+           retention window, in one database transaction:
+               each payload: canonical JSON ──► sha256 ──► gzip
+                   ──► one wah4pc_payload_archive row (data / outbound_data)
+               hot row: raw_payload = outbound_payload = NULL,
+                        payload_archive = <pointer>,
+                        payload_sha256 / outbound_sha256 = <hashes>
+
+    load_payload(txn[, outbound=True])   (get_transaction, payload endpoint,
+                                          legacy list)
+        payload present  ──► returned as is
+        archived         ──► decompressed, hash checked
+
+Only COMPLETED / FAILED rows are archived; pending and in-flight rows
+are still read by the webhook and query worker. Archiving does not touch
+updated_at.
+
+Settings (environment):
+    WAH4PC_PAYLOAD_RETENTION_DAYS   days a payload stays in the hot table (default 90)
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import timedelta
+from typing import Any, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from patients.models import WAH4PCPayloadArchive, WAH4PCTransaction
+
+
+logger = logging.getLogger(__name__)
+
+RETENTION_DAYS = int(os.getenv('WAH4PC_PAYLOAD_RETENTION_DAYS', '90'))
+
+# Transactions archived per database transaction
+BATCH_SIZE = 200
+
+# The outbox worker runs one batch at most this often
+SCHEDULE_INTERVAL = 300.0
+
+ARCHIVABLE_STATUSES = ('COMPLETED', 'FAILED')
+
+CODEC = 'gzip'
+
+
+class PayloadIntegrityError(Exception):
+    """Archived payload does not match the hash kept on the transaction."""
+
+
+# ============================================================================
+# ENCODING
+# ============================================================================
+
+def encode(payload: Any) -> Tuple[bytes, str, int]:
+    """Compress a JSON payload. Returns (compressed bytes, sha256 hex, raw size)."""
+    raw = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return gzip.compress(raw, mtime=0), hashlib.sha256(raw).hexdigest(), len(raw)
+
+
+def decode(data: bytes, sha256: Optional[str] = None) -> Any:
+    """Decompress a payload made by encode(); verifies sha256 when given."""
+    raw = gzip.decompress(bytes(data))
+    if sha256 and hashlib.sha256(raw).hexdigest() != sha256:
+        raise PayloadIntegrityError('Archived payload hash mismatch')
+    return json.loads(raw)
+
+
+# ============================================================================
+# ARCHIVE
+# ============================================================================
+
+def archivable(days: int = RETENTION_DAYS):
+    """Finished transactions whose payload is due for the archive."""
+    cutoff = timezone.now() - timedelta(days=days)
+    return WAH4PCTransaction.objects.filter(
+        Q(raw_payload__isnull=False) | Q(outbound_payload__isnull=False),
+        status__in=ARCHIVABLE_STATUSES,
+        created_at__lt=cutoff,
+        payload_archive__isnull=True,
+    )
+
+
+def archive_batch(days: int = RETENTION_DAYS, batch_size: int = BATCH_SIZE) -> int:
+    """Archive up to batch_size payloads in one database transaction; returns the count."""
+    with transaction.atomic():
+        txns = list(
+            archivable(days)
+            .select_for_update(skip_locked=True)
+            .only('id', 'raw_payload', 'outbound_payload')
+            .order_by('id')[:batch_size]
+        )
+        if not txns:
+            return 0
+
+        archives = []
+        for txn in txns:
+            archive = WAH4PCPayloadArchive(codec=CODEC)
+            if txn.raw_payload is not None:
+                archive.data, txn.payload_sha256, archive.size = encode(txn.raw_payload)
+            if txn.outbound_payload is not None:
+                archive.outbound_data, txn.outbound_sha256, archive.outbound_size = encode(txn.outbound_payload)
+            archives.append(archive)
+        WAH4PCPayloadArchive.objects.bulk_create(archives)
+
+        for txn, archive in zip(txns, archives):
+            txn.payload_archive = archive
+            txn.raw_payload = txn.outbound_payload = None
+        WAH4PCTransaction.objects.bulk_update(
+            txns,
+            ['raw_payload', 'outbound_payload', 'payload_archive', 'payload_sha256', 'outbound_sha256'],
+        )
+    return len(txns)
+
+
+def archive_expired(
+    days: int = RETENTION_DAYS,
+    batch_size: int = BATCH_SIZE,
+    max_batches: Optional[int] = None,
+) -> int:
+    """Archive in batches until nothing is due or max_batches ran; returns the count."""
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        archived = archive_batch(days, batch_size)
+        total += archived
+        batches += 1
+        if archived < batch_size:
+            break
+    return total
+
+
+_next_run = 0.0
+
+
+def archive_if_due() -> int:
+    """One bounded batch every SCHEDULE_INTERVAL seconds (for the outbox worker loop)."""
+    global _next_run
+    if time.monotonic() < _next_run:
+        return 0
+    _next_run = time.monotonic() + SCHEDULE_INTERVAL
+    try:
+        return archive_batch()
+    except Exception:
+        logger.exception('[WAH4PC] Payload archiving failed')
+        return 0
+
+
+# ============================================================================
+# READ
+# ============================================================================
+
+def load_payload(txn: WAH4PCTransaction, outbound: bool = False) -> Any:
+    """
+    raw_payload (or outbound_payload with outbound=True) of a transaction,
+    read back from the archive if it was moved.
+    """
+    payload = txn.outbound_payload if outbound else txn.raw_payload
+    if payload is not None or txn.payload_archive_id is None:
+        return payload
+    archive = txn.payload_archive
+    if outbound:
+        data, digest = archive.outbound_data, txn.outbound_sha256
+    else:
+        data, digest = archive.data, txn.payload_sha256
+    return decode(data, digest) if data is not None else None
@@ -0,0 +1,199 @@
+"""
+WAH4PC Provider Directory
+=========================
+The provider list behind NetworkSearchModal changes a few times a day, but
+it used to be fetched from the gateway on every modal open. It is now served
+from a per-process snapshot with stale-while-revalidate semantics:
+
+    providers() / provider(id)
+        │
+        ├─ no snapshot in memory   ──► load the wah4pc_provider table
+        │                              (gateway only if the table is empty)
+        ├─ age <  PROVIDERS_TTL    ──► serve
+        └─ age >= PROVIDERS_TTL    ──► serve the stale copy and start one
+                                       background refresh
+
+    refresh()  ->  GET /api/v1/providers
+                     ok     -> replace snapshot + table (fetched_at = now)
+                     failed -> keep serving what we have, retry after
+                               REFRESH_RETRY seconds
+
+The table is the persisted copy: every process refreshes it, and a cold
+process starts from it rather than blocking on the gateway. The outbox
+worker (run_wah4pc_outbox) also refreshes a stale directory on its loop, so
+web processes mostly find fresh data already there.
+
+Settings (environment):
+    WAH4PC_PROVIDERS_TTL   seconds before a refresh is due   (default 300)
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from patients.models import WAH4PCProvider
+from patients import wah4pc
+
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS_TTL = float(os.getenv('WAH4PC_PROVIDERS_TTL', '300'))
+
+# After a failed refresh, wait this long before asking the gateway again
+REFRESH_RETRY = 30.0
+
+
+class ProviderDirectory:
+    """Per-process provider snapshot; see the module docstring."""
+
+    def __init__(self, ttl: float = PROVIDERS_TTL, fetch=None):
+        self.ttl = ttl
+        self._fetch = fetch or wah4pc.fetch_providers
+        self._lock = threading.Lock()
+        self._providers: Optional[List[Dict[str, Any]]] = None
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._fetched_at = None          # datetime of the gateway answer
+        self._next_refresh = 0.0         # monotonic time the next refresh is due
+        self._refreshing = False
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def providers(self, include_inactive: bool = False) -> List[Dict[str, Any]]:
+        """Directory entries, active only unless include_inactive."""
+        providers = self._snapshot()
+        if include_inactive:
+            return list(providers)
+        return [p for p in providers if p.get('isActive', True)]
+
+    def provider(self, provider_id: str) -> Optional[Dict[str, Any]]:
+        """One directory entry by provider ID, or None."""
+        self._snapshot()
+        return self._by_id.get(provider_id)
+
+    def age(self) -> Optional[float]:
+        """Seconds since the snapshot was fetched from the gateway."""
+        if self._fetched_at is None:
+            return None
+        return (timezone.now() - self._fetched_at).total_seconds()
+
+    def _snapshot(self) -> List[Dict[str, Any]]:
+        if self._providers is None:
+            self.load()
+            if self._providers is None and time.monotonic() >= self._next_refresh:
+                # Nothing persisted yet (first run): this call has to wait
+                self.refresh()
+        elif time.monotonic() >= self._next_refresh:
+            self._spawn_refresh()
+        return self._providers or []
+
+    def load(self) -> None:
+        """(Re)load the snapshot from the wah4pc_provider table."""
+        with self._lock:
+            self._load()
+
+    def _load(self) -> None:
+        rows = list(WAH4PCProvider.objects.order_by('name', 'provider_id'))
+        if not rows:
+            return
+        fetched_at = min(row.fetched_at for row in rows)
+        self._install([row.data for row in rows], fetched_at)
+
+    def _install(self, providers: List[Dict[str, Any]], fetched_at) -> None:
+        self._providers = providers
+        self._by_id = {str(p['id']): p for p in providers}
+        self._fetched_at = fetched_at
+        remaining = self.ttl - (timezone.now() - fetched_at).total_seconds()
+        self._next_refresh = time.monotonic() + max(0.0, remaining)
+
+    # ------------------------------------------------------------------
+    # Refresh
+    # ------------------------------------------------------------------
+
+    def is_stale(self) -> bool:
+        age = self.age()
+        return age is None or age >= self.ttl
+
+    def refresh_if_stale(self) -> bool:
+        """Refresh unless this or another process already has; True if refreshed."""
+        if not self.is_stale():
+            return False
+        self.load()
+        if not self.is_stale():
+            return False
+        return self.refresh()
+
+    def refresh(self) -> bool:
+        """Fetch the directory from the gateway now; False if the gateway failed."""
+        providers = self._fetch()
+        if providers is None:
+            with self._lock:
+                self._next_refresh = time.monotonic() + REFRESH_RETRY
+            return False
+
+        fetched_at = timezone.now()
+        self._persist(providers, fetched_at)
+        with self._lock:
+            self._install(providers, fetched_at)
+        return True
+
+    def _spawn_refresh(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+            # Don't let every request in the meantime try again
+            self._next_refresh = time.monotonic() + REFRESH_RETRY
+        threading.Thread(target=self._refresh_in_background, name='wah4pc-providers', daemon=True).start()
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self.refresh_if_stale()
+        except Exception:
+            logger.exception('[WAH4PC] Provider directory refresh failed')
+        finally:
+            close_old_connections()
+            with self._lock:
+                self._refreshing = False
+
+    @staticmethod
+    def _persist(providers: List[Dict[str, Any]], fetched_at) -> None:
+        ids = [str(p['id']) for p in providers]
+        with transaction.atomic():
+            WAH4PCProvider.objects.exclude(provider_id__in=ids).delete()
+            existing = WAH4PCProvider.objects.in_bulk(ids, field_name='provider_id')
+            rows, new = [], []
+            for p in providers:
+                row = existing.get(str(p['id'])) or WAH4PCProvider(provider_id=str(p['id']))
+                row.name = p.get('name') or ''
+                row.is_active = bool(p.get('isActive', True))
+                row.data = p
+                row.fetched_at = fetched_at
+                (rows if row.pk else new).append(row)
+            WAH4PCProvider.objects.bulk_update(rows, ['name', 'is_active', 'data', 'fetched_at'])
+            WAH4PCProvider.objects.bulk_create(new)
+
+
+_directory = None
+_directory_lock = threading.Lock()
+
+
+def get_provider_directory() -> ProviderDirectory:
+    """Process-wide ProviderDirectory."""
+    global _directory
+    if _directory is None:
+        with _directory_lock:
+            if _directory is None:
+                _directory = ProviderDirectory()
+    return _directory
+
+
+def refresh_if_stale() -> bool:
+    """Refresh the process-wide directory when due (for the outbox worker loop)."""
+    return get_provider_directory().refresh_if_stale()
@@ -0,0 +1,422 @@
+"""
+WAH4PC Process-Query Worker Pool
+================================
+Answers incoming gateway queries (/fhir/process-query) on a fixed pool of
+threads instead of one new thread per request.
+
+    webhook_process_query  ->  WAH4PCTransaction (receive_query, PROCESSING)
+                           ->  pool.submit()  -- queue full? 503 + Retry-After
+    worker thread          ->  claim row  ->  match patient  ->  build FHIR
+                           ->  POST to gatewayReturnUrl  ->  COMPLETED / FAILED
+
+The transaction row is the durable job: everything a worker needs is in its
+raw_payload. A row still PROCESSING after QUERY_STALL_TIMEOUT was lost (the
+process restarted, or the job sat in a queue that died with it), so
+recover() re-enqueues it. Recovery runs when the pool starts, every
+RECOVERY_INTERVAL seconds after that, and from the outbox worker process.
+
+A worker only runs a job if its claim UPDATE still sees the updated_at
+stamp the job was queued with. When two processes recover the same row,
+only one of them answers the gateway. The claim is a lease: it is renewed
+every LEASE_RENEW_INTERVAL while the answer streams out (each chunk write
+is bounded by the connect timeout), and the result is only written while
+the stamp is still ours, so a run that lost its row never overwrites the
+run that took it over.
+
+Answers are streamed: Bundles are encoded from the queryset in chunks and
+POSTed with chunked transfer encoding (see wah4pc.iter_bundle_json).
+
+Settings (environment):
+    WAH4PC_QUERY_WORKERS  threads per process        (default 4)
+    WAH4PC_QUERY_QUEUE    jobs waiting per process   (default 100)
+    WAH4PC_GZIP_RESULTS   gzip answers               (default off)
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from patients.models import Immunization, Patient, WAH4PCTransaction
+from patients import wah4pc
+
+
+logger = logging.getLogger(__name__)
+
+PROCESSING = 'PROCESSING'
+TYPE_RECEIVE_QUERY = 'receive_query'
+
+QUERY_WORKERS = int(os.getenv('WAH4PC_QUERY_WORKERS', '4'))
+QUERY_QUEUE_SIZE = int(os.getenv('WAH4PC_QUERY_QUEUE', '100'))
+
+# A PROCESSING row untouched for this long has no live worker
+QUERY_STALL_TIMEOUT = timedelta(minutes=2)
+RECOVERY_INTERVAL = 60.0
+
+# Seconds between lease renewals of a running job (well inside the stall timeout)
+LEASE_RENEW_INTERVAL = 30.0
+
+# Seconds a gateway is told to wait when the queue is full
+BUSY_RETRY_AFTER = 5
+
+# Gzip query answers (only if the gateway accepts Content-Encoding: gzip)
+GZIP_RESULTS = os.getenv('WAH4PC_GZIP_RESULTS', '').lower() in ('1', 'true', 'yes')
+
+
+# ============================================================================
+# JOBS
+# ============================================================================
+
+def create_query_job(payload: Dict[str, Any]) -> Optional[WAH4PCTransaction]:
+    """
+    Record an incoming query as a PROCESSING receive_query transaction.
+
+    Returns:
+        The new transaction, or None if this transactionId was already
+        received (gateway redelivery).
+    """
+    txn, created = WAH4PCTransaction.objects.get_or_create(
+        transaction_id=payload['transactionId'],
+        defaults={
+            'type': TYPE_RECEIVE_QUERY,
+            'status': PROCESSING,
+            'requester_id': payload.get('requesterId'),
+            'raw_payload': payload,
+            'idempotency_key': str(uuid.uuid4()),
+        },
+    )
+    return txn if created else None
+
+
+def requested_resource(payload: Dict[str, Any]) -> str:
+    """Resource type asked for: explicit resourceType wins, then the return URL."""
+    explicit = payload.get('resourceType')
+    if explicit:
+        return explicit
+    return_url = payload.get('gatewayReturnUrl') or ''
+    for resource in ('Encounter', 'Procedure', 'Immunization'):
+        if resource in return_url:
+            return resource
+    return 'Patient'
+
+
+def match_patient(identifiers: List[Dict[str, Any]]) -> Optional[Patient]:
+    """First patient matching the supplied identifier list, if any."""
+    for ident in identifiers:
+        system = (ident.get('system') or '').lower()
+        value = ident.get('value')
+        if not value:
+            continue
+
+        patient = None
+        if 'philhealth' in system:
+            patient = Patient.objects.filter(philhealth_id=value).first()
+        elif 'mrn' in system or 'medical-record' in system:
+            patient = Patient.objects.filter(patient_id=value).first()
+        elif 'phone' in system or 'mobile' in system:
+            patient = Patient.objects.filter(mobile_number=value).first()
+        if patient:
+            return patient
+    return None
+
+
+def _response_json(patient: Patient, resource: str) -> Iterable[bytes]:
+    """The answer's `data` member as JSON bytes; Bundles are streamed."""
+    if resource == 'Encounter':
+        from admission.models import Encounter
+        rows = Encounter.objects.filter(subject_id=patient.id).order_by('-period_start', '-created_at')
+    elif resource == 'Procedure':
+        from admission.models import Procedure
+        rows = Procedure.objects.filter(subject_id=patient.id).order_by('-performed_datetime', '-created_at')
+    elif resource == 'Immunization':
+        rows = Immunization.objects.filter(patient=patient).order_by('-occurrence_datetime', '-created_at')
+    else:
+        return [json.dumps(wah4pc.patient_to_fhir(patient)).encode('utf-8')]
+    return wah4pc.iter_bundle_json(rows, resource)
+
+
+class LeaseLost(Exception):
+    """The job's row was re-stamped by another worker (see QueryWorkerPool.recover)."""
+
+
+class _Lease:
+    """A worker's claim on a PROCESSING row: the updated_at stamp it last wrote."""
+
+    def __init__(self, pk: int, stamp):
+        self.pk = pk
+        self.stamp = stamp
+        self._renewed = time.monotonic()
+
+    def _rows(self):
+        return WAH4PCTransaction.objects.filter(pk=self.pk, status=PROCESSING, updated_at=self.stamp)
+
+    def claim(self) -> bool:
+        """Take the row over from the stamp it was queued with."""
+        stamp = timezone.now()
+        if not self._rows().update(updated_at=stamp):
+            return False
+        self.stamp, self._renewed = stamp, time.monotonic()
+        return True
+
+    def renew(self) -> None:
+        """Re-stamp the row if LEASE_RENEW_INTERVAL has passed; LeaseLost if it is no longer ours."""
+        if time.monotonic() - self._renewed < LEASE_RENEW_INTERVAL:
+            return
+        if not self.claim():
+            raise LeaseLost(self.pk)
+
+    def renewing(self, chunks: Iterable[bytes]) -> Iterable[bytes]:
+        """Pass chunks through, renewing the lease between them."""
+        for chunk in chunks:
+            self.renew()
+            yield chunk
+
+    def finish(self, **fields) -> bool:
+        """Write the job's result; False (nothing written) if the row is no longer ours."""
+        return bool(self._rows().update(updated_at=timezone.now(), **fields))
+
+
+def run_query(pk: int, stamp) -> bool:
+    """
+    Answer one queued query.
+
+    Args:
+        pk: WAH4PCTransaction primary key
+        stamp: The row's updated_at when it was queued
+
+    Returns:
+        bool: False if the row was claimed elsewhere (nothing was sent)
+    """
+    lease = _Lease(pk, stamp)
+    if not lease.claim():
+        return False
+
+    txn = WAH4PCTransaction.objects.get(pk=pk)
+    payload = txn.raw_payload or {}
+    patient = None
+    result = {'status': 'COMPLETED'}
+    try:
+        patient = match_patient(payload.get('identifiers') or [])
+        if patient:
+            response_status = 'SUCCESS'
+            data = _response_json(patient, requested_resource(payload))
+        else:
+            response_status = 'REJECTED'
+            data = [json.dumps({'error': 'Patient not found'}).encode('utf-8')]
+
+        # The body is encoded while it is sent (chunked), so a long history
+        # is never held in memory as one document
+        response = wah4pc.get_gateway_client().post_stream(
+            payload['gatewayReturnUrl'],
+            'query_return',
+            lease.renewing(wah4pc.iter_json_object(
+                {'transactionId': txn.transaction_id, 'status': response_status}, 'data', data,
+            )),
+            idempotency_key=txn.idempotency_key,
+            gzip=GZIP_RESULTS,
+        )
+        if response.status_code >= 400:
+            result = {'status': 'FAILED', 'error_message': wah4pc.gateway_error_message(response)}
+    except LeaseLost:
+        logger.warning('[WAH4PC] process_query txn %s was taken over mid-answer; dropping this run',
+                       txn.transaction_id)
+        return True
+    except Exception as e:
+        logger.exception('[WAH4PC] process_query failed for txn %s', txn.transaction_id)
+        result = {'status': 'FAILED', 'error_message': str(e)}
+    if not lease.finish(related_patient=patient, **result):
+        logger.warning('[WAH4PC] process_query txn %s was taken over; not recording this run',
+                       txn.transaction_id)
+    return True
+
+
+# ============================================================================
+# POOL
+# ============================================================================
+
+class QueryWorkerPool:
+    """
+    Fixed-size thread pool over a bounded in-memory queue.
+
+    submit() never blocks: when the queue is full it returns False and the
+    caller pushes back on the gateway. metrics() reports queue depth, busy
+    workers, throughput and queue-wait / run latency.
+    """
+
+    def __init__(self, workers: int = QUERY_WORKERS, max_queue: int = QUERY_QUEUE_SIZE,
+                 handler=run_query, recovery_interval: Optional[float] = RECOVERY_INTERVAL):
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.handler = handler
+        self.recovery_interval = recovery_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=self.max_queue)
+        self._lock = threading.Lock()
+        self._started = False
+        self._busy = 0
+        self._stats = {
+            'submitted': 0,
+            'rejected': 0,
+            'processed': 0,
+            'skipped': 0,
+            'errors': 0,
+            'wait_seconds': 0.0,
+            'wait_max': 0.0,
+            'run_seconds': 0.0,
+            'run_max': 0.0,
+        }
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for n in range(self.workers):
+            threading.Thread(target=self._work, name=f'wah4pc-query-{n}', daemon=True).start()
+        if self.recovery_interval is not None:
+            threading.Thread(target=self._recover_forever, name='wah4pc-query-recovery', daemon=True).start()
+
+    def submit(self, txn: WAH4PCTransaction) -> bool:
+        """Queue a PROCESSING transaction; False if the queue is full."""
+        self.start()
+        return self._put(txn.pk, txn.updated_at)
+
+    def _put(self, pk: int, stamp) -> bool:
+        try:
+            self._queue.put_nowait((pk, stamp, time.monotonic()))
+        except queue.Full:
+            with self._lock:
+                self._stats['rejected'] += 1
+            return False
+        with self._lock:
+            self._stats['submitted'] += 1
+        return True
+
+    # -- recovery --------------------------------------------------------------
+
+    def recover(self) -> int:
+        """
+        Re-enqueue stalled PROCESSING queries (lost on restart or crash).
+
+        Stops early when the queue fills; the rest wait for the next sweep.
+
+        Returns:
+            int: Number of queries re-enqueued
+        """
+        cutoff = timezone.now() - QUERY_STALL_TIMEOUT
+        stalled = (
+            WAH4PCTransaction.objects
+            .filter(type=TYPE_RECEIVE_QUERY, status=PROCESSING, updated_at__lt=cutoff)
+            .order_by('updated_at')
+            .values_list('pk', flat=True)[:self.max_queue]
+        )
+        requeued = 0
+        for pk in list(stalled):
+            if self._queue.full():
+                break
+            stamp = timezone.now()
+            taken = WAH4PCTransaction.objects.filter(
+                pk=pk, status=PROCESSING, updated_at__lt=cutoff,
+            ).update(updated_at=stamp)
+            if taken and self._put(pk, stamp):
+                requeued += 1
+        if requeued:
+            logger.warning('[WAH4PC] Re-enqueued %d stalled process_query job(s)', requeued)
+        return requeued
+
+    def _recover_forever(self) -> None:
+        while True:
+            try:
+                self.recover()
+            except Exception:
+                logger.exception('[WAH4PC] process_query recovery sweep failed')
+            finally:
+                connection.close()
+            time.sleep(self.recovery_interval)
+
+    # -- workers ---------------------------------------------------------------
+
+    def _work(self) -> None:
+        while True:
+            pk, stamp, queued_at = self._queue.get()
+            started = time.monotonic()
+            with self._lock:
+                self._busy += 1
+            ran = error = False
+            try:
+                close_old_connections()
+                ran = self.handler(pk, stamp)
+            except Exception:
+                error = True
+                logger.exception('[WAH4PC] process_query worker error (pk=%s)', pk)
+            finally:
+                # Return the thread's database connection between jobs
+                connection.close()
+                self._record(started - queued_at, time.monotonic() - started, ran, error)
+                self._queue.task_done()
+
+    def _record(self, waited: float, ran_for: float, ran: bool, error: bool) -> None:
+        with self._lock:
+            stats = self._stats
+            self._busy -= 1
+            if error:
+                stats['errors'] += 1
+                return
+            if not ran:
+                # Claimed by another process first
+                stats['skipped'] += 1
+                return
+            stats['processed'] += 1
+            stats['wait_seconds'] += waited
+            stats['wait_max'] = max(stats['wait_max'], waited)
+            stats['run_seconds'] += ran_for
+            stats['run_max'] = max(stats['run_max'], ran_for)
+
+    def join(self) -> None:
+        """Block until every queued job has finished (tests, shutdown)."""
+        self._queue.join()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of queue depth, worker use, throughput and latency."""
+        with self._lock:
+            stats = dict(self._stats)
+            busy = self._busy
+        done = stats['processed'] or 1
+        return {
+            'workers': self.workers,
+            'busy_workers': busy,
+            'queue_depth': self._queue.qsize(),
+            'queue_capacity': self.max_queue,
+            'submitted': stats['submitted'],
+            'rejected': stats['rejected'],
+            'processed': stats['processed'],
+            'skipped': stats['skipped'],
+            'errors': stats['errors'],
+            'avg_wait_ms': round(stats['wait_seconds'] * 1000 / done, 1),
+            'max_wait_ms': round(stats['wait_max'] * 1000, 1),
+            'avg_run_ms': round(stats['run_seconds'] * 1000 / done, 1),
+            'max_run_ms': round(stats['run_max'] * 1000, 1),
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_query_pool() -> QueryWorkerPool:
+    """Process-wide QueryWorkerPool (threads start on first submit)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = QueryWorkerPool()
+    return _pool
@@ -0,0 +1,157 @@
+"""
+WAH4PC Transaction Status Notifications
+=======================================
+Lets a request wait for a WAH4PCTransaction to change status instead of
+the frontend polling get_transaction on a timer.
+
+    watch_transaction view  ->  wait_for_status_change(txn, known_status)
+                                  registers an Event under the txn's IDs
+                                  re-reads the status column
+                                  sleeps on the Event
+    webhook_receive / outbox worker
+        txn.save()  ->  post_save (patients.signals)
+                    ->  on commit: notify(transaction_id, gateway_transaction_id)
+                    ->  waiting Events are set, waiters re-read and return
+
+notify() only reaches waiters in the same process. A webhook answered by a
+different worker process is picked up by the periodic re-read every
+RECHECK_INTERVAL seconds: a single-column primary-key query, still far
+cheaper than a full polling request with authentication.
+
+Every waiter holds a request thread, so at most MAX_WATCHERS requests per
+process wait at a time (watcher_slot()); the rest are answered at once.
+Streams that wait for minutes pass release_connection=True so the
+database connection is not held between re-reads.
+
+Settings (environment):
+    WAH4PC_MAX_WATCHERS   waiting requests per process   (default 16)
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+from django.db import connection
+
+from patients.models import WAH4PCTransaction
+
+
+# Waiters re-read the status this often even without a notification
+RECHECK_INTERVAL = 2.0
+
+# Statuses after which a transaction no longer changes
+TERMINAL_STATUSES = {'COMPLETED', 'FAILED'}
+
+# Requests allowed to wait at once in this process (each holds a thread)
+MAX_WATCHERS = int(os.getenv('WAH4PC_MAX_WATCHERS', '16'))
+
+_lock = threading.Lock()
+_waiters: Dict[str, Set[threading.Event]] = {}
+_slots = {'held': 0, 'turned_away': 0}
+
+
+# ============================================================================
+# NOTIFY
+# ============================================================================
+
+def notify(*transaction_ids: Optional[str]) -> None:
+    """Wake every waiter registered under any of the given IDs."""
+    with _lock:
+        events = [e for key in transaction_ids if key for e in _waiters.get(key, ())]
+    for event in events:
+        event.set()
+
+
+def waiting() -> int:
+    """Number of requests currently waiting in this process."""
+    with _lock:
+        return len({e for events in _waiters.values() for e in events})
+
+
+def turned_away() -> int:
+    """Number of watch requests answered at once because MAX_WATCHERS were waiting."""
+    with _lock:
+        return _slots['turned_away']
+
+
+@contextmanager
+def watcher_slot() -> Iterator[bool]:
+    """
+    Hold one of this process's MAX_WATCHERS waiting slots.
+
+    Yields:
+        bool: False if every slot is taken; the caller should not wait
+    """
+    with _lock:
+        admitted = _slots['held'] < MAX_WATCHERS
+        _slots['held' if admitted else 'turned_away'] += 1
+    try:
+        yield admitted
+    finally:
+        if admitted:
+            with _lock:
+                _slots['held'] -= 1
+
+
+def _register(keys: Set[str], event: threading.Event) -> None:
+    with _lock:
+        for key in keys:
+            _waiters.setdefault(key, set()).add(event)
+
+
+def _unregister(keys: Set[str], event: threading.Event) -> None:
+    with _lock:
+        for key in keys:
+            events = _waiters.get(key)
+            if events is not None:
+                events.discard(event)
+                if not events:
+                    del _waiters[key]
+
+
+# ============================================================================
+# WAIT
+# ============================================================================
+
+def wait_for_status_change(
+    txn: WAH4PCTransaction,
+    known_status: str,
+    timeout: float,
+    release_connection: bool = False,
+) -> Tuple[Optional[WAH4PCTransaction], bool]:
+    """
+    Block until txn's status differs from known_status, or timeout.
+
+    Args:
+        release_connection: Close the thread's database connection before
+            each sleep (outside a transaction only); the next re-read
+            opens a new one.
+
+    Returns:
+        (transaction, changed). The transaction is re-read from the database
+        when it changed; it is None if the row was deleted meanwhile.
+    """
+    event = threading.Event()
+    keys = {k for k in (txn.transaction_id, txn.gateway_transaction_id) if k}
+    # Registered before the first read, so a notify in between is not lost
+    _register(keys, event)
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            status = WAH4PCTransaction.objects.filter(pk=txn.pk).values_list('status', flat=True).first()
+            if status is None:
+                return None, True
+            if status != known_status:
+                txn.refresh_from_db()
+                return txn, True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return txn, False
+            if release_connection and not connection.in_atomic_block:
+                connection.close()
+            event.wait(min(remaining, RECHECK_INTERVAL))
+            event.clear()
+    finally:
+        _unregister(keys, event)
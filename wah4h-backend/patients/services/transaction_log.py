@@ -0,0 +1,119 @@
+"""
+WAH4PC Transaction Log Listing
+==============================
+Slim, keyset-paginated reads of WAH4PCTransaction for the interop log UI.
+
+    list_transactions?view=slim
+        ├─ rows:  raw_payload / outbound_payload deferred (hasPayload flag
+        │         instead: either one present, or archived); the bodies are
+        │         fetched per row from .../transactions/<id>/payload
+        ├─ order: (-created_at, -id), seek by cursor - the filtered
+        │         variants ride the (status, created_at) and
+        │         (type, created_at) indexes
+        └─ count: cached per filter set for COUNT_CACHE_SECONDS, so paging
+                  does not re-count the whole table on every request
+
+The count is approximate by design: it can lag new rows by up to
+COUNT_CACHE_SECONDS.
+"""
+
+import base64
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db.models import BooleanField, ExpressionWrapper, Q
+
+from patients.models import WAH4PCTransaction
+
+
+COUNT_CACHE_SECONDS = 60
+
+# Filters accepted by list_transactions, as query param -> model field
+FILTER_FIELDS = {
+    'patient_id': 'patient_id',
+    'status': 'status',
+    'type': 'type',
+}
+
+
+def filtered_transactions(filters: Dict[str, Any]):
+    """WAH4PCTransaction queryset for the non-empty list filters."""
+    txns = WAH4PCTransaction.objects.all()
+    lookups = {FILTER_FIELDS[k]: v for k, v in filters.items() if k in FILTER_FIELDS and v}
+    return txns.filter(**lookups) if lookups else txns
+
+
+# ============================================================================
+# SLIM PAGES (KEYSET PAGINATION)
+# ============================================================================
+
+def list_slim(
+    filters: Dict[str, Any],
+    cursor: Optional[str] = None,
+    limit: int = 50,
+) -> Tuple[List[WAH4PCTransaction], Optional[str]]:
+    """
+    One page of transactions, newest first, without raw_payload.
+
+    Each row carries has_payload (inbound or outbound body). Returns (rows, next cursor or None on the
+    last page); raises ValueError for a malformed cursor.
+    """
+    txns = (
+        filtered_transactions(filters)
+        .defer('raw_payload', 'outbound_payload', 'entries')
+        .annotate(has_payload=ExpressionWrapper(
+            # The sha256 columns are set only when that payload was archived
+            Q(raw_payload__isnull=False) | Q(payload_sha256__isnull=False)
+            | Q(outbound_payload__isnull=False) | Q(outbound_sha256__isnull=False),
+            output_field=BooleanField(),
+        ))
+    )
+    if cursor:
+        created_at, last_id = _decode_cursor(cursor)
+        txns = txns.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=last_id))
+
+    # Fetch one extra row to learn whether another page exists
+    rows = list(txns.order_by('-created_at', '-id')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = _encode_cursor(rows[-1].created_at, rows[-1].id) if has_more and rows else None
+    return rows, next_cursor
+
+
+def _encode_cursor(created_at: datetime, pk: int) -> str:
+    """Encode a (created_at, id) sort key as an opaque URL-safe cursor."""
+    raw = json.dumps([created_at.isoformat(), pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by _encode_cursor; raises ValueError if malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, pk = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        created_at = datetime.fromisoformat(created_at)
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(pk, int):
+        raise ValueError('Invalid cursor')
+    return created_at, pk
+
+
+# ============================================================================
+# APPROXIMATE COUNT
+# ============================================================================
+
+def approximate_count(filters: Dict[str, Any]) -> int:
+    """Row count for the filters, cached for COUNT_CACHE_SECONDS."""
+    active = sorted((k, str(v)) for k, v in filters.items() if k in FILTER_FIELDS and v)
+    digest = hashlib.sha1(json.dumps(active).encode('utf-8')).hexdigest()
+    key = f'wah4pc:txn_count:{digest}'
+    count = cache.get(key)
+    if count is None:
+        count = filtered_transactions(filters).count()
+        cache.set(key, count, COUNT_CACHE_SECONDS)
+    return count
@@ -0,0 +1,65 @@
+# patients/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Immunization, Patient, WAH4PCTransaction
+from .services import fhir_cache, patient_acl, patient_search, transaction_events
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Patient)
+def refresh_patient_search_index(sender, instance, raw=False, **kwargs):
+    """
+    Keep the PatientSearchTerm index in sync with every Patient save, and
+    drop the patient from the request's lookup scope so later reads see it.
+    Search terms of a deleted patient cascade through the FK; the lookup
+    scope is cleared by forget_deleted_patient.
+    """
+    patient_acl.forget_patient(instance.pk)
+    if raw:
+        # loaddata — the rebuild command is the supported path for fixtures
+        return
+    try:
+        patient_search.index_patient(instance)
+    except Exception:
+        logger.exception("Failed to index patient %s for search", instance.pk)
+
+
+@receiver(post_delete, sender=Patient)
+def forget_deleted_patient(sender, instance, **kwargs):
+    """Drop a deleted patient from the request's lookup scope so later reads miss it."""
+    patient_acl.forget_patient(instance.pk)
+
+
+# Rendered FHIR resources are cached per record and versioned on updated_at,
+# so a stale entry is never served; dropping it on write just frees the slot
+# early. Encounters and procedures live in the admission app and are
+# referenced lazily so this module doesn't import it.
+
+@receiver([post_save, post_delete], sender=Patient)
+def drop_cached_patient_fhir(sender, instance, **kwargs):
+    fhir_cache.invalidate("Patient", instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Immunization)
+def drop_cached_immunization_fhir(sender, instance, **kwargs):
+    fhir_cache.invalidate("Immunization", instance.pk)
+
+
+@receiver([post_save, post_delete], sender="admission.Encounter")
+def drop_cached_encounter_fhir(sender, instance, **kwargs):
+    fhir_cache.invalidate("Encounter", instance.pk)
+
+
+@receiver([post_save, post_delete], sender="admission.Procedure")
+def drop_cached_procedure_fhir(sender, instance, **kwargs):
+    fhir_cache.invalidate("Procedure", instance.pk)
+
+
+@receiver(post_save, sender=WAH4PCTransaction)
+def wake_transaction_watchers(sender, instance, **kwargs):
+    """Wake long-poll/SSE watchers once the new status is committed and readable."""
+    ids = (instance.transaction_id, instance.gateway_transaction_id)
+    transaction.on_commit(lambda: transaction_events.notify(*ids))
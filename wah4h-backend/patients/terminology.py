@@ -0,0 +1,220 @@
+"""PH-Core terminology lookups used by the WAH4PC FHIR converters.
+
+PSGC (Philippine Standard Geographic Code) data is packaged in
+patients/data/psgc.json and compiled once per process into forward and
+reverse indexes:
+
+    export  (patient_to_fhir)                 import  (fhir_to_dict)
+    ─────────────────────────                 ──────────────────────
+    region  "NCR"        → "130000000"        "130000000"  → "NCR"
+    city    "1381100000" → "137605000"        "137605000"  → "1381100000"
+            "1381100000" → "Pasay City"       "Pasay City" → "1381100000"
+    barangay (city, name) → 9-digit code      9-digit code → (city, name)
+
+Every lookup is a dict access. Barangay codes for the packaged barangay
+lists are computed when the index is built; names outside those lists are
+derived on first use and memoized.
+
+The CodeableConcept tables (religion, education, occupation) map the
+display string the DB stores to the PH-Core code, and back.
+
+To take a newer PSGC release, regenerate psgc.json in the same row format;
+nothing else changes.
+"""
+
+import json
+import re
+import zlib
+from functools import cache, lru_cache
+from pathlib import Path
+
+PSGC_FILE = Path(__file__).resolve().parent / "data" / "psgc.json"
+
+_NUMBERED_BARANGAY = re.compile(r"Barangay (\d+)")
+
+
+# ---------------------------------------------------------------------------
+# CodeableConcept code tables
+# The DB stores the display string. These maps give the canonical code that
+# the PH-Core CodeSystem expects in coding[].code.
+# ---------------------------------------------------------------------------
+
+class CodeTable:
+    """display → code, and code → the first display listed for it."""
+
+    def __init__(self, codes: dict[str, str]):
+        self.codes = codes
+        self.displays: dict[str, str] = {}
+        for display, code in codes.items():
+            self.displays.setdefault(code, display)
+
+    def code(self, display: str | None) -> str | None:
+        return self.codes.get(display) if display else None
+
+    def display(self, code: str | None) -> str | None:
+        return self.displays.get(code) if code else None
+
+
+RELIGION = CodeTable({
+    "Roman Catholic":        "1013",
+    "Islam":                 "1012",
+    "Iglesia ni Cristo":     "1018",
+    "Protestant":            "1022",
+    "Born Again Christian":  "1028",
+    "Baptist":               "1027",
+    "Seventh-day Adventist": "1024",
+    "Aglipayan":             "1011",
+    "Buddhism":              "1026",
+    "Hinduism":              "1025",
+    "None":                  "1000",
+    "Other":                 "1099",
+})
+
+# Educational attainment — slug codes matching the PH-Core CodeSystem
+EDUCATION = CodeTable({
+    "No Formal Education":   "no-formal-education",
+    "Elementary":            "elementary",
+    "High School":           "high-school",
+    "Junior High School":    "junior-high-school",
+    "Senior High School":    "senior-high-school",
+    "Vocational/Technical":  "vocational-technical",
+    "Vocational":            "vocational-technical",
+    "College Undergraduate": "college-undergraduate",
+    "College Graduate":      "college-graduate",
+    "Post Graduate":         "post-graduate",
+    "Post-Graduate":         "post-graduate",
+    "Masteral":              "masteral",
+    "Doctorate":             "doctorate",
+})
+
+# Occupation — Philippine Standard Occupational Classification (PSOC)
+OCCUPATION = CodeTable({
+    "Managers":                                             "1",
+    "Professionals":                                        "2",
+    "Technicians and Associate Professionals":              "3",
+    "Clerical Support Workers":                             "4",
+    "Service and Sales Workers":                            "5",
+    "Skilled Agricultural, Forestry and Fishery Workers":  "6",
+    "Craft and Related Trades Workers":                     "7",
+    "Plant and Machine Operators and Assemblers":           "8",
+    "Elementary Occupations":                               "9",
+    "Armed Forces Occupations":                             "0",
+})
+
+
+# ---------------------------------------------------------------------------
+# PSGC
+# ---------------------------------------------------------------------------
+
+def _name_key(name: str) -> str:
+    return " ".join(name.split()).casefold()
+
+
+def _derive_barangay_code(city_9: str, barangay_name: str) -> str:
+    """9-digit code for a barangay of a city with a known PSA code.
+
+    1. "Barangay N" — exact derivation: city_9[:6] + N.zfill(3)
+       e.g. city "137605000" + "Barangay 17"  →  "137605017"
+    2. Named barangay — deterministic 3-digit suffix from adler32 of the name
+       (stable across processes). Structurally valid, but NOT an official
+       PSA code; ship the barangay's code in psgc.json once it is known.
+    """
+    m = _NUMBERED_BARANGAY.fullmatch(barangay_name)
+    if m:
+        return city_9[:6] + str(int(m.group(1))).zfill(3)
+    suffix = zlib.adler32(barangay_name.encode("utf-8")) % 1000
+    return city_9[:6] + str(suffix).zfill(3)
+
+
+class PsgcIndex:
+    """Forward and reverse PSGC lookups compiled from the packaged dataset."""
+
+    def __init__(self, data: dict):
+        self.region_names: dict[str, str] = {}
+        self.region_codes: dict[str, str] = {}
+        self.region_by_code: dict[str, str] = {}
+        for short, name, psgc in data["regions"]:
+            self.region_names[short] = name
+            self.region_codes[short] = psgc
+            self.region_by_code[psgc] = short
+
+        self.province_names: dict[str, str] = {code: name for code, name, _ in data["provinces"]}
+
+        self.city_names: dict[str, str] = {}
+        self.city_codes: dict[str, str] = {}
+        self.city_by_code: dict[str, str] = {}
+        self.city_by_name: dict[str, str] = {}
+        for code, display, psgc, _province, *aliases in data["cities"]:
+            self.city_names[code] = display
+            self.city_codes[code] = psgc
+            self.city_by_code[psgc] = code
+            for name in (display, *aliases):
+                self.city_by_name.setdefault(_name_key(name), code)
+
+        self.barangay_codes: dict[tuple[str, str], str] = {}
+        self.barangay_by_code: dict[str, tuple[str, str] | None] = {}
+        for city, names in data["barangays"].items():
+            city_9 = self.city_codes.get(city)
+            if not city_9:
+                continue
+            for name in names:
+                code = _derive_barangay_code(city_9, name)
+                self.barangay_codes[(city, name)] = code
+                # Derived suffixes can collide; such a code does not name one barangay
+                self.barangay_by_code[code] = None if code in self.barangay_by_code else (city, name)
+
+    # Export ---------------------------------------------------------------
+
+    def region_code(self, region: str | None) -> str | None:
+        """9-digit PSA code for the short region code the DB stores ("NCR")."""
+        return self.region_codes.get(region) if region else None
+
+    def region_name(self, region: str | None) -> str | None:
+        return self.region_names.get(region, region) if region else None
+
+    def city_code(self, city: str | None) -> str | None:
+        """9-digit PSA code for the 10-digit frontend city code the DB stores."""
+        return self.city_codes.get(city) if city else None
+
+    def city_name(self, city: str | None) -> str | None:
+        """Display name ("Name City" format) for a city code; unknown codes pass through."""
+        return self.city_names.get(city, city) if city else None
+
+    def barangay_code(self, city: str | None, barangay_name: str | None) -> str | None:
+        """9-digit code for a barangay, or None if the city has no PSA code."""
+        if not city or not barangay_name:
+            return None
+        code = self.barangay_codes.get((city, barangay_name))
+        if code is None:
+            code = _barangay_code_outside_dataset(city, barangay_name)
+        return code
+
+    # Import ---------------------------------------------------------------
+
+    def region_from_code(self, psgc: str | None) -> str | None:
+        return self.region_by_code.get(psgc) if psgc else None
+
+    def city_from_code(self, psgc: str | None) -> str | None:
+        """10-digit frontend city code for a 9-digit PSA code."""
+        return self.city_by_code.get(psgc) if psgc else None
+
+    def city_from_name(self, name: str | None) -> str | None:
+        """10-digit frontend city code for a display name or PSA-style name."""
+        return self.city_by_name.get(_name_key(name)) if name else None
+
+    def barangay_from_code(self, psgc: str | None) -> tuple[str, str] | None:
+        """(city code, barangay name) for a packaged barangay's 9-digit code."""
+        return self.barangay_by_code.get(psgc) if psgc else None
+
+
+@cache
+def psgc() -> PsgcIndex:
+    """Process-wide PSGC index, built from PSGC_FILE on first use."""
+    with open(PSGC_FILE, encoding="utf-8") as f:
+        return PsgcIndex(json.load(f))
+
+
+@lru_cache(maxsize=4096)
+def _barangay_code_outside_dataset(city: str, barangay_name: str) -> str | None:
+    city_9 = psgc().city_code(city)
+    return _derive_barangay_code(city_9, barangay_name) if city_9 else None
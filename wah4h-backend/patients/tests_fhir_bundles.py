@@ -0,0 +1,108 @@
+"""
+FHIR Bundle Builder Tests
+=========================
+The encounter/procedure/immunization Bundle builders resolve patient,
+practitioner and location references in bulk: the query count must not grow
+with the number of resources. The streaming encoder must produce the same
+documents.
+"""
+
+import json
+
+from django.test import TestCase
+
+from accounts.models import Location, Practitioner
+from admission.models import Encounter, Procedure
+from patients import wah4pc
+from patients.models import Immunization, Patient
+
+
+class FhirBundleReferenceTests(TestCase):
+
+    def setUp(self):
+        self.patient = Patient.objects.create(
+            patient_id='WAH-2026-00001', first_name='Juan', middle_name='Santos', last_name='Dela Cruz',
+        )
+        self.doctor = Practitioner.objects.create(identifier='DOC-001', first_name='Ana', last_name='Reyes')
+        self.nurse = Practitioner.objects.create(identifier='RN-001', first_name='Lito', last_name='Lim')
+        self.ward = Location.objects.create(identifier='W-1', status='active', name='Ward 1')
+
+    def _encounters(self, count):
+        for n in range(count):
+            Encounter.objects.create(
+                identifier=f'ENC-{n}', subject_id=self.patient.id, class_field='AMB', type='outpatient',
+                status='finished', participant_individual_id=self.doctor.practitioner_id,
+                location_id=self.ward.location_id,
+            )
+        return Encounter.objects.filter(subject_id=self.patient.id).order_by('identifier')
+
+    def test_encounter_bundle_query_count_is_constant(self):
+        encounters = self._encounters(10)
+        # encounters + patients + practitioners + locations
+        with self.assertNumQueries(4):
+            bundle = wah4pc.encounters_to_bundle(encounters)
+
+        self.assertEqual(len(bundle['entry']), 10)
+        resource = bundle['entry'][0]['resource']
+        self.assertEqual(resource['subject']['display'], 'Juan Santos Dela Cruz')
+        self.assertEqual(resource['participant'][0]['individual'], {
+            'type': 'Practitioner', 'display': 'Ana Reyes', 'reference': 'Practitioner/DOC-001',
+        })
+        self.assertEqual(resource['location'], [{'location': {'display': 'Ward 1'}}])
+
+    def test_procedure_bundle_query_count_is_constant(self):
+        encounter = self._encounters(1).first()
+        for n in range(10):
+            Procedure.objects.create(
+                identifier=f'PROC-{n}', status='completed', subject_id=self.patient.id, encounter=encounter,
+                recorder_id=self.nurse.practitioner_id, performer_actor_id=self.doctor.practitioner_id,
+                location_id=self.ward.location_id,
+            )
+        with self.assertNumQueries(4):
+            bundle = wah4pc.procedures_to_bundle(Procedure.objects.filter(subject_id=self.patient.id))
+
+        resource = bundle['entry'][0]['resource']
+        self.assertEqual(resource['recorder']['reference'], 'Practitioner/RN-001')
+        self.assertEqual(resource['performer'][0]['actor']['display'], 'Ana Reyes')
+        self.assertEqual(resource['location'], {'display': 'Ward 1'})
+
+    def test_immunization_bundle_query_count_is_constant(self):
+        encounter = self._encounters(1).first()
+        for n in range(10):
+            Immunization.objects.create(
+                identifier=f'IMM-{n}', status='completed', patient=self.patient, encounter_id=encounter.pk,
+            )
+        # Plain queryset, no select_related: patients come from one bulk lookup
+        with self.assertNumQueries(2):
+            bundle = wah4pc.immunizations_to_bundle(Immunization.objects.filter(patient=self.patient))
+
+        self.assertEqual(bundle['entry'][0]['resource']['patient']['display'], 'Juan Dela Cruz')
+
+    def test_single_resource_and_unknown_references(self):
+        encounter = Encounter.objects.create(
+            identifier='ENC-X', subject_id=self.patient.id, class_field='AMB', type='outpatient',
+            status='finished', participant_individual_id=999, location_id=999,
+        )
+        resource = wah4pc.encounter_to_fhir(encounter)
+        self.assertEqual(resource['subject']['display'], 'Juan Santos Dela Cruz')
+        self.assertNotIn('participant', resource)
+        self.assertNotIn('location', resource)
+
+    def test_streamed_bundle_matches_built_bundle(self):
+        encounters = self._encounters(7)
+        built = wah4pc.encounters_to_bundle(encounters)
+        chunks = list(wah4pc.iter_bundle_json(encounters, 'Encounter', chunk_size=3))
+
+        # Opening, three chunks of rows, closing
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(json.loads(b''.join(chunks)), json.loads(json.dumps(built)))
+
+    def test_streamed_envelope(self):
+        body = wah4pc.iter_json_object(
+            {'transactionId': 't-1', 'status': 'SUCCESS'}, 'data',
+            wah4pc.iter_bundle_json(Encounter.objects.none(), 'Encounter'),
+        )
+        self.assertEqual(json.loads(b''.join(body)), {
+            'transactionId': 't-1', 'status': 'SUCCESS',
+            'data': {'resourceType': 'Bundle', 'type': 'collection', 'entry': []},
+        })
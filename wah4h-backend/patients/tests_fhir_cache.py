@@ -0,0 +1,87 @@
+"""
+Rendered FHIR Cache Tests
+=========================
+Converters serve unchanged records from the cache, re-render when the record
+or anything it displays (patient, practitioner, location) changes, and
+count hits and misses per resource type.
+"""
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from accounts.models import Location, Practitioner
+from admission.models import Encounter
+from patients import wah4pc
+from patients.models import Immunization, Patient
+from patients.services import fhir_cache
+
+
+class FhirCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        fhir_cache.reset_metrics()
+        self.patient = Patient.objects.create(
+            patient_id='WAH-2026-00001', first_name='Juan', last_name='Dela Cruz',
+        )
+        self.doctor = Practitioner.objects.create(identifier='DOC-001', first_name='Ana', last_name='Reyes')
+        self.ward = Location.objects.create(identifier='W-1', status='active', name='Ward 1')
+        self.encounter = Encounter.objects.create(
+            identifier='ENC-1', subject_id=self.patient.id, class_field='AMB', type='outpatient',
+            status='finished', participant_individual_id=self.doctor.practitioner_id,
+            location_id=self.ward.location_id,
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_unchanged_patient_is_a_hit(self):
+        first = wah4pc.patient_to_fhir(self.patient)
+        second = wah4pc.patient_to_fhir(Patient.objects.get(pk=self.patient.pk))
+
+        self.assertEqual(first, second)
+        self.assertEqual(fhir_cache.metrics()['Patient'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_save_re_renders(self):
+        wah4pc.patient_to_fhir(self.patient)
+        self.patient.first_name = 'Pedro'
+        self.patient.save()
+
+        self.assertIsNone(cache.get(fhir_cache.cache_key('Patient', self.patient.pk)))
+        resource = wah4pc.patient_to_fhir(self.patient)
+        self.assertEqual(resource['name'][0]['given'], ['Pedro'])
+        self.assertEqual(fhir_cache.metrics()['Patient']['hits'], 0)
+
+    def test_stale_version_is_never_served(self):
+        # An entry left behind under an older version, e.g. by another process
+        cache.set(fhir_cache.cache_key('Patient', self.patient.pk), (('old',), {'stale': True}))
+
+        self.assertNotIn('stale', wah4pc.patient_to_fhir(self.patient))
+        self.assertEqual(fhir_cache.metrics()['Patient']['misses'], 1)
+
+    def test_referenced_practitioner_change_re_renders_encounter(self):
+        wah4pc.encounter_to_fhir(self.encounter)
+        self.assertEqual(wah4pc.encounter_to_fhir(self.encounter)['participant'][0]['individual']['display'],
+                         'Ana Reyes')
+
+        self.doctor.last_name = 'Cruz'
+        self.doctor.save()
+        resource = wah4pc.encounter_to_fhir(self.encounter)
+
+        self.assertEqual(resource['participant'][0]['individual']['display'], 'Ana Cruz')
+        self.assertEqual(fhir_cache.metrics()['Encounter'], {'hits': 1, 'misses': 2, 'hit_rate': 0.333})
+
+    def test_bundle_reuses_cached_entries(self):
+        Immunization.objects.create(
+            identifier='IMM-1', status='completed', patient=self.patient, encounter_id=self.encounter.pk,
+        )
+        queryset = Immunization.objects.filter(patient=self.patient)
+        first = wah4pc.immunizations_to_bundle(queryset)
+        second = wah4pc.immunizations_to_bundle(queryset)
+
+        self.assertEqual(first, second)
+        self.assertEqual(fhir_cache.metrics()['Immunization']['hits'], 1)
+
+    def test_unsaved_model_bypasses_cache(self):
+        wah4pc.patient_to_fhir(Patient(first_name='Temp', last_name='Only'))
+        self.assertEqual(fhir_cache.metrics(), {})
@@ -0,0 +1,67 @@
+"""
+FHIR Logical ID Tests
+=====================
+Patient and Immunization persist the uuid5 logical id wah4pc exports, so an
+inbound Patient/<uuid> reference resolves with one indexed lookup.
+"""
+
+import os
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from patients import wah4pc
+from patients.models import Immunization, Patient, fhir_logical_id
+
+
+class FhirLogicalIdTests(TestCase):
+
+    def setUp(self):
+        self.patient = Patient.objects.create(
+            patient_id='WAH-2026-00001', first_name='Juan', last_name='Dela Cruz',
+        )
+
+    def test_id_is_persisted_on_create_and_matches_export(self):
+        self.patient.refresh_from_db()
+        self.assertEqual(self.patient.fhir_id, fhir_logical_id('patient', self.patient.pk))
+        self.assertEqual(wah4pc.patient_to_fhir(self.patient)['id'], self.patient.fhir_id)
+
+        imm = Immunization.objects.create(
+            identifier='IMM-1', status='completed', patient=self.patient, encounter_id=1,
+        )
+        self.assertEqual(Immunization.objects.get(pk=imm.pk).fhir_id, wah4pc.immunization_to_fhir(imm)['id'])
+
+    def test_export_uses_the_persisted_id(self):
+        cache.clear()  # rendered-FHIR cache entries of earlier tests' rows
+        Patient.objects.filter(pk=self.patient.pk).update(fhir_id='a1b2c3d4-0000-4000-8000-000000000001')
+        self.patient.refresh_from_db()
+        imm = Immunization.objects.create(
+            identifier='IMM-2', status='completed', patient=self.patient, encounter_id=1,
+        )
+
+        self.assertEqual(wah4pc.patient_to_fhir(self.patient)['id'], self.patient.fhir_id)
+        self.assertEqual(
+            wah4pc.immunization_to_fhir(imm)['patient']['reference'], f'Patient/{self.patient.fhir_id}',
+        )
+        refs = wah4pc.FhirReferences([self.patient.pk])
+        self.assertEqual(refs.patient_ref(self.patient.pk)[0], self.patient.fhir_id)
+
+    def test_import_resolves_uuid_reference(self):
+        Patient.objects.create(patient_id='WAH-2026-00002', first_name='Ana', last_name='Santos')
+        resource = {
+            'resourceType': 'Immunization',
+            'identifier': [{'value': 'IMM-EXT-1'}],
+            'status': 'completed',
+            'vaccineCode': {'coding': [{'code': '08'}]},
+            'patient': {'reference': f'Patient/{self.patient.fhir_id}'},
+        }
+        imported = wah4pc.import_immunization_from_fhir(resource)
+        self.assertEqual(imported.patient, self.patient)
+
+    def test_backfill_command(self):
+        Patient.objects.filter(pk=self.patient.pk).update(fhir_id=None)
+        call_command('backfill_fhir_ids', stdout=open(os.devnull, 'w'))
+        self.assertEqual(
+            Patient.objects.get(pk=self.patient.pk).fhir_id, fhir_logical_id('patient', self.patient.pk),
+        )
@@ -0,0 +1,126 @@
+"""
+WAH4PC Gateway Client Tests
+===========================
+Runs GatewayClient against a local keep-alive HTTP server.
+"""
+
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from patients import wah4pc
+
+
+class _GatewayStub(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep connections open between requests
+    responses = []
+    seen_headers = []
+    seen_bodies = []
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding') == 'chunked':
+            body = b''
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                body += self.rfile.read(size)
+                self.rfile.readline()  # CRLF after each chunk
+                if not size:
+                    return body
+        return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+    def _reply(self):
+        type(self).seen_bodies.append(self._read_body())
+        type(self).seen_headers.append(dict(self.headers))
+        code, body = type(self).responses.pop(0)
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+class GatewayClientTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _GatewayStub)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        _GatewayStub.responses = []
+        _GatewayStub.seen_headers = []
+        _GatewayStub.seen_bodies = []
+        self.client = wah4pc.GatewayClient(base_url=self.base_url)
+
+    def test_connections_are_reused(self):
+        _GatewayStub.responses = [(200, {'data': []}), (200, {'data': []}), (200, {'data': []})]
+        for _ in range(3):
+            self.assertEqual(self.client.get_json('/api/v1/transactions', 'transactions'), {'data': []})
+
+        metrics = self.client.metrics()
+        self.assertEqual(metrics['connections_opened'], 1)
+        self.assertEqual(metrics['connections_reused'], 2)
+        self.assertEqual(metrics['endpoints']['transactions']['calls'], 3)
+
+    @patch('patients.wah4pc._BACKOFF_SECONDS', [0, 0])
+    def test_post_with_retry_on_rate_limit(self):
+        _GatewayStub.responses = [(429, {}), (200, {'transactionId': 't-1'})]
+        result = self.client.post_with_retry('/api/v1/fhir/push/Patient', {}, 'fhir_push', 'key-1')
+        self.assertEqual(result, {'transactionId': 't-1', 'idempotency_key': 'key-1'})
+        self.assertEqual(_GatewayStub.seen_headers[-1]['Idempotency-Key'], 'key-1')
+        self.assertEqual(self.client.metrics()['endpoints']['fhir_push']['errors'], 1)
+
+    @patch('patients.wah4pc._BACKOFF_SECONDS', [0, 0])
+    def test_post_with_retry_gives_up(self):
+        _GatewayStub.responses = [(409, {})] * 3
+        result = self.client.post_with_retry('/api/v1/fhir/push/Patient', {}, 'fhir_push', 'key-2')
+        self.assertEqual(result['status_code'], 409)
+
+    def test_error_body_is_reported(self):
+        _GatewayStub.responses = [(404, {'error': 'Transaction not found'})]
+        result = self.client.get_json('/api/v1/transactions/x', 'transactions')
+        self.assertEqual(result, {'error': 'Transaction not found', 'status_code': 404})
+
+    def test_network_error(self):
+        client = wah4pc.GatewayClient(base_url='http://127.0.0.1:9', timeouts={'providers': (0.5, 0.5)})
+        result = client.get_json('/api/v1/providers', 'providers', authenticated=False)
+        self.assertEqual(result['status_code'], 500)
+        self.assertEqual(client.metrics()['endpoints']['providers']['errors'], 1)
+
+    def test_module_functions_use_shared_client(self):
+        self.assertIs(wah4pc.get_gateway_client(), wah4pc.get_gateway_client())
+        with patch.object(wah4pc, '_client', self.client):
+            _GatewayStub.responses = [(200, [{'id': 'a', 'isActive': True}, {'id': 'b', 'isActive': False}])]
+            self.assertEqual(wah4pc.get_providers(), [{'id': 'a', 'isActive': True}])
+
+    def test_post_stream_is_chunked(self):
+        _GatewayStub.responses = [(200, {}), (200, {})]
+        chunks = [b'{"entry": [', b'{"a": 1}', b', {"b": 2}', b']}']
+        self.client.post_stream('/return', 'query_return', chunks, idempotency_key='key-3')
+        self.client.post_stream('/return', 'query_return', chunks, gzip=True)
+
+        plain, zipped = _GatewayStub.seen_headers
+        self.assertEqual(plain['Transfer-Encoding'], 'chunked')
+        self.assertEqual(plain['Idempotency-Key'], 'key-3')
+        self.assertEqual(json.loads(_GatewayStub.seen_bodies[0]), {'entry': [{'a': 1}, {'b': 2}]})
+        self.assertEqual(zipped['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(_GatewayStub.seen_bodies[1])), {'entry': [{'a': 1}, {'b': 2}]})
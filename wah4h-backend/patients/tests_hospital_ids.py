@@ -0,0 +1,56 @@
+"""
+Hospital ID Allocator Tests
+===========================
+Covers the per-year hospital ID counter used by PatientRegistrationService.
+"""
+
+from datetime import datetime
+
+from django.test import TestCase
+
+from patients.models import HospitalIdSequence, Patient
+from patients.services import hospital_ids
+from patients.services.patients_services import PatientRegistrationService
+
+
+class HospitalIdAllocatorTests(TestCase):
+
+    def test_sequential_ids_per_year(self):
+        self.assertEqual(hospital_ids.next_hospital_id(2030), 'WAH-2030-00001')
+        self.assertEqual(hospital_ids.next_hospital_id(2030), 'WAH-2030-00002')
+        self.assertEqual(hospital_ids.next_hospital_id(2031), 'WAH-2031-00001')
+        self.assertEqual(HospitalIdSequence.objects.get(year=2030).last_value, 2)
+
+    def test_first_allocation_continues_existing_numbering(self):
+        Patient.objects.create(patient_id='WAH-2030-00041', first_name='A', last_name='B')
+        Patient.objects.create(patient_id='WAH-2030-00007', first_name='C', last_name='D')
+        Patient.objects.create(patient_id='WAH-2030-legacy', first_name='E', last_name='F')
+        self.assertEqual(hospital_ids.next_hospital_id(2030), 'WAH-2030-00042')
+
+    def test_block_allocation(self):
+        block = hospital_ids.allocate_hospital_ids(3, 2030)
+        self.assertEqual(block, ['WAH-2030-00001', 'WAH-2030-00002', 'WAH-2030-00003'])
+        self.assertEqual(hospital_ids.next_hospital_id(2030), 'WAH-2030-00004')
+        self.assertEqual(hospital_ids.allocate_hospital_ids(0, 2030), [])
+
+    def test_pool_draws_from_blocks(self):
+        pool = hospital_ids.HospitalIdPool(block_size=2, year=2030)
+        self.assertEqual([pool.next() for _ in range(3)], ['WAH-2030-00001', 'WAH-2030-00002', 'WAH-2030-00003'])
+        # The second block (00003-00004) is partly used; a fresh allocation skips past it
+        self.assertEqual(hospital_ids.next_hospital_id(2030), 'WAH-2030-00005')
+        self.assertEqual(pool.take(2), ['WAH-2030-00004', 'WAH-2030-00006'])
+
+    def test_sequence_widens_past_five_digits(self):
+        HospitalIdSequence.objects.create(year=2030, last_value=99999)
+        self.assertEqual(hospital_ids.next_hospital_id(2030), 'WAH-2030-100000')
+
+    def test_register_patient_assigns_id(self):
+        year = datetime.now().year
+        first = PatientRegistrationService.register_patient(
+            {'first_name': 'Ana', 'last_name': 'Reyes', 'birthdate': '1990-01-01'}
+        )
+        second = PatientRegistrationService.register_patient(
+            {'first_name': 'Ben', 'last_name': 'Reyes', 'birthdate': '1990-01-01'}
+        )
+        self.assertEqual(first.patient_id, f'WAH-{year}-00001')
+        self.assertEqual(second.patient_id, f'WAH-{year}-00002')
@@ -0,0 +1,157 @@
+"""
+Patient Bulk Import Tests
+=========================
+Covers patient_import readers, the chunked PatientImporter, the
+/api/patients/import/ endpoint and the import_patients command.
+"""
+
+import io
+import json
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from patients.models import Patient, fhir_logical_id
+from patients.services import patient_acl, patient_import, patient_search
+
+
+CSV_HEADER = 'patient_id,first_name,last_name,birthdate,gender,mobile_number,active\n'
+
+
+def _run(text, fmt, **kwargs):
+    importer = patient_import.PatientImporter(**kwargs)
+    return importer.run(patient_import.read_rows(io.BytesIO(text.encode('utf-8')), fmt))
+
+
+class PatientImporterTests(TestCase):
+
+    def setUp(self):
+        Patient.objects.create(
+            patient_id='WAH-2020-00001', first_name='Juan', last_name='Dela Cruz',
+            birthdate='1980-05-01', gender='male',
+        )
+
+    def test_csv_import_reports_per_row_errors(self):
+        text = CSV_HEADER + (
+            ',Ana,Reyes,1990-01-01,female,09171234567,true\n'   # ok
+            ',Ben,Santos,not-a-date,male,,\n'                   # invalid birthdate
+            ',JUAN,dela cruz,1980-05-01,male,,\n'               # duplicate of existing
+            ',ana,REYES,1990-01-01,female,,\n'                  # duplicate within file
+            'WAH-2020-00001,Carla,Lim,1975-03-03,female,,\n'    # patient_id taken
+            'LEGACY-7,Dino,Tan,1960-07-07,male,,false\n'        # ok, explicit id, inactive
+        )
+        report = _run(text, 'csv', chunk_size=2)
+
+        self.assertEqual(report['total'], 6)
+        self.assertEqual(report['created'], 2)
+        self.assertEqual(report['duplicates'], 2)
+        self.assertEqual(report['failed'], 2)
+        self.assertEqual([e['row'] for e in report['errors']], [3, 4, 5, 6])
+        self.assertIn('birthdate', report['errors'][0]['errors'])
+
+        ana = Patient.objects.get(first_name='Ana')
+        self.assertTrue(ana.patient_id.startswith('WAH-'))
+        dino = Patient.objects.get(patient_id='LEGACY-7')
+        self.assertEqual(dino.status, 'inactive')
+        # bulk_create bypasses post_save; the importer indexes the rows itself
+        self.assertEqual([r['id'] for r in patient_acl.search_patients('reyes')], [ana.id])
+        self.assertEqual(ana.fhir_id, fhir_logical_id('patient', ana.pk))
+
+    def test_csv_rows_are_numbered_by_file_line(self):
+        text = CSV_HEADER + (
+            ',Ana,Reyes,1990-13-01,female,,\n'
+            ',"Ben\nJr",Santos,1991-01-01,male,,\n'           # name spans two lines
+            ',Carla,Lim,not-a-date,female,,\n'
+        )
+        report = _run(text, 'csv')
+        self.assertEqual([e['row'] for e in report['errors']], [2, 5])
+
+    def test_ndjson_import(self):
+        text = (
+            json.dumps({'first_name': 'Ella', 'last_name': 'Go', 'birthdate': '2001-02-03', 'gender': 'female'}) + '\n'
+            + '\n'
+            + '{not json}\n'
+        )
+        report = _run(text, 'ndjson')
+        self.assertEqual((report['created'], report['failed']), (1, 1))
+        self.assertEqual(report['errors'][0]['row'], 3)
+
+    def test_bundle_import(self):
+        bundle = {
+            'resourceType': 'Bundle',
+            'entry': [
+                {'resource': {
+                    'resourceType': 'Patient', 'gender': 'male', 'birthDate': '1999-09-09',
+                    'name': [{'family': 'Aquino', 'given': ['Fidel']}],
+                }},
+                {'resource': {'resourceType': 'Observation'}},
+            ],
+        }
+        report = _run(json.dumps(bundle), 'bundle')
+        self.assertEqual((report['total'], report['created']), (1, 1))
+        self.assertTrue(Patient.objects.filter(last_name='Aquino', first_name='Fidel').exists())
+
+    def test_row_by_row_fallback_indexes_each_row_once(self):
+        text = CSV_HEADER + ',Ana,Reyes,1990-01-01,female,,\n,Ben,Santos,1991-01-01,male,,\n'
+        with patch.object(Patient.objects, 'bulk_create', side_effect=IntegrityError), \
+                patch.object(patient_search, 'index_patient', wraps=patient_search.index_patient) as one, \
+                patch.object(patient_search, 'index_patients') as bulk:
+            report = _run(text, 'csv')
+
+        self.assertEqual(report['created'], 2)
+        self.assertEqual((one.call_count, bulk.call_count), (2, 0))
+        ana = Patient.objects.get(first_name='Ana')
+        self.assertEqual([r['id'] for r in patient_acl.search_patients('reyes')], [ana.id])
+        self.assertEqual(ana.fhir_id, fhir_logical_id('patient', ana.pk))
+
+    def test_dry_run_writes_nothing(self):
+        report = _run(CSV_HEADER + ',Ana,Reyes,1990-01-01,female,,\n', 'csv', dry_run=True)
+        self.assertEqual(report['created'], 1)
+        self.assertFalse(Patient.objects.filter(first_name='Ana').exists())
+
+    def test_detect_format(self):
+        self.assertEqual(patient_import.detect_format('registry.CSV'), 'csv')
+        self.assertEqual(patient_import.detect_format('export.jsonl'), 'ndjson')
+        self.assertIsNone(patient_import.detect_format('notes.txt'))
+
+
+class PatientImportApiTests(APITestCase):
+
+    def test_import_endpoint(self):
+        upload = SimpleUploadedFile(
+            'registry.csv', (CSV_HEADER + ',Ana,Reyes,1990-01-01,female,,\n,Ben,,1990-01-01,male,,\n').encode('utf-8'),
+            content_type='text/csv',
+        )
+        response = self.client.post('/api/patients/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'][0]['row'], 3)
+        self.assertIn('last_name', response.data['errors'][0]['errors'])
+
+    def test_import_endpoint_requires_file_and_format(self):
+        response = self.client.post('/api/patients/import/', {}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        upload = SimpleUploadedFile('registry.txt', b'x')
+        response = self.client.post('/api/patients/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ImportPatientsCommandTests(TestCase):
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write(CSV_HEADER + ',Ana,Reyes,1990-01-01,female,,\n')
+        try:
+            out = io.StringIO()
+            call_command('import_patients', f.name, stdout=out)
+        finally:
+            os.unlink(f.name)
+        self.assertIn('Imported 1 of 1 rows', out.getvalue())
+        self.assertTrue(Patient.objects.filter(first_name='Ana').exists())
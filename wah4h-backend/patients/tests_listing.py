@@ -0,0 +1,144 @@
+"""
+Patient List Tests
+==================
+Covers keyset (cursor) pagination in patient_acl.list_patients, the cursor
+headers returned by GET /api/patients/, and the projection-based DTO shapes.
+"""
+
+from datetime import date
+
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from patients.models import Patient
+from patients.services import patient_acl
+
+
+def _make_patients():
+    names = [
+        ('Ana', 'Santos'), ('Ben', 'Santos'), ('Carla', 'Reyes'),
+        ('Dino', 'Aquino'), ('Ella', 'Aquino'), ('Ana', 'Santos'),
+    ]
+    return [
+        Patient.objects.create(
+            patient_id=f'WAH-2026-{i:05d}', first_name=first, last_name=last,
+        )
+        for i, (first, last) in enumerate(names, start=1)
+    ]
+
+
+class PatientKeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        self.patients = _make_patients()
+
+    def _walk(self, limit):
+        seen, cursor = [], None
+        while True:
+            page, cursor = patient_acl.list_patients(cursor=cursor, limit=limit)
+            seen.extend(p['id'] for p in page)
+            if not cursor:
+                return seen
+
+    def test_pages_cover_all_rows_once_in_sort_order(self):
+        expected = list(
+            Patient.objects.filter(status='active')
+            .order_by('last_name', 'first_name', 'id')
+            .values_list('id', flat=True)
+        )
+        for limit in (1, 2, 4, 10):
+            self.assertEqual(self._walk(limit), expected)
+
+    def test_last_page_has_no_cursor(self):
+        page, cursor = patient_acl.list_patients(limit=10)
+        self.assertEqual(len(page), 6)
+        self.assertIsNone(cursor)
+
+    def test_inactive_patients_excluded(self):
+        Patient.objects.filter(pk=self.patients[0].pk).update(status='inactive')
+        self.assertNotIn(self.patients[0].id, self._walk(2))
+
+    def test_invalid_cursor_raises(self):
+        with self.assertRaises(ValueError):
+            patient_acl.list_patients(cursor='not-a-cursor', limit=2)
+
+
+class PatientListApiTests(APITestCase):
+
+    def setUp(self):
+        self.patients = _make_patients()
+
+    def test_body_is_flat_array_with_next_cursor_header(self):
+        response = self.client.get('/api/patients/', {'limit': 4})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 4)
+        cursor = response['X-Next-Cursor']
+        self.assertIn('rel="next"', response['Link'])
+
+        response = self.client.get('/api/patients/', {'limit': 4, 'cursor': cursor})
+        self.assertEqual(len(response.data), 2)
+        self.assertNotIn('X-Next-Cursor', response)
+
+    def test_limit_is_capped(self):
+        response = self.client.get('/api/patients/', {'limit': 100000})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 6)
+
+    def test_invalid_cursor_returns_400(self):
+        response = self.client.get('/api/patients/', {'cursor': '!!!'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PatientDtoProjectionTests(TestCase):
+
+    def setUp(self):
+        self.patient = Patient.objects.create(
+            patient_id='WAH-2026-00100', first_name='Luz', last_name='Bautista',
+            birthdate=date(2000, 6, 15), address_city='Cebu City',
+        )
+
+    def test_summary_matches_model_fields(self):
+        dto = patient_acl.get_patient_summary(self.patient.id)
+        self.assertEqual(dto['full_name'], 'Luz Bautista')
+        self.assertEqual(dto['middle_name'], '')
+        self.assertEqual(dto['birthdate'], '2000-06-15')
+        self.assertEqual(dto['age'], self.patient.age)
+        self.assertEqual(dto['address_city'], 'Cebu City')
+        self.assertTrue(dto['active'])
+        self.assertIsNotNone(dto['created_at'])
+
+    def test_full_shape_has_no_age(self):
+        dto = patient_acl.get_patient_details(self.patient.id)
+        self.assertNotIn('age', dto)
+        self.assertEqual(dto['address_city'], 'Cebu City')
+
+    def test_missing_patient_returns_none(self):
+        self.assertIsNone(patient_acl.get_patient_summary(999999))
+
+    def test_age_uses_reference_date(self):
+        rows = Patient.objects.filter(pk=self.patient.pk).values_list(
+            *patient_acl.patient_dto_columns(patient_acl.DTO_SLIM)
+        )
+        before, = patient_acl.build_patient_dtos(rows, patient_acl.DTO_SLIM, today=date(2026, 6, 14))
+        on, = patient_acl.build_patient_dtos(rows, patient_acl.DTO_SLIM, today=date(2026, 6, 15))
+        self.assertEqual((before['age'], on['age']), (25, 26))
+
+    def test_slim_shape_is_a_subset(self):
+        page, _ = patient_acl.list_patients(limit=10, shape=patient_acl.DTO_SLIM)
+        self.assertEqual(page[0]['patient_id'], 'WAH-2026-00100')
+        self.assertNotIn('address_city', page[0])
+        self.assertNotIn('created_at', page[0])
+
+    def test_unknown_shape_rejected(self):
+        with self.assertRaises(ValueError):
+            patient_acl.patient_dto_columns('everything')
+
+    def test_list_endpoint_slim_shape(self):
+        response = self.client.get('/api/patients/', {'shape': 'slim'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['full_name'], 'Luz Bautista')
+        self.assertNotIn('address_city', response.data[0])
+
+        response = self.client.get('/api/patients/', {'shape': 'bogus'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
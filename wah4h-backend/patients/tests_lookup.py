@@ -0,0 +1,56 @@
+"""
+Patient Batch Lookup Tests
+==========================
+Covers patient_acl.get_patient_summaries and the request-scoped identity map
+opened by PatientLookupScopeMiddleware.
+"""
+
+from django.test import TestCase
+
+from patients.models import Patient
+from patients.services import patient_acl
+
+
+class PatientBatchLookupTests(TestCase):
+
+    def setUp(self):
+        self.ana = Patient.objects.create(patient_id='WAH-2026-00201', first_name='Ana', last_name='Reyes')
+        self.ben = Patient.objects.create(patient_id='WAH-2026-00202', first_name='Ben', last_name='Cruz')
+
+    def test_batch_is_one_query(self):
+        with self.assertNumQueries(1):
+            found = patient_acl.get_patient_summaries([self.ana.id, self.ben.id, self.ana.id, None, 999999])
+        self.assertEqual(set(found), {self.ana.id, self.ben.id})
+        self.assertEqual(found[self.ben.id]['full_name'], 'Ben Cruz')
+
+    def test_empty_input_skips_database(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(patient_acl.get_patient_summaries([None]), {})
+
+    def test_scope_serves_repeated_lookups_from_memory(self):
+        with patient_acl.patient_lookup_scope():
+            patient_acl.get_patient_summaries([self.ana.id, 999999])
+            with self.assertNumQueries(0):
+                self.assertEqual(patient_acl.get_patient_summary(self.ana.id)['first_name'], 'Ana')
+                self.assertIsNone(patient_acl.get_patient_summary(999999))
+            with self.assertNumQueries(1):
+                patient_acl.get_patient_summaries([self.ana.id, self.ben.id])
+
+    def test_save_evicts_from_scope(self):
+        with patient_acl.patient_lookup_scope():
+            patient_acl.get_patient_summary(self.ana.id)
+            self.ana.first_name = 'Anna'
+            self.ana.save()
+            self.assertEqual(patient_acl.get_patient_summary(self.ana.id)['first_name'], 'Anna')
+
+    def test_delete_evicts_from_scope(self):
+        with patient_acl.patient_lookup_scope():
+            patient_acl.get_patient_summaries([self.ana.id, self.ben.id])
+            ana_id = self.ana.id
+            self.ana.delete()
+            self.assertEqual(set(patient_acl.get_patient_summaries([ana_id, self.ben.id])), {self.ben.id})
+
+    def test_no_caching_outside_scope(self):
+        patient_acl.get_patient_summary(self.ana.id)
+        with self.assertNumQueries(1):
+            patient_acl.get_patient_summary(self.ana.id)
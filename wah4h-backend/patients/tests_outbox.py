@@ -0,0 +1,318 @@
+"""
+WAH4PC Outbox Tests
+===================
+Covers the queued fetch/send flow: 202 from the API, delivery by the
+worker, backoff on 409/429 (honouring Retry-After) and webhook matching on
+the gateway's transaction ID; and the one-Bundle patient record transfer
+with its per-entry status.
+"""
+
+import os
+from datetime import timedelta
+from unittest.mock import patch
+
+import requests
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import Location, Practitioner
+from admission.models import Encounter, Procedure
+from patients import wah4pc
+from patients.models import AllergyIntolerance, Condition, Immunization, Patient, WAH4PCTransaction
+from patients.services import gateway_outbox
+
+
+class _FakeResponse:
+
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self._body = body if body is not None else {}
+        self.headers = headers or {}
+        self.text = 'x' if body is not None else ''
+
+    def json(self):
+        return self._body
+
+
+class _FakeClient:
+    """Stands in for GatewayClient; replays canned responses in order."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    @staticmethod
+    def auth_headers(idempotency_key=None):
+        return {'Idempotency-Key': idempotency_key}
+
+    def send(self, method, path, endpoint, **kwargs):
+        self.calls.append((method, path, endpoint, kwargs))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class BackoffTests(SimpleTestCase):
+
+    def test_delay_is_jittered_within_exponential_ceiling(self):
+        for attempt, ceiling in ((1, 1), (3, 4), (20, gateway_outbox.BACKOFF_CAP_SECONDS)):
+            for _ in range(20):
+                self.assertTrue(0 <= gateway_outbox.retry_delay(attempt) <= ceiling)
+
+    def test_retry_after_is_a_floor(self):
+        self.assertGreaterEqual(gateway_outbox.retry_delay(1, retry_after=30), 30)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(gateway_outbox.parse_retry_after('12'), 12)
+        self.assertIsNone(gateway_outbox.parse_retry_after(None))
+        self.assertIsNone(gateway_outbox.parse_retry_after('soon'))
+        later = timezone.now() + timedelta(seconds=120)
+        seconds = gateway_outbox.parse_retry_after(later.strftime('%a, %d %b %Y %H:%M:%S GMT'))
+        self.assertTrue(100 < seconds <= 120)
+
+
+class OutboxDeliveryTests(TestCase):
+
+    def setUp(self):
+        self.patient = Patient.objects.create(
+            patient_id='WAH-2026-00001', first_name='Juan', last_name='Dela Cruz',
+        )
+
+    def test_fetch_delivered_and_waits_for_webhook(self):
+        txn = gateway_outbox.enqueue_patient_fetch('provider-1', '12-345678901-2')
+        client = _FakeClient(_FakeResponse(202, {'data': {'id': 'gw-1'}}))
+
+        self.assertEqual(gateway_outbox.process_due(client=client), 1)
+
+        txn.refresh_from_db()
+        self.assertEqual(txn.status, 'PENDING')
+        self.assertEqual(txn.gateway_transaction_id, 'gw-1')
+        self.assertEqual(txn.attempts, 1)
+        method, path, endpoint, kwargs = client.calls[0]
+        self.assertEqual((method, path, endpoint), ('POST', '/api/v1/fhir/request/Patient', 'fhir_request'))
+        self.assertEqual(kwargs['headers']['Idempotency-Key'], txn.transaction_id)
+        self.assertEqual(kwargs['json']['identifiers'][0]['value'], '12-345678901-2')
+
+    def test_rate_limit_requeues_with_retry_after(self):
+        txn = gateway_outbox.enqueue_patient_push('provider-1', self.patient)
+        client = _FakeClient(_FakeResponse(429, {}, headers={'Retry-After': '60'}))
+
+        gateway_outbox.process_due(client=client)
+
+        txn.refresh_from_db()
+        self.assertEqual(txn.status, 'QUEUED')
+        self.assertGreaterEqual(txn.next_attempt_at, timezone.now() + timedelta(seconds=55))
+        # Not due yet, so the next pass leaves it alone
+        self.assertEqual(gateway_outbox.process_due(client=client), 0)
+
+    def test_retry_reuses_idempotency_key(self):
+        txn = gateway_outbox.enqueue_patient_push('provider-1', self.patient)
+        client = _FakeClient(
+            _FakeResponse(409, {}),
+            requests.ConnectionError('reset'),
+            _FakeResponse(200, {'transactionId': 'gw-2', 'status': 'PENDING'}),
+        )
+        with patch.object(gateway_outbox, 'retry_delay', return_value=0):
+            for _ in range(3):
+                gateway_outbox.process_due(client=client)
+
+        txn.refresh_from_db()
+        self.assertEqual(txn.status, 'PENDING')
+        self.assertEqual(txn.attempts, 3)
+        self.assertIsNone(txn.error_message)
+        keys = {call[3]['headers']['Idempotency-Key'] for call in client.calls}
+        self.assertEqual(keys, {txn.idempotency_key})
+
+    def test_gives_up_after_max_attempts(self):
+        txn = gateway_outbox.enqueue_patient_fetch('provider-1', '12-345678901-2')
+        client = _FakeClient(*[_FakeResponse(429, {})] * gateway_outbox.MAX_ATTEMPTS)
+        with patch.object(gateway_outbox, 'retry_delay', return_value=0):
+            for _ in range(gateway_outbox.MAX_ATTEMPTS):
+                gateway_outbox.process_due(client=client)
+
+        txn.refresh_from_db()
+        self.assertEqual(txn.status, 'FAILED')
+        self.assertIn('gave up', txn.error_message)
+
+    def test_client_error_fails_immediately(self):
+        txn = gateway_outbox.enqueue_patient_fetch('provider-1', '12-345678901-2')
+        gateway_outbox.process_due(client=_FakeClient(_FakeResponse(400, {'error': 'Unknown target'})))
+
+        txn.refresh_from_db()
+        self.assertEqual(txn.status, 'FAILED')
+        self.assertEqual(txn.error_message, 'Unknown target')
+
+    def test_stalled_rows_are_requeued(self):
+        txn = gateway_outbox.enqueue_patient_fetch('provider-1', '12-345678901-2')
+        WAH4PCTransaction.objects.filter(pk=txn.pk).update(
+            status='SENDING', updated_at=timezone.now() - timedelta(hours=1),
+        )
+        self.assertEqual(gateway_outbox.requeue_stalled(), 1)
+        self.assertEqual(WAH4PCTransaction.objects.get(pk=txn.pk).status, 'QUEUED')
+
+    def test_worker_command_once(self):
+        gateway_outbox.enqueue_patient_fetch('provider-1', '12-345678901-2')
+        with patch('patients.wah4pc.get_gateway_client', return_value=_FakeClient(
+            _FakeResponse(202, {'transactionId': 'gw-3'}),
+        )):
+            call_command('run_wah4pc_outbox', once=True, stdout=open(os.devnull, 'w'))
+        self.assertTrue(WAH4PCTransaction.objects.filter(gateway_transaction_id='gw-3').exists())
+
+
+class RecordTransferTests(TestCase):
+
+    def setUp(self):
+        self.patient = Patient.objects.create(
+            patient_id='WAH-2026-00003', first_name='Lito', last_name='Lim',
+        )
+        doctor = Practitioner.objects.create(identifier='DOC-TR-001', first_name='Ana', last_name='Reyes')
+        ward = Location.objects.create(identifier='W-TR', status='active', name='Ward 2')
+        for n in range(3):
+            encounter = Encounter.objects.create(
+                identifier=f'ENC-TR-{n}', subject_id=self.patient.id, class_field='IMP', type='inpatient',
+                status='finished', participant_individual_id=doctor.practitioner_id,
+                location_id=ward.location_id,
+            )
+            Procedure.objects.create(
+                identifier=f'PROC-TR-{n}', status='completed', subject_id=self.patient.id, encounter=encounter,
+                performer_actor_id=doctor.practitioner_id,
+            )
+        Immunization.objects.create(
+            identifier='IMM-TR-1', status='completed', patient=self.patient, encounter_id=encounter.pk,
+        )
+        Condition.objects.create(
+            identifier='COND-TR-1', code='Hypertension', clinical_status='active',
+            patient=self.patient, recorder_id=doctor.practitioner_id,
+        )
+        AllergyIntolerance.objects.create(
+            identifier='ALG-TR-1', code='Penicillin', reaction_manifestation='Hives', patient=self.patient,
+        )
+
+    def test_bundle_holds_whole_record_with_constant_queries(self):
+        # five sections + patients + practitioners + locations
+        with self.assertNumQueries(8):
+            bundle = wah4pc.patient_record_bundle(self.patient)
+
+        self.assertEqual(bundle['type'], 'transaction')
+        types = [e['resource']['resourceType'] for e in bundle['entry']]
+        self.assertEqual(types, ['Patient'] + ['Encounter'] * 3 + ['Procedure'] * 3
+                         + ['Immunization', 'Condition', 'AllergyIntolerance'])
+        self.assertEqual(bundle['entry'][1]['request'], {'method': 'PUT', 'url': 'Encounter/ENC-TR-0'})
+        condition = bundle['entry'][8]['resource']
+        self.assertEqual(condition['recorder']['display'], 'Ana Reyes')
+        self.assertEqual(condition['subject']['reference'], f'Patient/{self.patient.fhir_id}')
+
+    def test_one_call_with_per_entry_status(self):
+        txn = gateway_outbox.enqueue_patient_transfer('provider-1', self.patient)
+        self.assertEqual(len(txn.entries), 10)
+        self.assertEqual({e['status'] for e in txn.entries}, {'QUEUED'})
+
+        response_bundle = {
+            'resourceType': 'Bundle', 'type': 'transaction-response',
+            'entry': [{'response': {'status': '201 Created'}}] * 9
+                     + [{'response': {'status': '400 Bad Request', 'outcome': {'issue': []}}}],
+        }
+        client = _FakeClient(_FakeResponse(200, {'transactionId': 'gw-5', 'status': 'COMPLETED',
+                                                 'data': response_bundle}))
+        gateway_outbox.process_due(client=client)
+
+        self.assertEqual(len(client.calls), 1)
+        self.assertEqual(client.calls[0][1], wah4pc.BUNDLE_PUSH_PATH)
+        txn.refresh_from_db()
+        self.assertEqual(txn.status, 'COMPLETED')
+        self.assertEqual(txn.entries[0], {'resourceType': 'Patient', 'id': self.patient.fhir_id,
+                                          'status': '201 Created'})
+        self.assertEqual(txn.entries[-1]['status'], '400 Bad Request')
+        self.assertIn('outcome', txn.entries[-1])
+
+    def test_failure_marks_every_entry(self):
+        txn = gateway_outbox.enqueue_patient_transfer('provider-1', self.patient)
+        gateway_outbox.process_due(client=_FakeClient(_FakeResponse(400, {'error': 'Unknown target'})))
+
+        txn.refresh_from_db()
+        self.assertEqual({e['status'] for e in txn.entries}, {'FAILED'})
+
+
+class OutboxApiTests(APITestCase):
+
+    def setUp(self):
+        practitioner = Practitioner.objects.create(
+            identifier='DOC-OUT-001', first_name='Test', last_name='Doctor',
+        )
+        self.user = get_user_model().objects.create_user(
+            username='nurse', password='pw', practitioner=practitioner,
+        )
+        self.patient = Patient.objects.create(
+            patient_id='WAH-2026-00002', first_name='Ana', last_name='Santos',
+        )
+
+    def tearDown(self):
+        # Throttle counters live in the shared cache; don't spend other suites' budget
+        cache.clear()
+
+    def test_fetch_returns_202_without_calling_gateway(self):
+        with patch('patients.wah4pc.GatewayClient.send') as send:
+            response = self.client.post(
+                '/api/patients/wah4pc/fetch',
+                {'targetProviderId': 'provider-1', 'philHealthId': '12-345678901-2'},
+                format='json',
+            )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'QUEUED')
+        send.assert_not_called()
+        self.assertTrue(WAH4PCTransaction.objects.filter(
+            transaction_id=response.data['transactionId'], type='fetch',
+        ).exists())
+
+    def test_send_queues_patient_snapshot(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            '/api/patients/wah4pc/send',
+            {'patientId': self.patient.id, 'targetProviderId': 'provider-1'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        txn = WAH4PCTransaction.objects.get(transaction_id=response.data['transactionId'])
+        self.assertEqual(txn.related_patient, self.patient)
+        self.assertEqual(txn.outbound_payload['data']['resourceType'], 'Patient')
+
+    def test_transfer_queues_one_bundle(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            '/api/patients/wah4pc/transfer',
+            {'patientId': self.patient.id, 'targetProviderId': 'provider-1'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['entries'], 1)
+        txn = WAH4PCTransaction.objects.get(transaction_id=response.data['transactionId'])
+        self.assertEqual(txn.type, 'transfer')
+        self.assertEqual(txn.outbound_payload['resource']['type'], 'transaction')
+
+        detail = self.client.get(f'/api/patients/wah4pc/transactions/{txn.transaction_id}/')
+        self.assertEqual(detail.data['entries'][0]['status'], 'QUEUED')
+
+    @patch.dict(os.environ, {'GATEWAY_AUTH_KEY': 'secret'})
+    def test_webhook_and_status_match_gateway_id(self):
+        self.client.force_authenticate(self.user)
+        txn = gateway_outbox.enqueue_patient_fetch('provider-1', '12-345678901-2')
+        gateway_outbox.process_due(client=_FakeClient(_FakeResponse(202, {'transactionId': 'gw-4'})))
+
+        response = self.client.post(
+            '/fhir/receive-results',
+            {'transactionId': 'gw-4', 'status': 'FAILED', 'data': {'error': 'No match'}},
+            format='json',
+            HTTP_X_GATEWAY_AUTH='secret',
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(f'/api/patients/wah4pc/transactions/{txn.transaction_id}/')
+        self.assertEqual(response.data['status'], 'FAILED')
+        self.assertEqual(response.data['gatewayTransactionId'], 'gw-4')
+        self.assertEqual(response.data['error'], 'No match')
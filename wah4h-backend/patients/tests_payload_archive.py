@@ -0,0 +1,130 @@
+"""
+WAH4PC Payload Archive Tests
+============================
+Expired payloads move to the compressed archive table in bounded batches,
+and every read path returns them as if they had never left.
+"""
+
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import Practitioner
+from patients.models import WAH4PCPayloadArchive, WAH4PCTransaction
+from patients.services import payload_archive
+
+
+PAYLOAD = {'resourceType': 'Bundle', 'entry': [{'resource': {'resourceType': 'Patient', 'id': 'p-1'}}]}
+
+
+def _txn(txn_id, age_days, status='COMPLETED', payload=PAYLOAD):
+    txn = WAH4PCTransaction.objects.create(
+        transaction_id=txn_id, type='receive_push', status=status, raw_payload=payload,
+    )
+    WAH4PCTransaction.objects.filter(pk=txn.pk).update(created_at=timezone.now() - timedelta(days=age_days))
+    return txn
+
+
+class PayloadArchiveTests(TestCase):
+
+    def test_archives_only_expired_finished_rows(self):
+        old = _txn('old', 120)
+        _txn('recent', 5)
+        _txn('pending', 120, status='PENDING')
+
+        self.assertEqual(payload_archive.archive_expired(days=90), 1)
+
+        old.refresh_from_db()
+        self.assertIsNone(old.raw_payload)
+        self.assertEqual(len(old.payload_sha256), 64)
+        self.assertEqual(payload_archive.load_payload(old), PAYLOAD)
+        self.assertEqual(
+            set(WAH4PCTransaction.objects.filter(raw_payload__isnull=False).values_list('transaction_id', flat=True)),
+            {'recent', 'pending'},
+        )
+
+    def test_outbound_payload_is_archived_with_its_own_hash(self):
+        bundle = {'resourceType': 'Bundle', 'type': 'transaction', 'entry': []}
+        send = _txn('send', 120, payload=None)
+        WAH4PCTransaction.objects.filter(pk=send.pk).update(type='send', outbound_payload=bundle)
+
+        self.assertEqual(payload_archive.archive_expired(days=90), 1)
+
+        send.refresh_from_db()
+        self.assertIsNone(send.outbound_payload)
+        self.assertIsNone(send.payload_sha256)
+        self.assertEqual(len(send.outbound_sha256), 64)
+        self.assertIsNone(send.payload_archive.data)
+        self.assertEqual(payload_archive.load_payload(send, outbound=True), bundle)
+        self.assertIsNone(payload_archive.load_payload(send))
+
+        WAH4PCPayloadArchive.objects.filter(pk=send.payload_archive_id).update(
+            outbound_data=payload_archive.encode(PAYLOAD)[0],
+        )
+        send.refresh_from_db()
+        with self.assertRaises(payload_archive.PayloadIntegrityError):
+            payload_archive.load_payload(send, outbound=True)
+
+    def test_batches_are_bounded(self):
+        for i in range(5):
+            _txn(f'old-{i}', 100)
+
+        self.assertEqual(payload_archive.archive_expired(days=90, batch_size=2, max_batches=2), 4)
+        self.assertEqual(payload_archive.archivable(90).count(), 1)
+        self.assertEqual(payload_archive.archive_expired(days=90, batch_size=2), 1)
+        self.assertEqual(WAH4PCPayloadArchive.objects.count(), 5)
+
+    def test_tampered_archive_is_rejected(self):
+        txn = _txn('old', 120)
+        payload_archive.archive_batch(days=90)
+        txn.refresh_from_db()
+        data, _, _ = payload_archive.encode({'resourceType': 'Bundle'})
+        WAH4PCPayloadArchive.objects.filter(pk=txn.payload_archive_id).update(data=data)
+
+        txn.refresh_from_db()
+        with self.assertRaises(payload_archive.PayloadIntegrityError):
+            payload_archive.load_payload(txn)
+
+    def test_command(self):
+        _txn('old', 120)
+        out = StringIO()
+        call_command('archive_wah4pc_payloads', '--days', '90', '--dry-run', stdout=out)
+        self.assertIn('1 payload(s)', out.getvalue())
+
+        call_command('archive_wah4pc_payloads', '--days', '90', stdout=out)
+        self.assertIn('Archived 1', out.getvalue())
+        self.assertFalse(payload_archive.archivable(90).exists())
+
+
+class ArchivedPayloadApiTests(APITestCase):
+
+    def setUp(self):
+        practitioner = Practitioner.objects.create(identifier='DOC-A-001', first_name='Test', last_name='Doctor')
+        user = get_user_model().objects.create_user(username='archivist', password='pw', practitioner=practitioner)
+        self.client.force_authenticate(user)
+        _txn('old', 120)
+        payload_archive.archive_expired(days=90)
+
+    def tearDown(self):
+        # Throttle counters live in the shared cache; don't spend other suites' budget
+        cache.clear()
+
+    def test_reads_decompress_transparently(self):
+        detail = self.client.get('/api/patients/wah4pc/transactions/old/')
+        self.assertEqual(detail.status_code, status.HTTP_200_OK)
+        self.assertEqual(detail.data['rawPayload'], PAYLOAD)
+        self.assertTrue(detail.data['payloadArchived'])
+
+        body = self.client.get('/api/patients/wah4pc/transactions/old/payload').data
+        self.assertEqual((body['rawPayload'], body['outboundPayload']), (PAYLOAD, None))
+        listing = self.client.get('/api/patients/wah4pc/transactions/').data
+        self.assertEqual(listing['results'][0]['rawPayload'], PAYLOAD)
+        slim = self.client.get('/api/patients/wah4pc/transactions/', {'view': 'slim'}).data
+        self.assertTrue(slim['results'][0]['hasPayload'])
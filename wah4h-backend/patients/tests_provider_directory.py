@@ -0,0 +1,114 @@
+"""
+WAH4PC Provider Directory Tests
+===============================
+The directory answers from memory or the persisted table, refreshes stale
+data without making the caller wait, and keeps serving when the gateway
+fails.
+"""
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from patients.models import WAH4PCProvider
+from patients.services import provider_directory
+
+
+PROVIDERS = [
+    {'id': 'p-1', 'name': 'Ospital ng Maynila', 'type': 'hospital', 'isActive': True},
+    {'id': 'p-2', 'name': 'Closed Clinic', 'type': 'clinic', 'isActive': False},
+]
+
+
+class _FakeGateway:
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.answers.pop(0)
+
+
+class ProviderDirectoryTests(TestCase):
+
+    def test_cold_start_fetches_once_and_persists(self):
+        gateway = _FakeGateway(PROVIDERS)
+        directory = provider_directory.ProviderDirectory(ttl=300, fetch=gateway)
+
+        self.assertEqual([p['id'] for p in directory.providers()], ['p-1'])
+        self.assertEqual(directory.provider('p-2')['name'], 'Closed Clinic')
+        self.assertEqual(gateway.calls, 1)
+        self.assertEqual(WAH4PCProvider.objects.count(), 2)
+
+    def test_new_process_starts_from_table(self):
+        provider_directory.ProviderDirectory(fetch=_FakeGateway(PROVIDERS)).refresh()
+        gateway = _FakeGateway()
+        directory = provider_directory.ProviderDirectory(ttl=300, fetch=gateway)
+
+        self.assertEqual(directory.provider('p-1')['type'], 'hospital')
+        self.assertEqual(gateway.calls, 0)
+
+    def test_stale_copy_served_while_refreshing(self):
+        gateway = _FakeGateway(PROVIDERS, [PROVIDERS[0], {'id': 'p-3', 'name': 'New RHU'}])
+        directory = provider_directory.ProviderDirectory(ttl=300, fetch=gateway)
+        directory.refresh()
+        WAH4PCProvider.objects.update(fetched_at=timezone.now() - timedelta(hours=1))
+        directory.load()
+
+        with patch.object(directory, '_spawn_refresh') as spawn:
+            served = directory.providers(include_inactive=True)
+        spawn.assert_called_once()
+        self.assertEqual({p['id'] for p in served}, {'p-1', 'p-2'})
+
+        # What the background thread runs
+        self.assertTrue(directory.refresh_if_stale())
+        self.assertEqual({p['id'] for p in directory.providers(include_inactive=True)}, {'p-1', 'p-3'})
+        self.assertFalse(WAH4PCProvider.objects.filter(provider_id='p-2').exists())
+
+    def test_gateway_failure_keeps_last_copy(self):
+        gateway = _FakeGateway(PROVIDERS, None)
+        directory = provider_directory.ProviderDirectory(ttl=0, fetch=gateway)
+        directory.refresh()
+
+        self.assertFalse(directory.refresh())
+        self.assertEqual(directory.provider('p-1')['name'], 'Ospital ng Maynila')
+        # Retry is held off rather than attempted on every read
+        directory.providers()
+        self.assertEqual(gateway.calls, 2)
+
+    def test_refresh_if_stale_skips_fresh_table(self):
+        provider_directory.ProviderDirectory(fetch=_FakeGateway(PROVIDERS)).refresh()
+        gateway = _FakeGateway()
+        directory = provider_directory.ProviderDirectory(ttl=300, fetch=gateway)
+
+        self.assertFalse(directory.refresh_if_stale())
+        self.assertEqual(gateway.calls, 0)
+
+
+class ProviderApiTests(APITestCase):
+
+    def setUp(self):
+        self.directory = provider_directory.ProviderDirectory(ttl=300, fetch=_FakeGateway(PROVIDERS))
+        patcher = patch.object(provider_directory, 'get_provider_directory', return_value=self.directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        # Throttle counters live in the shared cache; don't spend other suites' budget
+        cache.clear()
+
+    def test_list_and_lookup(self):
+        response = self.client.get('/api/patients/wah4pc/providers/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in response.data], ['p-1'])
+
+        self.assertEqual(self.client.get('/api/patients/wah4pc/providers/p-2/').data['isActive'], False)
+        missing = self.client.get('/api/patients/wah4pc/providers/nope/')
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,207 @@
+"""
+WAH4PC Process-Query Pool Tests
+===============================
+Covers the bounded worker pool behind /fhir/process-query: job execution,
+backpressure, metrics, and recovery of PROCESSING rows.
+"""
+
+import json
+import os
+import threading
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from patients.models import Patient, WAH4PCTransaction
+from patients.services import query_worker
+
+
+class _FakeResponse:
+    status_code = 200
+    text = ''
+
+
+class _FakeClient:
+
+    def __init__(self):
+        self.posts = []
+
+    def post_stream(self, url, endpoint, chunks, idempotency_key=None, gzip=False):
+        self.posts.append((url, json.loads(b''.join(chunks))))
+        return _FakeResponse()
+
+
+def _query_payload(txn_id, **extra):
+    return {
+        'transactionId': txn_id,
+        'gatewayReturnUrl': 'https://gateway.example/api/v1/fhir/receive/Patient',
+        'requesterId': 'provider-9',
+        'identifiers': [{'system': 'http://philhealth.gov.ph', 'value': '12-345678901-2'}],
+        **extra,
+    }
+
+
+class QueryJobTests(TestCase):
+
+    def setUp(self):
+        self.patient = Patient.objects.create(
+            patient_id='WAH-2026-00001', first_name='Juan', last_name='Dela Cruz',
+            philhealth_id='12-345678901-2',
+        )
+        self.gateway = _FakeClient()
+        patcher = patch('patients.wah4pc.get_gateway_client', return_value=self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_run_query_answers_gateway(self):
+        txn = query_worker.create_query_job(_query_payload('q-1'))
+        self.assertTrue(query_worker.run_query(txn.pk, txn.updated_at))
+
+        txn.refresh_from_db()
+        self.assertEqual(txn.status, 'COMPLETED')
+        self.assertEqual(txn.related_patient, self.patient)
+        url, body = self.gateway.posts[0]
+        self.assertEqual(body['status'], 'SUCCESS')
+        self.assertEqual(body['data']['resourceType'], 'Patient')
+
+    def test_unknown_patient_is_rejected(self):
+        txn = query_worker.create_query_job(_query_payload(
+            'q-2', identifiers=[{'system': 'http://philhealth.gov.ph', 'value': 'nope'}],
+        ))
+        query_worker.run_query(txn.pk, txn.updated_at)
+        self.assertEqual(self.gateway.posts[0][1], {
+            'transactionId': 'q-2', 'status': 'REJECTED', 'data': {'error': 'Patient not found'},
+        })
+
+    def test_bundle_answer_is_streamed(self):
+        txn = query_worker.create_query_job(_query_payload('q-7', resourceType='Immunization'))
+        query_worker.run_query(txn.pk, txn.updated_at)
+        body = self.gateway.posts[0][1]
+        self.assertEqual(body['status'], 'SUCCESS')
+        self.assertEqual(body['data'], {'resourceType': 'Bundle', 'type': 'collection', 'entry': []})
+
+    def test_redelivery_is_not_a_new_job(self):
+        self.assertIsNotNone(query_worker.create_query_job(_query_payload('q-3')))
+        self.assertIsNone(query_worker.create_query_job(_query_payload('q-3')))
+
+    def test_stale_stamp_is_skipped(self):
+        txn = query_worker.create_query_job(_query_payload('q-4'))
+        self.assertFalse(query_worker.run_query(txn.pk, txn.updated_at - timedelta(seconds=1)))
+        self.assertEqual(self.gateway.posts, [])
+
+    def test_run_taken_over_mid_answer_is_not_recorded(self):
+        txn = query_worker.create_query_job(_query_payload('q-8', resourceType='Immunization'))
+        takeover = timezone.now() + timedelta(minutes=5)
+
+        def post_stream(url, endpoint, chunks, **kwargs):
+            chunks = iter(chunks)
+            next(chunks)
+            # Another process's recover() re-stamps the row mid-upload
+            WAH4PCTransaction.objects.filter(pk=txn.pk).update(updated_at=takeover)
+            b''.join(chunks)
+            return _FakeResponse()
+
+        with patch.object(self.gateway, 'post_stream', side_effect=post_stream):
+            # Lease not due for renewal: the answer goes out, the result is not written
+            with self.assertLogs('patients.services.query_worker', 'WARNING') as logs:
+                self.assertTrue(query_worker.run_query(txn.pk, txn.updated_at))
+            self.assertIn('not recording', logs.output[0])
+            self.assertEqual(WAH4PCTransaction.objects.get(pk=txn.pk).status, 'PROCESSING')
+
+            # Renewed per chunk: the upload stops at the first chunk after the takeover
+            WAH4PCTransaction.objects.filter(pk=txn.pk).update(updated_at=txn.updated_at)
+            with patch.object(query_worker, 'LEASE_RENEW_INTERVAL', 0), \
+                    self.assertLogs('patients.services.query_worker', 'WARNING') as logs:
+                self.assertTrue(query_worker.run_query(txn.pk, txn.updated_at))
+            self.assertIn('mid-answer', logs.output[0])
+
+        txn.refresh_from_db()
+        self.assertEqual((txn.status, txn.updated_at), ('PROCESSING', takeover))
+
+    def test_lease_is_renewed_while_streaming(self):
+        txn = query_worker.create_query_job(_query_payload('q-9', resourceType='Immunization'))
+        with patch.object(query_worker, 'LEASE_RENEW_INTERVAL', 0):
+            self.assertTrue(query_worker.run_query(txn.pk, txn.updated_at))
+        txn.refresh_from_db()
+        self.assertEqual(txn.status, 'COMPLETED')
+
+    def test_recover_requeues_stalled_rows_once(self):
+        txn = query_worker.create_query_job(_query_payload('q-5'))
+        WAH4PCTransaction.objects.filter(pk=txn.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        query_worker.create_query_job(_query_payload('q-6'))  # fresh, left alone
+
+        pool = query_worker.QueryWorkerPool(recovery_interval=None)
+        self.assertEqual(pool.recover(), 1)
+        self.assertEqual(pool.recover(), 0)
+        self.assertEqual(pool.metrics()['queue_depth'], 1)
+
+
+class QueryWorkerPoolTests(SimpleTestCase):
+
+    def test_bounded_queue_and_metrics(self):
+        release = threading.Event()
+        ran = []
+
+        def handler(pk, stamp):
+            release.wait(5)
+            ran.append(pk)
+            return True
+
+        pool = query_worker.QueryWorkerPool(workers=1, max_queue=2, handler=handler, recovery_interval=None)
+        jobs = [WAH4PCTransaction(pk=n, updated_at=timezone.now()) for n in range(1, 6)]
+        accepted = [pool.submit(job) for job in jobs]
+
+        # One job may already be with the worker; at most one more than the queue holds
+        self.assertIn(accepted.count(True), (2, 3))
+        self.assertFalse(accepted[-1])
+        self.assertGreaterEqual(pool.metrics()['rejected'], 2)
+
+        release.set()
+        pool.join()
+        metrics = pool.metrics()
+        self.assertEqual(metrics['processed'], accepted.count(True))
+        self.assertEqual(metrics['queue_depth'], 0)
+        self.assertEqual(metrics['busy_workers'], 0)
+        self.assertGreater(metrics['avg_run_ms'], 0)
+
+
+@patch.dict(os.environ, {'GATEWAY_AUTH_KEY': 'secret'})
+class ProcessQueryWebhookTests(APITestCase):
+
+    def tearDown(self):
+        # Throttle counters live in the shared cache; don't spend other suites' budget
+        cache.clear()
+
+    def _post(self, payload):
+        return self.client.post(
+            '/fhir/process-query', payload, format='json', HTTP_X_GATEWAY_AUTH='secret',
+        )
+
+    def test_query_is_recorded_and_submitted(self):
+        pool = query_worker.QueryWorkerPool(recovery_interval=None)
+        with patch.object(query_worker, 'get_query_pool', return_value=pool), \
+                patch.object(pool, 'submit', return_value=True) as submit:
+            response = self._post(_query_payload('q-10'))
+            duplicate = self._post(_query_payload('q-10'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(duplicate.status_code, status.HTTP_200_OK)
+        self.assertEqual(submit.call_count, 1)
+        txn = WAH4PCTransaction.objects.get(transaction_id='q-10')
+        self.assertEqual((txn.type, txn.status), ('receive_query', 'PROCESSING'))
+
+    def test_full_queue_pushes_back(self):
+        pool = query_worker.QueryWorkerPool(recovery_interval=None)
+        with patch.object(query_worker, 'get_query_pool', return_value=pool), \
+                patch.object(pool, 'submit', return_value=False):
+            response = self._post(_query_payload('q-11'))
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], str(query_worker.BUSY_RETRY_AFTER))
+        # Dropped so the gateway's redelivery is treated as new
+        self.assertFalse(WAH4PCTransaction.objects.filter(transaction_id='q-11').exists())
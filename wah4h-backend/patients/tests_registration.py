@@ -0,0 +1,77 @@
+"""
+Patient Registration Dedup Tests
+================================
+Covers the normalised dedup keys on Patient and the duplicate check shared by
+register_patient, the bulk importer and the webhook auto-register fallback.
+"""
+
+import os
+from unittest.mock import patch
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from patients.models import Patient, WAH4PCTransaction, name_key
+from patients.services.patients_services import PatientRegistrationService
+
+
+class PatientDedupKeyTests(TestCase):
+
+    def setUp(self):
+        self.patient = Patient.objects.create(
+            patient_id='WAH-2026-00301', first_name='  José ', last_name='Dela  PEÑA',
+            birthdate='1985-04-12', gender='male',
+        )
+
+    def test_name_key(self):
+        self.assertEqual(name_key('  Dela  PEÑA '), 'dela pena')
+        self.assertEqual(name_key(None), '')
+
+    def test_keys_maintained_on_save(self):
+        self.assertEqual((self.patient.first_name_key, self.patient.last_name_key), ('jose', 'dela pena'))
+        self.patient.last_name = 'Santos'
+        self.patient.save(update_fields=['last_name'])
+        self.patient.refresh_from_db()
+        self.assertEqual(self.patient.last_name_key, 'santos')
+
+    def test_find_duplicate_matches_normalised_names(self):
+        found = PatientRegistrationService.find_duplicate('JOSE', 'dela pena', '1985-04-12')
+        self.assertEqual(found, self.patient)
+        self.assertIsNone(PatientRegistrationService.find_duplicate('Jose', 'Dela Pena', '1985-04-13'))
+        self.assertIsNone(PatientRegistrationService.find_duplicate('', 'Dela Pena', '1985-04-12'))
+
+    def test_missing_birthdate_matches_only_on_request(self):
+        undated = Patient.objects.create(patient_id='WAH-2026-00302', first_name='Ana', last_name='Reyes')
+        self.assertIsNone(PatientRegistrationService.find_duplicate('Ana', 'Reyes', None))
+        self.assertEqual(
+            PatientRegistrationService.find_duplicate('ana', 'REYES', None, match_missing_birthdate=True), undated,
+        )
+        self.assertIsNone(
+            PatientRegistrationService.find_duplicate('Jose', 'Dela Pena', None, match_missing_birthdate=True),
+        )
+
+    @patch.dict(os.environ, {'GATEWAY_AUTH_KEY': 'secret'})
+    def test_webhook_links_undated_patient_to_undated_record(self):
+        undated = Patient.objects.create(patient_id='WAH-2026-00302', first_name='Ana', last_name='Reyes')
+        txn = WAH4PCTransaction.objects.create(transaction_id='gw-7', type='fetch', status='PENDING')
+        APIClient().post(
+            '/fhir/receive-results',
+            {
+                'transactionId': 'gw-7', 'status': 'SUCCESS',
+                'data': {'resourceType': 'Patient', 'name': [{'family': 'Reyes', 'given': ['Ana']}]},
+            },
+            format='json', HTTP_X_GATEWAY_AUTH='secret',
+        )
+        txn.refresh_from_db()
+        self.assertEqual(txn.related_patient, undated)
+
+    def test_register_patient_rejects_accent_and_case_variants(self):
+        with self.assertRaises(ValidationError):
+            PatientRegistrationService.register_patient(
+                {'first_name': 'jose', 'last_name': 'Dela Pena', 'birthdate': '1985-04-12'}
+            )
+
+    def test_dedup_is_single_query(self):
+        with self.assertNumQueries(1):
+            PatientRegistrationService.find_duplicate('Jose', 'Dela Pena', '1985-04-12')
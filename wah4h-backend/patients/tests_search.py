@@ -0,0 +1,113 @@
+"""
+Patient Search Engine Tests
+===========================
+Covers the PatientSearchTerm index maintained by post_save and the ranked
+search exposed through patient_acl.search_patients and the API endpoints.
+"""
+
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from patients.models import Patient, PatientSearchTerm, name_key
+from patients.services import patient_acl, patient_search
+
+
+class PatientSearchIndexTests(TestCase):
+
+    def setUp(self):
+        self.juan = Patient.objects.create(
+            patient_id='WAH-2026-00001', first_name='Juan', middle_name='Santos',
+            last_name='Dela Cruz', philhealth_id='12-345678901-2',
+        )
+        self.maria = Patient.objects.create(
+            patient_id='WAH-2026-00002', first_name='María', last_name='Peñaflor',
+        )
+        self.cruzada = Patient.objects.create(
+            patient_id='WAH-2026-00003', first_name='Pedro', last_name='Cruzada',
+        )
+
+    def test_index_maintained_on_save(self):
+        self.assertTrue(
+            PatientSearchTerm.objects.filter(patient=self.juan, kind='word', term='cruz').exists()
+        )
+        self.juan.last_name = 'Reyes'
+        self.juan.save()
+        self.assertFalse(
+            PatientSearchTerm.objects.filter(patient=self.juan, kind='word', term='cruz').exists()
+        )
+        self.assertEqual(patient_search.search('reyes'), [self.juan.id])
+
+    def test_exact_word_ranks_above_prefix(self):
+        self.assertEqual(patient_search.search('cruz'), [self.juan.id, self.cruzada.id])
+
+    def test_prefix_match(self):
+        self.assertEqual(patient_search.search('cruzad'), [self.cruzada.id])
+        # "cruza" still fuzzy-matches plain "cruz", but the prefix hit ranks first
+        self.assertEqual(patient_search.search('cruza')[0], self.cruzada.id)
+
+    def test_accent_insensitive(self):
+        self.assertEqual(patient_search.search('penaflor'), [self.maria.id])
+        self.assertEqual(patient_search.search('Maria'), [self.maria.id])
+
+    def test_tokens_follow_the_dedup_key(self):
+        for name in ('  Dela  PEÑA ', 'ﬁlipina', 'Zoë'):
+            self.assertEqual(patient_search.name_tokens(name), name_key(name).split())
+
+    def test_fuzzy_match(self):
+        self.assertIn(self.maria.id, patient_search.search('penaflr'))
+
+    def test_philhealth_and_hospital_id(self):
+        self.assertEqual(patient_search.search('12-345678901-2'), [self.juan.id])
+        self.assertEqual(patient_search.search('WAH-2026-00002'), [self.maria.id])
+        self.assertEqual(len(patient_search.search('wah-2026')), 3)
+
+    def test_inactive_patients_excluded(self):
+        self.cruzada.active = False
+        self.cruzada.save()
+        self.assertEqual(patient_search.search('cruz'), [self.juan.id])
+
+    def test_rebuild_command(self):
+        PatientSearchTerm.objects.all().delete()
+        self.assertEqual(patient_search.search('cruz'), [])
+        call_command('rebuild_patient_search_index', verbosity=0, stdout=open('/dev/null', 'w'))
+        self.assertEqual(patient_search.search('cruz'), [self.juan.id, self.cruzada.id])
+
+    def test_acl_returns_summary_dtos_in_rank_order(self):
+        results = patient_acl.search_patients('cruz')
+        self.assertEqual([r['id'] for r in results], [self.juan.id, self.cruzada.id])
+        self.assertEqual(results[0]['full_name'], 'Juan Santos Dela Cruz')
+
+
+class PatientSearchApiTests(APITestCase):
+
+    def setUp(self):
+        self.patient = Patient.objects.create(
+            patient_id='WAH-2026-00010', first_name='Ana', last_name='Santos',
+            philhealth_id='98-765432109-8',
+        )
+
+    def test_patient_search_endpoint(self):
+        response = self.client.get('/api/patients/search/', {'q': 'santos'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['id'], self.patient.id)
+
+    def test_search_limit_is_parsed_and_capped(self):
+        for limit in ('abc', '-1', '100000'):
+            response = self.client.get('/api/patients/search/', {'q': 'santos', 'limit': limit})
+            self.assertEqual(response.status_code, status.HTTP_200_OK, limit)
+        with patch.object(patient_acl, 'search_patients', return_value=[]) as search:
+            self.client.get('/api/patients/search/', {'q': 'santos', 'limit': '100000'})
+        self.assertEqual(search.call_args.args[1], 200)
+
+    def test_encounter_search_patients_endpoint(self):
+        response = self.client.get(
+            '/api/admission/encounters/search_patients/', {'q': '98-765432109-8'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['patientId'], 'WAH-2026-00010')
+        self.assertEqual(response.data[0]['philhealth'], '98-765432109-8')
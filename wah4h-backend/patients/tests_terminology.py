@@ -0,0 +1,81 @@
+"""
+Terminology Lookup Tests
+========================
+PSGC and PH-Core code lookups work in both directions, so a Patient
+exported with patient_to_fhir comes back through fhir_to_dict with the
+codes the DB stores.
+"""
+
+from datetime import date
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from patients import terminology, wah4pc
+from patients.models import Patient
+
+
+class PsgcIndexTests(SimpleTestCase):
+
+    def setUp(self):
+        self.psgc = terminology.psgc()
+
+    def test_city_both_ways(self):
+        self.assertEqual(self.psgc.city_code('1381100000'), '137605000')
+        self.assertEqual(self.psgc.city_name('1381100000'), 'Pasay City')
+        self.assertEqual(self.psgc.city_from_code('137605000'), '1381100000')
+        # Export display and the registration form's name both resolve
+        self.assertEqual(self.psgc.city_from_name('Caloocan City'), '1380100000')
+        self.assertEqual(self.psgc.city_from_name('city of  caloocan'), '1380100000')
+        self.assertEqual(self.psgc.city_name('9999999999'), '9999999999')
+
+    def test_region_both_ways(self):
+        self.assertEqual(self.psgc.region_code('NCR'), '130000000')
+        self.assertEqual(self.psgc.region_from_code('030000000'), 'III')
+        self.assertIsNone(self.psgc.region_code('Metro'))
+
+    def test_barangay_codes(self):
+        self.assertEqual(self.psgc.barangay_code('1381100000', 'Barangay 17'), '137605017')
+        self.assertEqual(self.psgc.barangay_from_code('137605017'), ('1381100000', 'Barangay 17'))
+        # Outside the packaged lists: derived the same way, memoized
+        self.assertEqual(self.psgc.barangay_code('1381100000', 'Barangay 999'), '137605999')
+        self.assertIsNone(self.psgc.barangay_code('9999999999', 'Barangay 1'))
+
+    def test_code_tables(self):
+        self.assertEqual(terminology.RELIGION.code('Islam'), '1012')
+        self.assertEqual(terminology.EDUCATION.display('vocational-technical'), 'Vocational/Technical')
+        self.assertEqual(terminology.OCCUPATION.display('2'), 'Professionals')
+
+
+class AddressRoundTripTests(TestCase):
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_patient_round_trip_keeps_stored_codes(self):
+        patient = Patient.objects.create(
+            patient_id='WAH-2026-00077', first_name='Maria', last_name='Santos',
+            gender='female', birthdate=date(1990, 1, 1), religion='Islam',
+            address_line='Barangay 17', address_city='1381100000', address_state='NCR',
+        )
+        fhir = wah4pc.patient_to_fhir(patient)
+        self.assertEqual(fhir['address'][0]['city'], 'Pasay City')
+
+        data = wah4pc.fhir_to_dict(fhir)
+        self.assertEqual(
+            (data['address_line'], data['address_city'], data['address_state'], data['religion']),
+            ('Barangay 17', '1381100000', 'NCR', 'Islam'),
+        )
+
+    def test_codes_without_display(self):
+        fhir = {
+            'resourceType': 'Patient',
+            'name': [{'family': 'Reyes', 'given': ['Jose']}],
+            'extension': [{
+                'url': 'urn://example.com/ph-core/fhir/StructureDefinition/occupation',
+                'valueCodeableConcept': {'coding': [{'code': '2'}]},
+            }],
+            'address': [{'city': 'City of Makati'}],
+        }
+        data = wah4pc.fhir_to_dict(fhir)
+        self.assertEqual((data['occupation'], data['address_city']), ('Professionals', '1380300000'))
@@ -0,0 +1,100 @@
+"""
+WAH4PC Transaction Log Listing Tests
+====================================
+The slim list leaves raw_payload out, pages by cursor, and answers its
+count from cache; the payload is fetched per transaction.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import Practitioner
+from patients.models import WAH4PCTransaction
+
+
+LIST_URL = '/api/patients/wah4pc/transactions/'
+
+
+class SlimTransactionListTests(APITestCase):
+
+    def setUp(self):
+        practitioner = Practitioner.objects.create(identifier='DOC-L-001', first_name='Test', last_name='Doctor')
+        self.user = get_user_model().objects.create_user(
+            username='logviewer', password='pw', practitioner=practitioner,
+        )
+        self.client.force_authenticate(self.user)
+        for i in range(5):
+            WAH4PCTransaction.objects.create(
+                transaction_id=f'txn-{i}', type='fetch', status='COMPLETED' if i % 2 else 'FAILED',
+                raw_payload={'resourceType': 'Bundle', 'n': i} if i != 4 else None,
+            )
+
+    def tearDown(self):
+        # Throttle counters live in the shared cache; don't spend other suites' budget
+        cache.clear()
+
+    def test_slim_rows_leave_payload_out(self):
+        response = self.client.get(LIST_URL, {'view': 'slim'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['countIsApproximate'])
+        self.assertEqual(response.data['count'], 5)
+
+        rows = response.data['results']
+        self.assertEqual([r['id'] for r in rows], ['txn-4', 'txn-3', 'txn-2', 'txn-1', 'txn-0'])
+        self.assertNotIn('rawPayload', rows[0])
+        self.assertEqual([r['hasPayload'] for r in rows[:2]], [False, True])
+        self.assertIsNone(response.data['nextCursor'])
+
+    def test_outbound_only_rows_have_payload(self):
+        WAH4PCTransaction.objects.create(
+            transaction_id='send-1', type='send', status='COMPLETED', outbound_payload={'resourceType': 'Bundle'},
+        )
+        WAH4PCTransaction.objects.create(
+            transaction_id='send-2', type='send', status='COMPLETED', outbound_sha256='0' * 64,  # archived
+        )
+        rows = self.client.get(LIST_URL, {'view': 'slim'}).data['results']
+        self.assertEqual([(r['id'], r['hasPayload']) for r in rows[:2]], [('send-2', True), ('send-1', True)])
+
+    def test_cursor_walks_every_row_once(self):
+        seen, params = [], {'view': 'slim', 'page_size': 2}
+        while True:
+            data = self.client.get(LIST_URL, params).data
+            seen += [r['id'] for r in data['results']]
+            if not data['nextCursor']:
+                break
+            params['cursor'] = data['nextCursor']
+        self.assertEqual(seen, ['txn-4', 'txn-3', 'txn-2', 'txn-1', 'txn-0'])
+
+        filtered = self.client.get(LIST_URL, {'view': 'slim', 'status': 'FAILED'}).data
+        self.assertEqual([r['id'] for r in filtered['results']], ['txn-4', 'txn-2', 'txn-0'])
+
+    def test_bad_cursor(self):
+        response = self.client.get(LIST_URL, {'view': 'slim', 'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_count_is_cached(self):
+        self.client.get(LIST_URL, {'view': 'slim'})
+        WAH4PCTransaction.objects.create(transaction_id='txn-new', type='send', status='PENDING')
+
+        with self.assertNumQueries(1):
+            data = self.client.get(LIST_URL, {'view': 'slim'}).data
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(data['results'][0]['id'], 'txn-new')
+
+    def test_legacy_page_mode_unchanged(self):
+        data = self.client.get(LIST_URL, {'page_size': 2, 'page': 2}).data
+        self.assertEqual((data['page'], data['totalPages']), (2, 3))
+        self.assertEqual(data['results'][0]['rawPayload']['n'], 2)
+
+    def test_payload_endpoint(self):
+        response = self.client.get(f'{LIST_URL}txn-1/payload')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            {'id': 'txn-1', 'rawPayload': {'resourceType': 'Bundle', 'n': 1}, 'outboundPayload': None},
+        )
+
+        missing = self.client.get(f'{LIST_URL}nope/payload')
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
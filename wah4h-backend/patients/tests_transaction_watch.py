@@ -0,0 +1,152 @@
+"""
+WAH4PC Transaction Watch Tests
+==============================
+Long-poll and SSE waiters on a transaction's status are woken by the save
+in webhook_receive, without waiting for the periodic re-read.
+"""
+
+import json
+import os
+import threading
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TransactionTestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from accounts.models import Practitioner
+from patients.models import WAH4PCTransaction
+from patients.services import transaction_events
+
+
+def _pending(txn_id='txn-1', **extra):
+    return WAH4PCTransaction.objects.create(
+        transaction_id=txn_id, type='fetch', status='PENDING', **extra,
+    )
+
+
+class WaitForStatusChangeTests(TransactionTestCase):
+
+    def test_save_wakes_waiter(self):
+        txn = _pending()
+
+        def complete():
+            time.sleep(0.2)
+            row = WAH4PCTransaction.objects.get(pk=txn.pk)
+            row.status = 'COMPLETED'
+            row.save()
+
+        worker = threading.Thread(target=complete)
+        # Only a notification can wake the waiter this early
+        with patch.object(transaction_events, 'RECHECK_INTERVAL', 30):
+            worker.start()
+            started = time.monotonic()
+            fresh, changed = transaction_events.wait_for_status_change(txn, 'PENDING', timeout=10)
+        worker.join()
+
+        self.assertTrue(changed)
+        self.assertEqual(fresh.status, 'COMPLETED')
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(transaction_events.waiting(), 0)
+
+    def test_timeout_reports_unchanged(self):
+        txn = _pending()
+        fresh, changed = transaction_events.wait_for_status_change(txn, 'PENDING', timeout=0.1)
+        self.assertFalse(changed)
+        self.assertEqual(fresh.status, 'PENDING')
+
+    def test_release_connection_closes_it_between_reads(self):
+        txn = _pending()
+        with patch.object(transaction_events.connection, 'close') as close:
+            transaction_events.wait_for_status_change(txn, 'PENDING', timeout=0.05, release_connection=True)
+        self.assertTrue(close.called)
+
+    def test_already_changed_returns_at_once(self):
+        txn = _pending()
+        fresh, changed = transaction_events.wait_for_status_change(txn, 'QUEUED', timeout=10)
+        self.assertTrue(changed)
+
+
+@patch.dict(os.environ, {'GATEWAY_AUTH_KEY': 'secret'})
+class WatchEndpointTests(TransactionTestCase):
+
+    def setUp(self):
+        practitioner = Practitioner.objects.create(identifier='DOC-W-001', first_name='Test', last_name='Doctor')
+        self.user = get_user_model().objects.create_user(
+            username='watcher', password='pw', practitioner=practitioner,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        # Throttle counters live in the shared cache; don't spend other suites' budget
+        cache.clear()
+
+    def test_long_poll_returns_when_webhook_lands(self):
+        _pending('gw-9')
+
+        def webhook():
+            time.sleep(0.2)
+            APIClient().post(
+                '/fhir/receive-results',
+                {'transactionId': 'gw-9', 'status': 'FAILED', 'data': {'error': 'No match'}},
+                format='json', HTTP_X_GATEWAY_AUTH='secret',
+            )
+
+        worker = threading.Thread(target=webhook)
+        with patch.object(transaction_events, 'RECHECK_INTERVAL', 30):
+            worker.start()
+            response = self.client.get('/api/patients/wah4pc/transactions/gw-9/watch?timeout=10')
+        worker.join()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['changed'])
+        self.assertEqual((response.data['status'], response.data['error']), ('FAILED', 'No match'))
+
+    def test_long_poll_timeout_and_bad_timeout(self):
+        _pending()
+        response = self.client.get('/api/patients/wah4pc/transactions/txn-1/watch?timeout=0')
+        self.assertFalse(response.data['changed'])
+        self.assertEqual(response.data['status'], 'PENDING')
+
+        bad = self.client.get('/api/patients/wah4pc/transactions/txn-1/watch?timeout=soon')
+        self.assertEqual(bad.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_non_finite_timeout_is_rejected(self):
+        _pending()
+        for value in ('nan', 'inf', '-inf'):
+            response = self.client.get(f'/api/patients/wah4pc/transactions/txn-1/watch?timeout={value}')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, value)
+
+    def test_sse_stream_ends_on_terminal_status(self):
+        WAH4PCTransaction.objects.create(transaction_id='txn-2', type='send', status='COMPLETED')
+        response = self.client.get(
+            '/api/patients/wah4pc/transactions/txn-2/watch', HTTP_ACCEPT='text/event-stream',
+        )
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join(response.streaming_content).decode()
+        event, data = body.strip().split('\n')
+        self.assertEqual(event, 'event: status')
+        self.assertEqual(json.loads(data[len('data: '):])['status'], 'COMPLETED')
+
+    def test_watchers_beyond_the_limit_are_answered_at_once(self):
+        _pending()
+        turned_away = transaction_events.turned_away()
+        with patch.object(transaction_events, 'MAX_WATCHERS', 0):
+            started = time.monotonic()
+            response = self.client.get('/api/patients/wah4pc/transactions/txn-1/watch?timeout=10')
+            self.assertLess(time.monotonic() - started, 5)
+            self.assertFalse(response.data['changed'])
+            self.assertEqual(response['Retry-After'], '5')
+
+            stream = self.client.get(
+                '/api/patients/wah4pc/transactions/txn-1/watch', HTTP_ACCEPT='text/event-stream',
+            )
+            body = b''.join(stream.streaming_content).decode()
+        self.assertTrue(body.startswith('event: status\n'))
+        self.assertTrue(body.endswith('retry: 5000\n\n'))
+        self.assertEqual(transaction_events.turned_away() - turned_away, 2)
@@ -21,9 +21,14 @@ from patients.api.views import (
     ImmunizationViewSet,
     fetch_wah4pc,
     send_to_wah4pc,
+    transfer_to_wah4pc,
     list_providers,
+    get_provider,
     list_transactions,
     get_transaction,
+    get_transaction_payload,
+    watch_transaction,
+    gateway_metrics,
 )
 
 # Initialize router
@@ -41,10 +46,15 @@ router.register(r'', PatientViewSet, basename='patient')
 urlpatterns = [
     # WAH4PC Operations (your backend -> gateway)
     path('wah4pc/providers/', list_providers, name='wah4pc_list_providers'),
+    path('wah4pc/providers/<str:provider_id>/', get_provider, name='wah4pc_get_provider'),
     path('wah4pc/fetch', fetch_wah4pc, name='wah4pc_fetch'),
     path('wah4pc/send', send_to_wah4pc, name='wah4pc_send'),
+    path('wah4pc/transfer', transfer_to_wah4pc, name='wah4pc_transfer'),
     path('wah4pc/transactions/', list_transactions, name='wah4pc_list_transactions'),
     path('wah4pc/transactions/<str:transaction_id>/', get_transaction, name='wah4pc_get_transaction'),
+    path('wah4pc/transactions/<str:transaction_id>/watch', watch_transaction, name='wah4pc_watch_transaction'),
+    path('wah4pc/transactions/<str:transaction_id>/payload', get_transaction_payload, name='wah4pc_transaction_payload'),
+    path('wah4pc/metrics/', gateway_metrics, name='wah4pc_metrics'),
 
     # Patient API routes
     path('', include(router.urls)),
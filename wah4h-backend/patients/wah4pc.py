@@ -1,11 +1,17 @@
+import json
 import os
 import re
+import threading
 import time
 import uuid
 import zlib
 from datetime import datetime, timezone, date, timedelta
+from itertools import islice
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from patients import terminology
 
 URL = "https://wah4pc.echosphere.cfd"
 
@@ -35,171 +41,10 @@ _HL7_MARITAL_STATUS: dict[str, str] = {
 }
 
 # ---------------------------------------------------------------------------
-# PSGC lookup tables
+# PSGC and CodeableConcept code tables live in patients.terminology
+# (region / city / barangay codes and religion, education, occupation).
 # ---------------------------------------------------------------------------
 
-# City / municipality  — DB stores the 10-digit codes from addressData.json.
-# Display names use the national-registry "Name City" format (not "City of Name").
-_PSGC_CITY: dict[str, str] = {
-    "1380100000": "Caloocan City",
-    "1380200000": "Las Piñas City",
-    "1380300000": "Makati City",
-    "1380400000": "Malabon City",
-    "1380500000": "Mandaluyong City",
-    "1380600000": "Manila",           # Manila does not append "City" per PSA
-    "1380700000": "Marikina City",
-    "1380800000": "Muntinlupa City",
-    "1380900000": "Navotas City",
-    "1381000000": "Parañaque City",
-    "1381100000": "Pasay City",
-    "1381200000": "Pasig City",
-    "1381300000": "Quezon City",
-    "1381400000": "San Juan City",
-    "1381500000": "Taguig City",
-    "1381600000": "Valenzuela City",
-    "1381701000": "Pateros",          # municipality — no "City" suffix
-    # Central Luzon samples
-    "0310600000": "San Fernando City",
-    "0318200000": "Angeles City",
-    "0307400000": "Mabalacat City",
-}
-
-# Province / district codes
-_PSGC_PROVINCE: dict[str, str] = {
-    "NCR, All District": "NCR, All District",
-    "PAMP": "Pampanga",
-    "BUL":  "Bulacan",
-    "ZMB":  "Zambales",
-}
-
-# Region display names keyed on the short alphabetic code stored in the DB.
-_PSGC_REGION: dict[str, str] = {
-    "NCR":   "National Capital Region",
-    "CAR":   "Cordillera Administrative Region",
-    "I":     "Ilocos Region",
-    "II":    "Cagayan Valley",
-    "III":   "Central Luzon",
-    "IVA":   "CALABARZON",
-    "IVB":   "MIMAROPA",
-    "V":     "Bicol Region",
-    "VI":    "Western Visayas",
-    "VII":   "Central Visayas",
-    "VIII":  "Eastern Visayas",
-    "IX":    "Zamboanga Peninsula",
-    "X":     "Northern Mindanao",
-    "XI":    "Davao Region",
-    "XII":   "SOCCSKSARGEN",
-    "XIII":  "Caraga",
-    "BARMM": "Bangsamoro Autonomous Region in Muslim Mindanao",
-}
-
-# ---------------------------------------------------------------------------
-# 10-digit frontend code → 9-digit PSA PSGC code for city/municipality.
-# The addressData.json uses a 10-digit numbering system; the WAH4PC gateway
-# requires the official PSA 9-digit PSGC codes.
-# Source: PSA PSGC 2023 publication.
-# Codes annotated "confirmed" were verified against the Working-Version JSON.
-# All others should be cross-checked against the PSA PSGC release if errors
-# are encountered on the target system.
-# ---------------------------------------------------------------------------
-_PSGC_CITY_9: dict[str, str] = {
-    # NCR ─────────────────────────────────────────────────────────────────
-    "1380100000": "133701000",  # City of Caloocan
-    "1380200000": "137602000",  # City of Las Piñas
-    "1380300000": "137603000",  # City of Makati
-    "1380400000": "137604000",  # City of Malabon
-    "1380500000": "133800000",  # City of Mandaluyong
-    "1380600000": "133900000",  # City of Manila
-    "1380700000": "137607000",  # City of Marikina
-    "1380800000": "137608000",  # City of Muntinlupa
-    "1380900000": "137609000",  # City of Navotas
-    "1381000000": "137610000",  # City of Parañaque
-    "1381100000": "137605000",  # Pasay City — CONFIRMED (Working-Version JSON)
-    "1381200000": "137611000",  # City of Pasig
-    "1381300000": "133700000",  # Quezon City
-    "1381400000": "137612000",  # City of San Juan
-    "1381500000": "137613000",  # City of Taguig
-    "1381600000": "137614000",  # City of Valenzuela
-    "1381701000": "137615000",  # Pateros
-    # Central Luzon ────────────────────────────────────────────────────────
-    "0310600000": "035403000",  # City of San Fernando (Pampanga)
-    "0318200000": "035401000",  # City of Angeles
-    "0307400000": "035404000",  # Mabalacat City
-}
-
-# PSA 9-digit PSGC numeric codes for each region (used in valueCoding.code).
-_PSGC_REGION_CODE: dict[str, str] = {
-    "NCR":   "130000000",
-    "CAR":   "140000000",
-    "I":     "010000000",
-    "II":    "020000000",
-    "III":   "030000000",
-    "IVA":   "040000000",
-    "IVB":   "170000000",
-    "V":     "050000000",
-    "VI":    "060000000",
-    "VII":   "070000000",
-    "VIII":  "080000000",
-    "IX":    "090000000",
-    "X":     "100000000",
-    "XI":    "110000000",
-    "XII":   "120000000",
-    "XIII":  "160000000",
-    "BARMM": "190000000",
-}
-
-# ---------------------------------------------------------------------------
-# CodeableConcept code tables
-# The DB stores the display string. These maps give the canonical code that
-# the PH-Core CodeSystem expects in coding[].code.
-# ---------------------------------------------------------------------------
-
-_RELIGION_CODE: dict[str, str] = {
-    "Roman Catholic":        "1013",
-    "Islam":                 "1012",
-    "Iglesia ni Cristo":     "1018",
-    "Protestant":            "1022",
-    "Born Again Christian":  "1028",
-    "Baptist":               "1027",
-    "Seventh-day Adventist": "1024",
-    "Aglipayan":             "1011",
-    "Buddhism":              "1026",
-    "Hinduism":              "1025",
-    "None":                  "1000",
-    "Other":                 "1099",
-}
-
-# Educational attainment — slug codes matching the PH-Core CodeSystem
-_EDUCATION_CODE: dict[str, str] = {
-    "No Formal Education":   "no-formal-education",
-    "Elementary":            "elementary",
-    "High School":           "high-school",
-    "Junior High School":    "junior-high-school",
-    "Senior High School":    "senior-high-school",
-    "Vocational/Technical":  "vocational-technical",
-    "Vocational":            "vocational-technical",
-    "College Undergraduate": "college-undergraduate",
-    "College Graduate":      "college-graduate",
-    "Post Graduate":         "post-graduate",
-    "Post-Graduate":         "post-graduate",
-    "Masteral":              "masteral",
-    "Doctorate":             "doctorate",
-}
-
-# Occupation — Philippine Standard Occupational Classification (PSOC)
-_OCCUPATION_CODE: dict[str, str] = {
-    "Managers":                                             "1",
-    "Professionals":                                        "2",
-    "Technicians and Associate Professionals":              "3",
-    "Clerical Support Workers":                             "4",
-    "Service and Sales Workers":                            "5",
-    "Skilled Agricultural, Forestry and Fishery Workers":  "6",
-    "Craft and Related Trades Workers":                     "7",
-    "Plant and Machine Operators and Assemblers":           "8",
-    "Elementary Occupations":                               "9",
-    "Armed Forces Occupations":                             "0",
-}
-
 # ---------------------------------------------------------------------------
 # FHIR R4 Encounter class code → human-readable display name.
 # Source: HL7 v3 ActCode CodeSystem.
@@ -227,38 +72,24 @@ def _slug(text: str) -> str:
     return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
 
 
-def _barangay_psgc_code(city_psgc_10: str | None, barangay_name: str | None) -> str | None:
-    """Return a 9-digit code for a barangay, or None if the city is unknown.
-
-    Strategy (in priority order):
-    1. "Barangay N" — exact derivation: city_9[:6] + N.zfill(3)
-       e.g. city "137605000" + "Barangay 17"  →  "137605017"
-    2. Named barangay — deterministic 3-digit suffix via CRC32 of the name:
-       city_9[:6] + (crc32(name) % 1000).zfill(3)
-       e.g. city "137613000" + "Palingon"  →  "137613NNN"
-       This keeps the extension structurally valid and 9 digits.
-       NOTE: the suffix is NOT an official PSA code; update _PSGC_CITY_9 or
-       add a named barangay lookup dict when the PSA PSGC file is available.
-    """
-    if not city_psgc_10 or not barangay_name:
-        return None
-    city_9 = _PSGC_CITY_9.get(city_psgc_10)
-    if not city_9:
-        return None
-    # Numbered barangay — exact
-    m = re.fullmatch(r"Barangay (\d+)", barangay_name)
-    if m:
-        return city_9[:6] + str(int(m.group(1))).zfill(3)
-    # Named barangay — deterministic (zlib.adler32 is stable across processes)
-    suffix = zlib.adler32(barangay_name.encode("utf-8")) % 1000
-    return city_9[:6] + str(suffix).zfill(3)
-
-
 def _clean(d: dict) -> dict:
     """Strip None and empty-string values from a flat dict."""
     return {k: v for k, v in d.items() if v is not None and v != ""}
 
 
+def _logical_id(kind, row, pk):
+    """FHIR id of a local row: its persisted fhir_id, else models.fhir_logical_id.
+
+    Rows without a primary key (unsaved objects) get a random uuid4.
+    """
+    from patients.models import fhir_logical_id
+
+    fhir_id = getattr(row, "fhir_id", None)
+    if fhir_id:
+        return fhir_id
+    return fhir_logical_id(kind, pk) if pk is not None else str(uuid.uuid4())
+
+
 def _meta_last_updated(dt) -> str:
     """Format a Django DateTimeField value as a FHIR meta.lastUpdated string.
 
@@ -309,6 +140,228 @@ _MAX_ATTEMPTS = 3
 _BACKOFF_SECONDS = [1, 2]  # sleep before attempt 2, then before attempt 3
 
 
+# ---------------------------------------------------------------------------
+# Gateway client
+# ---------------------------------------------------------------------------
+# One pooled keep-alive session for every call to the gateway, so repeated
+# calls reuse open TCP+TLS connections instead of handshaking each time.
+# Timeouts are (connect, read) seconds per endpoint group.
+# ---------------------------------------------------------------------------
+_GATEWAY_TIMEOUTS = {
+    "fhir_request": (5, 30),
+    "fhir_push":    (5, 30),
+    "providers":    (5, 10),
+    "transactions": (5, 15),
+    "query_return": (5, 10),
+}
+_GATEWAY_POOL_SIZE = int(os.getenv("WAH4PC_POOL_SIZE", "20"))
+
+
+class GatewayClient:
+    """Thread-safe WAH4PC gateway client over a shared requests.Session.
+
+    The session only carries the connection pool (the gateway sets no
+    cookies), so concurrent use from request threads and background workers
+    is safe. Credentials are read per call so key rotation needs no restart.
+
+    metrics() reports per-endpoint call counts, errors and latency, plus
+    how many requests went over an already-open connection.
+    """
+
+    def __init__(self, base_url=URL, pool_size=_GATEWAY_POOL_SIZE, timeouts=None):
+        self.base_url = base_url
+        self.timeouts = {**_GATEWAY_TIMEOUTS, **(timeouts or {})}
+        self.session = requests.Session()
+        self._adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    # -- plumbing ----------------------------------------------------------
+
+    @staticmethod
+    def auth_headers(idempotency_key=None):
+        headers = {
+            "X-API-Key": os.getenv("WAH4PC_API_KEY"),
+            "X-Provider-ID": os.getenv("WAH4PC_PROVIDER_ID"),
+        }
+        if idempotency_key:
+            headers["Idempotency-Key"] = idempotency_key
+        return headers
+
+    def send(self, method, path_or_url, endpoint, **kwargs):
+        """Send one request; `endpoint` picks the timeout and metrics bucket.
+
+        Raises:
+            requests.RequestException: On network failure
+        """
+        url = path_or_url if path_or_url.startswith("http") else f"{self.base_url}{path_or_url}"
+        kwargs.setdefault("timeout", self.timeouts.get(endpoint, (5, 30)))
+        started = time.monotonic()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            self._record(endpoint, time.monotonic() - started, error=True)
+            raise
+        self._record(endpoint, time.monotonic() - started, error=response.status_code >= 400)
+        return response
+
+    def _record(self, endpoint, seconds, error):
+        with self._lock:
+            stat = self._stats.setdefault(endpoint, {"calls": 0, "errors": 0, "seconds": 0.0})
+            stat["calls"] += 1
+            stat["errors"] += int(error)
+            stat["seconds"] += seconds
+
+    def metrics(self):
+        """Snapshot of per-endpoint stats and connection reuse."""
+        with self._lock:
+            endpoints = {
+                name: {**stat, "avg_ms": round(stat["seconds"] * 1000 / stat["calls"], 1)}
+                for name, stat in self._stats.items()
+            }
+        opened = sent = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+                sent += pool.num_requests
+        return {
+            "endpoints": endpoints,
+            "connections_opened": opened,
+            "requests_sent": sent,
+            "connections_reused": max(0, sent - opened),
+        }
+
+    # -- calls ---------------------------------------------------------------
+
+    def post_with_retry(self, path, payload, endpoint, idempotency_key):
+        """POST with the gateway's retry contract.
+
+        Retries up to _MAX_ATTEMPTS times on 409/429 with _BACKOFF_SECONDS
+        between attempts. Always returns a dict: the JSON body plus
+        'idempotency_key' on success, or 'error' and 'status_code'.
+        """
+        last_retryable_result = None
+
+        for attempt in range(_MAX_ATTEMPTS):
+            if attempt > 0:
+                # Exponential-ish back-off: 1 s, then 2 s
+                time.sleep(_BACKOFF_SECONDS[min(attempt - 1, len(_BACKOFF_SECONDS) - 1)])
+
+            try:
+                response = self.send(
+                    "POST", path, endpoint,
+                    headers=self.auth_headers(idempotency_key),
+                    json=payload,
+                )
+
+                if response.status_code in _RETRY_STATUSES:
+                    last_retryable_result = {
+                        "error": (
+                            "Request already in progress — retrying"
+                            if response.status_code == 409
+                            else "Rate limit exceeded — retrying"
+                        ),
+                        "status_code": response.status_code,
+                        "idempotency_key": idempotency_key,
+                    }
+                    continue  # wait (top of loop) then retry
+
+                if response.status_code >= 400:
+                    return {
+                        "error": gateway_error_message(response),
+                        "status_code": response.status_code,
+                        "idempotency_key": idempotency_key,
+                    }
+
+                result = response.json()
+                result["idempotency_key"] = idempotency_key
+                return result
+
+            except requests.RequestException as e:
+                return {
+                    "error": f"Network error: {str(e)}",
+                    "status_code": 500,
+                    "idempotency_key": idempotency_key,
+                }
+
+        # All _MAX_ATTEMPTS exhausted on a retryable status
+        return last_retryable_result
+
+    def post_stream(self, path_or_url, endpoint, chunks, idempotency_key=None, gzip=False):
+        """POST a JSON body produced piece by piece (chunked transfer encoding).
+
+        `chunks` is an iterable of bytes, e.g. from iter_bundle_json(); with
+        gzip=True it is compressed on the fly. The body is never held in
+        memory whole, so it cannot be replayed: this makes one attempt.
+
+        Raises:
+            requests.RequestException: On network failure
+        """
+        headers = {**self.auth_headers(idempotency_key), "Content-Type": "application/json"}
+        if gzip:
+            headers["Content-Encoding"] = "gzip"
+            chunks = gzip_chunks(chunks)
+        return self.send("POST", path_or_url, endpoint, headers=headers, data=iter(chunks))
+
+    def get_json(self, path, endpoint, params=None, authenticated=True):
+        """GET returning the JSON body, or 'error' and 'status_code'."""
+        try:
+            response = self.send(
+                "GET", path, endpoint,
+                headers=self.auth_headers() if authenticated else None,
+                params=params,
+            )
+            if response.status_code >= 400:
+                return {"error": gateway_error_message(response), "status_code": response.status_code}
+            return response.json()
+        except requests.RequestException as e:
+            return {"error": f"Network error: {str(e)}", "status_code": 500}
+
+
+def gateway_error_message(response):
+    """The 'error' field of a gateway error response, if it has one."""
+    try:
+        body = response.json() if response.text else {}
+    except ValueError:
+        body = {}
+    if isinstance(body, dict) and body.get("error"):
+        return body["error"]
+    return "Unknown error"
+
+
+def response_transaction_id(result):
+    """Gateway transaction ID from a fetch/push response body.
+
+    The gateway returns it as 'transactionId' or 'id', flat or nested
+    under 'data'.
+    """
+    data = result.get("data") if isinstance(result.get("data"), dict) else {}
+    return (
+        result.get("transactionId")
+        or result.get("id")
+        or data.get("transactionId")
+        or data.get("id")
+    )
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_gateway_client():
+    """Process-wide GatewayClient (created on first use)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GatewayClient()
+    return _client
+
+
 def request_patient(target_id, philhealth_id, idempotency_key=None):
     """Request patient data from another provider via WAH4PC gateway.
 
@@ -321,75 +374,61 @@ def request_patient(target_id, philhealth_id, idempotency_key=None):
         dict: Response with 'data' key on success, or 'error' and 'status_code' on failure.
               Retries up to _MAX_ATTEMPTS times on 409/429 before giving up.
     """
-    # Read credentials at call time so key rotation takes effect without a restart
-    api_key = os.getenv("WAH4PC_API_KEY")
-    provider_id = os.getenv("WAH4PC_PROVIDER_ID")
-
     if not idempotency_key:
         idempotency_key = str(uuid.uuid4())
 
-    last_retryable_result = None
+    return get_gateway_client().post_with_retry(
+        PATIENT_REQUEST_PATH,
+        patient_request_payload(target_id, philhealth_id),
+        "fhir_request",
+        idempotency_key,
+    )
 
-    for attempt in range(_MAX_ATTEMPTS):
-        if attempt > 0:
-            # Exponential-ish back-off: 1 s, then 2 s
-            time.sleep(_BACKOFF_SECONDS[min(attempt - 1, len(_BACKOFF_SECONDS) - 1)])
 
-        try:
-            response = requests.post(
-                f"{URL}/api/v1/fhir/request/Patient",
-                headers={
-                    "X-API-Key": api_key,
-                    "X-Provider-ID": provider_id,
-                    "Idempotency-Key": idempotency_key,
-                },
-                json={
-                    "requesterId": provider_id,
-                    "targetId": target_id,
-                    "identifiers": [
-                        {"system": "http://philhealth.gov.ph", "value": philhealth_id}
-                    ],
-                },
-                timeout=30,
-            )
+# ---------------------------------------------------------------------------
+# Outbound request bodies
+# ---------------------------------------------------------------------------
+# Shared by the synchronous helpers in this module and the outbox worker
+# (patients.services.gateway_outbox), which stores them for later delivery.
+# ---------------------------------------------------------------------------
+PATIENT_REQUEST_PATH = "/api/v1/fhir/request/Patient"
+PATIENT_PUSH_PATH = "/api/v1/fhir/push/Patient"
+IMMUNIZATION_PUSH_PATH = "/api/v1/fhir/push/Immunization"
 
-            if response.status_code in _RETRY_STATUSES:
-                last_retryable_result = {
-                    "error": (
-                        "Request already in progress — retrying"
-                        if response.status_code == 409
-                        else "Rate limit exceeded — retrying"
-                    ),
-                    "status_code": response.status_code,
-                    "idempotency_key": idempotency_key,
-                }
-                continue  # wait (top of loop) then retry
 
-            if response.status_code >= 400:
-                error_msg = (
-                    response.json().get("error", "Unknown error")
-                    if response.text
-                    else "Unknown error"
-                )
-                return {
-                    "error": error_msg,
-                    "status_code": response.status_code,
-                    "idempotency_key": idempotency_key,
-                }
+def patient_request_payload(target_id, philhealth_id):
+    """Body of a Patient fetch request by PhilHealth ID."""
+    return {
+        "requesterId": os.getenv("WAH4PC_PROVIDER_ID"),
+        "targetId": target_id,
+        "identifiers": [
+            {"system": "http://philhealth.gov.ph", "value": philhealth_id}
+        ],
+    }
 
-            result = response.json()
-            result["idempotency_key"] = idempotency_key
-            return result
 
-        except requests.RequestException as e:
-            return {
-                "error": f"Network error: {str(e)}",
-                "status_code": 500,
-                "idempotency_key": idempotency_key,
-            }
+def patient_push_payload(target_id, patient):
+    """Body of a Patient push; the FHIR resource is rendered now."""
+    return {
+        "senderId": os.getenv("WAH4PC_PROVIDER_ID"),
+        "targetId": target_id,
+        "resourceType": "Patient",
+        "data": patient_to_fhir(patient),
+    }
 
-    # All _MAX_ATTEMPTS exhausted on a retryable status
-    return last_retryable_result
+
+def immunization_push_payload(target_id, immunization_model):
+    """Body of an Immunization push (a one-entry collection Bundle)."""
+    return {
+        "senderId":     os.getenv("WAH4PC_PROVIDER_ID"),
+        "targetId":     target_id,
+        "resourceType": "Immunization",
+        "resource": {
+            "resourceType": "Bundle",
+            "type":         "collection",
+            "entry":        [{"resource": immunization_to_fhir(immunization_model)}],
+        },
+    }
 
 
 def patient_to_fhir(patient):
@@ -403,9 +442,16 @@ def patient_to_fhir(patient):
       include both code and display inside their coding[] array.
     - Identifier has use="official" and the SB type coding.
     - Marital status sends code + system only (no display), per the sample.
-    - meta.lastUpdated reflects the current UTC timestamp.
+    - meta.lastUpdated reflects the record's updated_at.
     - Null / empty fields are omitted entirely — never sent as null or "".
+
+    Served from the rendered-FHIR cache until the patient is saved again.
     """
+    return _cached("Patient", patient.pk, (patient.updated_at,), lambda: _render_patient(patient))
+
+
+def _render_patient(patient):
+    """Build the Patient resource; see patient_to_fhir."""
 
     # ------------------------------------------------------------------
     # 1. Root-level extension array
@@ -418,7 +464,7 @@ def patient_to_fhir(patient):
     # Sending an unknown slug (e.g. "born-again-christian") causes mismatches
     # on the receiving system's terminology validation.
     if patient.religion:
-        rel_code = _RELIGION_CODE.get(patient.religion)
+        rel_code = terminology.RELIGION.code(patient.religion)
         if rel_code:
             extensions.append({
                 "url": f"{_URN_EXT}/religion",
@@ -449,7 +495,7 @@ def patient_to_fhir(patient):
     # Only emit when the value maps to a recognised canonical code.
     # Sending an unknown slug causes a 500/Save error on receiving systems.
     if patient.education:
-        edu_code = _EDUCATION_CODE.get(patient.education)
+        edu_code = terminology.EDUCATION.code(patient.education)
         if edu_code:
             extensions.append({
                 "url": f"{_URN_EXT}/educational-attainment",
@@ -466,7 +512,7 @@ def patient_to_fhir(patient):
     # Only emit when the value maps to a recognised numeric PSOC code.
     # Sending a slug like "cybersecurity-analysts" causes validation errors.
     if patient.occupation:
-        occ_code = _OCCUPATION_CODE.get(patient.occupation)
+        occ_code = terminology.OCCUPATION.code(patient.occupation)
         if occ_code:
             extensions.append({
                 "url": f"{_URN_EXT}/occupation",
@@ -498,17 +544,13 @@ def patient_to_fhir(patient):
     # gets the same FHIR resource id (enables deduplication on target systems).
     # Falls back to uuid4 for unsaved objects that have no PK yet.
     pk = getattr(patient, "id", None) or getattr(patient, "pk", None)
-    resource_id = (
-        str(uuid.uuid5(uuid.NAMESPACE_OID, f"patient:{pk}"))
-        if pk is not None
-        else str(uuid.uuid4())
-    )
+    resource_id = _logical_id("patient", patient, pk)
 
     fhir: dict = {
         "resourceType": "Patient",
         "id": resource_id,
         "meta": {
-            "lastUpdated": datetime.now(tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "lastUpdated": _meta_last_updated(patient.updated_at),
             "profile": [f"{_URN_EXT}/ph-core-patient"],
         },
         "extension": extensions,
@@ -594,8 +636,8 @@ def patient_to_fhir(patient):
     # 8. Address — top-level city as display name + PSGC extension array
     # ------------------------------------------------------------------
     if patient.address_line or patient.address_city:
-        city_display = _PSGC_CITY.get(patient.address_city, patient.address_city) \
-                       if patient.address_city else None
+        psgc = terminology.psgc()
+        city_display = psgc.city_name(patient.address_city)
 
         # Build the PSGC extension array
         addr_extensions = []
@@ -604,9 +646,9 @@ def patient_to_fhir(patient):
         # Falling back to the raw short code ("NCR") in the code field would
         # cause a validation error on the receiving system.
         if patient.address_state:
-            region_code = _PSGC_REGION_CODE.get(patient.address_state)
+            region_code = psgc.region_code(patient.address_state)
             if region_code:
-                region_display = _PSGC_REGION.get(patient.address_state, patient.address_state)
+                region_display = psgc.region_name(patient.address_state)
                 addr_extensions.append({
                     "url": f"{_URN_EXT}/region",
                     "valueCoding": {
@@ -617,11 +659,11 @@ def patient_to_fhir(patient):
                 })
 
         # 8b. City-municipality — emit 9-digit PSA code only.
-        # The DB stores a 10-digit frontend code; _PSGC_CITY_9 converts it.
+        # The DB stores a 10-digit frontend code; psgc.city_code converts it.
         # If no 9-digit code is known, omit the extension (never send a
         # 10-digit code — it fails length/constraint checks on target systems).
         if patient.address_city:
-            city_9 = _PSGC_CITY_9.get(patient.address_city)
+            city_9 = psgc.city_code(patient.address_city)
             if city_9:
                 addr_extensions.append({
                     "url": f"{_URN_EXT}/city-municipality",
@@ -637,7 +679,7 @@ def patient_to_fhir(patient):
         # Named barangays (e.g. "Almanza Uno") have no derivable code and are
         # excluded entirely; sending an invented slug causes 500/Save errors.
         if patient.address_line:
-            bgy_code = _barangay_psgc_code(patient.address_city, patient.address_line)
+            bgy_code = psgc.barangay_code(patient.address_city, patient.address_line)
             if bgy_code:
                 addr_extensions.append({
                     "url": f"{_URN_EXT}/barangay",
@@ -707,73 +749,15 @@ def push_patient(target_id, patient, idempotency_key=None):
         dict: Response with transaction data on success, or 'error' and 'status_code' on failure.
               Retries up to _MAX_ATTEMPTS times on 409/429 before giving up.
     """
-    # Read credentials at call time so key rotation takes effect without a restart
-    api_key = os.getenv("WAH4PC_API_KEY")
-    provider_id = os.getenv("WAH4PC_PROVIDER_ID")
-
     if not idempotency_key:
         idempotency_key = str(uuid.uuid4())
 
-    last_retryable_result = None
-
-    for attempt in range(_MAX_ATTEMPTS):
-        if attempt > 0:
-            time.sleep(_BACKOFF_SECONDS[min(attempt - 1, len(_BACKOFF_SECONDS) - 1)])
-
-        try:
-            response = requests.post(
-                f"{URL}/api/v1/fhir/push/Patient",
-                headers={
-                    "X-API-Key": api_key,
-                    "X-Provider-ID": provider_id,
-                    "Idempotency-Key": idempotency_key,
-                },
-                json={
-                    "senderId": provider_id,
-                    "targetId": target_id,
-                    "resourceType": "Patient",
-                    "data": patient_to_fhir(patient),
-                },
-                timeout=30,
-            )
-
-            if response.status_code in _RETRY_STATUSES:
-                last_retryable_result = {
-                    "error": (
-                        "Request already in progress — retrying"
-                        if response.status_code == 409
-                        else "Rate limit exceeded — retrying"
-                    ),
-                    "status_code": response.status_code,
-                    "idempotency_key": idempotency_key,
-                }
-                continue  # wait (top of loop) then retry
-
-            if response.status_code >= 400:
-                error_msg = (
-                    response.json().get("error", "Unknown error")
-                    if response.text
-                    else "Unknown error"
-                )
-                return {
-                    "error": error_msg,
-                    "status_code": response.status_code,
-                    "idempotency_key": idempotency_key,
-                }
-
-            result = response.json()
-            result["idempotency_key"] = idempotency_key
-            return result
-
-        except requests.RequestException as e:
-            return {
-                "error": f"Network error: {str(e)}",
-                "status_code": 500,
-                "idempotency_key": idempotency_key,
-            }
-
-    # All _MAX_ATTEMPTS exhausted on a retryable status
-    return last_retryable_result
+    return get_gateway_client().post_with_retry(
+        PATIENT_PUSH_PATH,
+        patient_push_payload(target_id, patient),
+        "fhir_push",
+        idempotency_key,
+    )
 
 
 def _get_extension(extensions, url):
@@ -801,27 +785,39 @@ def _get_extension(extensions, url):
     return None
 
 
-def get_providers():
-    """Fetch all registered providers from WAH4PC gateway (public endpoint).
+def fetch_providers():
+    """Fetch every registered provider from the WAH4PC gateway (public endpoint).
+
+    Unlike get_providers(), a failed call returns None rather than [], so the
+    provider directory can tell an outage from an empty registry.
 
     Returns:
-        list: List of active provider dictionaries with id, name, type, isActive fields
+        list | None: Provider dicts (id, name, type, isActive), inactive included
     """
-    try:
-        response = requests.get(f"{URL}/api/v1/providers", timeout=10)
+    result = get_gateway_client().get_json("/api/v1/providers", "providers", authenticated=False)
+    if isinstance(result, dict) and "error" in result and "status_code" in result:
+        print(f"[WAH4PC] Error fetching providers: {result['error']}")
+        return None
 
-        if response.status_code == 200:
-            result = response.json()
-            # Handle both wrapped {"data": [...]} and flat array formats
-            providers = result.get("data", result) if isinstance(result, dict) else result
-            # Filter to only return active providers
-            return [p for p in providers if p.get("isActive", True)]
+    # Handle both wrapped {"data": [...]} and flat array formats
+    providers = result.get("data", result) if isinstance(result, dict) else result
+    if not isinstance(providers, list):
+        return None
+    return [p for p in providers if isinstance(p, dict) and p.get("id")]
 
-        return []
 
-    except requests.RequestException as e:
-        print(f"[WAH4PC] Error fetching providers: {str(e)}")
-        return []
+def get_providers():
+    """Fetch all registered providers from WAH4PC gateway (public endpoint).
+
+    Calls the gateway every time; the API serves the cached copy in
+    patients.services.provider_directory instead.
+
+    Returns:
+        list: List of active provider dictionaries with id, name, type, isActive fields
+    """
+    providers = fetch_providers() or []
+    # Filter to only return active providers
+    return [p for p in providers if p.get("isActive", True)]
 
 
 def gateway_list_transactions(status_filter=None, limit=50):
@@ -834,36 +830,10 @@ def gateway_list_transactions(status_filter=None, limit=50):
     Returns:
         dict: Response with 'data' key containing transaction list, or 'error' and 'status_code' on failure
     """
-    # Read credentials at call time so key rotation takes effect without a restart
-    api_key = os.getenv("WAH4PC_API_KEY")
-    provider_id = os.getenv("WAH4PC_PROVIDER_ID")
-
-    try:
-        params = {"limit": limit}
-        if status_filter:
-            params["status"] = status_filter
-
-        response = requests.get(
-            f"{URL}/api/v1/transactions",
-            headers={
-                "X-API-Key": api_key,
-                "X-Provider-ID": provider_id,
-            },
-            params=params,
-        )
-
-        if response.status_code >= 400:
-            error_msg = (
-                response.json().get("error", "Unknown error")
-                if response.text
-                else "Unknown error"
-            )
-            return {"error": error_msg, "status_code": response.status_code}
-
-        return response.json()
-
-    except requests.RequestException as e:
-        return {"error": f"Network error: {str(e)}", "status_code": 500}
+    params = {"limit": limit}
+    if status_filter:
+        params["status"] = status_filter
+    return get_gateway_client().get_json("/api/v1/transactions", "transactions", params=params)
 
 
 def gateway_get_transaction(transaction_id):
@@ -875,31 +845,7 @@ def gateway_get_transaction(transaction_id):
     Returns:
         dict: Response with transaction details, or 'error' and 'status_code' on failure
     """
-    # Read credentials at call time so key rotation takes effect without a restart
-    api_key = os.getenv("WAH4PC_API_KEY")
-    provider_id = os.getenv("WAH4PC_PROVIDER_ID")
-
-    try:
-        response = requests.get(
-            f"{URL}/api/v1/transactions/{transaction_id}",
-            headers={
-                "X-API-Key": api_key,
-                "X-Provider-ID": provider_id,
-            },
-        )
-
-        if response.status_code >= 400:
-            error_msg = (
-                response.json().get("error", "Unknown error")
-                if response.text
-                else "Unknown error"
-            )
-            return {"error": error_msg, "status_code": response.status_code}
-
-        return response.json()
-
-    except requests.RequestException as e:
-        return {"error": f"Network error: {str(e)}", "status_code": 500}
+    return get_gateway_client().get_json(f"/api/v1/transactions/{transaction_id}", "transactions")
 
 
 def fhir_to_dict(fhir):
@@ -912,7 +858,9 @@ def fhir_to_dict(fhir):
 
     civil_status is stored in the DB as the single-letter HL7 code ('S','M',…).
     We read the code from maritalStatus.coding[0].code (not the display) so the
-    roundtrip format stays consistent.
+    roundtrip format stays consistent. For the same reason address_city and
+    address_state come back as the 10-digit city code and short region code
+    (via patients.terminology) rather than the display names we export.
     """
     name = fhir.get("name", [{}])[0]
     ids = fhir.get("identifier", [])
@@ -953,12 +901,34 @@ def fhir_to_dict(fhir):
         if race_codings:
             nationality = race_codings[0].get("display") or race_codings[0].get("code")
 
-    def _display(val):
+    def _display(val, table=None):
         if isinstance(val, dict):
             codings = val.get("coding", [{}])
-            return codings[0].get("display") if codings else None
+            if not codings:
+                return None
+            # Senders may omit the display; map the PH-Core code back to ours
+            return codings[0].get("display") or (table.display(codings[0].get("code")) if table else None)
         return None
 
+    # Address: PSGC extension codes map back to the codes the DB stores
+    # (region short code, 10-digit city code); the free-text fields are the
+    # fallback for senders without them.
+    psgc = terminology.psgc()
+    addr_extensions = addr.get("extension", [])
+
+    def _psgc_code(kind):
+        coding = _get_extension(addr_extensions, f"{_EXT_BASE}/{kind}")
+        return coding.get("code") if isinstance(coding, dict) else None
+
+    address_city = psgc.city_from_code(_psgc_code("city-municipality")) \
+        or psgc.city_from_name(addr.get("city")) or addr.get("city")
+    address_state = psgc.region_from_code(_psgc_code("region")) or addr.get("state")
+    address_line = addr.get("line", [None])[0] if addr.get("line") else None
+    if not address_line:
+        barangay = psgc.barangay_from_code(_psgc_code("barangay"))
+        if barangay:
+            address_line = barangay[1]
+
     # civil_status: read the code so it matches what the DB stores ('S','M',…)
     civil_status = None
     if fhir.get("maritalStatus"):
@@ -981,16 +951,16 @@ def fhir_to_dict(fhir):
         "philhealth_id":         ph_id,
         "mobile_number":         phone,
         "nationality":           nationality,
-        "religion":              _display(religion_val),
-        "occupation":            _display(occupation_val),
-        "education":             _display(education_val),
+        "religion":              _display(religion_val, terminology.RELIGION),
+        "occupation":            _display(occupation_val, terminology.OCCUPATION),
+        "education":             _display(education_val, terminology.EDUCATION),
         "indigenous_flag":       indigenous_val if isinstance(indigenous_val, bool) else None,
         "indigenous_group":      _display(indigenous_grp),
         "civil_status":          civil_status,
-        "address_line":          addr.get("line", [None])[0] if addr.get("line") else None,
-        "address_city":          addr.get("city"),
+        "address_line":          address_line,
+        "address_city":          address_city,
         "address_district":      addr.get("district"),
-        "address_state":         addr.get("state"),
+        "address_state":         address_state,
         "address_postal_code":   addr.get("postalCode"),
         "address_country":       addr.get("country"),
         "contact_first_name":    contact_name.get("given", [None])[0] if contact_name.get("given") else None,
@@ -1007,6 +977,119 @@ def fhir_to_dict(fhir):
     return {k: v for k, v in result.items() if v is not None and v != ""}
 
 
+# ---------------------------------------------------------------------------
+# Reference resolution
+# ---------------------------------------------------------------------------
+# Encounters, procedures and immunizations point at patients, practitioners
+# and locations by integer ID (Fortress Pattern). A Bundle builder collects
+# every ID in the batch up front and resolves each kind with one query, so a
+# 200-encounter Bundle costs three lookups instead of several hundred.
+# The same lookups carry updated_at, which versions the rendered-resource
+# cache (patients.services.fhir_cache): renaming a practitioner re-renders
+# every encounter that displays them.
+# ---------------------------------------------------------------------------
+
+def _full_name(obj):
+    return " ".join(p for p in [obj.first_name, obj.middle_name, obj.last_name] if p)
+
+
+class FhirReferences:
+    """Patients, practitioners and locations referenced by a batch of resources.
+
+    Usage:
+        refs = FhirReferences.collect(
+            encounters,
+            patient_fields=("subject_id",),
+            practitioner_fields=("participant_individual_id",),
+            location_fields=("location_id",),
+        )
+        [encounter_to_fhir(enc, refs) for enc in encounters]
+    """
+
+    def __init__(self, patient_ids=(), practitioner_ids=(), location_ids=()):
+        from accounts.models import Location, Practitioner
+        from patients.models import Patient
+
+        patient_ids = {i for i in patient_ids if i}
+        practitioner_ids = {i for i in practitioner_ids if i}
+        location_ids = {i for i in location_ids if i}
+
+        self.patients = (
+            Patient.objects
+            .only("id", "fhir_id", "first_name", "middle_name", "last_name", "updated_at")
+            .in_bulk(patient_ids)
+            if patient_ids else {}
+        )
+        self.practitioners = (
+            Practitioner.objects
+            .only("practitioner_id", "identifier", "first_name", "middle_name", "last_name", "updated_at")
+            .in_bulk(practitioner_ids)
+            if practitioner_ids else {}
+        )
+        self.locations = (
+            Location.objects.only("location_id", "name", "updated_at").in_bulk(location_ids)
+            if location_ids else {}
+        )
+
+    @classmethod
+    def collect(cls, models, patient_fields=(), practitioner_fields=(), location_fields=()):
+        """Resolve every ID found in the given attributes of `models`."""
+        def ids(fields):
+            return [getattr(m, f, None) for m in models for f in fields]
+        return cls(ids(patient_fields), ids(practitioner_fields), ids(location_fields))
+
+    @classmethod
+    def collect_groups(cls, groups):
+        """Like collect() for several (models, refs_spec) groups resolved together."""
+        ids = {"patient_fields": [], "practitioner_fields": [], "location_fields": []}
+        for models, spec in groups:
+            for kind, fields in spec.items():
+                ids[kind] += [getattr(m, f, None) for m in models for f in fields]
+        return cls(ids["patient_fields"], ids["practitioner_fields"], ids["location_fields"])
+
+    def patient_ref(self, subject_id):
+        """Return (fhir_id, display_name) for a Patient PK.
+
+        Unknown patients get a random id and an empty display.
+        """
+        patient = self.patients.get(subject_id) if subject_id else None
+        if patient is None:
+            return str(uuid.uuid4()), ""
+        return _logical_id("patient", patient, patient.id), _full_name(patient)
+
+    def practitioner_ref(self, practitioner_id):
+        """FHIR reference dict for a Practitioner PK, or None if unknown."""
+        pract = self.practitioners.get(practitioner_id) if practitioner_id else None
+        if pract is None:
+            return None
+        return {
+            "display":   _full_name(pract),
+            "reference": f"Practitioner/{pract.identifier}",
+        }
+
+    def location_name(self, location_id):
+        location = self.locations.get(location_id) if location_id else None
+        return location.name if location is not None else None
+
+    def version(self, model, patient_fields=(), practitioner_fields=(), location_fields=()):
+        """Cache version of `model`: its updated_at plus that of each referenced record."""
+        def stamps(lookup, fields):
+            return [getattr(lookup.get(getattr(model, f, None)), "updated_at", None) for f in fields]
+
+        return (
+            model.updated_at,
+            *stamps(self.patients, patient_fields),
+            *stamps(self.practitioners, practitioner_fields),
+            *stamps(self.locations, location_fields),
+        )
+
+
+def _cached(resource_type, pk, version, render):
+    """Serve a converter's output from the rendered-FHIR cache (see fhir_cache)."""
+    from patients.services import fhir_cache
+    return fhir_cache.get_or_render(resource_type, pk, fhir_cache.version_of(*version), render)
+
+
 # ---------------------------------------------------------------------------
 # Immunization Maps
 # ---------------------------------------------------------------------------
@@ -1019,7 +1102,12 @@ _SITE_CODE_MAP  = {"LA": "Left Arm",  "RA": "Right Arm", "LL": "Left Leg"}
 _ROUTE_CODE_MAP = {"IM": "Intramuscular", "PO": "Oral", "IDINJ": "Intradermal"}
 
 
-def immunization_to_fhir(model):
+_IMMUNIZATION_REFS = {
+    "patient_fields": ("patient_id",),
+}
+
+
+def immunization_to_fhir(model, refs=None):
     """Convert a local Immunization model instance to a PH Core FHIR Immunization resource.
 
     Follows the Manual Dict Construction pattern used by patient_to_fhir:
@@ -1027,22 +1115,30 @@ def immunization_to_fhir(model):
     - Null / empty fields are omitted entirely.
     - doseQuantity units are hardcoded to "ml" per the Working JSON spec.
     - performer.function is hardcoded to Administering Provider (AP).
+
+    Args:
+        model: Immunization instance
+        refs: Optional FhirReferences for the batch; built for this record
+              when omitted
     """
+    if refs is None:
+        refs = FhirReferences.collect([model], **_IMMUNIZATION_REFS)
+    return _cached("Immunization", model.pk, refs.version(model, **_IMMUNIZATION_REFS), lambda: _render_immunization(model, refs))
+
+
+def _render_immunization(model, refs):
+    """Build the Immunization resource; see immunization_to_fhir."""
     pk = getattr(model, "immunization_id", None) or getattr(model, "pk", None)
-    resource_id = (
-        str(uuid.uuid5(uuid.NAMESPACE_OID, f"immunization:{pk}"))
-        if pk is not None
-        else str(uuid.uuid4())
-    )
+    resource_id = _logical_id("immunization", model, pk)
 
-    # Patient reference uses the same deterministic UUID strategy as patient_to_fhir
+    # Patient reference uses the same id as patient_to_fhir
     patient_pk = model.patient_id
-    patient_fhir_id = str(uuid.uuid5(uuid.NAMESPACE_OID, f"patient:{patient_pk}"))
+    patient_fhir_id = _logical_id("patient", refs.patients.get(patient_pk), patient_pk)
 
-    # Patient display name (patient is select_related on the queryset)
-    patient_obj = model.patient if hasattr(model, '_state') else None
+    # Patient display name
     try:
-        patient_display = f"{model.patient.first_name or ''} {model.patient.last_name or ''}".strip()
+        patient = refs.patients.get(patient_pk)
+        patient_display = f"{patient.first_name or ''} {patient.last_name or ''}".strip()
     except Exception:
         patient_display = ""
 
@@ -1055,7 +1151,7 @@ def immunization_to_fhir(model):
         "resourceType": "Immunization",
         "id": resource_id,
         "meta": {
-            "lastUpdated": datetime.now(tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "lastUpdated": _meta_last_updated(model.updated_at),
             "profile": [f"{_URN_EXT}/ph-core-immunization"],
         },
         "status": model.status,
@@ -1164,10 +1260,12 @@ def immunizations_to_bundle(queryset):
     Returns:
         dict: { "resourceType": "Bundle", "type": "collection", "entry": [...] }
     """
+    immunizations = list(queryset)
+    refs = FhirReferences.collect(immunizations, **_IMMUNIZATION_REFS)
     return {
         "resourceType": "Bundle",
         "type": "collection",
-        "entry": [{"resource": immunization_to_fhir(imm)} for imm in queryset],
+        "entry": [{"resource": immunization_to_fhir(imm, refs)} for imm in immunizations],
     }
 
 
@@ -1175,49 +1273,19 @@ def immunizations_to_bundle(queryset):
 # FHIR Procedure conversion (reads from Admission module — source of truth)
 # ---------------------------------------------------------------------------
 
-def _practitioner_ref(practitioner_id):
-    """Look up a Practitioner by its integer PK and return a FHIR reference dict.
-
-    Returns None when the record does not exist.
-    """
-    if not practitioner_id:
-        return None
-    from accounts.models import Practitioner
-    try:
-        pract = Practitioner.objects.get(practitioner_id=practitioner_id)
-        full_name = " ".join(p for p in [pract.first_name, pract.middle_name, pract.last_name] if p)
-        return {
-            "display":   full_name,
-            "reference": f"Practitioner/{pract.identifier}",
-        }
-    except Practitioner.DoesNotExist:
-        return None
-
-
-def _patient_ref(subject_id):
-    """Look up a Patient by its integer PK and return (fhir_id, display_name).
-
-    Returns a pair of empty strings when the record does not exist.
-    """
-    if not subject_id:
-        return str(uuid.uuid4()), ""
-    from patients.models import Patient
-    try:
-        patient = Patient.objects.get(id=subject_id)
-        fhir_id = str(uuid.uuid5(uuid.NAMESPACE_OID, f"patient:{patient.id}"))
-        full_name = " ".join(
-            p for p in [patient.first_name, patient.middle_name, patient.last_name] if p
-        )
-        return fhir_id, full_name
-    except Patient.DoesNotExist:
-        return str(uuid.uuid4()), ""
+_PROCEDURE_REFS = {
+    "patient_fields":      ("subject_id",),
+    "practitioner_fields": ("recorder_id", "performer_actor_id"),
+    "location_fields":     ("location_id",),
+}
 
 
-def procedure_to_fhir(model):
+def procedure_to_fhir(model, refs=None):
     """Convert an Admission Procedure instance to a PH Core FHIR Procedure resource.
 
     Reads from the Admission module as the source of truth (read-only).
-    Resolves Patient, Practitioner, and Location via Fortress Pattern IDs.
+    Resolves Patient, Practitioner, and Location via Fortress Pattern IDs,
+    from `refs` when a Bundle builder passes one.
 
     Notable spec rules applied:
     - subject does NOT include a "type" field (FHIR Procedure spec).
@@ -1225,19 +1293,17 @@ def procedure_to_fhir(model):
     - outcome / reasonCode emit only "text" (free-text from outcome_display /
       reason_code_display) — no coding array required by this profile.
     """
-    from accounts.models import Location
+    if refs is None:
+        refs = FhirReferences.collect([model], **_PROCEDURE_REFS)
+    return _cached("Procedure", model.pk, refs.version(model, **_PROCEDURE_REFS), lambda: _render_procedure(model, refs))
 
-    patient_fhir_id, patient_display = _patient_ref(model.subject_id)
-    recorder   = _practitioner_ref(model.recorder_id)
-    performer  = _practitioner_ref(model.performer_actor_id)
 
-    location_display = None
-    if model.location_id:
-        try:
-            loc = Location.objects.get(location_id=model.location_id)
-            location_display = loc.name
-        except Location.DoesNotExist:
-            pass
+def _render_procedure(model, refs):
+    """Build the Procedure resource; see procedure_to_fhir."""
+    patient_fhir_id, patient_display = refs.patient_ref(model.subject_id)
+    recorder   = refs.practitioner_ref(model.recorder_id)
+    performer  = refs.practitioner_ref(model.performer_actor_id)
+    location_display = refs.location_name(model.location_id)
 
     fhir: dict = {
         "resourceType": "Procedure",
@@ -1314,10 +1380,12 @@ def procedures_to_bundle(queryset):
     Returns:
         dict: { "resourceType": "Bundle", "type": "collection", "entry": [...] }
     """
+    procedures = list(queryset)
+    refs = FhirReferences.collect(procedures, **_PROCEDURE_REFS)
     return {
         "resourceType": "Bundle",
         "type":         "collection",
-        "entry":        [{"resource": procedure_to_fhir(proc)} for proc in queryset],
+        "entry":        [{"resource": procedure_to_fhir(proc, refs)} for proc in procedures],
     }
 
 
@@ -1325,11 +1393,19 @@ def procedures_to_bundle(queryset):
 # FHIR Encounter conversion (reads from Admission module — source of truth)
 # ---------------------------------------------------------------------------
 
-def encounter_to_fhir(model):
+_ENCOUNTER_REFS = {
+    "patient_fields":      ("subject_id",),
+    "practitioner_fields": ("participant_individual_id",),
+    "location_fields":     ("location_id",),
+}
+
+
+def encounter_to_fhir(model, refs=None):
     """Convert an Admission Encounter instance to a PH Core FHIR Encounter resource.
 
     Reads from the Admission module as the source of truth (read-only).
-    Resolves Patient, Practitioner, and Location via Fortress Pattern IDs.
+    Resolves Patient, Practitioner, and Location via Fortress Pattern IDs,
+    from `refs` when a Bundle builder passes one.
 
     Notable spec rules applied:
     - subject DOES include "type": "Patient" (FHIR Encounter spec).
@@ -1338,46 +1414,34 @@ def encounter_to_fhir(model):
       by padding date-only values with midnight PHT (T00:00:00+08:00).
     - participant hardcoded to PPRF (primary performer) type.
     """
-    from accounts.models import Location
+    if refs is None:
+        refs = FhirReferences.collect([model], **_ENCOUNTER_REFS)
+    return _cached("Encounter", model.pk, refs.version(model, **_ENCOUNTER_REFS), lambda: _render_encounter(model, refs))
 
-    patient_fhir_id, patient_display = _patient_ref(model.subject_id)
+
+def _render_encounter(model, refs):
+    """Build the Encounter resource; see encounter_to_fhir."""
+    patient_fhir_id, patient_display = refs.patient_ref(model.subject_id)
 
     # Participant (practitioner)
     participant_fhir = None
-    if model.participant_individual_id:
-        from accounts.models import Practitioner
-        try:
-            pract = Practitioner.objects.get(
-                practitioner_id=model.participant_individual_id
-            )
-            full_name = " ".join(
-                p for p in [pract.first_name, pract.middle_name, pract.last_name] if p
-            )
-            participant_fhir = {
-                "type": [{
-                    "coding": [{
-                        "code":    "PPRF",
-                        "system":  "http://terminology.hl7.org/CodeSystem/v3-ParticipationType",
-                        "display": "primary performer",
-                    }]
-                }],
-                "individual": {
-                    "type":      "Practitioner",
-                    "display":   full_name,
-                    "reference": f"Practitioner/{pract.identifier}",
-                },
-            }
-        except Practitioner.DoesNotExist:
-            pass
+    individual = refs.practitioner_ref(model.participant_individual_id)
+    if individual:
+        participant_fhir = {
+            "type": [{
+                "coding": [{
+                    "code":    "PPRF",
+                    "system":  "http://terminology.hl7.org/CodeSystem/v3-ParticipationType",
+                    "display": "primary performer",
+                }]
+            }],
+            "individual": {"type": "Practitioner", **individual},
+        }
 
     # Location
     location_fhir = None
-    if model.location_id:
-        try:
-            loc = Location.objects.get(location_id=model.location_id)
-            location_fhir = [{"location": {"display": loc.name}}]
-        except Location.DoesNotExist:
-            pass
+    if model.location_id in refs.locations:
+        location_fhir = [{"location": {"display": refs.location_name(model.location_id)}}]
 
     # class code → display via map
     class_code    = model.class_field or ""
@@ -1440,19 +1504,295 @@ def encounters_to_bundle(queryset):
     Returns:
         dict: { "resourceType": "Bundle", "type": "collection", "entry": [...] }
     """
+    encounters = list(queryset)
+    refs = FhirReferences.collect(encounters, **_ENCOUNTER_REFS)
     return {
         "resourceType": "Bundle",
         "type":         "collection",
-        "entry":        [{"resource": encounter_to_fhir(enc)} for enc in queryset],
+        "entry":        [{"resource": encounter_to_fhir(enc, refs)} for enc in encounters],
     }
 
 
+# ---------------------------------------------------------------------------
+# FHIR Condition / AllergyIntolerance conversion
+# ---------------------------------------------------------------------------
+# Used by the patient record transfer below. Both carry their unique local
+# identifier as the FHIR id, like Encounter and Procedure.
+# ---------------------------------------------------------------------------
+
+_CONDITION_REFS = {
+    "patient_fields":      ("patient_id",),
+    "practitioner_fields": ("recorder_id", "asserter_id"),
+}
+
+_ALLERGY_REFS = {
+    "patient_fields":      ("patient_id",),
+    "practitioner_fields": ("recorder_id", "asserter_id"),
+}
+
+
+def _status_concept(system, code):
+    return {"coding": [{"system": system, "code": code}]} if code else None
+
+
+def _text_concept(text):
+    return {"text": text} if text else None
+
+
+def condition_to_fhir(model, refs=None):
+    """Convert a local Condition instance to a PH Core FHIR Condition resource.
+
+    - clinicalStatus / verificationStatus use the HL7 condition code systems.
+    - code, category and severity are sent as free text.
+    - Null / empty fields are omitted entirely.
+    """
+    if refs is None:
+        refs = FhirReferences.collect([model], **_CONDITION_REFS)
+
+    patient_fhir_id, patient_display = refs.patient_ref(model.patient_id)
+    fhir = {
+        "resourceType": "Condition",
+        "id":           model.identifier,
+        "meta": {
+            "profile":     [f"{_URN_EXT}/ph-core-condition"],
+            "lastUpdated": _meta_last_updated(model.updated_at),
+        },
+        "clinicalStatus": _status_concept(
+            "http://terminology.hl7.org/CodeSystem/condition-clinical", model.clinical_status,
+        ),
+        "verificationStatus": _status_concept(
+            "http://terminology.hl7.org/CodeSystem/condition-ver-status", model.verification_status,
+        ),
+        "category": [_text_concept(model.category)] if model.category else None,
+        "severity": _text_concept(model.severity),
+        "code":     _text_concept(model.code),
+        "bodySite": [_text_concept(model.body_site)] if model.body_site else None,
+        "subject": {
+            "display":   patient_display,
+            "reference": f"Patient/{patient_fhir_id}",
+        },
+        "onsetDateTime":     format_fhir_datetime(model.onset_datetime) if model.onset_datetime else None,
+        "abatementDateTime": (
+            format_fhir_datetime(model.abatement_datetime) if model.abatement_datetime else None
+        ),
+        "recordedDate": str(model.recorded_date) if model.recorded_date else None,
+        "recorder":     refs.practitioner_ref(model.recorder_id),
+        "asserter":     refs.practitioner_ref(model.asserter_id),
+        "note":         [{"text": model.note}] if model.note else None,
+    }
+    return {k: v for k, v in fhir.items() if v is not None}
+
+
+def allergy_to_fhir(model, refs=None):
+    """Convert a local AllergyIntolerance instance to a PH Core FHIR AllergyIntolerance resource.
+
+    - clinicalStatus / verificationStatus use the HL7 allergy code systems.
+    - A single reaction is built from the reaction_* columns, as free text.
+    - Null / empty fields are omitted entirely.
+    """
+    if refs is None:
+        refs = FhirReferences.collect([model], **_ALLERGY_REFS)
+
+    patient_fhir_id, patient_display = refs.patient_ref(model.patient_id)
+    reaction = _clean({
+        "description":   model.reaction_description,
+        "substance":     _text_concept(model.reaction_substance),
+        "manifestation": [_text_concept(model.reaction_manifestation)] if model.reaction_manifestation else None,
+        "onset":         str(model.reaction_onset) if model.reaction_onset else None,
+        "severity":      model.reaction_severity,
+        "exposureRoute": _text_concept(model.reaction_exposure_route),
+        "note":          [{"text": model.reaction_note}] if model.reaction_note else None,
+    })
+    fhir = {
+        "resourceType": "AllergyIntolerance",
+        "id":           model.identifier,
+        "meta": {
+            "profile":     [f"{_URN_EXT}/ph-core-allergyintolerance"],
+            "lastUpdated": _meta_last_updated(model.updated_at),
+        },
+        "clinicalStatus": _status_concept(
+            "http://terminology.hl7.org/CodeSystem/allergyintolerance-clinical", model.clinical_status,
+        ),
+        "verificationStatus": _status_concept(
+            "http://terminology.hl7.org/CodeSystem/allergyintolerance-verification", model.verification_status,
+        ),
+        "type":        model.type,
+        "category":    [model.category] if model.category else None,
+        "criticality": model.criticality,
+        "code":        _text_concept(model.code),
+        "patient": {
+            "display":   patient_display,
+            "reference": f"Patient/{patient_fhir_id}",
+        },
+        "onsetDateTime":  format_fhir_datetime(model.onset_datetime) if model.onset_datetime else None,
+        "recordedDate":   str(model.recorded_date) if model.recorded_date else None,
+        "recorder":       refs.practitioner_ref(model.recorder_id),
+        "asserter":       refs.practitioner_ref(model.asserter_id),
+        "lastOccurrence": model.last_occurrence,
+        "reaction":       [reaction] if reaction else None,
+        "note":           [{"text": model.note}] if model.note else None,
+    }
+    return {k: v for k, v in fhir.items() if v is not None}
+
+
+# ---------------------------------------------------------------------------
+# Patient record transfer
+# ---------------------------------------------------------------------------
+# A referral ships the whole record (Patient, Encounters, Procedures,
+# Immunizations, Conditions, Allergies) as one FHIR transaction Bundle in a
+# single gateway call, instead of one push per resource. Entries are PUTs
+# keyed on the logical id so a re-delivered Bundle updates rather than
+# duplicates. References across every section are resolved together: the
+# whole Bundle costs one query per resource type plus three lookups.
+# ---------------------------------------------------------------------------
+BUNDLE_PUSH_PATH = "/api/v1/fhir/push/Bundle"
+
+
+def patient_record_bundle(patient):
+    """Build the transfer transaction Bundle for one patient.
+
+    Returns:
+        dict: { "resourceType": "Bundle", "type": "transaction", "entry": [...] },
+              each entry carrying the resource and a PUT request.
+    """
+    # Local import — Admission is the source of truth for these, read-only
+    from admission.models import Encounter, Procedure
+    from patients.models import AllergyIntolerance, Condition, Immunization
+
+    sections = [
+        (list(Encounter.objects.filter(subject_id=patient.pk).order_by("pk")),
+         encounter_to_fhir, _ENCOUNTER_REFS),
+        (list(Procedure.objects.filter(subject_id=patient.pk).order_by("pk")),
+         procedure_to_fhir, _PROCEDURE_REFS),
+        (list(Immunization.objects.filter(patient_id=patient.pk).order_by("pk")),
+         immunization_to_fhir, _IMMUNIZATION_REFS),
+        (list(Condition.objects.filter(patient_id=patient.pk).order_by("pk")),
+         condition_to_fhir, _CONDITION_REFS),
+        (list(AllergyIntolerance.objects.filter(patient_id=patient.pk).order_by("pk")),
+         allergy_to_fhir, _ALLERGY_REFS),
+    ]
+    refs = FhirReferences.collect_groups((models, spec) for models, _, spec in sections)
+
+    resources = [patient_to_fhir(patient)]
+    for models, convert, _ in sections:
+        resources += [convert(model, refs) for model in models]
+
+    return {
+        "resourceType": "Bundle",
+        "type":         "transaction",
+        "entry": [
+            {
+                "resource": resource,
+                "request":  {"method": "PUT", "url": f"{resource['resourceType']}/{resource['id']}"},
+            }
+            for resource in resources
+        ],
+    }
+
+
+def patient_record_push_payload(target_id, bundle):
+    """Body of a patient record transfer (a transaction Bundle)."""
+    return {
+        "senderId":     os.getenv("WAH4PC_PROVIDER_ID"),
+        "targetId":     target_id,
+        "resourceType": "Bundle",
+        "resource":     bundle,
+    }
+
+
+def bundle_entry_outcomes(result):
+    """Per-entry response.status/outcome from a transaction-response Bundle.
+
+    `result` is a gateway answer or webhook body; the Bundle may sit at the
+    top level or under "data"/"resource". Returns a list aligned with the
+    request entries, or [] when no response Bundle is present.
+    """
+    if not isinstance(result, dict):
+        return []
+    for bundle in (result, result.get("data"), result.get("resource")):
+        if isinstance(bundle, dict) and bundle.get("resourceType") == "Bundle":
+            return [
+                (entry.get("response") or {}) if isinstance(entry, dict) else {}
+                for entry in bundle.get("entry") or []
+            ]
+    return []
+
+
+# ---------------------------------------------------------------------------
+# Streaming Bundle encoding
+# ---------------------------------------------------------------------------
+# A query answer for a long-stay patient can hold years of encounters. The
+# *_to_bundle builders above keep the whole Bundle in memory (and requests
+# then encodes it into one more big string); these generators instead read
+# the rows in chunks and yield UTF-8 JSON as they go, so memory stays flat
+# whatever the history size. References are resolved once per chunk.
+# ---------------------------------------------------------------------------
+BUNDLE_CHUNK_SIZE = 200
+
+_BUNDLE_CONVERTERS = {
+    "Encounter":    (encounter_to_fhir, _ENCOUNTER_REFS),
+    "Procedure":    (procedure_to_fhir, _PROCEDURE_REFS),
+    "Immunization": (immunization_to_fhir, _IMMUNIZATION_REFS),
+}
+
+
+def iter_bundle_json(queryset, resource_type, chunk_size=BUNDLE_CHUNK_SIZE):
+    """Yield a collection Bundle of Encounter/Procedure/Immunization rows as JSON bytes.
+
+    Args:
+        queryset: QuerySet (read with .iterator(chunk_size)) or any iterable
+        resource_type: "Encounter", "Procedure" or "Immunization"
+        chunk_size: Rows converted (and references resolved) per step
+
+    The joined output decodes to the same document as the matching
+    *_to_bundle() builder.
+    """
+    to_fhir, ref_fields = _BUNDLE_CONVERTERS[resource_type]
+    rows = queryset.iterator(chunk_size=chunk_size) if hasattr(queryset, "iterator") else iter(queryset)
+
+    yield b'{"resourceType": "Bundle", "type": "collection", "entry": ['
+    separator = b""
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        refs = FhirReferences.collect(chunk, **ref_fields)
+        entries = ", ".join(json.dumps({"resource": to_fhir(row, refs)}) for row in chunk)
+        yield separator + entries.encode("utf-8")
+        separator = b", "
+    yield b"]}"
+
+
+def iter_json_object(fields, stream_key, stream):
+    """Yield a JSON object: `fields` plus one member whose value is streamed.
+
+    `stream` must yield an already-encoded JSON value in bytes (e.g.
+    iter_bundle_json()).
+    """
+    head = json.dumps(fields)[:-1]
+    if fields:
+        head += ", "
+    yield f"{head}{json.dumps(stream_key)}: ".encode("utf-8")
+    yield from stream
+    yield b"}"
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip-compress a stream of bytes chunk by chunk."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
 def import_immunization_from_fhir(fhir_data):
     """Parse a FHIR Immunization resource and upsert into the local Immunization model.
 
     Resolution order for the patient FK:
     1. Try the reference value as a plain integer local PK.
-    2. Scan Patient rows matching the deterministic uuid5 used by immunization_to_fhir.
+    2. Look the value up as the patient's persisted FHIR logical id (fhir_id).
 
     Upsert key priority:
     1. identifier value (unique in DB) — if present.
@@ -1473,11 +1813,7 @@ def import_immunization_from_fhir(fhir_data):
         try:
             patient = Patient.objects.get(id=int(ref_value))
         except (ValueError, Patient.DoesNotExist):
-            # Reverse the deterministic uuid5 by scanning (small table assumption)
-            for p in Patient.objects.all():
-                if str(uuid.uuid5(uuid.NAMESPACE_OID, f"patient:{p.id}")) == ref_value:
-                    patient = p
-                    break
+            patient = Patient.objects.filter(fhir_id=ref_value).first()
 
     if patient is None:
         return None
@@ -1626,71 +1962,12 @@ def push_immunization(target_id, immunization_model, idempotency_key=None):
         dict: Response with transaction data on success, or 'error' and 'status_code' on failure.
               Retries up to _MAX_ATTEMPTS times on 409/429 before giving up.
     """
-    api_key     = os.getenv("WAH4PC_API_KEY")
-    provider_id = os.getenv("WAH4PC_PROVIDER_ID")
-
     if not idempotency_key:
         idempotency_key = str(uuid.uuid4())
 
-    last_retryable_result = None
-
-    for attempt in range(_MAX_ATTEMPTS):
-        if attempt > 0:
-            time.sleep(_BACKOFF_SECONDS[min(attempt - 1, len(_BACKOFF_SECONDS) - 1)])
-
-        try:
-            response = requests.post(
-                f"{URL}/api/v1/fhir/push/Immunization",
-                headers={
-                    "X-API-Key":        api_key,
-                    "X-Provider-ID":    provider_id,
-                    "Idempotency-Key":  idempotency_key,
-                },
-                json={
-                    "senderId":     provider_id,
-                    "targetId":     target_id,
-                    "resourceType": "Immunization",
-                    "resource": {
-                        "resourceType": "Bundle",
-                        "type":         "collection",
-                        "entry":        [{"resource": immunization_to_fhir(immunization_model)}],
-                    },
-                },
-            )
-
-            if response.status_code in _RETRY_STATUSES:
-                last_retryable_result = {
-                    "error": (
-                        "Request already in progress — retrying"
-                        if response.status_code == 409
-                        else "Rate limit exceeded — retrying"
-                    ),
-                    "status_code": response.status_code,
-                    "idempotency_key": idempotency_key,
-                }
-                continue
-
-            if response.status_code >= 400:
-                error_msg = (
-                    response.json().get("error", "Unknown error")
-                    if response.text
-                    else "Unknown error"
-                )
-                return {
-                    "error": error_msg,
-                    "status_code": response.status_code,
-                    "idempotency_key": idempotency_key,
-                }
-
-            result = response.json()
-            result["idempotency_key"] = idempotency_key
-            return result
-
-        except requests.RequestException as e:
-            return {
-                "error": f"Network error: {str(e)}",
-                "status_code": 500,
-                "idempotency_key": idempotency_key,
-            }
-
-    return last_retryable_result
+    return get_gateway_client().post_with_retry(
+        IMMUNIZATION_PUSH_PATH,
+        immunization_push_payload(target_id, immunization_model),
+        "fhir_push",
+        idempotency_key,
+    )
@@ -11,7 +11,7 @@ class MedicationSerializer(serializers.ModelSerializer):
         model = Medication
         fields = '__all__'
 
-from patients.models import Patient
+from patients.services import patient_acl
 from accounts.models import Practitioner
 
 class MedicationRequestSerializer(serializers.ModelSerializer):
@@ -30,12 +30,12 @@ class MedicationRequestSerializer(serializers.ModelSerializer):
         patients_map = self.context.get('patients_map', {})
         if obj.subject_id in patients_map:
             patient = patients_map[obj.subject_id]
-            return f"{patient.first_name} {patient.last_name}".strip()
+            return f"{patient['first_name']} {patient['last_name']}".strip()
             
-        # Fallback to single query if not in context
-        patient = Patient.objects.filter(id=obj.subject_id).first()
+        # Fallback to the patient ACL if not in context
+        patient = patient_acl.get_patient_summary(obj.subject_id)
         if patient:
-            return f"{patient.first_name} {patient.last_name}".strip()
+            return f"{patient['first_name']} {patient['last_name']}".strip()
         return "Unknown"
 
     def get_practitioner_name(self, obj):
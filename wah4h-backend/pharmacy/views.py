@@ -10,6 +10,7 @@ from .serializers import (
     MedicationAdministrationSerializer
 )
 from django_filters.rest_framework import DjangoFilterBackend
+from patients.services import patient_acl
 
 class InventoryViewSet(viewsets.ModelViewSet):
     queryset = Inventory.objects.all()
@@ -62,11 +63,7 @@ class MedicationRequestViewSet(viewsets.ModelViewSet):
             if req.requester_id:
                 practitioner_ids.add(req.requester_id)
         
-        patients_map = {}
-        if subject_ids:
-            from patients.models import Patient
-            patients = Patient.objects.filter(id__in=subject_ids)
-            patients_map = {p.id: p for p in patients}
+        patients_map = patient_acl.get_patient_summaries(subject_ids)
 
         practitioners_map = {}
         if practitioner_ids:
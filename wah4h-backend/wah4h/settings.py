@@ -56,6 +56,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "patients.middleware.PatientLookupScopeMiddleware",
 ]
 
 ROOT_URLCONF = "wah4h.urls"
@@ -121,6 +122,8 @@ MEDIA_ROOT = BASE_DIR / "media"
 # CORS (DEV)
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
+# Keyset pagination metadata on /api/patients/ (see PatientViewSet.list)
+CORS_EXPOSE_HEADERS = ["X-Next-Cursor", "Link"]
 
 # Custom user model
 AUTH_USER_MODEL = "accounts.User"